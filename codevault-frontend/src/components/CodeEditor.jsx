@@ -110,6 +110,10 @@ const CodeEditor = ({ initialCode = '', language = 'PYTHON', onCodeChange, probl
                 code: code
             });
 
+            // Code that does not compile gets one verdict; every case is reported as not run
+            if (response.data.compile_output) {
+                setError(`Compilation Error:\n${response.data.compile_output}`);
+            }
             setTestResults(response.data);
         } catch (err) {
             console.error('Test execution error:', err);
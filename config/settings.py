@@ -172,12 +172,138 @@ SIMPLE_JWT = {
 }
 
 # Code Execution API Configuration
-CODE_EXECUTION_API = os.getenv('CODE_EXECUTION_API', 'piston')  # 'piston' or 'judge0'
+CODE_EXECUTION_API = os.getenv('CODE_EXECUTION_API', 'piston')  # 'piston', 'judge0' or 'local'
 
 # Piston API Configuration (FREE - No API key required!)
+# Several self-hosted instances may be listed comma-separated; requests are balanced between them
 PISTON_API_URL = os.getenv('PISTON_API_URL', 'https://emkc.org/api/v2/piston')
+# Pinned runtime versions, e.g. "PYTHON=3.10.0,JAVA=15.0.2" (unpinned languages use the latest)
+PISTON_LANGUAGE_VERSIONS = {
+    language.strip().upper(): version.strip()
+    for language, version in (
+        item.split('=', 1) for item in os.getenv('PISTON_LANGUAGE_VERSIONS', '').split(',') if '=' in item
+    )
+}
+# Highest run_timeout/run_cpu_time (ms) the Piston hosts accept: 3000 on a stock install and the
+# public API. Raise it along with the limits of a self-hosted Piston to allow longer time limits.
+PISTON_MAX_RUN_TIMEOUT_MS = int(os.getenv('PISTON_MAX_RUN_TIMEOUT_MS', '3000'))
 
 # Judge0 API Configuration (Requires RapidAPI subscription)
 JUDGE0_API_URL = os.getenv('JUDGE0_API_URL', 'https://judge0-ce.p.rapidapi.com')
 JUDGE0_API_KEY = os.getenv('JUDGE0_API_KEY', '')
 JUDGE0_API_HOST = os.getenv('JUDGE0_API_HOST', 'judge0-ce.p.rapidapi.com')
+
+# Judge0 polling backoff (seconds)
+JUDGE0_POLL_INITIAL_INTERVAL = float(os.getenv('JUDGE0_POLL_INITIAL_INTERVAL', '0.05'))
+JUDGE0_POLL_MAX_INTERVAL = float(os.getenv('JUDGE0_POLL_MAX_INTERVAL', '1.0'))
+JUDGE0_POLL_TIMEOUT = float(os.getenv('JUDGE0_POLL_TIMEOUT', '30'))
+
+# Judge0 callback mode (optional): public URL of /api/judge0/callback/ and its shared secret.
+# Use a shared CACHES backend (e.g. Redis) so callbacks reach waiters in every worker process.
+JUDGE0_CALLBACK_URL = os.getenv('JUDGE0_CALLBACK_URL', '')
+JUDGE0_CALLBACK_SECRET = os.getenv('JUDGE0_CALLBACK_SECRET', '')
+
+# Executor failover: a backend whose calls keep failing (request errors, 429/5xx, timeouts, or more
+# than EXECUTOR_BREAKER_SLOW_CALL seconds of overhead) is skipped until a background probe succeeds.
+# Its executions then go to EXECUTOR_FAILOVER_API ('piston' or 'judge0'; empty to fail fast instead).
+EXECUTOR_FAILOVER_API = os.getenv('EXECUTOR_FAILOVER_API', '')
+# The breaker is on by default only with a failover backend; set True to also fail fast without one
+EXECUTOR_BREAKER_ENABLED = os.getenv('EXECUTOR_BREAKER_ENABLED', str(bool(EXECUTOR_FAILOVER_API))) == 'True'
+EXECUTOR_BREAKER_WINDOW = float(os.getenv('EXECUTOR_BREAKER_WINDOW', '30'))  # seconds
+EXECUTOR_BREAKER_MIN_CALLS = int(os.getenv('EXECUTOR_BREAKER_MIN_CALLS', '5'))
+EXECUTOR_BREAKER_FAILURE_RATE = float(os.getenv('EXECUTOR_BREAKER_FAILURE_RATE', '0.5'))
+EXECUTOR_BREAKER_SLOW_CALL = float(os.getenv('EXECUTOR_BREAKER_SLOW_CALL', '5'))  # seconds
+EXECUTOR_PROBE_INTERVAL = float(os.getenv('EXECUTOR_PROBE_INTERVAL', '5'))  # seconds
+
+# Local Executor (CODE_EXECUTION_API=local): runs code in rlimited subprocesses on this host.
+# Needs python3/node/g++/javac installed; run the app as an unprivileged user inside a container.
+LOCAL_EXECUTOR_TIMEOUT = float(os.getenv('LOCAL_EXECUTOR_TIMEOUT', '10'))  # wall-clock seconds
+LOCAL_EXECUTOR_CPU_LIMIT = int(os.getenv('LOCAL_EXECUTOR_CPU_LIMIT', '5'))  # CPU seconds
+LOCAL_EXECUTOR_MEMORY_LIMIT_MB = int(os.getenv('LOCAL_EXECUTOR_MEMORY_LIMIT_MB', '256'))
+LOCAL_EXECUTOR_FILE_SIZE_LIMIT_MB = int(os.getenv('LOCAL_EXECUTOR_FILE_SIZE_LIMIT_MB', '16'))
+# Best-effort: RLIMIT_NPROC counts every process/thread of the app's user, so a run may start this many
+# more on top of the user's count at launch (shared with anything else the user starts; 0 disables)
+LOCAL_EXECUTOR_MAX_PROCESSES = int(os.getenv('LOCAL_EXECUTOR_MAX_PROCESSES', '256'))
+LOCAL_EXECUTOR_COMPILE_TIMEOUT = float(os.getenv('LOCAL_EXECUTOR_COMPILE_TIMEOUT', '30'))  # seconds
+LOCAL_EXECUTOR_TEMP_DIR = os.getenv('LOCAL_EXECUTOR_TEMP_DIR') or None
+# Compiled C++/Java builds are cached here, keyed on source and compiler flags (0 MB disables)
+LOCAL_COMPILE_CACHE_DIR = os.getenv('LOCAL_COMPILE_CACHE_DIR', str(BASE_DIR / '.compile_cache'))
+LOCAL_COMPILE_CACHE_MAX_MB = int(os.getenv('LOCAL_COMPILE_CACHE_MAX_MB', '256'))
+# Warm JVM workers for Java (0 disables): replaced after MAX_RUNS runs or past MAX_RSS_MB resident memory
+LOCAL_JVM_POOL_SIZE = int(os.getenv('LOCAL_JVM_POOL_SIZE', '0'))
+LOCAL_JVM_POOL_MAX_RUNS = int(os.getenv('LOCAL_JVM_POOL_MAX_RUNS', '100'))
+LOCAL_JVM_POOL_MAX_RSS_MB = int(os.getenv('LOCAL_JVM_POOL_MAX_RSS_MB', '512'))
+# Fork Python runs from a pre-started interpreter with common stdlib modules already imported
+LOCAL_PYTHON_ZYGOTE = os.getenv('LOCAL_PYTHON_ZYGOTE', 'False') == 'True'
+
+# Executor HTTP Client (shared keep-alive connection pool for Piston/Judge0)
+EXECUTOR_HTTP_POOL_SIZE = int(os.getenv('EXECUTOR_HTTP_POOL_SIZE', '20'))
+EXECUTOR_CONNECT_TIMEOUT = float(os.getenv('EXECUTOR_CONNECT_TIMEOUT', '3.05'))  # seconds
+EXECUTOR_READ_TIMEOUT = float(os.getenv('EXECUTOR_READ_TIMEOUT', '10'))  # seconds
+# Connections the async client of the /api/asgi/ views may open per event loop
+EXECUTOR_ASYNC_MAX_CONNECTIONS = int(os.getenv('EXECUTOR_ASYNC_MAX_CONNECTIONS', '200'))
+# With several endpoints: route to the one with the fewest requests in flight ('least_outstanding') or
+# the lowest load-weighted latency ('latency'), with at most MAX_CONCURRENCY requests each (0 = no cap)
+EXECUTOR_ROUTING_POLICY = os.getenv('EXECUTOR_ROUTING_POLICY', 'least_outstanding')
+EXECUTOR_ENDPOINT_MAX_CONCURRENCY = int(os.getenv('EXECUTOR_ENDPOINT_MAX_CONCURRENCY', '0'))
+# Hedging (several endpoints only): a request still running after DELAY_FRACTION of the recent p95 latency
+# is also sent to another endpoint and the first answer is used; at most MAX_RATE of requests are hedged
+EXECUTOR_HEDGING = os.getenv('EXECUTOR_HEDGING', 'False') == 'True'
+EXECUTOR_HEDGE_DELAY_FRACTION = float(os.getenv('EXECUTOR_HEDGE_DELAY_FRACTION', '1.0'))
+EXECUTOR_HEDGE_MAX_RATE = float(os.getenv('EXECUTOR_HEDGE_MAX_RATE', '0.1'))
+
+# Execution Result Cache (identical runs are answered without calling the executor)
+EXECUTION_CACHE_BACKEND = os.getenv('EXECUTION_CACHE_BACKEND', 'memory')  # 'memory', 'file', 'django' or 'none'
+EXECUTION_CACHE_MAX_ENTRIES = int(os.getenv('EXECUTION_CACHE_MAX_ENTRIES', '1024'))
+EXECUTION_CACHE_TTL = int(os.getenv('EXECUTION_CACHE_TTL', '3600'))  # seconds
+EXECUTION_CACHE_DIR = os.getenv('EXECUTION_CACHE_DIR', str(BASE_DIR / '.execution_cache'))
+EXECUTION_CACHE_ALIAS = os.getenv('EXECUTION_CACHE_ALIAS', 'default')  # Django cache used by the 'django' backend
+
+# Asynchronous Execution Jobs ("async": true; drained by `python manage.py run_execution_worker`)
+EXECUTION_JOB_LEASE_SECONDS = int(os.getenv('EXECUTION_JOB_LEASE_SECONDS', '120'))  # reclaimed after a worker dies
+EXECUTION_JOB_MAX_ATTEMPTS = int(os.getenv('EXECUTION_JOB_MAX_ATTEMPTS', '3'))
+EXECUTION_WORKER_CONCURRENCY = int(os.getenv('EXECUTION_WORKER_CONCURRENCY', '4'))  # jobs per worker process
+EXECUTION_WORKER_POLL_INTERVAL = float(os.getenv('EXECUTION_WORKER_POLL_INTERVAL', '0.5'))  # seconds
+
+# A user's newest run of a problem supersedes the earlier ones (their tokens live in the Django cache;
+# use a shared CACHES backend so runs in other worker processes are stopped too)
+EXECUTION_TOKEN_TTL = int(os.getenv('EXECUTION_TOKEN_TTL', '3600'))  # seconds
+
+# Execution Scheduler: executions that reach a backend share this many slots per process (0 disables).
+# Queued executions are served fairly per user, in a "run" lane (POST /api/execute/) and a "submit"
+# lane (run_tests) that share the slots by weight, e.g. "run=4,submit=1"
+EXECUTION_SCHEDULER_SLOTS = int(os.getenv('EXECUTION_SCHEDULER_SLOTS', '8'))
+EXECUTION_SCHEDULER_LANE_WEIGHTS = {
+    lane.strip().lower(): float(weight)
+    for lane, weight in (
+        item.split('=', 1) for item in os.getenv('EXECUTION_SCHEDULER_LANE_WEIGHTS', 'run=4,submit=1').split(',')
+        if '=' in item
+    )
+}
+
+# Execution Bulkhead: requests to the execution endpoints (run_code, run_tests and their ASGI
+# versions) handled at once per process (0 disables). Up to EXECUTION_BULKHEAD_QUEUE more wait for
+# a turn, for at most EXECUTION_BULKHEAD_QUEUE_TIMEOUT seconds; the rest get 429 with Retry-After.
+# Keep CONCURRENCY + QUEUE below the gunicorn threads per worker (gunicorn.conf.py) so the other
+# endpoints always find a free thread.
+EXECUTION_BULKHEAD_CONCURRENCY = int(os.getenv('EXECUTION_BULKHEAD_CONCURRENCY', '4'))
+EXECUTION_BULKHEAD_QUEUE = int(os.getenv('EXECUTION_BULKHEAD_QUEUE', '4'))
+EXECUTION_BULKHEAD_QUEUE_TIMEOUT = float(os.getenv('EXECUTION_BULKHEAD_QUEUE_TIMEOUT', '10'))
+# The ASGI execution views hold no thread while they wait, so they have a bulkhead of their own
+EXECUTION_BULKHEAD_ASYNC_CONCURRENCY = int(os.getenv('EXECUTION_BULKHEAD_ASYNC_CONCURRENCY', '200'))
+EXECUTION_BULKHEAD_ASYNC_QUEUE = int(os.getenv('EXECUTION_BULKHEAD_ASYNC_QUEUE', '200'))
+
+# Test Case Execution
+# Size of the process-wide thread pool shared by all test runs
+TEST_CASE_MAX_WORKERS = int(os.getenv('TEST_CASE_MAX_WORKERS', '8'))
+# Test cases a single submission may run at once (1 = sequential)
+TEST_CASE_CONCURRENCY = int(os.getenv('TEST_CASE_CONCURRENCY', '4'))
+# Run all test cases of a submission in one execution where a batch harness exists
+TEST_CASE_BATCH_MODE = os.getenv('TEST_CASE_BATCH_MODE', 'True') == 'True'
+# Per-language overrides, e.g. "JAVA=2,PYTHON=6"
+TEST_CASE_CONCURRENCY_BY_LANGUAGE = {
+    language.strip().upper(): int(value)
+    for language, value in (
+        item.split('=', 1) for item in os.getenv('TEST_CASE_CONCURRENCY_BY_LANGUAGE', '').split(',') if '=' in item
+    )
+}
@@ -0,0 +1,16 @@
+"""
+Gunicorn settings, read automatically from the directory gunicorn starts in.
+
+Threaded workers: each worker process handles GUNICORN_THREADS requests at
+once. Code execution requests take at most EXECUTION_BULKHEAD_CONCURRENCY +
+EXECUTION_BULKHEAD_QUEUE of those threads (see problems/bulkhead.py), so the
+rest of the API keeps free threads however much code is being run.
+
+The asgi process (Procfile) overrides the worker class with
+-k uvicorn.workers.UvicornWorker; threads does not apply there.
+"""
+import os
+
+
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', '16'))
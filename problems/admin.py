@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Problem, Solution, Collection
+from .models import Problem, Solution, Collection, ExecutionJob, TestCaseHistory
 
 
 @admin.register(Problem)
@@ -79,3 +79,46 @@ class CollectionAdmin(admin.ModelAdmin):
         return obj.problems.count()
     
     problem_count.short_description = 'Problems'
+
+
+@admin.register(ExecutionJob)
+class ExecutionJobAdmin(admin.ModelAdmin):
+    """Admin interface for asynchronous execution jobs (read-only monitoring)."""
+    
+    list_display = ('id', 'user', 'kind', 'language', 'status', 'completed_count', 'total_count', 'created_at')
+    list_filter = ('status', 'kind', 'language')
+    search_fields = ('id', 'user__username', 'worker')
+    readonly_fields = (
+        'id', 'user', 'problem', 'kind', 'language', 'code', 'input_data', 'test_cases', 'limits',
+        'stop_on_first_failure', 'status', 'completed_count', 'total_count', 'result', 'error',
+        'worker', 'attempts', 'lease_expires_at', 'created_at', 'started_at', 'finished_at'
+    )
+    
+    fieldsets = (
+        ('Job', {
+            'fields': ('id', 'user', 'problem', 'kind', 'language', 'status')
+        }),
+        ('Submission', {
+            'fields': ('code', 'input_data', 'test_cases', 'limits', 'stop_on_first_failure'),
+            'classes': ('collapse',)
+        }),
+        ('Progress', {
+            'fields': ('completed_count', 'total_count', 'result', 'error')
+        }),
+        ('Worker', {
+            'fields': ('worker', 'attempts', 'lease_expires_at')
+        }),
+        ('Timestamps', {
+            'fields': ('created_at', 'started_at', 'finished_at'),
+            'classes': ('collapse',)
+        }),
+    )
+
+
+@admin.register(TestCaseHistory)
+class TestCaseHistoryAdmin(admin.ModelAdmin):
+    """Admin interface for the failing test cases remembered per user and problem."""
+    
+    list_display = ('problem', 'user', 'updated_at')
+    search_fields = ('problem__problem_name', 'user__username')
+    readonly_fields = ('user', 'problem', 'failed_cases', 'updated_at')
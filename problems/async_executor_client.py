@@ -0,0 +1,147 @@
+"""
+Async HTTP client for the remote code execution services (Piston, Judge0).
+
+The counterpart of executor_client for coroutines (see async_services): one
+httpx.AsyncClient per event loop keeps a pool of keep-alive connections
+(closed when the loop shuts down), and waiting on an executor costs a
+suspended coroutine instead of a blocked thread, so a worker process can
+have hundreds of executions in flight.
+"""
+import asyncio
+import threading
+import weakref
+
+import httpx
+from django.conf import settings
+
+
+EXECUTOR_HTTP_POOL_SIZE = getattr(settings, 'EXECUTOR_HTTP_POOL_SIZE', 20)
+EXECUTOR_ASYNC_MAX_CONNECTIONS = getattr(settings, 'EXECUTOR_ASYNC_MAX_CONNECTIONS', 200)
+EXECUTOR_CONNECT_TIMEOUT = getattr(settings, 'EXECUTOR_CONNECT_TIMEOUT', 3.05)  # seconds
+EXECUTOR_READ_TIMEOUT = getattr(settings, 'EXECUTOR_READ_TIMEOUT', 10)  # seconds
+
+
+class AsyncExecutorClient:
+    """Pooled keep-alive async HTTP client for code execution services."""
+
+    def __init__(self, max_connections=EXECUTOR_ASYNC_MAX_CONNECTIONS, keepalive=EXECUTOR_HTTP_POOL_SIZE,
+                 connect_timeout=EXECUTOR_CONNECT_TIMEOUT, read_timeout=EXECUTOR_READ_TIMEOUT):
+        """
+        Args:
+            max_connections (int): Maximum concurrent connections across hosts
+            keepalive (int): Idle keep-alive connections kept open
+            connect_timeout (float): Seconds to wait for a TCP/TLS connection
+            read_timeout (float): Seconds to wait for the response
+        """
+        self.max_connections = max_connections
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=keepalive),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+        )
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._errors = 0
+
+    async def request(self, method, url, **kwargs):
+        """
+        Send a request over the pooled client.
+
+        Args:
+            method (str): HTTP method
+            url (str): Absolute URL
+            **kwargs: Passed to httpx.AsyncClient.request
+
+        Returns:
+            httpx.Response: The response
+
+        Raises:
+            httpx.HTTPError: If the request fails
+        """
+        with self._lock:
+            self._requests += 1
+        try:
+            return await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            with self._lock:
+                self._errors += 1
+            raise
+
+    async def get(self, url, **kwargs):
+        """Send a GET request (see request)."""
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        """Send a POST request (see request)."""
+        return await self.request('POST', url, **kwargs)
+
+    async def aclose(self):
+        """Close the pooled connections."""
+        await self.client.aclose()
+
+    def stats(self):
+        """
+        Request counters.
+
+        Returns:
+            dict: {'requests': int, 'errors': int, 'max_connections': int}
+        """
+        with self._lock:
+            return {
+                'requests': self._requests,
+                'errors': self._errors,
+                'max_connections': self.max_connections,
+            }
+
+
+# httpx connections belong to the event loop that opened them
+_clients = weakref.WeakKeyDictionary()
+_clients_lock = threading.Lock()
+
+
+async def _close_on_shutdown(client):
+    """
+    Close client when its event loop shuts down.
+
+    Started as an async generator so the loop tracks it: asyncio.run, asgiref
+    and ASGI servers call loop.shutdown_asyncgens() before closing a loop,
+    which runs the finally below on that loop.
+    """
+    try:
+        yield
+    finally:
+        await client.aclose()
+
+
+def get_async_executor_client():
+    """
+    Return the async executor client of the running event loop.
+
+    Returns:
+        AsyncExecutorClient: Client shared by every coroutine on this loop
+    """
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        client = _clients.get(loop)
+        if client is None:
+            client = _clients[loop] = AsyncExecutorClient()
+            # Kept on the client: the loop only holds a weak reference to its generators
+            client._closer = _close_on_shutdown(client)
+            asyncio.ensure_future(client._closer.__anext__())
+        return client
+
+
+def get_async_executor_stats():
+    """
+    Request counters summed over the async clients of every event loop.
+
+    Returns:
+        dict: {'loops': int, 'requests': int, 'errors': int}
+    """
+    with _clients_lock:
+        clients = list(_clients.values())
+    stats = [client.stats() for client in clients]
+    return {
+        'loops': len(stats),
+        'requests': sum(item['requests'] for item in stats),
+        'errors': sum(item['errors'] for item in stats),
+    }
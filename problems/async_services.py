@@ -0,0 +1,472 @@
+"""
+Async code execution for the ASGI views (see async_views).
+
+execute_code_async and run_test_cases_async mirror execute_code and
+run_test_cases, but talk to Piston and Judge0 through the async executor
+client: an execution in flight is a suspended coroutine rather than a
+blocked thread, so one worker process can keep hundreds of them going.
+Routing and failover, the result cache, the scheduler, execution tokens and
+the batch harnesses are shared with the sync path.
+
+Differences from the sync path:
+    - the local executor runs programs in subprocesses and is driven from a
+      thread per execution
+    - in Judge0 callback mode, waiting for a callback holds a thread
+    - cancelled test cases stop their HTTP requests instead of letting them
+      finish in the background
+"""
+import asyncio
+
+import httpx
+from asgiref.sync import sync_to_async
+
+from .async_executor_client import get_async_executor_client
+from .executor_client import get_executor_client
+from .executor_router import get_executor_router
+from .local_executor import check_compilation_local, execute_code_local
+from .result_cache import MemoryResultCache, NullResultCache, get_result_cache, is_cacheable_result
+from .scheduler import async_execution_slot
+from .services import (
+    BATCH_HARNESS_WRAPPERS, CANCEL_CHECK_INTERVAL, COMPILED_LANGUAGES, EXECUTION_TIMEOUT_MESSAGE,
+    JUDGE0_API_ERROR_PREFIX, JUDGE0_API_HOST, JUDGE0_API_KEY, JUDGE0_API_URL, JUDGE0_BATCH_SIZE,
+    JUDGE0_CALLBACK_URL, JUDGE0_POLL_TIMEOUT, PISTON_API_ERROR_PREFIX, PISTON_API_URLS, TEST_CASE_BATCH_MODE,
+    AnyEvent, build_batch_harness, build_compile_error_summary, build_executor_unavailable_result,
+    build_judge0_batch, build_judge0_error_result, build_not_run_result, build_not_started_result,
+    build_piston_payload, build_test_case_result, build_test_run_summary, complete_backend_result,
+    format_judge0_result, format_piston_result, get_compile_error, get_poll_delays, get_test_case_concurrency,
+    is_backend_failure, is_judge0_finished, judge0_completions, parse_batch_results, parse_judge0_batch_tokens,
+    prepare_backend_execution, prepare_test_case_source, resolve_execution_limits
+)
+
+
+def build_error_result(message):
+    """Execution result for a run that failed before or outside the program."""
+    return {
+        'output': '',
+        'error': message,
+        'status': 'Error',
+        'status_id': 0,
+        'time': '0',
+        'memory': 0,
+        'compile_output': ''
+    }
+
+
+async def call_result_cache(method, *args):
+    """Call the result cache; backends doing file or network IO are called from a thread."""
+    if isinstance(get_result_cache(), (MemoryResultCache, NullResultCache)):
+        return method(*args)
+    return await sync_to_async(method, thread_sensitive=False)(*args)
+
+
+async def execute_code_async(language, code, input_data="", limits=None, batch=False):
+    """
+    Async version of execute_code.
+
+    Args:
+        language (str): Programming language (JAVA, PYTHON, CPP, JAVASCRIPT)
+        code (str): Source code to execute
+        input_data (str): Input data for stdin
+        limits (dict): Optional per-problem limits {'time_limit': seconds, 'memory_limit': MB}
+        batch (bool): The code is a batch harness running many test cases
+
+    Returns:
+        dict: Execution result in the execute_code format
+    """
+    if not code or not code.strip():
+        return build_error_result('No code provided')
+
+    limits = resolve_execution_limits(limits)
+
+    router = get_executor_router()
+    backend = router.choose_backend()
+    if backend is None:
+        return build_executor_unavailable_result()
+
+    result = await execute_code_on_backend_async(backend, language, code, input_data, limits, batch)
+    if is_backend_failure(result):
+        failover = router.get_failover(backend)
+        if failover:
+            result = await execute_code_on_backend_async(failover, language, code, input_data, limits, batch)
+    return result
+
+
+async def execute_code_on_backend_async(backend, language, code, input_data, limits, batch=False):
+    """Async version of execute_code_on_backend."""
+    code, cache_key = prepare_backend_execution(backend, language, code, input_data, limits)
+
+    result_cache = get_result_cache()
+    cached_result = await call_result_cache(result_cache.get, cache_key)
+    if cached_result is not None:
+        return cached_result
+
+    async with async_execution_slot() as scheduled:
+        if not scheduled:
+            return build_not_started_result()
+
+        started = asyncio.get_running_loop().time()
+        if backend == 'piston':
+            result = await execute_code_piston_async(language, code, input_data, limits)
+        elif backend == 'local':
+            result = await sync_to_async(execute_code_local, thread_sensitive=False)(
+                language, code, input_data, limits
+            )
+        else:
+            result = await execute_code_judge0_async(language, code, input_data, limits)
+
+    result = complete_backend_result(backend, result, asyncio.get_running_loop().time() - started, batch)
+    if is_cacheable_result(result):
+        await call_result_cache(result_cache.set, cache_key, result)
+    return result
+
+
+async def execute_code_piston_async(language, code, input_data="", limits=None):
+    """
+    Async version of execute_code_piston.
+
+    Returns:
+        dict: Execution result in the execute_code format
+    """
+    try:
+        payload = build_piston_payload(language, code, input_data, limits)
+    except ValueError as e:
+        return build_error_result(str(e))
+
+    client = get_async_executor_client()
+
+    async def send(base_url):
+        response = await client.post(f"{base_url}/execute", json=payload)
+        response.raise_for_status()
+        return response.json()
+
+    try:
+        result = await get_executor_client().get_endpoint_pool('piston', PISTON_API_URLS).call_async(send)
+        return format_piston_result(result)
+    except (httpx.HTTPError, ValueError) as e:
+        # ValueError: the response was not JSON
+        return build_error_result(f'{PISTON_API_ERROR_PREFIX}{str(e)}')
+    except Exception as e:
+        return build_error_result(f'Unexpected error: {str(e)}')
+
+
+async def execute_code_judge0_async(language, code, input_data="", limits=None):
+    """
+    Async version of execute_code_judge0: a batch of one submission, polled with backoff.
+
+    Returns:
+        dict: Execution result in the execute_code format
+    """
+    try:
+        tokens = await create_submissions_batch_async(language, [(code, input_data)], limits)
+        results = await poll_submissions_batch_async(tokens)
+        return format_judge0_result(results[tokens[0]])
+    except httpx.HTTPError as e:
+        return build_error_result(f'{JUDGE0_API_ERROR_PREFIX}{str(e)}')
+    except Exception as e:
+        return build_judge0_error_result(e)
+
+
+def get_judge0_headers():
+    """Headers of Judge0 API requests."""
+    return {
+        "X-RapidAPI-Key": JUDGE0_API_KEY,
+        "X-RapidAPI-Host": JUDGE0_API_HOST
+    }
+
+
+async def create_submissions_batch_async(language, submissions, limits=None):
+    """
+    Async version of create_submissions_batch.
+
+    Returns:
+        list: Submission tokens, in the same order as `submissions`
+
+    Raises:
+        httpx.HTTPError: If API request fails
+        ValueError: If any submission was rejected
+    """
+    response = await get_async_executor_client().post(
+        f"{JUDGE0_API_URL}/submissions/batch?base64_encoded=true",
+        json=build_judge0_batch(language, submissions, limits),
+        headers=get_judge0_headers()
+    )
+    response.raise_for_status()
+    return parse_judge0_batch_tokens(response.json(), len(submissions))
+
+
+async def get_submissions_batch_async(tokens):
+    """
+    Async version of get_submissions_batch.
+
+    Returns:
+        list: Submission results in token order (None for unknown tokens)
+
+    Raises:
+        httpx.HTTPError: If API request fails
+    """
+    response = await get_async_executor_client().get(
+        f"{JUDGE0_API_URL}/submissions/batch",
+        params={'tokens': ','.join(tokens), 'base64_encoded': 'true', 'fields': '*'},
+        headers=get_judge0_headers()
+    )
+    response.raise_for_status()
+    return response.json().get('submissions', [])
+
+
+async def wait_for_judge0_async(tokens, delay):
+    """
+    Async version of wait_for_judge0.
+
+    In callback mode the wait blocks a thread on the completion registry so
+    that a callback still ends it early; otherwise it is a plain sleep.
+    """
+    if not JUDGE0_CALLBACK_URL:
+        await asyncio.sleep(delay)
+        return {}
+    return await sync_to_async(judge0_completions.wait, thread_sensitive=False)(tokens, delay)
+
+
+async def poll_submissions_batch_async(tokens, timeout=JUDGE0_POLL_TIMEOUT, cancel_event=None, on_finished=None):
+    """
+    Async version of poll_submissions_batch.
+
+    Returns:
+        dict: Mapping of token to its finished submission result. Tokens that
+        did not finish before cancellation are missing.
+
+    Raises:
+        TimeoutError: If some results are not ready before the timeout
+        httpx.HTTPError: If API request fails
+    """
+    finished = {}
+    pending = list(tokens)
+
+    def collect(new_results):
+        for token in pending:
+            if token in new_results and token not in finished:
+                finished[token] = new_results[token]
+                if on_finished:
+                    on_finished(token, finished[token])
+
+    judge0_completions.register(tokens)
+    try:
+        for delay in get_poll_delays(timeout):
+            if cancel_event and cancel_event.is_set():
+                return finished
+
+            collect(await wait_for_judge0_async(pending, delay))
+            pending = [token for token in pending if token not in finished]
+            if cancel_event and cancel_event.is_set():
+                return finished
+
+            # Judge0 caps the number of tokens per batched GET as well
+            results = []
+            for start in range(0, len(pending), JUDGE0_BATCH_SIZE):
+                results.extend(await get_submissions_batch_async(pending[start:start + JUDGE0_BATCH_SIZE]))
+
+            collect({
+                token: result
+                for token, result in zip(pending, results)
+                if is_judge0_finished(result)
+            })
+
+            pending = [token for token in pending if token not in finished]
+            if not pending:
+                return finished
+    finally:
+        judge0_completions.unregister(tokens)
+
+    raise TimeoutError(EXECUTION_TIMEOUT_MESSAGE)
+
+
+async def run_test_cases_judge0_batch_async(language, code, cases, cancel_event=None, limits=None, on_result=None):
+    """
+    Async version of run_test_cases_judge0_batch.
+
+    Returns:
+        dict: Mapping of test case idx to its result entry (missing when the
+        run was cancelled before the case finished)
+    """
+    submissions = [prepare_test_case_source(language, code, test_case) for _, test_case in cases]
+    cases_by_token = {}
+    results = {}
+
+    def on_finished(token, result):
+        idx, test_case = cases_by_token[token]
+        results[idx] = build_test_case_result(idx, test_case, format_judge0_result(result), limits)
+        if on_result:
+            on_result(results[idx])
+
+    error_result = None
+    try:
+        # The whole batch counts as one execution for the scheduler
+        async with async_execution_slot() as scheduled:
+            if scheduled:
+                tokens = []
+                for start in range(0, len(submissions), JUDGE0_BATCH_SIZE):
+                    tokens.extend(await create_submissions_batch_async(
+                        language, submissions[start:start + JUDGE0_BATCH_SIZE], limits
+                    ))
+                cases_by_token = dict(zip(tokens, cases))
+                await poll_submissions_batch_async(tokens, cancel_event=cancel_event, on_finished=on_finished)
+    except httpx.HTTPError as e:
+        error_result = build_error_result(f'{JUDGE0_API_ERROR_PREFIX}{str(e)}')
+    except Exception as e:
+        error_result = build_judge0_error_result(e)
+    if error_result is not None:
+        for idx, test_case in cases:
+            if idx not in results:
+                results[idx] = build_test_case_result(idx, test_case, error_result)
+                if on_result:
+                    on_result(results[idx])
+
+    # A batch runs many programs at once, so only its outcome is recorded, not its latency
+    get_executor_router().record('judge0', None, error_result is not None and is_backend_failure(error_result))
+
+    return results
+
+
+async def run_test_case_async(language, code, idx, test_case, limits=None):
+    """Async version of run_test_case_safely."""
+    try:
+        test_code, stdin = prepare_test_case_source(language, code, test_case)
+        execution_result = await execute_code_async(language, test_code, stdin, limits)
+        return build_test_case_result(idx, test_case, execution_result, limits)
+    except Exception as e:
+        return build_not_run_result(idx, test_case, f'Unexpected error: {str(e)}', verdict='Error')
+
+
+async def run_test_cases_concurrently_async(language, code, cases, concurrency, cancel_event=None, limits=None,
+                                            on_result=None):
+    """
+    Async version of run_test_cases_concurrently.
+
+    Cases run as tasks of the current event loop, at most `concurrency` at a
+    time. Once cancel_event is set the running cases are cancelled, which
+    stops their requests to the executor.
+
+    Returns:
+        dict: Mapping of test case idx to its result entry (missing when not run)
+    """
+    remaining = iter(cases)
+    pending = {}
+    results = {}
+
+    try:
+        while True:
+            while len(pending) < concurrency and not (cancel_event and cancel_event.is_set()):
+                try:
+                    idx, test_case = next(remaining)
+                except StopIteration:
+                    break
+                task = asyncio.ensure_future(run_test_case_async(language, code, idx, test_case, limits))
+                pending[task] = idx
+
+            if not pending or (cancel_event and cancel_event.is_set()):
+                break
+
+            done, _ = await asyncio.wait(pending, timeout=CANCEL_CHECK_INTERVAL, return_when=asyncio.FIRST_COMPLETED)
+            if cancel_event and cancel_event.is_set():
+                break
+            for task in done:
+                result = results[pending.pop(task)] = task.result()
+                if on_result:
+                    on_result(result)
+    finally:
+        for task in pending:
+            task.cancel()
+
+    return results
+
+
+async def run_test_cases_async(language, code, test_cases, cancel_event=None, limits=None, on_result=None,
+                               stop_on_first_failure=False, priority=None):
+    """
+    Async version of run_test_cases.
+
+    Takes the same arguments and returns the same summary. Cases the batch
+    harness does not cover are sent to Judge0 through its batch endpoints,
+    or run as concurrent tasks on the other backends.
+    """
+    if not test_cases:
+        return {
+            'all_passed': False,
+            'passed_count': 0,
+            'total_count': 0,
+            'results': [],
+            'error': 'No test cases provided'
+        }
+
+    cases = list(enumerate(test_cases, 1))
+    results_by_idx = {}
+    limits = resolve_execution_limits(limits)
+
+    # Stable sort: prioritized cases first, each group in its original order
+    prioritized = set(priority or [])
+    scheduled = sorted(cases, key=lambda case: case[0] not in prioritized)
+    position = {idx: order for order, (idx, _) in enumerate(scheduled)}
+
+    failed = asyncio.Event()
+    halt = AnyEvent(cancel_event, failed)
+
+    def report(result):
+        if stop_on_first_failure and not result['passed']:
+            failed.set()
+        if on_result:
+            on_result(result)
+
+    def record(new_results):
+        results_by_idx.update(new_results)
+        for idx in sorted(new_results, key=position.get):
+            report(new_results[idx])
+
+    backend = get_executor_router().current_backend()
+
+    # Cases of an interpreted language cannot fail to compile
+    compile_checked = language.upper() not in COMPILED_LANGUAGES
+    if not compile_checked and backend == 'local':
+        source, _ = prepare_test_case_source(language, code, scheduled[0][1])
+        async with async_execution_slot() as slot_held:
+            compile_output = await sync_to_async(check_compilation_local, thread_sensitive=False)(
+                language, source
+            ) if slot_held else None
+        if compile_output:
+            return build_compile_error_summary(cases, compile_output)
+        compile_checked = compile_output == ''
+
+    # Pack every case into one remote execution where a batch harness exists (not for fail-fast runs)
+    if (TEST_CASE_BATCH_MODE and backend not in ('local', None) and not stop_on_first_failure
+            and language.upper() in BATCH_HARNESS_WRAPPERS and len(cases) > 1):
+        harness, nonce = build_batch_harness(language, code, scheduled, limits)
+        batch_results = parse_batch_results(
+            scheduled, nonce, await execute_code_async(language, harness, '', batch=True), limits
+        )
+        compile_output = get_compile_error(batch_results)
+        if compile_output:
+            return build_compile_error_summary(cases, compile_output)
+        record(batch_results)
+        compile_checked = compile_checked or bool(batch_results)
+
+    # Otherwise the first case doubles as the compile check before the rest are started
+    unchecked = [(idx, test_case) for idx, test_case in scheduled if idx not in results_by_idx]
+    if not compile_checked and len(unchecked) > 1 and not halt.is_set():
+        idx, test_case = unchecked[0]
+        first_result = {idx: await run_test_case_async(language, code, idx, test_case, limits)}
+        compile_output = get_compile_error(first_result)
+        if compile_output:
+            return build_compile_error_summary(cases, compile_output)
+        record(first_result)
+
+    remaining = [] if halt.is_set() else [
+        (idx, test_case) for idx, test_case in scheduled if idx not in results_by_idx
+    ]
+    if backend == 'judge0' and len(remaining) > 1:
+        results_by_idx.update(await run_test_cases_judge0_batch_async(
+            language, code, remaining, halt, limits, report
+        ))
+    elif remaining:
+        results_by_idx.update(await run_test_cases_concurrently_async(
+            language, code, remaining, get_test_case_concurrency(language, backend), halt, limits, report
+        ))
+
+    return build_test_run_summary(cases, results_by_idx, failed.is_set(), cancel_event)
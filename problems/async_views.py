@@ -0,0 +1,196 @@
+"""
+ASGI-native code execution endpoints.
+
+Async counterparts of run_code and ProblemViewSet.run_tests, built on
+problems/async_services.py. Served by an ASGI server (the asgi process in
+the Procfile, the codevault-asgi service in render.yaml), a request waiting
+on the executor holds no thread, so one worker process can keep hundreds of
+executions in flight. Under WSGI they still work, but each request then runs
+its own event loop on a worker thread and nothing is gained.
+
+The rest of the API stays on WSGI: under ASGI Django buffers the sync
+streamed responses of run_tests instead of sending each case as it finishes.
+
+They take the same request bodies and JWT authentication as the sync views,
+and answer in the same format. Job ("async": true) and stream modes stay on
+the sync endpoints, and identical concurrent requests are not coalesced.
+
+DRF views are sync-only, so these are plain Django views.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from rest_framework import exceptions
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .async_services import execute_code_async, run_test_cases_async
+from .bulkhead import bulkheaded
+from .execution_tokens import begin_execution, execution_scope, finish_execution
+from .models import Problem
+from .scheduler import RUN_LANE, SUBMIT_LANE, scheduling
+from .singleflight import make_flight_key
+from .failure_history import get_failed_first_priority, remember_test_results
+
+
+SUPPORTED_LANGUAGES = ['JAVA', 'PYTHON', 'CPP', 'JAVASCRIPT']
+
+
+def authenticate(request):
+    """
+    Authenticate a request with its JWT bearer token.
+
+    Returns:
+        User: The authenticated user, or None if the request carries no valid token
+    """
+    try:
+        user_auth = JWTAuthentication().authenticate(request)
+    except exceptions.AuthenticationFailed:
+        return None
+    return user_auth[0] if user_auth else None
+
+
+async def parse_execution_request(request):
+    """
+    Authenticate a POST request and decode its JSON body.
+
+    Returns:
+        tuple: (user, data, None), or (None, None, error response)
+    """
+    if request.method != 'POST':
+        return None, None, JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+    user = await sync_to_async(authenticate)(request)
+    if user is None:
+        return None, None, JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return None, None, JsonResponse({'error': 'Request body must be JSON'}, status=400)
+    if not isinstance(data, dict):
+        return None, None, JsonResponse({'error': 'Request body must be a JSON object'}, status=400)
+    return user, data, None
+
+
+def is_flag_set(request, data, name):
+    """Whether a boolean option is on ("name": true in the body or ?name=true)."""
+    value = data.get(name, request.GET.get(name, False))
+    return str(value).lower() in ('1', 'true', 'yes')
+
+
+@bulkheaded
+async def run_code_async(request):
+    """
+    Execute code (async counterpart of run_code).
+
+    POST /api/asgi/execute/
+
+    Request Body:
+    {
+        "language": "PYTHON",  // JAVA, PYTHON, CPP, JAVASCRIPT
+        "code": "print('Hello World')",
+        "input": ""  // optional stdin input
+    }
+
+    Returns:
+        200 OK: Execution result, as from POST /api/execute/
+        400 Bad Request: Missing or unsupported fields
+        401 Unauthorized: No valid JWT
+        429 Too Many Requests: Execution capacity exhausted (see problems/bulkhead.py)
+    """
+    user, data, error_response = await parse_execution_request(request)
+    if error_response:
+        return error_response
+
+    language = str(data.get('language', '')).upper()
+    code = data.get('code', '')
+    input_data = data.get('input', '')
+
+    if not language:
+        return JsonResponse({'error': 'language field is required'}, status=400)
+    if not code or not code.strip():
+        return JsonResponse({'error': 'code field is required and cannot be empty'}, status=400)
+    if language not in SUPPORTED_LANGUAGES:
+        return JsonResponse(
+            {'error': f'Unsupported language: {language}', 'supported': SUPPORTED_LANGUAGES}, status=400
+        )
+
+    try:
+        with scheduling(user.id, RUN_LANE):
+            result = await execute_code_async(language, code, input_data)
+        return JsonResponse(result)
+    except Exception as e:
+        return JsonResponse(
+            {'error': f'Code execution failed: {str(e)}', 'output': '', 'status': 'Error'}, status=500
+        )
+
+
+@bulkheaded
+async def run_tests_async(request, pk):
+    """
+    Run code against a problem's test cases (async counterpart of run_tests).
+
+    POST /api/asgi/problems/{id}/run_tests/
+
+    Request Body:
+    {
+        "language": "PYTHON",
+        "code": "...",
+        "stop_on_first_failure": false  // optional: start no further cases once one fails
+    }
+
+    Cases run failed-first under the problem's limits, and different code
+    supersedes the user's run of the problem in progress, as with run_tests.
+
+    Returns:
+        200 OK: Test results, as from POST /api/problems/{id}/run_tests/
+        400 Bad Request: Missing required fields or no test cases
+        401 Unauthorized: No valid JWT
+        403 Forbidden: User doesn't own the problem
+        404 Not Found: No such problem
+        429 Too Many Requests: Execution capacity exhausted (see problems/bulkhead.py)
+    """
+    user, data, error_response = await parse_execution_request(request)
+    if error_response:
+        return error_response
+
+    problem = await Problem.objects.filter(pk=pk).afirst()
+    if problem is None:
+        return JsonResponse({'detail': 'Not found.'}, status=404)
+    if problem.user_id != user.id:
+        return JsonResponse({'error': "You can only run your own problems' test cases"}, status=403)
+    if not problem.test_cases:
+        return JsonResponse({'error': 'This problem has no test cases defined'}, status=400)
+
+    language = data.get('language')
+    code = data.get('code')
+    if not language or not code:
+        return JsonResponse({'error': 'Both language and code are required'}, status=400)
+
+    stop_on_first_failure = is_flag_set(request, data, 'stop_on_first_failure')
+    test_cases = problem.test_cases
+    limits = problem.get_execution_limits()
+    priority = await sync_to_async(get_failed_first_priority)(user, problem, test_cases)
+    fingerprint = make_flight_key(
+        user.id, 'run_tests', problem.pk, language, code, test_cases, limits, stop_on_first_failure, priority
+    )
+
+    execution = begin_execution(user.id, problem.pk, fingerprint)
+    try:
+        with execution_scope(execution), scheduling(user.id, SUBMIT_LANE):
+            results = await run_test_cases_async(
+                language, code, test_cases, cancel_event=execution, limits=limits,
+                stop_on_first_failure=stop_on_first_failure, priority=priority
+            )
+        if execution.superseded:
+            return JsonResponse({**results, 'superseded': True})
+        await sync_to_async(remember_test_results)(user, problem, test_cases, results)
+        return JsonResponse(results)
+    except Exception as e:
+        return JsonResponse({'error': f'Failed to run tests: {str(e)}'}, status=500)
+    finally:
+        finish_execution(execution)
+
+
+# Authenticated by JWT, not by session cookie
+run_code_async.csrf_exempt = True
+run_tests_async.csrf_exempt = True
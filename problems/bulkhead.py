@@ -0,0 +1,248 @@
+"""
+Bulkhead for the code execution endpoints.
+
+Executions are slow and come in bursts; unchecked they take every request
+thread of a worker process, and plain CRUD requests (problem lists, the
+dashboard) queue up behind them. Execution requests therefore go through a
+bulkhead: at most EXECUTION_BULKHEAD_CONCURRENCY of them are handled at once
+per process, at most EXECUTION_BULKHEAD_QUEUE wait for a turn (for up to
+EXECUTION_BULKHEAD_QUEUE_TIMEOUT seconds), and the rest are answered at once
+with 429 Too Many Requests and a Retry-After header.
+
+The worker's remaining threads (see gunicorn.conf.py) stay free for the rest
+of the API, so its latency does not depend on the execution load.
+
+The ASGI execution views (see async_views) hold no thread while they wait on
+the executor, so they go through a bulkhead of their own with much larger
+limits (EXECUTION_BULKHEAD_ASYNC_CONCURRENCY, EXECUTION_BULKHEAD_ASYNC_QUEUE).
+"""
+import asyncio
+import functools
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+
+
+EXECUTION_BULKHEAD_CONCURRENCY = getattr(settings, 'EXECUTION_BULKHEAD_CONCURRENCY', 4)  # 0 disables the bulkhead
+EXECUTION_BULKHEAD_QUEUE = getattr(settings, 'EXECUTION_BULKHEAD_QUEUE', 4)
+EXECUTION_BULKHEAD_QUEUE_TIMEOUT = getattr(settings, 'EXECUTION_BULKHEAD_QUEUE_TIMEOUT', 10)  # seconds
+EXECUTION_BULKHEAD_ASYNC_CONCURRENCY = getattr(settings, 'EXECUTION_BULKHEAD_ASYNC_CONCURRENCY', 200)  # 0 disables
+EXECUTION_BULKHEAD_ASYNC_QUEUE = getattr(settings, 'EXECUTION_BULKHEAD_ASYNC_QUEUE', 200)
+
+# Weight of the newest request in the moving average used for Retry-After
+SERVICE_TIME_DECAY = 0.2
+
+# How often a coroutine waiting for a turn checks again
+ASYNC_WAIT_INTERVAL = 0.05  # seconds
+
+
+class Bulkhead:
+    """Concurrency ceiling with a bounded waiting line."""
+
+    def __init__(self, max_concurrent=EXECUTION_BULKHEAD_CONCURRENCY, max_queue=EXECUTION_BULKHEAD_QUEUE,
+                 queue_timeout=EXECUTION_BULKHEAD_QUEUE_TIMEOUT):
+        """
+        Args:
+            max_concurrent (int): Requests handled at once
+            max_queue (int): Requests allowed to wait for a turn
+            queue_timeout (float): Seconds a request waits before it is turned away
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._condition = threading.Condition()
+        self._running = 0
+        self._waiting = 0
+        self._admitted = 0
+        self._queued = 0
+        self._rejected = 0
+        self._service_time = None  # moving average, seconds
+
+    def enter(self):
+        """
+        Take a turn, waiting in line if the ceiling is reached.
+
+        Returns:
+            bool: True once admitted (call leave() when done), False if the
+            line is full or the wait timed out
+        """
+        with self._condition:
+            if self._running < self.max_concurrent:
+                return self._admit()
+            if self._waiting >= self.max_queue:
+                self._rejected += 1
+                return False
+
+            self._waiting += 1
+            self._queued += 1
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                while self._running >= self.max_concurrent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._rejected += 1
+                        return False
+                    self._condition.wait(remaining)
+            finally:
+                self._waiting -= 1
+            return self._admit()
+
+    async def enter_async(self):
+        """Like enter(), waiting without blocking the event loop."""
+        with self._condition:
+            if self._running < self.max_concurrent:
+                return self._admit()
+            if self._waiting >= self.max_queue:
+                self._rejected += 1
+                return False
+            self._waiting += 1
+            self._queued += 1
+
+        deadline = time.monotonic() + self.queue_timeout
+        try:
+            while True:
+                with self._condition:
+                    if self._running < self.max_concurrent:
+                        return self._admit()
+                if time.monotonic() >= deadline:
+                    with self._condition:
+                        self._rejected += 1
+                    return False
+                await asyncio.sleep(ASYNC_WAIT_INTERVAL)
+        finally:
+            with self._condition:
+                self._waiting -= 1
+
+    def _admit(self):
+        """Count a request as running (called with the lock held)."""
+        self._running += 1
+        self._admitted += 1
+        return True
+
+    def leave(self, service_time):
+        """
+        Give the turn taken with enter() to the next request in line.
+
+        Args:
+            service_time (float): Seconds the request was handled for
+        """
+        with self._condition:
+            self._running -= 1
+            if self._service_time is None:
+                self._service_time = service_time
+            else:
+                self._service_time += SERVICE_TIME_DECAY * (service_time - self._service_time)
+            self._condition.notify()
+
+    def get_retry_after(self):
+        """
+        Seconds a turned-away client should wait before retrying.
+
+        Returns:
+            int: Time for the requests running and waiting now to drain, at least 1
+        """
+        with self._condition:
+            backlog = self._running + self._waiting
+            service_time = self._service_time or 1.0
+        return max(1, math.ceil(service_time * backlog / max(self.max_concurrent, 1)))
+
+    def stats(self):
+        """
+        Load and admission counters.
+
+        Returns:
+            dict: {'max_concurrent', 'max_queue', 'running', 'waiting', 'admitted',
+            'queued', 'rejected', 'avg_service_ms'}
+        """
+        with self._condition:
+            return {
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'running': self._running,
+                'waiting': self._waiting,
+                'admitted': self._admitted,
+                'queued': self._queued,
+                'rejected': self._rejected,
+                'avg_service_ms': round(self._service_time * 1000, 1) if self._service_time is not None else None,
+            }
+
+
+def build_overloaded_response(bulkhead):
+    """429 response for a request turned away by bulkhead."""
+    retry_after = bulkhead.get_retry_after()
+    response = JsonResponse(
+        {
+            'error': 'Too many code executions in progress. Please try again shortly.',
+            'retry_after': retry_after
+        },
+        status=429
+    )
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def release_after_stream(response, bulkhead, started):
+    """Keep the turn of a streaming response until its last chunk has been sent."""
+    content = response.streaming_content
+
+    def stream():
+        try:
+            yield from content
+        finally:
+            bulkhead.leave(time.monotonic() - started)
+
+    response.streaming_content = stream()
+    return response
+
+
+def bulkheaded(view):
+    """
+    Run a view (sync or async, function or method) inside the execution bulkhead.
+
+    Sync views share execution_bulkhead, async views async_execution_bulkhead.
+    Requests that cannot get a turn get build_overloaded_response() instead.
+    """
+    if asyncio.iscoroutinefunction(view):
+        if EXECUTION_BULKHEAD_ASYNC_CONCURRENCY <= 0:
+            return view
+
+        @functools.wraps(view)
+        async def async_wrapper(*args, **kwargs):
+            if not await async_execution_bulkhead.enter_async():
+                return build_overloaded_response(async_execution_bulkhead)
+            started = time.monotonic()
+            try:
+                return await view(*args, **kwargs)
+            finally:
+                async_execution_bulkhead.leave(time.monotonic() - started)
+        return async_wrapper
+
+    if EXECUTION_BULKHEAD_CONCURRENCY <= 0:
+        return view
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not execution_bulkhead.enter():
+            return build_overloaded_response(execution_bulkhead)
+        started = time.monotonic()
+        streaming = False
+        try:
+            response = view(*args, **kwargs)
+            if isinstance(response, StreamingHttpResponse):
+                streaming = True
+                return release_after_stream(response, execution_bulkhead, started)
+            return response
+        finally:
+            if not streaming:
+                execution_bulkhead.leave(time.monotonic() - started)
+    return wrapper
+
+
+# Shared by the sync execution endpoints in this process
+execution_bulkhead = Bulkhead()
+
+# Shared by the async (ASGI) execution endpoints in this process
+async_execution_bulkhead = Bulkhead(EXECUTION_BULKHEAD_ASYNC_CONCURRENCY, EXECUTION_BULKHEAD_ASYNC_QUEUE)
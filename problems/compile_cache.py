@@ -0,0 +1,230 @@
+"""
+Disk-backed cache of compiled artifacts for the local executor.
+
+Each entry is a directory holding what a compiler produced (a C++ binary,
+Java .class files) or the compiler output of a failed build, keyed on a hash
+of the source, the compile command and the compiler version. Concurrent
+requests for the same key compile once: the first caller builds under a
+per-key lock (a thread lock plus a flock, so other worker processes on the
+host wait too) and everyone else reuses the result.
+
+The directory is bounded in size; the least recently used entries are
+deleted first.
+"""
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+from django.conf import settings
+
+
+# Cache configuration
+LOCAL_COMPILE_CACHE_DIR = getattr(
+    settings, 'LOCAL_COMPILE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'codevault-compile-cache')
+)
+LOCAL_COMPILE_CACHE_MAX_MB = getattr(settings, 'LOCAL_COMPILE_CACHE_MAX_MB', 256)  # 0 disables the cache
+
+# Written last into an entry, so a half-built entry is never used
+COMPLETE_MARKER = '.complete'
+COMPILE_OUTPUT_FILE = '.compile_output'
+
+
+def make_compile_key(language, compile_command, compiler_version, source):
+    """
+    Build the cache key for a compilation.
+
+    Args:
+        language (str): Programming language
+        compile_command (list): Compiler command line, flags included
+        compiler_version (str): Version of the compiler
+        source (str): Source code
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    payload = json.dumps([language, compile_command, compiler_version, source])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def get_directory_size(path):
+    """Total size in bytes of the files under path."""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class CompileCache:
+    """Size-bounded directory of compiled artifacts, one subdirectory per key."""
+
+    def __init__(self, directory=LOCAL_COMPILE_CACHE_DIR, max_mb=LOCAL_COMPILE_CACHE_MAX_MB):
+        """
+        Args:
+            directory (str): Cache directory (created if missing)
+            max_mb (int): Size bound in MB
+        """
+        self.directory = directory
+        self.max_bytes = max_mb * 1024 * 1024
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._hits = 0
+        self._misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _entry_path(self, key):
+        return os.path.join(self.directory, key)
+
+    def _read_entry(self, key):
+        """Return (entry_dir, compile_output) of a complete entry, or None."""
+        entry = self._entry_path(key)
+        if not os.path.exists(os.path.join(entry, COMPLETE_MARKER)):
+            return None
+        try:
+            # Touch the entry so pruning evicts least recently used first
+            os.utime(entry)
+            with open(os.path.join(entry, COMPILE_OUTPUT_FILE), 'r', encoding='utf-8') as output_file:
+                return entry, output_file.read()
+        except OSError:
+            return None
+
+    def _key_lock(self, key):
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = [threading.Lock(), 0]
+            lock[1] += 1
+            return lock
+
+    def _release_key_lock(self, key, lock):
+        with self._lock:
+            lock[1] -= 1
+            if lock[1] == 0:
+                del self._key_locks[key]
+
+    def get_or_compile(self, key, compile_fn):
+        """
+        Return the artifacts for key, compiling them first if needed.
+
+        Args:
+            key (str): Key from make_compile_key
+            compile_fn (callable): compile_fn(build_dir) compiles into the
+                empty build_dir and returns (compile_output, cacheable), with
+                compile_output '' on success. Results that are not cacheable
+                (e.g. a compile timeout) are returned but not stored.
+
+        Returns:
+            tuple: (artifact_dir, compile_output). artifact_dir holds the
+            compiled files and must be treated as read-only; it is None when
+            the result was not cached.
+        """
+        entry = self._read_entry(key)
+        if entry is not None:
+            with self._lock:
+                self._hits += 1
+            return entry
+
+        lock = self._key_lock(key)
+        try:
+            # Lock files are striped by key prefix so they never need deleting
+            with lock[0], open(os.path.join(self.directory, f'.lock-{key[:2]}'), 'w') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    # Another thread or process may have built it while we waited
+                    entry = self._read_entry(key)
+                    if entry is not None:
+                        with self._lock:
+                            self._hits += 1
+                        return entry
+                    with self._lock:
+                        self._misses += 1
+                    return self._build(key, compile_fn)
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+        finally:
+            self._release_key_lock(key, lock)
+
+    def _build(self, key, compile_fn):
+        build_dir = tempfile.mkdtemp(prefix='.build-', dir=self.directory)
+        try:
+            compile_output, cacheable = compile_fn(build_dir)
+            if not cacheable:
+                return None, compile_output
+
+            with open(os.path.join(build_dir, COMPILE_OUTPUT_FILE), 'w', encoding='utf-8') as output_file:
+                output_file.write(compile_output)
+            open(os.path.join(build_dir, COMPLETE_MARKER), 'w').close()
+
+            entry = self._entry_path(key)
+            shutil.rmtree(entry, ignore_errors=True)
+            os.rename(build_dir, entry)
+        finally:
+            shutil.rmtree(build_dir, ignore_errors=True)
+
+        self.prune()
+        return entry, compile_output
+
+    def prune(self):
+        """Delete the least recently used entries beyond the size bound."""
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.startswith('.') or not os.path.isdir(path):
+                continue
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                continue
+            size = get_directory_size(path)
+            entries.append((mtime, size, path))
+            total += size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def stats(self):
+        """
+        Hit/miss counters.
+
+        Returns:
+            dict: {'hits': int, 'misses': int, 'hit_ratio': float}
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_ratio': round(self._hits / lookups, 3) if lookups else 0.0
+            }
+
+
+_compile_cache = None
+_compile_cache_lock = threading.Lock()
+
+
+def get_compile_cache():
+    """
+    Return the process-wide compile cache.
+
+    Returns:
+        CompileCache: Shared cache instance, or None when LOCAL_COMPILE_CACHE_MAX_MB is 0
+    """
+    global _compile_cache
+    if not LOCAL_COMPILE_CACHE_MAX_MB:
+        return None
+    with _compile_cache_lock:
+        if _compile_cache is None:
+            _compile_cache = CompileCache()
+        return _compile_cache
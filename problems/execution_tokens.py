@@ -0,0 +1,195 @@
+"""
+Execution tokens: a user's newest run of a problem supersedes the older ones.
+
+Every test run of a problem holds the token that was current for its user
+and problem when it started. Submitting different code issues a new token;
+the older run then starts no further test cases and kills the local
+subprocesses it still has running, so executor capacity goes to the code the
+user is actually waiting for. Resubmitting identical code keeps the current
+token (the request joins the run in progress, see singleflight).
+
+Runs in this process are stopped immediately. The current token is also put
+in the Django cache so that, with a shared cache backend, runs in other
+worker processes (including the job workers) notice within
+SUPERSEDE_CHECK_INTERVAL.
+"""
+import contextvars
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+EXECUTION_TOKEN_TTL = getattr(settings, 'EXECUTION_TOKEN_TTL', 3600)  # seconds
+SUPERSEDE_CHECK_INTERVAL = 0.5  # seconds between checks of the shared token
+
+SUPERSEDED_REASON = 'Not run: superseded by a newer submission'
+
+# Execution whose local subprocesses are killed when it is superseded
+_current_execution = contextvars.ContextVar('codevault_execution', default=None)
+
+
+def get_execution_key(user_id, problem_id):
+    """Cache key of the current token for a user's runs of a problem."""
+    return f'execution-token:{user_id}:{problem_id}'
+
+
+class Execution:
+    """
+    A run holding an execution token.
+
+    Quacks like a threading.Event, so it can be passed to run_test_cases as
+    its cancel_event: it counts as set once the run has been superseded.
+    """
+
+    cancel_reason = SUPERSEDED_REASON
+
+    def __init__(self, key, token):
+        self.key = key
+        self.token = token
+        self._superseded = threading.Event()
+        self._lock = threading.Lock()
+        self._processes = set()
+        self._checked_at = 0.0
+        self._holders = 0
+
+    @property
+    def superseded(self):
+        """Whether a newer run took over (without checking the shared token)."""
+        return self._superseded.is_set()
+
+    def is_set(self):
+        """Whether the run has been superseded, checking the shared token now and then."""
+        if self._superseded.is_set():
+            return True
+        now = time.monotonic()
+        if now - self._checked_at >= SUPERSEDE_CHECK_INTERVAL:
+            self._checked_at = now
+            current = cache.get(self.key)
+            if current is not None and current['token'] != self.token:
+                self.supersede()
+        return self._superseded.is_set()
+
+    def supersede(self):
+        """Stop the run: flag it and kill the local subprocesses it owns."""
+        with self._lock:
+            self._superseded.set()
+            pids = list(self._processes)
+        for pid in pids:
+            kill_process(pid)
+
+    def add_process(self, pid):
+        """
+        Register a running program (the leader of its process group).
+
+        A program started after the run was superseded is killed right away.
+        """
+        with self._lock:
+            self._processes.add(pid)
+            superseded = self._superseded.is_set()
+        if superseded:
+            kill_process(pid)
+
+    def remove_process(self, pid):
+        """Forget a program that has been reaped."""
+        with self._lock:
+            self._processes.discard(pid)
+
+
+def kill_process(pid):
+    """Kill a program's process group."""
+    # Imported here: local_executor builds on this module
+    from .local_executor import kill_process_group
+    kill_process_group(pid)
+
+
+_active = {}
+_active_lock = threading.Lock()
+
+
+def begin_execution(user_id, problem_id, fingerprint=''):
+    """
+    Start a run of a problem for a user, superseding the user's earlier runs.
+
+    Args:
+        user_id (int): User running the code
+        problem_id (int): Problem whose test cases are run
+        fingerprint (str): Identity of the submission (e.g. its flight key);
+            a run with the same fingerprint as the current one shares its token
+
+    Returns:
+        Execution: Token of the new run; release it with finish_execution
+    """
+    key = get_execution_key(user_id, problem_id)
+    with _active_lock:
+        current = cache.get(key)
+        if fingerprint and current is not None and current['fingerprint'] == fingerprint:
+            token = current['token']
+        else:
+            token = uuid.uuid4().hex
+            cache.set(key, {'token': token, 'fingerprint': fingerprint}, EXECUTION_TOKEN_TTL)
+
+        execution = _active.get(key)
+        if execution is not None and execution.token != token:
+            execution.supersede()
+            execution = None
+        if execution is None:
+            execution = _active[key] = Execution(key, token)
+        execution._holders += 1
+    return execution
+
+
+def finish_execution(execution):
+    """Release a token taken with begin_execution."""
+    with _active_lock:
+        execution._holders -= 1
+        if execution._holders <= 0 and _active.get(execution.key) is execution:
+            del _active[execution.key]
+
+
+def publish_execution(user_id, problem_id, token):
+    """
+    Make token the current one for a run that starts elsewhere (a queued job).
+
+    Runs of the same user and problem in this process are superseded now,
+    those in other processes at their next check.
+
+    Args:
+        user_id (int): User running the code
+        problem_id (int): Problem whose test cases are run
+        token (str): Token the run will hold (see watch_execution)
+    """
+    key = get_execution_key(user_id, problem_id)
+    with _active_lock:
+        cache.set(key, {'token': token, 'fingerprint': ''}, EXECUTION_TOKEN_TTL)
+        execution = _active.pop(key, None)
+    if execution is not None:
+        execution.supersede()
+
+
+def watch_execution(user_id, problem_id, token):
+    """
+    Token of a run published earlier with publish_execution.
+
+    Returns:
+        Execution: Set once a newer run took over
+    """
+    return Execution(get_execution_key(user_id, problem_id), token)
+
+
+@contextmanager
+def execution_scope(execution):
+    """Attribute the local subprocesses started in this context to execution."""
+    reset_token = _current_execution.set(execution)
+    try:
+        yield execution
+    finally:
+        _current_execution.reset(reset_token)
+
+
+def get_current_execution():
+    """Execution of the current context (see execution_scope), or None."""
+    return _current_execution.get()
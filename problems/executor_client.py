@@ -0,0 +1,536 @@
+"""
+Shared HTTP client for the remote code execution services (Piston, Judge0).
+
+Every call to an executor goes through one process-wide requests.Session with
+a pooled HTTPAdapter, so TCP/TLS connections are kept alive and reused across
+executions, test cases and Judge0 polls instead of being opened per request.
+
+A service deployed on several hosts (e.g. self-hosted Piston instances) is
+reached through an EndpointPool, which routes each request to one endpoint
+by EXECUTOR_ROUTING_POLICY and caps the requests in flight per endpoint.
+With EXECUTOR_HEDGING, a request still running after a fraction of the
+pool's recent p95 latency is duplicated to another endpoint and the first
+answer wins (see EndpointPool.call).
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+
+# Connection pool configuration
+EXECUTOR_HTTP_POOL_SIZE = getattr(settings, 'EXECUTOR_HTTP_POOL_SIZE', 20)
+EXECUTOR_CONNECT_TIMEOUT = getattr(settings, 'EXECUTOR_CONNECT_TIMEOUT', 3.05)  # seconds
+EXECUTOR_READ_TIMEOUT = getattr(settings, 'EXECUTOR_READ_TIMEOUT', 10)  # seconds
+
+# Number of distinct hosts (Piston, Judge0, ...) to keep a connection pool for
+EXECUTOR_HTTP_POOL_HOSTS = 10
+
+# Endpoint routing: 'least_outstanding' or 'latency' (see EndpointPool)
+EXECUTOR_ROUTING_POLICY = getattr(settings, 'EXECUTOR_ROUTING_POLICY', 'least_outstanding')
+EXECUTOR_ENDPOINT_MAX_CONCURRENCY = getattr(settings, 'EXECUTOR_ENDPOINT_MAX_CONCURRENCY', 0)  # 0 = unlimited
+
+# Weight of the newest sample in an endpoint's moving average latency
+ENDPOINT_LATENCY_DECAY = 0.2
+
+# Hedged requests: duplicate a request to a second endpoint once it has run for
+# EXECUTOR_HEDGE_DELAY_FRACTION of the recent p95, for at most EXECUTOR_HEDGE_MAX_RATE of requests
+EXECUTOR_HEDGING = getattr(settings, 'EXECUTOR_HEDGING', False)
+EXECUTOR_HEDGE_DELAY_FRACTION = getattr(settings, 'EXECUTOR_HEDGE_DELAY_FRACTION', 1.0)
+EXECUTOR_HEDGE_MAX_RATE = getattr(settings, 'EXECUTOR_HEDGE_MAX_RATE', 0.1)
+
+# Successful request latencies kept per pool for the p95, and how many are needed before hedging
+HEDGE_LATENCY_SAMPLE_SIZE = 200
+HEDGE_MIN_SAMPLES = 20
+# Recent requests over which the hedge rate is bounded
+HEDGE_RATE_WINDOW = 100
+
+# How often a coroutine waiting for an endpoint below its cap checks again
+ENDPOINT_WAIT_INTERVAL = 0.01  # seconds
+
+
+class Endpoint:
+    """One host of a service, with its load and latency."""
+
+    def __init__(self, url):
+        self.url = url
+        self.outstanding = 0
+        self.requests = 0
+        self.errors = 0
+        self.latency = None  # exponentially weighted moving average, seconds
+
+
+class EndpointPool:
+    """
+    Routes requests between the endpoints of one service.
+
+    Policies:
+        least_outstanding  the endpoint with the fewest requests in flight
+        latency            the endpoint with the lowest moving average latency
+                           weighted by its requests in flight, so a slow host
+                           gets proportionally less traffic (hosts without a
+                           sample yet are tried first)
+
+    Each endpoint has at most max_concurrency requests in flight; once all of
+    them are at the cap, further requests wait for one to finish.
+    """
+
+    def __init__(self, urls, policy=EXECUTOR_ROUTING_POLICY, max_concurrency=EXECUTOR_ENDPOINT_MAX_CONCURRENCY,
+                 hedging=EXECUTOR_HEDGING):
+        """
+        Args:
+            urls (list): Base URLs of the service's hosts
+            policy (str): 'least_outstanding' or 'latency'
+            max_concurrency (int): Requests in flight per endpoint (0 for no cap)
+            hedging (bool): Duplicate slow requests to a second endpoint (see call)
+        """
+        if not urls:
+            raise ValueError('An endpoint pool needs at least one URL')
+        self.endpoints = [Endpoint(url.rstrip('/')) for url in urls]
+        self.policy = policy
+        self.max_concurrency = max_concurrency
+        self.hedging = hedging and len(self.endpoints) > 1
+        self._condition = threading.Condition()
+        self._latencies = deque(maxlen=HEDGE_LATENCY_SAMPLE_SIZE)
+        self._recent_hedges = deque(maxlen=HEDGE_RATE_WINDOW)
+        self._calls = 0
+        self._hedges = 0
+        self._hedge_wins = 0
+        self._hedge_executor = None
+
+    @property
+    def capacity(self):
+        """Requests the pool can have in flight at once (None if uncapped)."""
+        return self.max_concurrency * len(self.endpoints) if self.max_concurrency else None
+
+    def _score(self, endpoint):
+        if self.policy == 'latency':
+            return (endpoint.latency or 0.0) * (endpoint.outstanding + 1), endpoint.outstanding
+        return endpoint.outstanding, endpoint.latency or 0.0
+
+    def acquire(self, exclude=(), block=True):
+        """
+        Pick the endpoint for a request and count it as in flight.
+
+        Args:
+            exclude (tuple): Endpoints not to pick (e.g. one already tried)
+            block (bool): Wait while every candidate is at its cap; otherwise
+                return None right away
+
+        Returns:
+            Endpoint: The endpoint (hand it back with release), or None if
+            there is no candidate
+        """
+        with self._condition:
+            while True:
+                candidates = [
+                    endpoint for endpoint in self.endpoints
+                    if endpoint not in exclude
+                    and (not self.max_concurrency or endpoint.outstanding < self.max_concurrency)
+                ]
+                if candidates:
+                    endpoint = min(candidates, key=self._score)
+                    endpoint.outstanding += 1
+                    endpoint.requests += 1
+                    return endpoint
+                if not block or len(exclude) >= len(self.endpoints):
+                    return None
+                self._condition.wait()
+
+    def release(self, endpoint, latency, failed=False):
+        """
+        Record a finished request.
+
+        Args:
+            endpoint (Endpoint): Endpoint returned by acquire
+            latency (float): Seconds the request took; a failed request counts
+                as at least a read timeout, so an endpoint that fails fast does
+                not attract traffic under the latency policy. None for a
+                request that was cancelled, which is not recorded.
+            failed (bool): Whether the request failed
+        """
+        if failed:
+            latency = max(latency, EXECUTOR_READ_TIMEOUT)
+        with self._condition:
+            endpoint.outstanding -= 1
+            self._condition.notify()
+            if latency is None:
+                return
+            endpoint.errors += int(failed)
+            if not failed:
+                self._latencies.append(latency)
+            if endpoint.latency is None:
+                endpoint.latency = latency
+            else:
+                endpoint.latency += ENDPOINT_LATENCY_DECAY * (latency - endpoint.latency)
+
+    @contextmanager
+    def endpoint(self):
+        """
+        Hold an endpoint for the duration of the block, which gets its base URL.
+
+        The request counts as failed if the block raises.
+        """
+        endpoint = self.acquire()
+        started = time.monotonic()
+        failed = True
+        try:
+            yield endpoint.url
+            failed = False
+        finally:
+            self.release(endpoint, time.monotonic() - started, failed)
+
+    def call(self, send):
+        """
+        Send a request to one of the endpoints, hedging it when enabled.
+
+        Without hedging this is send(url) on the endpoint picked by acquire.
+        With hedging, once the request has run for EXECUTOR_HEDGE_DELAY_FRACTION
+        of the recent p95 latency, the same request is sent to a second
+        endpoint (if one is below its cap and fewer than EXECUTOR_HEDGE_MAX_RATE
+        of the recent requests were hedged). The first successful answer is
+        returned and the other attempt is abandoned: its result is discarded
+        and it stops counting against the caller, though the executor may
+        still finish running it.
+
+        Args:
+            send (callable): Sends the request to a base URL and returns its
+                result; raises on failure
+
+        Returns:
+            The result of send from the first attempt that succeeded
+
+        Raises:
+            Exception: What send raised, if every attempt failed
+        """
+        delay = self.get_hedge_delay()
+        if delay is None:
+            with self._condition:
+                self._calls += 1
+                self._recent_hedges.append(False)
+            with self.endpoint() as url:
+                return send(url)
+
+        primary = self.acquire()
+        attempts = {self._submit(primary, send): primary}
+        done, _ = wait(attempts, timeout=delay)
+        backup = None
+        if not done and self._may_hedge():
+            backup = self.acquire(exclude=(primary,), block=False)
+            if backup is not None:
+                attempts[self._submit(backup, send)] = backup
+        with self._condition:
+            self._calls += 1
+            self._hedges += int(backup is not None)
+            self._recent_hedges.append(backup is not None)
+
+        pending = set(attempts)
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    error = error or e
+                    continue
+                if backup is not None and attempts[future] is backup:
+                    with self._condition:
+                        self._hedge_wins += 1
+                for other in pending:
+                    other.cancel()
+                return result
+        raise error
+
+    async def acquire_async(self):
+        """Async version of acquire: waits for a free endpoint without blocking the event loop."""
+        while True:
+            endpoint = self.acquire(block=False)
+            if endpoint is not None:
+                return endpoint
+            await asyncio.sleep(ENDPOINT_WAIT_INTERVAL)
+
+    async def call_async(self, send):
+        """
+        Async version of call.
+
+        Args:
+            send (callable): Coroutine function sending the request to a base
+                URL and returning its result; raises on failure
+
+        Unlike call, the losing attempt of a hedged request is cancelled
+        outright, which closes its connection.
+        """
+        primary = await self.acquire_async()
+        attempts = {asyncio.ensure_future(self._attempt_async(primary, send)): primary}
+        backup = None
+        delay = self.get_hedge_delay()
+        if delay is not None:
+            done, _ = await asyncio.wait(attempts, timeout=delay)
+            if not done and self._may_hedge():
+                backup = self.acquire(exclude=(primary,), block=False)
+                if backup is not None:
+                    attempts[asyncio.ensure_future(self._attempt_async(backup, send))] = backup
+        with self._condition:
+            self._calls += 1
+            self._hedges += int(backup is not None)
+            self._recent_hedges.append(backup is not None)
+
+        pending = set(attempts)
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = error or task.exception()
+                        continue
+                    if backup is not None and attempts[task] is backup:
+                        with self._condition:
+                            self._hedge_wins += 1
+                    return task.result()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _attempt_async(self, endpoint, send):
+        """Await send against an acquired endpoint, releasing it when done."""
+        started = time.monotonic()
+        try:
+            result = await send(endpoint.url)
+        except asyncio.CancelledError:
+            self.release(endpoint, None)
+            raise
+        except Exception:
+            self.release(endpoint, time.monotonic() - started, failed=True)
+            raise
+        self.release(endpoint, time.monotonic() - started)
+        return result
+
+    def get_hedge_delay(self):
+        """
+        Seconds after which a request is hedged.
+
+        Returns:
+            float: EXECUTOR_HEDGE_DELAY_FRACTION of the recent p95 latency, or
+            None if hedging is off or there are too few samples yet
+        """
+        if not self.hedging:
+            return None
+        with self._condition:
+            if len(self._latencies) < HEDGE_MIN_SAMPLES:
+                return None
+            latencies = sorted(self._latencies)
+        return latencies[int((len(latencies) - 1) * 0.95)] * EXECUTOR_HEDGE_DELAY_FRACTION
+
+    def _may_hedge(self):
+        """Whether hedging another request keeps the recent hedge rate within EXECUTOR_HEDGE_MAX_RATE."""
+        with self._condition:
+            recent = len(self._recent_hedges) + 1
+            return (sum(self._recent_hedges) + 1) / recent <= EXECUTOR_HEDGE_MAX_RATE
+
+    def _submit(self, endpoint, send):
+        """Run send against an acquired endpoint on the hedge threads, releasing it when done."""
+        with self._condition:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(
+                    max_workers=EXECUTOR_HTTP_POOL_SIZE * 2, thread_name_prefix='codevault-hedge'
+                )
+
+        def attempt():
+            started = time.monotonic()
+            failed = True
+            try:
+                result = send(endpoint.url)
+                failed = False
+                return result
+            finally:
+                self.release(endpoint, time.monotonic() - started, failed)
+
+        return self._hedge_executor.submit(attempt)
+
+    def stats(self):
+        """
+        Load and latency per endpoint, and hedging counters.
+
+        Returns:
+            dict: {'policy': str, 'max_concurrency': int, 'hedging': bool, 'calls': int,
+            'hedges': int, 'hedge_wins': int, 'hedge_rate': float, 'hedge_delay_ms': float,
+            'endpoints': [{'url', 'outstanding', 'requests', 'errors', 'latency_ms'}]}
+        """
+        hedge_delay = self.get_hedge_delay()
+        with self._condition:
+            return {
+                'policy': self.policy,
+                'max_concurrency': self.max_concurrency,
+                'hedging': self.hedging,
+                'calls': self._calls,
+                'hedges': self._hedges,
+                'hedge_wins': self._hedge_wins,
+                'hedge_rate': round(self._hedges / self._calls, 3) if self._calls else 0.0,
+                'hedge_delay_ms': round(hedge_delay * 1000, 1) if hedge_delay is not None else None,
+                'endpoints': [
+                    {
+                        'url': endpoint.url,
+                        'outstanding': endpoint.outstanding,
+                        'requests': endpoint.requests,
+                        'errors': endpoint.errors,
+                        'latency_ms': round(endpoint.latency * 1000, 1) if endpoint.latency is not None else None,
+                    }
+                    for endpoint in self.endpoints
+                ],
+            }
+
+
+class ExecutorClient:
+    """
+    Pooled keep-alive HTTP client for code execution services.
+
+    requests.Session is safe to share between threads for plain request/response
+    use, which is all the executor calls need.
+    """
+
+    def __init__(self, pool_size=EXECUTOR_HTTP_POOL_SIZE, connect_timeout=EXECUTOR_CONNECT_TIMEOUT,
+                 read_timeout=EXECUTOR_READ_TIMEOUT):
+        """
+        Args:
+            pool_size (int): Maximum keep-alive connections kept per host
+            connect_timeout (float): Seconds to wait for a TCP/TLS connection
+            read_timeout (float): Seconds to wait for the response
+        """
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+        self.adapter = HTTPAdapter(
+            pool_connections=EXECUTOR_HTTP_POOL_HOSTS,
+            pool_maxsize=pool_size
+        )
+        self.session = requests.Session()
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._errors = 0
+        self._pools = {}
+
+    def request(self, method, url, **kwargs):
+        """
+        Send a request over the pooled session.
+
+        Args:
+            method (str): HTTP method
+            url (str): Absolute URL
+            **kwargs: Passed to requests.Session.request. When no timeout is
+                given, the configured (connect, read) timeouts are used.
+
+        Returns:
+            requests.Response: The response
+
+        Raises:
+            requests.RequestException: If the request fails
+        """
+        kwargs.setdefault('timeout', (self.connect_timeout, self.read_timeout))
+        with self._lock:
+            self._requests += 1
+        try:
+            return self.session.request(method, url, **kwargs)
+        except requests.RequestException:
+            with self._lock:
+                self._errors += 1
+            raise
+
+    def get(self, url, **kwargs):
+        """Send a GET request (see request)."""
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        """Send a POST request (see request)."""
+        return self.request('POST', url, **kwargs)
+
+    def get_endpoint_pool(self, name, urls):
+        """
+        Return the endpoint pool of a service, creating it on first use.
+
+        Args:
+            name (str): Service name (e.g. 'piston')
+            urls (list): Base URLs of the service's hosts
+
+        Returns:
+            EndpointPool: Pool shared by every request to the service
+        """
+        with self._lock:
+            pool = self._pools.get(name)
+            if pool is None:
+                pool = self._pools[name] = EndpointPool(urls)
+            return pool
+
+    def stats(self):
+        """
+        Connection reuse counters.
+
+        Returns:
+            dict: {
+                'requests': int,
+                'errors': int,
+                'connections_opened': int,
+                'connections_reused': int,
+                'reuse_ratio': float,
+                'pool_size': int,
+                'endpoints': {service: EndpointPool.stats()}
+            }
+        """
+        pools = self.adapter.poolmanager.pools
+        connections_opened = 0
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                connections_opened += pool.num_connections
+
+        with self._lock:
+            total_requests = self._requests
+            errors = self._errors
+            endpoint_pools = dict(self._pools)
+
+        connections_reused = max(0, total_requests - errors - connections_opened)
+        return {
+            'requests': total_requests,
+            'errors': errors,
+            'connections_opened': connections_opened,
+            'connections_reused': connections_reused,
+            'reuse_ratio': round(connections_reused / total_requests, 3) if total_requests else 0.0,
+            'pool_size': self.pool_size,
+            'endpoints': {name: pool.stats() for name, pool in endpoint_pools.items()}
+        }
+
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_executor_client():
+    """
+    Return the process-wide executor client.
+
+    A new client is created after a fork so that worker processes never share
+    sockets with their parent.
+
+    Returns:
+        ExecutorClient: Shared client
+    """
+    global _client, _client_pid
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = ExecutorClient()
+            _client_pid = os.getpid()
+        return _client
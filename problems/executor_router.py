@@ -0,0 +1,245 @@
+"""
+Health tracking, circuit breaking and failover for the remote executors.
+
+Every Piston and Judge0 execution is recorded with its outcome and, where
+the program's own run time is known, the overhead the service added on top
+of it. When, over the last EXECUTOR_BREAKER_WINDOW seconds, at least
+EXECUTOR_BREAKER_MIN_CALLS calls were made and EXECUTOR_BREAKER_FAILURE_RATE
+of them failed (a request error, a 429/5xx, a Judge0 poll timeout) or were
+slow (more than EXECUTOR_BREAKER_SLOW_CALL seconds of overhead), the
+backend's circuit opens:
+
+    closed  -> calls go to the backend
+    open    -> calls go to EXECUTOR_FAILOVER_API when it is configured and
+               healthy, otherwise they fail at once instead of waiting out
+               the backend's timeout
+    probing -> a background thread runs a trivial program on the backend
+               every EXECUTOR_PROBE_INTERVAL seconds and closes the circuit
+               once it succeeds
+
+The breaker (EXECUTOR_BREAKER_ENABLED) is on by default only when a
+failover backend is configured; otherwise health is just reported, since
+failing fast has nowhere better to send the executions. Health is tracked
+per process.
+"""
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+
+EXECUTOR_FAILOVER_API = getattr(settings, 'EXECUTOR_FAILOVER_API', '')  # '' disables failover
+EXECUTOR_BREAKER_ENABLED = getattr(settings, 'EXECUTOR_BREAKER_ENABLED', bool(EXECUTOR_FAILOVER_API))
+EXECUTOR_BREAKER_WINDOW = getattr(settings, 'EXECUTOR_BREAKER_WINDOW', 30)  # seconds
+EXECUTOR_BREAKER_MIN_CALLS = getattr(settings, 'EXECUTOR_BREAKER_MIN_CALLS', 5)
+EXECUTOR_BREAKER_FAILURE_RATE = getattr(settings, 'EXECUTOR_BREAKER_FAILURE_RATE', 0.5)
+EXECUTOR_BREAKER_SLOW_CALL = getattr(settings, 'EXECUTOR_BREAKER_SLOW_CALL', 5.0)  # seconds of overhead
+EXECUTOR_PROBE_INTERVAL = getattr(settings, 'EXECUTOR_PROBE_INTERVAL', 5)  # seconds
+
+# Backends the router manages; the local executor has no service to fail
+REMOTE_BACKENDS = ('piston', 'judge0')
+
+
+class BackendHealth:
+    """Rolling call outcomes and circuit state of one backend."""
+
+    def __init__(self, name):
+        self.name = name
+        self.state = 'closed'
+        self.calls = deque()  # (finished_at, latency, failed)
+        self.total_calls = 0
+        self.total_failures = 0
+        self.trips = 0
+        self.opened_at = None
+
+    def prune(self, now):
+        """Forget calls that left the window."""
+        while self.calls and self.calls[0][0] < now - EXECUTOR_BREAKER_WINDOW:
+            self.calls.popleft()
+
+    def failure_rate(self):
+        if not self.calls:
+            return 0.0
+        return sum(1 for _, _, failed in self.calls if failed) / len(self.calls)
+
+    def latency_percentile(self, fraction):
+        latencies = sorted(latency for _, latency, _ in self.calls if latency is not None)
+        if not latencies:
+            return None
+        return round(latencies[int((len(latencies) - 1) * fraction)], 3)
+
+
+class ExecutorRouter:
+    """Picks the backend for each execution and watches their health."""
+
+    def __init__(self, primary, failover=EXECUTOR_FAILOVER_API, breaker=EXECUTOR_BREAKER_ENABLED):
+        """
+        Args:
+            primary (str): Configured backend (CODE_EXECUTION_API)
+            failover (str): Backend used while the primary's circuit is open ('' for none)
+            breaker (bool): Open circuits of unhealthy backends (otherwise health is only reported)
+        """
+        self.primary = primary.lower()
+        self.breaker = breaker
+        failover = (failover or '').lower()
+        self.failover = failover if failover in REMOTE_BACKENDS and failover != self.primary else ''
+        self._lock = threading.Lock()
+        self._health = {name: BackendHealth(name) for name in REMOTE_BACKENDS}
+        self._failovers = 0
+        self._rejected = 0
+
+    def is_available(self, backend):
+        """Whether calls may go to backend (local, or a remote one with a closed circuit)."""
+        if backend not in self._health:
+            return True
+        with self._lock:
+            return self._health[backend].state == 'closed'
+
+    def current_backend(self):
+        """
+        Backend executions are routed to right now.
+
+        Returns:
+            str: The primary while its circuit is closed, otherwise the
+            failover backend if it is healthy, otherwise None (fail fast)
+        """
+        if self.is_available(self.primary):
+            return self.primary
+        if self.failover and self.is_available(self.failover):
+            return self.failover
+        return None
+
+    def choose_backend(self):
+        """Like current_backend(), counting the executions failed over or rejected."""
+        backend = self.current_backend()
+        if backend != self.primary:
+            with self._lock:
+                if backend is None:
+                    self._rejected += 1
+                else:
+                    self._failovers += 1
+        return backend
+
+    def get_failover(self, backend):
+        """
+        Backend to retry an execution on after it failed on backend.
+
+        Returns:
+            str: The other configured backend if its circuit is closed, else None
+        """
+        for candidate in (self.primary, self.failover):
+            if candidate and candidate != backend and self.is_available(candidate):
+                with self._lock:
+                    self._failovers += 1
+                return candidate
+        return None
+
+    def record(self, backend, latency, failed):
+        """
+        Record a finished call and open the backend's circuit if it is unhealthy.
+
+        Args:
+            backend (str): Backend that was called
+            latency (float): Service overhead of the call in seconds (the
+                call's duration minus the program's own run time), or None
+                if it was not measured
+            failed (bool): Whether the call failed at the service; calls
+                slower than EXECUTOR_BREAKER_SLOW_CALL count as failed too
+        """
+        health = self._health.get(backend)
+        if health is None:
+            return
+        failed = failed or (latency is not None and latency > EXECUTOR_BREAKER_SLOW_CALL)
+        now = time.monotonic()
+        with self._lock:
+            health.calls.append((now, latency, failed))
+            health.total_calls += 1
+            health.total_failures += int(failed)
+            health.prune(now)
+            trip = (
+                self.breaker
+                and health.state == 'closed'
+                and len(health.calls) >= EXECUTOR_BREAKER_MIN_CALLS
+                and health.failure_rate() >= EXECUTOR_BREAKER_FAILURE_RATE
+            )
+            if trip:
+                health.state = 'open'
+                health.opened_at = now
+                health.trips += 1
+        if trip:
+            threading.Thread(
+                target=self._probe_until_healthy, args=(health,), name=f'codevault-probe-{backend}', daemon=True
+            ).start()
+
+    def _probe_until_healthy(self, health):
+        """Probe a backend whose circuit is open until a probe succeeds, then close it."""
+        # Imported here: services builds on this module
+        from .services import probe_backend
+
+        while True:
+            time.sleep(EXECUTOR_PROBE_INTERVAL)
+            with self._lock:
+                health.state = 'probing'
+            try:
+                healthy = probe_backend(health.name)
+            except Exception:
+                healthy = False
+            with self._lock:
+                if healthy:
+                    health.state = 'closed'
+                    health.opened_at = None
+                    health.calls.clear()
+                    return
+                health.state = 'open'
+
+    def stats(self):
+        """
+        Health and circuit state per backend.
+
+        Returns:
+            dict: {'primary': str, 'failover': str, 'breaker': bool, 'failovers': int, 'rejected': int,
+            'backends': {name: {'state', 'calls', 'failures', 'failure_rate',
+            'latency_p50', 'latency_p95', 'trips', 'open_for'}}}
+        """
+        now = time.monotonic()
+        with self._lock:
+            backends = {}
+            for name, health in self._health.items():
+                health.prune(now)
+                backends[name] = {
+                    'state': health.state,
+                    'calls': health.total_calls,
+                    'failures': health.total_failures,
+                    'failure_rate': round(health.failure_rate(), 3),
+                    'latency_p50': health.latency_percentile(0.5),
+                    'latency_p95': health.latency_percentile(0.95),
+                    'trips': health.trips,
+                    'open_for': round(now - health.opened_at, 1) if health.opened_at else None,
+                }
+            return {
+                'primary': self.primary,
+                'failover': self.failover or None,
+                'breaker': self.breaker,
+                'failovers': self._failovers,
+                'rejected': self._rejected,
+                'backends': backends,
+            }
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_executor_router():
+    """
+    Return the process-wide router for CODE_EXECUTION_API.
+
+    Returns:
+        ExecutorRouter: Shared router
+    """
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = ExecutorRouter(getattr(settings, 'CODE_EXECUTION_API', 'piston'))
+        return _router
@@ -0,0 +1,99 @@
+"""
+Failed-first ordering for test runs.
+
+After each run the test cases that failed are remembered per user and
+problem (TestCaseHistory). The next run schedules those cases first, so
+together with stop_on_first_failure a submission that still fails where it
+failed before gets its verdict in one round trip instead of N.
+
+Cases are identified by a digest of their input and expected output rather
+than by position, so editing the problem's test cases does not point the
+history at the wrong cases.
+"""
+import hashlib
+import json
+
+from django.db import IntegrityError
+
+from .models import TestCaseHistory
+
+
+def get_test_case_digest(test_case):
+    """
+    Stable identity of a test case.
+
+    Args:
+        test_case (dict): Test case with input and output
+
+    Returns:
+        str: Hex digest of the case's input and expected output
+    """
+    payload = json.dumps([test_case.get('input', ''), test_case.get('output', '')])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+def get_failed_first_priority(user, problem, test_cases):
+    """
+    Positions of the test cases that failed on the user's last runs.
+
+    Args:
+        user (User): User running the tests
+        problem (Problem): Problem the test cases belong to
+        test_cases (list): Test cases about to be run
+
+    Returns:
+        list: 1-based positions in test_cases, for run_test_cases(priority=...)
+    """
+    history = TestCaseHistory.objects.filter(user=user, problem=problem).first()
+    if history is None or not history.failed_cases:
+        return []
+    failed = set(history.failed_cases)
+    return [
+        idx for idx, test_case in enumerate(test_cases, 1)
+        if get_test_case_digest(test_case) in failed
+    ]
+
+
+def remember_test_results(user, problem, test_cases, summary):
+    """
+    Update the user's failing cases from a finished run.
+
+    Cases that passed are forgotten and cases that failed are added. Cases
+    that were not run (cancelled, or skipped by stop_on_first_failure) keep
+    whatever state they had.
+
+    Args:
+        user (User): User who ran the tests
+        problem (Problem): Problem the test cases belong to
+        test_cases (list): Test cases that were run
+        summary (dict): run_test_cases result
+    """
+    results = summary.get('results') or []
+    if not results:
+        return
+
+    passed, failed = set(), set()
+    for result in results:
+        idx = result.get('test_case')
+        if not idx or idx > len(test_cases) or result.get('verdict') == 'Not Run':
+            continue
+        digest = get_test_case_digest(test_cases[idx - 1])
+        (passed if result.get('passed') else failed).add(digest)
+
+    current = {get_test_case_digest(test_case) for test_case in test_cases}
+    history = TestCaseHistory.objects.filter(user=user, problem=problem).first()
+    previous = set(history.failed_cases) if history else set()
+
+    # Drop cases that no longer exist on the problem
+    failing = sorted(((previous - passed) | failed) & current)
+    if history is not None:
+        if set(history.failed_cases) != set(failing):
+            history.failed_cases = failing
+            history.save(update_fields=['failed_cases', 'updated_at'])
+        return
+    if failing:
+        try:
+            TestCaseHistory.objects.create(user=user, problem=problem, failed_cases=failing)
+        except IntegrityError:
+            # A concurrent run created it first; its view is as good as ours
+            pass
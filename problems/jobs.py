@@ -0,0 +1,314 @@
+"""
+Asynchronous execution jobs.
+
+With "async": true, POST /api/execute/ and POST /api/problems/{id}/run_tests/
+store an ExecutionJob and answer right away instead of holding a gunicorn
+worker for the whole execution. Worker processes started with
+`python manage.py run_execution_worker` drain the job table, and
+GET /api/jobs/{id}/ reports progress and results.
+
+Jobs are claimed with SELECT ... FOR UPDATE SKIP LOCKED, so workers on any
+number of hosts skip rows another worker is claiming instead of queueing
+behind its lock. Each claim holds a lease that is renewed as test cases
+finish; a job whose worker died is claimed again once its lease expires, up
+to EXECUTION_JOB_MAX_ATTEMPTS times.
+"""
+import os
+import socket
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .execution_tokens import execution_scope, publish_execution, watch_execution
+from .models import ExecutionJob
+from .scheduler import RUN_LANE, SUBMIT_LANE, scheduling
+from .services import execute_code, run_test_cases
+from .failure_history import get_failed_first_priority, remember_test_results
+
+
+# Job processing configuration
+EXECUTION_JOB_LEASE_SECONDS = getattr(settings, 'EXECUTION_JOB_LEASE_SECONDS', 120)
+EXECUTION_JOB_MAX_ATTEMPTS = getattr(settings, 'EXECUTION_JOB_MAX_ATTEMPTS', 3)
+EXECUTION_WORKER_CONCURRENCY = getattr(settings, 'EXECUTION_WORKER_CONCURRENCY', 4)
+EXECUTION_WORKER_POLL_INTERVAL = getattr(settings, 'EXECUTION_WORKER_POLL_INTERVAL', 0.5)  # seconds
+
+
+def enqueue_execute_job(user, language, code, input_data=''):
+    """
+    Queue a single execution (POST /api/execute/ in async mode).
+
+    Args:
+        user (User): Owner of the job
+        language (str): Programming language (JAVA, PYTHON, CPP, JAVASCRIPT)
+        code (str): Source code to execute
+        input_data (str): Input data for stdin
+
+    Returns:
+        ExecutionJob: The queued job
+    """
+    return ExecutionJob.objects.create(
+        user=user,
+        kind='EXECUTE',
+        language=language,
+        code=code,
+        input_data=input_data or '',
+        total_count=1
+    )
+
+
+def enqueue_run_tests_job(user, problem, language, code, stop_on_first_failure=False):
+    """
+    Queue a test run against a problem (POST /api/problems/{id}/run_tests/ in async mode).
+
+    The problem's test cases and limits are copied into the job, so editing
+    the problem afterwards does not change a run that is already queued. The
+    job supersedes the user's earlier runs of the problem (see
+    problems/execution_tokens.py).
+
+    Args:
+        user (User): Owner of the job
+        problem (Problem): Problem whose test cases are run
+        language (str): Programming language
+        code (str): Source code to execute
+        stop_on_first_failure (bool): Start no further cases once one fails
+
+    Returns:
+        ExecutionJob: The queued job
+    """
+    job = ExecutionJob.objects.create(
+        user=user,
+        problem=problem,
+        kind='RUN_TESTS',
+        language=language,
+        code=code,
+        test_cases=problem.test_cases,
+        limits=problem.get_execution_limits(),
+        stop_on_first_failure=stop_on_first_failure,
+        total_count=len(problem.test_cases)
+    )
+    publish_execution(user.id, problem.pk, str(job.id))
+    return job
+
+
+def get_lease_expiry():
+    """End of a lease taken or renewed now."""
+    return timezone.now() + timedelta(seconds=EXECUTION_JOB_LEASE_SECONDS)
+
+
+def claim_next_job(worker_id):
+    """
+    Claim the oldest job that is queued or whose worker's lease expired.
+
+    Rows locked by another worker's claim are skipped, not waited for. The
+    status change is a conditional UPDATE as well, which keeps claims
+    exclusive on databases without row locks (SQLite ignores FOR UPDATE).
+
+    Args:
+        worker_id (str): Identity of the claiming worker thread
+
+    Returns:
+        ExecutionJob: The claimed job, now RUNNING under worker_id, or None
+        when there is nothing to do
+    """
+    while True:
+        now = timezone.now()
+        with transaction.atomic():
+            job = (
+                ExecutionJob.objects
+                .select_for_update(skip_locked=True)
+                .filter(Q(status='QUEUED') | Q(status='RUNNING', lease_expires_at__lt=now))
+                .order_by('created_at')
+                .first()
+            )
+            if job is None:
+                return None
+
+            # Jobs that keep losing their worker are given up on
+            if job.attempts >= EXECUTION_JOB_MAX_ATTEMPTS:
+                ExecutionJob.objects.filter(pk=job.pk, status=job.status, attempts=job.attempts).update(
+                    status='FAILED',
+                    error='Execution worker stopped responding',
+                    finished_at=now,
+                    lease_expires_at=None
+                )
+                continue
+
+            claimed = ExecutionJob.objects.filter(pk=job.pk, status=job.status, attempts=job.attempts).update(
+                status='RUNNING',
+                worker=worker_id,
+                attempts=F('attempts') + 1,
+                started_at=now,
+                lease_expires_at=get_lease_expiry()
+            )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+
+def update_job(job, **fields):
+    """
+    Write fields of a job this worker still owns.
+
+    Returns:
+        bool: False if the job was claimed by another worker in the meantime
+        (its lease expired), in which case nothing is written
+    """
+    return bool(
+        ExecutionJob.objects
+        .filter(pk=job.pk, status='RUNNING', worker=job.worker, attempts=job.attempts)
+        .update(**fields)
+    )
+
+
+def run_job(job):
+    """
+    Execute a claimed job and store its outcome.
+
+    Test runs report progress (and renew the lease) as each case finishes.
+
+    Args:
+        job (ExecutionJob): Job claimed by this worker
+    """
+    try:
+        if job.kind == 'EXECUTE':
+            with scheduling(job.user_id, RUN_LANE):
+                result = execute_code(job.language, job.code, job.input_data)
+        else:
+            execution = watch_execution(job.user_id, job.problem_id, str(job.id))
+            if execution.is_set():
+                # Still queued when the user submitted again
+                update_job(
+                    job,
+                    status='FAILED',
+                    error='Superseded by a newer submission',
+                    finished_at=timezone.now(),
+                    lease_expires_at=None
+                )
+                return
+            result = run_tests_job(job, execution)
+    except Exception as e:
+        update_job(
+            job,
+            status='FAILED',
+            error=f'Code execution failed: {str(e)}',
+            finished_at=timezone.now(),
+            lease_expires_at=None
+        )
+        return
+
+    update_job(
+        job,
+        status='COMPLETED',
+        result=result,
+        completed_count=job.total_count,
+        finished_at=timezone.now(),
+        lease_expires_at=None
+    )
+
+
+def run_tests_job(job, execution):
+    """
+    Run a RUN_TESTS job's test cases, reporting progress as each case finishes.
+
+    Args:
+        job (ExecutionJob): Job claimed by this worker
+        execution (Execution): The job's token; the run stops if it is superseded
+
+    Returns:
+        dict: run_test_cases result ("superseded": true if a newer run took over)
+    """
+    completed = [0]
+
+    def on_result(entry):
+        completed[0] += 1
+        try:
+            update_job(job, completed_count=completed[0], lease_expires_at=get_lease_expiry())
+        except DatabaseError:
+            # Progress is best effort; the final result is written below
+            pass
+
+    priority = get_failed_first_priority(job.user, job.problem, job.test_cases)
+    with execution_scope(execution), scheduling(job.user_id, SUBMIT_LANE):
+        result = run_test_cases(
+            job.language, job.code, job.test_cases,
+            cancel_event=execution,
+            limits=job.limits,
+            on_result=on_result,
+            stop_on_first_failure=job.stop_on_first_failure,
+            priority=priority
+        )
+    if execution.superseded:
+        result['superseded'] = True
+    else:
+        remember_test_results(job.user, job.problem, job.test_cases, result)
+    return result
+
+
+def get_worker_id():
+    """Identity of this worker process: host and pid."""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def work(worker_id, stop_event, poll_interval=EXECUTION_WORKER_POLL_INTERVAL, burst=False):
+    """
+    Claim and run jobs until stop_event is set.
+
+    Args:
+        worker_id (str): Identity of this worker thread
+        stop_event (threading.Event): Stops the loop after the current job
+        poll_interval (float): Seconds to wait when the queue is empty
+        burst (bool): Return as soon as the queue is empty
+    """
+    try:
+        while not stop_event.is_set():
+            close_old_connections()
+            try:
+                job = claim_next_job(worker_id)
+                if job is not None:
+                    run_job(job)
+                    continue
+            except DatabaseError:
+                # e.g. SQLite's "database is locked" when workers write at the same moment;
+                # a job whose outcome could not be stored is claimed again after its lease
+                stop_event.wait(poll_interval)
+                continue
+            if burst:
+                return
+            stop_event.wait(poll_interval)
+    finally:
+        # Each thread has its own connection
+        connection.close()
+
+
+def run_worker(concurrency=EXECUTION_WORKER_CONCURRENCY, poll_interval=EXECUTION_WORKER_POLL_INTERVAL,
+               stop_event=None, burst=False):
+    """
+    Run `concurrency` worker threads until stop_event is set.
+
+    Args:
+        concurrency (int): Jobs processed at once by this process
+        poll_interval (float): Seconds an idle thread waits before polling again
+        stop_event (threading.Event): Stops every thread after its current job
+        burst (bool): Exit once the queue is empty instead of waiting for jobs
+    """
+    stop_event = stop_event or threading.Event()
+    worker_id = get_worker_id()
+    threads = [
+        threading.Thread(
+            target=work,
+            args=(f'{worker_id}:{number}', stop_event, poll_interval, burst),
+            name=f'codevault-job-worker-{number}',
+            daemon=True
+        )
+        for number in range(max(1, concurrency))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        # Short joins keep the main thread responsive to signals
+        while thread.is_alive():
+            thread.join(timeout=1)
@@ -0,0 +1,264 @@
+import java.io.*;
+import java.lang.management.*;
+import java.lang.reflect.*;
+import java.net.*;
+import java.nio.charset.StandardCharsets;
+import java.nio.file.*;
+import java.util.*;
+import javax.tools.*;
+
+/**
+ * Warm JVM worker for the local executor's Java pool (see problems/jvm_pool.py).
+ *
+ * Reads one tab-separated command per line on stdin and answers one line on stdout:
+ *
+ *   COMPILE dir          -> COMPILED ok(0|1)         javac output in dir/.compile_output
+ *   RUN dir timeout_ms cpu_limit_ms heap_limit_bytes
+ *                        -> DONE exit cpu_ns peak_heap_bytes rss_kb clean(0|1)
+ *                           or TIMEOUT, or LIMIT (cpu|memory) cpu_ns peak_heap_bytes
+ *                           (the worker is then killed by the pool)
+ *
+ * javac runs in-process and keeps its file manager between compilations. Each
+ * run loads Main from dir in a fresh child-first class loader on top of the
+ * precompiled helper library (ListNode, TreeNode, Node) on the worker's class
+ * path, with System.in/out/err redirected to dir/.stdin, .stdout and .stderr.
+ *
+ * While a program runs, a watchdog stops it once its main thread has used more
+ * than cpu_limit_ms of CPU time or the live heap (measured after a collection)
+ * grows past heap_limit_bytes; 0 disables either limit.
+ */
+public class CodeVaultWorker {
+    private static final PrintStream PROTOCOL_OUT = System.out;
+    private static final PrintStream WORKER_ERR = System.err;
+    private static final long MAIN_STACK_SIZE = 64L * 1024 * 1024;
+    private static final long WATCHDOG_INTERVAL_MS = 10;
+
+    private static JavaCompiler compiler;
+    private static StandardJavaFileManager fileManager;
+
+    public static void main(String[] args) throws IOException {
+        compiler = ToolProvider.getSystemJavaCompiler();
+        fileManager = compiler.getStandardFileManager(null, null, StandardCharsets.UTF_8);
+
+        // Output of a program that calls System.exit is still flushed to its files
+        Runtime.getRuntime().addShutdownHook(new Thread(() -> {
+            System.out.flush();
+            System.err.flush();
+        }));
+
+        BufferedReader commands = new BufferedReader(new InputStreamReader(System.in, StandardCharsets.UTF_8));
+        reply("READY");
+        String line;
+        while ((line = commands.readLine()) != null) {
+            String[] parts = line.split("\t");
+            try {
+                if (parts[0].equals("COMPILE")) {
+                    reply(compile(Paths.get(parts[1])));
+                } else if (parts[0].equals("RUN")) {
+                    String result = run(
+                        Paths.get(parts[1]), Long.parseLong(parts[2]), Long.parseLong(parts[3]),
+                        Long.parseLong(parts[4])
+                    );
+                    reply(result);
+                    if (!result.startsWith("DONE")) {
+                        return;
+                    }
+                } else {
+                    reply("ERROR\tUnknown command");
+                }
+            } catch (Exception e) {
+                restoreStreams();
+                reply("ERROR\t" + e.toString().replace('\t', ' ').replace('\n', ' '));
+            }
+        }
+    }
+
+    private static void reply(String line) {
+        PROTOCOL_OUT.println(line);
+        PROTOCOL_OUT.flush();
+    }
+
+    private static String compile(Path dir) throws IOException {
+        List<File> sources = new ArrayList<>();
+        try (DirectoryStream<Path> stream = Files.newDirectoryStream(dir, "*.java")) {
+            for (Path source : stream) {
+                sources.add(source.toFile());
+            }
+        }
+        StringWriter diagnostics = new StringWriter();
+        List<String> options = Arrays.asList(
+            "-d", dir.toString(),
+            "-cp", System.getProperty("java.class.path"),
+            "-encoding", "UTF-8",
+            "-proc:none"
+        );
+        boolean ok = compiler.getTask(
+            diagnostics, fileManager, null, options, null, fileManager.getJavaFileObjectsFromFiles(sources)
+        ).call();
+
+        // Report paths relative to dir, as the javac command line would
+        String output = diagnostics.toString().replace(dir.toString() + File.separator, "");
+        Files.write(dir.resolve(".compile_output"), output.getBytes(StandardCharsets.UTF_8));
+        return "COMPILED\t" + (ok ? 0 : 1);
+    }
+
+    private static String run(Path dir, long timeoutMillis, long cpuLimitMillis, long heapLimitBytes)
+            throws Exception {
+        URLClassLoader loader = new ChildFirstClassLoader(
+            new URL[]{dir.toUri().toURL()}, CodeVaultWorker.class.getClassLoader()
+        );
+        InputStream in = new BufferedInputStream(new FileInputStream(dir.resolve(".stdin").toFile()));
+        PrintStream out = new PrintStream(
+            new BufferedOutputStream(new FileOutputStream(dir.resolve(".stdout").toFile())), false, "UTF-8"
+        );
+        PrintStream err = new PrintStream(
+            new BufferedOutputStream(new FileOutputStream(dir.resolve(".stderr").toFile())), false, "UTF-8"
+        );
+
+        int baselineThreads = Thread.activeCount();
+        resetHeapPeaks();
+        final int[] exitCode = {0};
+        final long[] cpuNanos = {0};
+
+        System.setIn(in);
+        System.setOut(out);
+        System.setErr(err);
+        Thread runner = new Thread(null, () -> {
+            try {
+                Method main = Class.forName("Main", true, loader).getMethod("main", String[].class);
+                main.setAccessible(true);
+                main.invoke(null, (Object) new String[0]);
+            } catch (InvocationTargetException e) {
+                exitCode[0] = 1;
+                System.err.print("Exception in thread \"main\" ");
+                e.getCause().printStackTrace();
+            } catch (Throwable e) {
+                exitCode[0] = 1;
+                e.printStackTrace();
+            } finally {
+                cpuNanos[0] = ManagementFactory.getThreadMXBean().getCurrentThreadCpuTime();
+            }
+        }, "main", MAIN_STACK_SIZE);
+        runner.setDaemon(true);
+        runner.start();
+        String exceeded = watch(runner, timeoutMillis, cpuLimitMillis, heapLimitBytes);
+        if (exceeded != null) {
+            // Threads cannot be stopped safely; the pool replaces this worker
+            out.flush();
+            err.flush();
+            return exceeded;
+        }
+
+        out.flush();
+        err.flush();
+        restoreStreams();
+        in.close();
+        out.close();
+        err.close();
+        loader.close();
+
+        boolean clean = Thread.activeCount() <= baselineThreads;
+        return "DONE\t" + exitCode[0] + "\t" + cpuNanos[0] + "\t" + heapPeak() + "\t" + residentKb()
+            + "\t" + (clean ? 1 : 0);
+    }
+
+    /**
+     * Wait for the program's main thread to finish within its limits.
+     *
+     * @return null once it finished, otherwise the reply for the limit it exceeded
+     */
+    private static String watch(Thread runner, long timeoutMillis, long cpuLimitMillis, long heapLimitBytes)
+            throws InterruptedException {
+        ThreadMXBean threads = ManagementFactory.getThreadMXBean();
+        long deadline = System.nanoTime() + timeoutMillis * 1_000_000L;
+        while (true) {
+            runner.join(WATCHDOG_INTERVAL_MS);
+            if (!runner.isAlive()) {
+                return null;
+            }
+            if (System.nanoTime() >= deadline) {
+                return "TIMEOUT";
+            }
+            long cpuNanos = threads.getThreadCpuTime(runner.getId());
+            if (cpuLimitMillis > 0 && cpuNanos > cpuLimitMillis * 1_000_000L) {
+                return "LIMIT\tcpu\t" + cpuNanos + "\t" + heapPeak();
+            }
+            if (heapLimitBytes > 0 && heapUsed() > heapLimitBytes) {
+                // Garbage does not count against the limit: check again after a collection
+                System.gc();
+                if (heapUsed() > heapLimitBytes) {
+                    return "LIMIT\tmemory\t" + cpuNanos + "\t" + heapPeak();
+                }
+            }
+        }
+    }
+
+    private static void restoreStreams() {
+        System.setOut(PROTOCOL_OUT);
+        System.setErr(WORKER_ERR);
+    }
+
+    private static void resetHeapPeaks() {
+        for (MemoryPoolMXBean pool : ManagementFactory.getMemoryPoolMXBeans()) {
+            if (pool.getType() == MemoryType.HEAP) {
+                pool.resetPeakUsage();
+            }
+        }
+    }
+
+    private static long heapPeak() {
+        long total = 0;
+        for (MemoryPoolMXBean pool : ManagementFactory.getMemoryPoolMXBeans()) {
+            if (pool.getType() == MemoryType.HEAP) {
+                total += pool.getPeakUsage().getUsed();
+            }
+        }
+        return total;
+    }
+
+    private static long heapUsed() {
+        return ManagementFactory.getMemoryMXBean().getHeapMemoryUsage().getUsed();
+    }
+
+    private static long residentKb() {
+        try {
+            for (String line : Files.readAllLines(Paths.get("/proc/self/status"))) {
+                if (line.startsWith("VmRSS:")) {
+                    return Long.parseLong(line.replaceAll("[^0-9]", ""));
+                }
+            }
+        } catch (IOException | NumberFormatException e) {
+            // Not on Linux: memory-based recycling is disabled
+        }
+        return 0;
+    }
+
+    /**
+     * Loads classes from the run directory before asking the parent, so a
+     * submission that defines its own ListNode gets its own class rather than
+     * the helper library's.
+     */
+    private static class ChildFirstClassLoader extends URLClassLoader {
+        ChildFirstClassLoader(URL[] urls, ClassLoader parent) {
+            super(urls, parent);
+        }
+
+        @Override
+        protected Class<?> loadClass(String name, boolean resolve) throws ClassNotFoundException {
+            synchronized (getClassLoadingLock(name)) {
+                Class<?> loaded = findLoadedClass(name);
+                if (loaded == null) {
+                    try {
+                        loaded = findClass(name);
+                    } catch (ClassNotFoundException e) {
+                        loaded = super.loadClass(name, false);
+                    }
+                }
+                if (resolve) {
+                    resolveClass(loaded);
+                }
+                return loaded;
+            }
+        }
+    }
+}
@@ -0,0 +1,19 @@
+import java.util.*;
+
+/**
+ * Graph helper shared by every run of the warm JVM pool.
+ * Mirrors the Node nested in Main by wrap_java_code.
+ */
+public class Node {
+    public int val;
+    public List<Node> neighbors;
+    public Node() { this.neighbors = new ArrayList<>(); }
+    public Node(int _val) {
+        val = _val;
+        neighbors = new ArrayList<>();
+    }
+    public Node(int _val, ArrayList<Node> _neighbors) {
+        val = _val;
+        neighbors = _neighbors;
+    }
+}
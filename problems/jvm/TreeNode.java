@@ -0,0 +1,16 @@
+/**
+ * Binary tree helper shared by every run of the warm JVM pool.
+ * Mirrors the TreeNode nested in Main by wrap_java_code.
+ */
+public class TreeNode {
+    public int val;
+    public TreeNode left;
+    public TreeNode right;
+    public TreeNode() {}
+    public TreeNode(int val) { this.val = val; }
+    public TreeNode(int val, TreeNode left, TreeNode right) {
+        this.val = val;
+        this.left = left;
+        this.right = right;
+    }
+}
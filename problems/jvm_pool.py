@@ -0,0 +1,463 @@
+"""
+Warm JVM worker pool for Java in the local executor.
+
+Starting a JVM and javac costs far more than running a typical submission, so
+with LOCAL_JVM_POOL_SIZE > 0 Java runs go to long-lived worker JVMs
+(problems/jvm/CodeVaultWorker.java) instead of a fresh `javac` + `java` per
+run. A worker compiles in-process with javax.tools and runs each submission
+in its own class loader on top of a helper library (ListNode, TreeNode, Node)
+compiled once when the pool starts. Workers are replaced after
+LOCAL_JVM_POOL_MAX_RUNS runs, when their RSS grows past
+LOCAL_JVM_POOL_MAX_RSS_MB, when a run times out, exceeds its limits or leaves
+threads behind, and when a program calls System.exit.
+
+The worker JVM's heap is sized for the executor's memory limit, so tighter
+per-problem limits are enforced by the worker's watchdog for each run: a
+program is stopped once its main thread has used more than the CPU limit or
+its live heap grows past the memory limit.
+"""
+import glob
+import os
+import select
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+from .compile_cache import get_compile_cache, make_compile_key
+from .local_executor import (
+    COMPILE_TIMEOUT_MESSAGE, LOCAL_EXECUTOR_COMPILE_TIMEOUT, LOCAL_EXECUTOR_CPU_LIMIT,
+    LOCAL_EXECUTOR_MEMORY_LIMIT_MB, LOCAL_EXECUTOR_TEMP_DIR, LOCAL_EXECUTOR_TIMEOUT,
+    build_launcher_command, build_local_error_result, build_local_result, get_local_runtime_version,
+    get_sandbox_env, kill_process_group, read_output, run_process
+)
+
+
+# Pool configuration
+LOCAL_JVM_POOL_SIZE = getattr(settings, 'LOCAL_JVM_POOL_SIZE', 0)  # 0 disables the pool
+LOCAL_JVM_POOL_MAX_RUNS = getattr(settings, 'LOCAL_JVM_POOL_MAX_RUNS', 100)  # runs before a worker is replaced
+LOCAL_JVM_POOL_MAX_RSS_MB = getattr(settings, 'LOCAL_JVM_POOL_MAX_RSS_MB', 512)
+
+# Worker sources: the worker itself plus the helper library
+JVM_SOURCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'jvm')
+
+# Seconds to wait for a new worker to report READY
+JVM_WORKER_START_TIMEOUT = 30
+
+# Extra seconds allowed for a worker's reply beyond the run's own time limit
+JVM_REPLY_GRACE = 2
+
+
+class JvmWorkerError(Exception):
+    """A worker died, hung or answered something unexpected."""
+
+
+class JvmWorkerTimeout(JvmWorkerError):
+    """A worker did not answer in time."""
+
+
+class JvmWorker:
+    """One worker JVM, driven over its stdin/stdout with a line protocol."""
+
+    def __init__(self, class_dir):
+        """
+        Start a worker and wait until it is ready.
+
+        Args:
+            class_dir (str): Directory holding the compiled worker and helper library
+
+        Raises:
+            JvmWorkerError: If the worker does not start
+        """
+        self.runs = 0
+        self._buffer = b''
+        command = [
+            'java', f'-Xmx{LOCAL_EXECUTOR_MEMORY_LIMIT_MB}m', '-XX:+UseSerialGC',
+            '-cp', class_dir, 'CodeVaultWorker'
+        ]
+        # The CPU limit covers the worker's whole life, so it is scaled by the run budget
+        self.process = subprocess.Popen(
+            build_launcher_command(
+                command,
+                os.path.join(class_dir, f'.report-{id(self)}'),
+                cpu_seconds=LOCAL_EXECUTOR_CPU_LIMIT * LOCAL_JVM_POOL_MAX_RUNS + LOCAL_EXECUTOR_COMPILE_TIMEOUT,
+                memory_limit_mb=LOCAL_EXECUTOR_MEMORY_LIMIT_MB,
+                limit_address_space=False
+            ),
+            cwd=class_dir,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env=get_sandbox_env(class_dir),
+            start_new_session=True,
+        )
+        try:
+            self._read_reply('READY', JVM_WORKER_START_TIMEOUT)
+        except JvmWorkerError:
+            self.close()
+            raise
+
+    def is_alive(self):
+        """Whether the worker process is still running."""
+        return self.process.poll() is None
+
+    def close(self):
+        """Kill the worker and everything it started (safe to call twice)."""
+        kill_process_group(self.process.pid)
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        self.process.wait()
+        self.process.stdout.close()
+
+    def _readline(self, deadline):
+        """Read one line from the worker, or None on timeout or exit."""
+        fd = self.process.stdout.fileno()
+        while b'\n' not in self._buffer:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            readable, _, _ = select.select([fd], [], [], remaining)
+            if not readable:
+                return None
+            chunk = os.read(fd, 4096)
+            if not chunk:
+                return None
+            self._buffer += chunk
+        line, self._buffer = self._buffer.split(b'\n', 1)
+        return line.decode('utf-8', errors='replace')
+
+    def _read_reply(self, expected, timeout):
+        """
+        Wait for a reply line starting with one of the expected keywords.
+
+        Other lines (JVM warnings) are skipped.
+
+        Returns:
+            list: Tab-separated fields of the reply
+
+        Raises:
+            JvmWorkerTimeout: If no reply arrives within timeout
+            JvmWorkerError: On worker exit or an ERROR reply
+        """
+        expected = (expected,) if isinstance(expected, str) else expected
+        deadline = time.monotonic() + timeout
+        while True:
+            line = self._readline(deadline)
+            if line is None:
+                if self.is_alive():
+                    raise JvmWorkerTimeout('JVM worker stopped responding')
+                raise JvmWorkerError('JVM worker exited')
+            fields = line.split('\t')
+            if fields[0] == 'ERROR':
+                raise JvmWorkerError(f"JVM worker error: {' '.join(fields[1:])}")
+            if fields[0] in expected:
+                return fields
+
+    def _send(self, *fields):
+        try:
+            self.process.stdin.write(('\t'.join(fields) + '\n').encode('utf-8'))
+            self.process.stdin.flush()
+        except OSError as e:
+            raise JvmWorkerError(f'JVM worker is gone: {e}')
+
+    def compile(self, directory):
+        """
+        Compile the .java files in directory into it.
+
+        Returns:
+            str: Compiler output on failure, COMPILE_TIMEOUT_MESSAGE if the
+            worker hung (it is then killed), '' on success
+
+        Raises:
+            JvmWorkerError: If the worker fails
+        """
+        self._send('COMPILE', directory)
+        try:
+            fields = self._read_reply('COMPILED', LOCAL_EXECUTOR_COMPILE_TIMEOUT)
+        except JvmWorkerTimeout:
+            self.close()
+            return COMPILE_TIMEOUT_MESSAGE
+        if fields[1] == '0':
+            return ''
+        return read_output(os.path.join(directory, '.compile_output')).strip() or 'Compilation failed'
+
+    def run(self, directory, input_data, timeout=LOCAL_EXECUTOR_TIMEOUT, cpu_seconds=LOCAL_EXECUTOR_CPU_LIMIT,
+            memory_limit_mb=LOCAL_EXECUTOR_MEMORY_LIMIT_MB):
+        """
+        Run the compiled Main in directory.
+
+        A run that exceeds cpu_seconds of CPU time is reported like one
+        stopped by RLIMIT_CPU (SIGXCPU); one whose live heap exceeds
+        memory_limit_mb is killed with its heap peak as max_rss_kb.
+
+        Returns:
+            tuple: (run, reusable). run has the run_process result format, with
+            the heap peak of the run as max_rss_kb; reusable tells whether the
+            worker can take another run.
+        """
+        with open(os.path.join(directory, '.stdin'), 'w', encoding='utf-8') as stdin_file:
+            stdin_file.write(input_data or '')
+        self.runs += 1
+
+        started = time.monotonic()
+        self._send(
+            'RUN', directory, str(int(timeout * 1000)), str(int((cpu_seconds or 0) * 1000)),
+            str((memory_limit_mb or 0) * 1024 * 1024)
+        )
+        try:
+            fields = self._read_reply(('DONE', 'TIMEOUT', 'LIMIT'), timeout + JVM_REPLY_GRACE)
+        except JvmWorkerTimeout:
+            fields = ['TIMEOUT']
+        except JvmWorkerError:
+            if self.is_alive():
+                raise
+            fields = None
+        wall_time = time.monotonic() - started
+
+        run = {
+            'stdout': read_output(os.path.join(directory, '.stdout')),
+            'stderr': read_output(os.path.join(directory, '.stderr')),
+            'exit_code': None,
+            'signal': None,
+            'timed_out': False,
+            'wall_time': wall_time,
+            'cpu_time': wall_time,
+            'max_rss_kb': 0,
+        }
+        if fields is None:
+            # The program ended the worker, e.g. through System.exit
+            self.process.wait()
+            run['exit_code'] = self.process.returncode
+            return run, False
+        if fields[0] == 'TIMEOUT':
+            run['timed_out'] = True
+            return run, False
+        if fields[0] == 'LIMIT':
+            _, limit, cpu_ns, heap_peak = fields
+            run['signal'] = signal.SIGXCPU if limit == 'cpu' else signal.SIGKILL
+            run['cpu_time'] = int(cpu_ns) / 1e9 if int(cpu_ns) >= 0 else wall_time
+            run['max_rss_kb'] = int(heap_peak) // 1024
+            return run, False
+
+        _, exit_code, cpu_ns, heap_peak, rss_kb, clean = fields
+        run['exit_code'] = int(exit_code)
+        run['cpu_time'] = int(cpu_ns) / 1e9
+        run['max_rss_kb'] = int(heap_peak) // 1024
+        reusable = (
+            clean == '1'
+            and self.runs < LOCAL_JVM_POOL_MAX_RUNS
+            and int(rss_kb) < LOCAL_JVM_POOL_MAX_RSS_MB * 1024
+        )
+        return run, reusable
+
+
+class JvmWorkerPool:
+    """A bounded set of warm JVM workers, started on demand."""
+
+    def __init__(self, size=LOCAL_JVM_POOL_SIZE):
+        """
+        Args:
+            size (int): Maximum number of workers (and concurrent Java runs)
+        """
+        self.size = size
+        self._slots = threading.Semaphore(size)
+        self._lock = threading.Lock()
+        self._idle = []
+        self._class_dir = None
+        self._started = 0
+        self._recycled = 0
+        self._runs = 0
+
+    def _get_class_dir(self):
+        """Compile the worker and helper library once per pool."""
+        with self._lock:
+            if self._class_dir is not None:
+                return self._class_dir
+            class_dir = tempfile.mkdtemp(prefix='codevault-jvm-', dir=LOCAL_EXECUTOR_TEMP_DIR)
+            sources = sorted(glob.glob(os.path.join(JVM_SOURCE_DIR, '*.java')))
+            build = run_process(
+                ['javac', '-encoding', 'UTF-8', '-d', class_dir] + sources,
+                class_dir,
+                timeout=LOCAL_EXECUTOR_COMPILE_TIMEOUT,
+                cpu_seconds=LOCAL_EXECUTOR_COMPILE_TIMEOUT,
+                limit_address_space=False
+            )
+            if build['exit_code'] != 0:
+                shutil.rmtree(class_dir, ignore_errors=True)
+                raise JvmWorkerError(f"Could not build the JVM worker: {build['stderr'].strip()}")
+            self._class_dir = class_dir
+            return class_dir
+
+    def _acquire(self):
+        self._slots.acquire()
+        try:
+            with self._lock:
+                if self._idle:
+                    return self._idle.pop()
+            worker = JvmWorker(self._get_class_dir())
+            with self._lock:
+                self._started += 1
+            return worker
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def _release(self, worker, reusable):
+        if reusable and worker.is_alive():
+            with self._lock:
+                self._idle.append(worker)
+        else:
+            worker.close()
+            with self._lock:
+                self._recycled += 1
+        self._slots.release()
+
+    def execute(self, code, input_data="", timeout=LOCAL_EXECUTOR_TIMEOUT, cpu_seconds=LOCAL_EXECUTOR_CPU_LIMIT,
+                memory_limit_mb=LOCAL_EXECUTOR_MEMORY_LIMIT_MB):
+        """
+        Compile and run a Java program (already wrapped into Main) on a warm worker.
+
+        Compilation goes through the compile cache like the javac command line
+        path, so repeated runs of the same source skip compilation.
+
+        Args:
+            code (str): Java source defining Main
+            input_data (str): Input data for stdin
+            timeout (float): Wall-clock limit in seconds
+            cpu_seconds (float): CPU time limit of the run's main thread
+            memory_limit_mb (int): Live heap limit of the run (memory use is
+                reported as the run's heap peak)
+
+        Returns:
+            dict: Execution result in the execute_code format
+        """
+        run_dir = tempfile.mkdtemp(prefix='codevault-run-', dir=LOCAL_EXECUTOR_TEMP_DIR)
+        try:
+            worker = self._acquire()
+        except (JvmWorkerError, OSError) as e:
+            shutil.rmtree(run_dir, ignore_errors=True)
+            return build_local_error_result(str(e))
+
+        reusable = False
+        try:
+            compile_output = self._prepare(worker, code, run_dir)
+            if compile_output:
+                reusable = worker.is_alive()
+                return build_local_result(
+                    {'stdout': '', 'stderr': '', 'exit_code': None, 'signal': None, 'timed_out': False,
+                     'wall_time': 0.0, 'cpu_time': 0.0, 'max_rss_kb': 0},
+                    compile_output=compile_output
+                )
+            run, reusable = worker.run(run_dir, input_data, timeout, cpu_seconds, memory_limit_mb)
+            with self._lock:
+                self._runs += 1
+            return build_local_result(run)
+        except JvmWorkerError as e:
+            return build_local_error_result(str(e))
+        finally:
+            self._release(worker, reusable)
+            shutil.rmtree(run_dir, ignore_errors=True)
+
+    def check_compilation(self, code):
+        """
+        Compile a Java program on a warm worker without running it.
+
+        The build lands in the compile cache, so the runs that follow for the
+        same source skip compilation.
+
+        Args:
+            code (str): Java source defining Main
+
+        Returns:
+            str: Compiler output on failure, '' on success, None if no worker
+            could be used
+        """
+        run_dir = tempfile.mkdtemp(prefix='codevault-run-', dir=LOCAL_EXECUTOR_TEMP_DIR)
+        try:
+            worker = self._acquire()
+        except (JvmWorkerError, OSError):
+            shutil.rmtree(run_dir, ignore_errors=True)
+            return None
+
+        reusable = False
+        try:
+            compile_output = self._prepare(worker, code, run_dir)
+            reusable = worker.is_alive()
+            return compile_output
+        except JvmWorkerError:
+            return None
+        finally:
+            self._release(worker, reusable)
+            shutil.rmtree(run_dir, ignore_errors=True)
+
+    def _prepare(self, worker, code, run_dir):
+        """Compile code for run_dir through the compile cache; returns compiler output."""
+        def write_source(directory):
+            with open(os.path.join(directory, 'Main.java'), 'w', encoding='utf-8') as source_file:
+                source_file.write(code)
+
+        def build(build_dir):
+            write_source(build_dir)
+            compile_output = worker.compile(build_dir)
+            return compile_output, compile_output != COMPILE_TIMEOUT_MESSAGE
+
+        compile_cache = get_compile_cache()
+        if compile_cache is None:
+            return build(run_dir)[0]
+
+        key = make_compile_key('JAVA', ['jvm-pool', JVM_SOURCE_DIR], get_local_runtime_version('JAVA'), code)
+        artifact_dir, compile_output = compile_cache.get_or_compile(key, build)
+        if compile_output:
+            return compile_output
+        try:
+            shutil.copytree(artifact_dir, run_dir, dirs_exist_ok=True, ignore=shutil.ignore_patterns('.*'))
+        except OSError:
+            return build(run_dir)[0]
+        return ''
+
+    def stats(self):
+        """
+        Pool counters.
+
+        Returns:
+            dict: {'size': int, 'idle': int, 'started': int, 'recycled': int, 'runs': int}
+        """
+        with self._lock:
+            return {
+                'size': self.size,
+                'idle': len(self._idle),
+                'started': self._started,
+                'recycled': self._recycled,
+                'runs': self._runs
+            }
+
+
+_jvm_pool = None
+_jvm_pool_pid = None
+_jvm_pool_lock = threading.Lock()
+
+
+def get_jvm_pool():
+    """
+    Return the process-wide JVM worker pool.
+
+    A new pool is created after a fork, since workers belong to the process
+    that started them.
+
+    Returns:
+        JvmWorkerPool: Shared pool, or None when LOCAL_JVM_POOL_SIZE is 0
+    """
+    global _jvm_pool, _jvm_pool_pid
+    if not LOCAL_JVM_POOL_SIZE:
+        return None
+    with _jvm_pool_lock:
+        if _jvm_pool is None or _jvm_pool_pid != os.getpid():
+            _jvm_pool = JvmWorkerPool()
+            _jvm_pool_pid = os.getpid()
+        return _jvm_pool
@@ -0,0 +1,547 @@
+"""
+Local code execution backend (CODE_EXECUTION_API = 'local').
+
+Runs submissions in subprocesses on the application host. Every run gets its
+own temporary directory, resource limits (CPU time, address space, file size,
+process count) and a wall-clock timeout, and reports real CPU time and peak
+memory from the kernel's rusage.
+
+rlimits bound resource usage but are not an isolation boundary: run the
+application as an unprivileged user inside a container when enabling this
+backend.
+"""
+import errno
+import json
+import math
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.conf import settings
+
+from .compile_cache import get_compile_cache, make_compile_key
+from .execution_tokens import get_current_execution
+
+
+# Limits applied to every run
+LOCAL_EXECUTOR_TIMEOUT = getattr(settings, 'LOCAL_EXECUTOR_TIMEOUT', 10)  # wall-clock seconds
+LOCAL_EXECUTOR_CPU_LIMIT = getattr(settings, 'LOCAL_EXECUTOR_CPU_LIMIT', 5)  # CPU seconds
+LOCAL_EXECUTOR_MEMORY_LIMIT_MB = getattr(settings, 'LOCAL_EXECUTOR_MEMORY_LIMIT_MB', 256)
+LOCAL_EXECUTOR_FILE_SIZE_LIMIT_MB = getattr(settings, 'LOCAL_EXECUTOR_FILE_SIZE_LIMIT_MB', 16)
+LOCAL_EXECUTOR_MAX_PROCESSES = getattr(settings, 'LOCAL_EXECUTOR_MAX_PROCESSES', 256)
+LOCAL_EXECUTOR_COMPILE_TIMEOUT = getattr(settings, 'LOCAL_EXECUTOR_COMPILE_TIMEOUT', 30)  # seconds
+LOCAL_EXECUTOR_TEMP_DIR = getattr(settings, 'LOCAL_EXECUTOR_TEMP_DIR', None)  # None = system temp dir
+
+# How much of stdout/stderr is returned to the caller
+LOCAL_EXECUTOR_OUTPUT_LIMIT = 1024 * 1024  # bytes
+
+COMPILE_TIMEOUT_MESSAGE = 'Compilation timed out'
+
+# Forks, limits and measures each program (see local_launcher)
+LOCAL_LAUNCHER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'local_launcher.py')
+
+# Per-language toolchain. Placeholders: {python}, {memory_mb}.
+# JVM and V8 reserve far more virtual memory than they use, so their heap is
+# capped with runtime flags instead of RLIMIT_AS.
+LOCAL_LANGUAGE_SPECS = {
+    'PYTHON': {
+        'source': 'main.py',
+        'compile': None,
+        'run': ['{python}', '-I', 'main.py'],
+        'version': ['{python}', '--version'],
+        'limit_address_space': True,
+    },
+    'JAVASCRIPT': {
+        'source': 'main.js',
+        'compile': None,
+        'run': ['node', '--max-old-space-size={memory_mb}', 'main.js'],
+        'version': ['node', '--version'],
+        'limit_address_space': False,
+    },
+    'CPP': {
+        'source': 'main.cpp',
+        'compile': ['g++', '-std=c++17', '-O2', '-o', 'main', 'main.cpp'],
+        'run': ['./main'],
+        'version': ['g++', '--version'],
+        'limit_address_space': True,
+    },
+    'JAVA': {
+        'source': 'Main.java',
+        'compile': ['javac', '-encoding', 'UTF-8', '-d', '.', 'Main.java'],
+        'run': ['java', '-Xmx{memory_mb}m', '-Xss64m', '-XX:+UseSerialGC', '-cp', '.', 'Main'],
+        'version': ['javac', '-version'],
+        'limit_address_space': False,
+    },
+}
+
+
+def format_command(template, memory_mb=LOCAL_EXECUTOR_MEMORY_LIMIT_MB):
+    """Fill the placeholders of a toolchain command."""
+    return [part.format(python=sys.executable, memory_mb=memory_mb) for part in template]
+
+
+def get_sandbox_env(run_dir):
+    """Minimal environment for user programs (no secrets from the app's environment)."""
+    return {
+        'PATH': os.environ.get('PATH', '/usr/local/bin:/usr/bin:/bin'),
+        'HOME': run_dir,
+        'TMPDIR': run_dir,
+        'LANG': 'C.UTF-8',
+        'PYTHONIOENCODING': 'utf-8',
+    }
+
+
+def build_launcher_command(args, report_path, cpu_seconds, memory_limit_mb, limit_address_space):
+    """
+    Wrap a command so it runs under local_launcher with the run's rlimits.
+
+    Args:
+        args (list): Command and arguments
+        report_path (str): File the launcher writes the exit status and rusage to
+        cpu_seconds (int): RLIMIT_CPU soft limit; SIGXCPU is sent when reached
+        memory_limit_mb (int): RLIMIT_AS in MB, when limit_address_space is set
+        limit_address_space (bool): Whether to apply RLIMIT_AS
+
+    Returns:
+        list: Launcher command line
+    """
+    address_space = int(memory_limit_mb * 1024 * 1024) if limit_address_space else 0
+    return [
+        sys.executable, '-I', '-S', LOCAL_LAUNCHER_PATH, report_path,
+        str(max(1, int(cpu_seconds))),
+        str(address_space),
+        str(int(LOCAL_EXECUTOR_FILE_SIZE_LIMIT_MB * 1024 * 1024)),
+        str(LOCAL_EXECUTOR_MAX_PROCESSES),
+        '--',
+    ] + list(args)
+
+
+def read_output(path):
+    """Read up to LOCAL_EXECUTOR_OUTPUT_LIMIT bytes of a captured stream."""
+    try:
+        with open(path, 'rb') as stream:
+            return stream.read(LOCAL_EXECUTOR_OUTPUT_LIMIT).decode('utf-8', errors='replace')
+    except OSError:
+        return ''
+
+
+def run_process(args, run_dir, stdin_data='', timeout=LOCAL_EXECUTOR_TIMEOUT, cpu_seconds=LOCAL_EXECUTOR_CPU_LIMIT,
+                memory_limit_mb=LOCAL_EXECUTOR_MEMORY_LIMIT_MB, limit_address_space=True, track=False):
+    """
+    Run one command under rlimits and a wall-clock timeout.
+
+    The command is started through local_launcher, which applies the rlimits
+    and reports the program's exit status, CPU time and peak RSS. stdin,
+    stdout and stderr go through files in run_dir, so large outputs can never
+    deadlock a pipe and are bounded by RLIMIT_FSIZE. The run has its own
+    session so the whole process group can be killed on timeout.
+
+    Args:
+        args (list): Command and arguments
+        run_dir (str): Working directory of the run
+        stdin_data (str): Standard input
+        timeout (float): Wall-clock limit in seconds
+        cpu_seconds (int): CPU time limit in seconds
+        memory_limit_mb (int): Address space limit in MB
+        limit_address_space (bool): Whether to apply the address space limit
+        track (bool): Register the process with the current execution, so it
+            is killed if the execution is superseded (see execution_tokens)
+
+    Returns:
+        dict: {
+            'stdout': str, 'stderr': str,
+            'exit_code': int or None, 'signal': int or None,
+            'timed_out': bool,
+            'wall_time': float (seconds),
+            'cpu_time': float (seconds, the wall time if the run was killed),
+            'max_rss_kb': int
+        }
+
+    Raises:
+        FileNotFoundError: If the command does not exist
+    """
+    stdin_path = os.path.join(run_dir, '.stdin')
+    stdout_path = os.path.join(run_dir, '.stdout')
+    stderr_path = os.path.join(run_dir, '.stderr')
+    report_path = os.path.join(run_dir, '.report')
+    with open(stdin_path, 'w', encoding='utf-8') as stdin_file:
+        stdin_file.write(stdin_data or '')
+    if os.path.exists(report_path):
+        os.remove(report_path)
+
+    with open(stdin_path, 'rb') as stdin_file, \
+            open(stdout_path, 'wb') as stdout_file, \
+            open(stderr_path, 'wb') as stderr_file:
+        started = time.monotonic()
+        process = subprocess.Popen(
+            build_launcher_command(args, report_path, cpu_seconds, memory_limit_mb, limit_address_space),
+            cwd=run_dir,
+            stdin=stdin_file,
+            stdout=stdout_file,
+            stderr=stderr_file,
+            env=get_sandbox_env(run_dir),
+            start_new_session=True,
+        )
+
+    execution = get_current_execution() if track else None
+    if execution is not None:
+        execution.add_process(process.pid)
+    try:
+        process.wait(timeout=timeout)
+        timed_out = False
+    except subprocess.TimeoutExpired:
+        timed_out = True
+    finally:
+        # Kill the program and anything it forked, then reap the launcher
+        kill_process_group(process.pid)
+        process.wait()
+        if execution is not None:
+            execution.remove_process(process.pid)
+    wall_time = time.monotonic() - started
+
+    try:
+        with open(report_path, 'r', encoding='utf-8') as report_file:
+            report = json.load(report_file)
+    except (OSError, ValueError):
+        # Launcher killed on timeout before it could report
+        report = {'exit_code': None, 'signal': signal.SIGKILL, 'cpu_time': None, 'max_rss_kb': 0}
+
+    if 'exec_error' in report:
+        error_number, message, filename = report['exec_error']
+        if error_number == errno.ENOENT:
+            raise FileNotFoundError(error_number, message, filename)
+        raise OSError(error_number, f'{filename}: {message}')
+
+    return {
+        'stdout': read_output(stdout_path),
+        'stderr': read_output(stderr_path),
+        'exit_code': report['exit_code'],
+        'signal': report['signal'],
+        'timed_out': timed_out,
+        'wall_time': wall_time,
+        'cpu_time': report['cpu_time'] if report['cpu_time'] is not None else wall_time,
+        'max_rss_kb': report['max_rss_kb'],
+    }
+
+
+def kill_process_group(pid):
+    """SIGKILL a run's process group, ignoring groups that are already gone."""
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def build_local_result(run, compile_output=''):
+    """
+    Map a finished run to the execute_code result format.
+
+    Status mapping mirrors execute_code_piston, plus real time limit verdicts.
+
+    Args:
+        run (dict): Result of run_process
+        compile_output (str): Compiler output when compilation failed
+
+    Returns:
+        dict: Execution result
+    """
+    if compile_output:
+        status, status_id = 'Compilation Error', 6
+    elif run['timed_out'] or run['signal'] == signal.SIGXCPU:
+        status, status_id = 'Time Limit Exceeded', 5
+    elif run['exit_code'] == 0:
+        status, status_id = 'Accepted', 3
+    elif run['signal']:
+        status, status_id = 'Runtime Error (Signal)', 11
+    elif run['stdout'].strip():
+        # Same as Piston: output despite a non-zero exit counts as accepted
+        status, status_id = 'Accepted', 3
+    else:
+        status, status_id = 'Runtime Error (Non-zero exit)', 11
+
+    return {
+        'output': run['stdout'],
+        'error': run['stderr'],
+        'status': status,
+        'status_id': status_id,
+        'time': f"{run['cpu_time']:.3f}",
+        'memory': run['max_rss_kb'],
+        'wall_time': round(run['wall_time'], 3),
+        'cpu_time': round(run['cpu_time'], 3),
+        'compile_output': compile_output
+    }
+
+
+def build_local_error_result(message):
+    """Execution result for failures of the local executor itself."""
+    return {
+        'output': '',
+        'error': message,
+        'status': 'Error',
+        'status_id': 0,
+        'time': '0',
+        'memory': 0,
+        'compile_output': ''
+    }
+
+
+def compile_source(spec, run_dir):
+    """
+    Compile the source in run_dir, if the language needs it.
+
+    Args:
+        spec (dict): Entry of LOCAL_LANGUAGE_SPECS
+        run_dir (str): Directory holding the source file
+
+    Returns:
+        str: Compiler output on failure, '' on success
+    """
+    if not spec['compile']:
+        return ''
+    run = run_process(
+        format_command(spec['compile']),
+        run_dir,
+        timeout=LOCAL_EXECUTOR_COMPILE_TIMEOUT,
+        cpu_seconds=LOCAL_EXECUTOR_COMPILE_TIMEOUT,
+        limit_address_space=False
+    )
+    if run['exit_code'] == 0:
+        return ''
+    if run['timed_out']:
+        return COMPILE_TIMEOUT_MESSAGE
+    return (run['stderr'] + run['stdout']).strip() or 'Compilation failed'
+
+
+def prepare_program(spec, language, code, run_dir):
+    """
+    Put a runnable program for code into run_dir.
+
+    Compiled languages go through the compile cache: the artifacts of an
+    identical earlier build (or its compiler errors) are copied into run_dir
+    instead of compiling again, and concurrent runs of the same source wait
+    for a single build.
+
+    Args:
+        spec (dict): Entry of LOCAL_LANGUAGE_SPECS
+        language (str): Programming language (upper case)
+        code (str): Source code
+        run_dir (str): Empty run directory
+
+    Returns:
+        str: Compiler output on failure, '' on success
+    """
+    def write_source(directory):
+        with open(os.path.join(directory, spec['source']), 'w', encoding='utf-8') as source_file:
+            source_file.write(code)
+
+    compile_cache = get_compile_cache() if spec['compile'] else None
+    if compile_cache is None:
+        write_source(run_dir)
+        return compile_source(spec, run_dir)
+
+    def build(build_dir):
+        write_source(build_dir)
+        compile_output = compile_source(spec, build_dir)
+        return compile_output, compile_output != COMPILE_TIMEOUT_MESSAGE
+
+    key = make_compile_key(language, spec['compile'], get_local_runtime_version(language), code)
+    artifact_dir, compile_output = compile_cache.get_or_compile(key, build)
+    if compile_output:
+        return compile_output
+
+    try:
+        # Copy, never link: the program must not be able to modify the cached build
+        shutil.copytree(artifact_dir, run_dir, dirs_exist_ok=True, ignore=shutil.ignore_patterns('.*'))
+    except OSError:
+        # Entry evicted while copying; build this run on its own
+        write_source(run_dir)
+        return compile_source(spec, run_dir)
+    return ''
+
+
+def get_local_limits(limits):
+    """
+    Tighten the executor's limits with per-problem ones.
+
+    Per-problem limits can only lower the deployment-wide limits. RLIMIT_CPU
+    counts whole seconds, so the CPU limit is rounded up; the exact time limit
+    is checked against the measured CPU time when test cases are judged.
+
+    Args:
+        limits (dict): Resolved per-problem limits (see services.resolve_execution_limits), or None
+
+    Returns:
+        tuple: (wall-clock timeout in seconds, CPU seconds, memory limit in MB)
+    """
+    timeout, cpu_seconds, memory_limit_mb = (
+        LOCAL_EXECUTOR_TIMEOUT, LOCAL_EXECUTOR_CPU_LIMIT, LOCAL_EXECUTOR_MEMORY_LIMIT_MB
+    )
+    if limits and limits['time_limit']:
+        timeout = min(timeout, limits['wall_time_limit'])
+        cpu_seconds = min(cpu_seconds, math.ceil(limits['time_limit']))
+    if limits and limits['memory_limit']:
+        memory_limit_mb = min(memory_limit_mb, limits['memory_limit'])
+    return timeout, cpu_seconds, memory_limit_mb
+
+
+def run_in_python_zygote(run_dir, input_data, timeout=LOCAL_EXECUTOR_TIMEOUT, cpu_seconds=LOCAL_EXECUTOR_CPU_LIMIT,
+                         memory_limit_mb=LOCAL_EXECUTOR_MEMORY_LIMIT_MB):
+    """
+    Run run_dir/main.py through the Python zygote when it is enabled.
+
+    Returns:
+        dict: run_process result with a 'startup' report, or None when the
+        zygote is disabled or unavailable (the caller then starts Python normally)
+    """
+    # Imported here: python_zygote builds on this module
+    from .python_zygote import ZygoteError, get_python_zygote
+    try:
+        zygote = get_python_zygote()
+        if zygote is None:
+            return None
+        return zygote.run(run_dir, input_data, timeout, cpu_seconds, memory_limit_mb)
+    except ZygoteError:
+        return None
+
+
+_runtime_versions = {}
+
+
+def get_local_runtime_version(language):
+    """
+    Version string of the local toolchain for a language (probed once).
+
+    Args:
+        language (str): Programming language
+
+    Returns:
+        str: First line of the tool's version output ('' if unavailable)
+    """
+    language_upper = language.upper()
+    if language_upper not in _runtime_versions:
+        spec = LOCAL_LANGUAGE_SPECS.get(language_upper)
+        version = ''
+        if spec:
+            try:
+                probe = subprocess.run(
+                    format_command(spec['version']), capture_output=True, text=True, timeout=10
+                )
+                version = (probe.stdout or probe.stderr).strip().splitlines()[0]
+            except (OSError, subprocess.SubprocessError, IndexError):
+                version = ''
+        _runtime_versions[language_upper] = version
+    return _runtime_versions[language_upper]
+
+
+def check_compilation_local(language, code):
+    """
+    Compile code without running it.
+
+    The build goes into the compile cache, so the runs of the same source
+    that follow do not compile again. Without the cache there is nothing to
+    reuse and no check is made.
+
+    Args:
+        language (str): Programming language (JAVA, PYTHON, CPP, JAVASCRIPT)
+        code (str): Source code (Java must already define Main)
+
+    Returns:
+        str: Compiler output on failure, '' on success, None when no check
+        was made (interpreted language, compile cache disabled, or the
+        toolchain could not be used)
+    """
+    language_upper = language.upper()
+    spec = LOCAL_LANGUAGE_SPECS.get(language_upper)
+    if spec is None or not spec['compile'] or get_compile_cache() is None:
+        return None
+
+    if language_upper == 'JAVA':
+        from .jvm_pool import get_jvm_pool
+        jvm_pool = get_jvm_pool()
+        if jvm_pool is not None:
+            return jvm_pool.check_compilation(code)
+
+    run_dir = tempfile.mkdtemp(prefix='codevault-run-', dir=LOCAL_EXECUTOR_TEMP_DIR)
+    try:
+        os.chmod(run_dir, 0o700)
+        return prepare_program(spec, language_upper, code, run_dir)
+    except OSError:
+        # e.g. the compiler is not installed; the runs report it
+        return None
+    finally:
+        shutil.rmtree(run_dir, ignore_errors=True)
+
+
+def execute_code_local(language, code, input_data="", limits=None):
+    """
+    Execute code in a local subprocess with resource limits.
+
+    Args:
+        language (str): Programming language (JAVA, PYTHON, CPP, JAVASCRIPT)
+        code (str): Source code to execute (Java must already define Main)
+        input_data (str): Input data for stdin
+        limits (dict): Resolved per-problem limits that tighten the executor's own, or None
+
+    Returns:
+        dict: Execution result in the execute_code format, with the CPU time
+        in seconds as 'time' and the peak resident memory in KB as 'memory'.
+        Runs forked from the Python zygote also carry 'startup':
+        {'mode': 'zygote', 'time_ms': float, 'saved_ms': float}.
+    """
+    language_upper = language.upper()
+    spec = LOCAL_LANGUAGE_SPECS.get(language_upper)
+    if spec is None:
+        return build_local_error_result(
+            f"Unsupported language: {language}. Supported: {', '.join(LOCAL_LANGUAGE_SPECS.keys())}"
+        )
+
+    timeout, cpu_seconds, memory_limit_mb = get_local_limits(limits)
+
+    if language_upper == 'JAVA':
+        # Imported here: jvm_pool builds on this module
+        from .jvm_pool import get_jvm_pool
+        jvm_pool = get_jvm_pool()
+        if jvm_pool is not None:
+            return jvm_pool.execute(code, input_data, timeout, cpu_seconds, memory_limit_mb)
+
+    run_dir = tempfile.mkdtemp(prefix='codevault-run-', dir=LOCAL_EXECUTOR_TEMP_DIR)
+    try:
+        os.chmod(run_dir, 0o700)
+        compile_output = prepare_program(spec, language_upper, code, run_dir)
+        if compile_output:
+            return build_local_result(
+                {'stdout': '', 'stderr': '', 'exit_code': None, 'signal': None, 'timed_out': False,
+                 'wall_time': 0.0, 'cpu_time': 0.0, 'max_rss_kb': 0},
+                compile_output=compile_output
+            )
+
+        run = None
+        if language_upper == 'PYTHON':
+            run = run_in_python_zygote(run_dir, input_data, timeout, cpu_seconds, memory_limit_mb)
+        if run is None:
+            run = run_process(
+                format_command(spec['run'], memory_limit_mb),
+                run_dir,
+                stdin_data=input_data,
+                timeout=timeout,
+                cpu_seconds=cpu_seconds,
+                memory_limit_mb=memory_limit_mb,
+                limit_address_space=spec['limit_address_space'],
+                track=True
+            )
+
+        result = build_local_result(run)
+        if 'startup' in run:
+            result['startup'] = run['startup']
+        return result
+
+    except FileNotFoundError as e:
+        return build_local_error_result(f'Local executor: {e.filename} is not installed')
+    except OSError as e:
+        return build_local_error_result(f'Local executor error: {str(e)}')
+    finally:
+        shutil.rmtree(run_dir, ignore_errors=True)
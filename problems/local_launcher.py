@@ -0,0 +1,108 @@
+"""
+Launcher for programs run by the local executor.
+
+Usage: python -I -S local_launcher.py REPORT CPU_SECONDS ADDRESS_SPACE FILE_SIZE MAX_PROCESSES -- COMMAND...
+
+Forks, applies rlimits in the child, execs COMMAND and writes the child's
+exit status and rusage to REPORT as JSON. It exists so the program is forked
+from this small process rather than from the application: a child's peak RSS
+starts at the size of the process it was forked from, which for a Django
+worker would hide the program's own memory use.
+
+Runs on the standard library only (no Django); ADDRESS_SPACE 0 means unlimited.
+MAX_PROCESSES is headroom over the user's current task count (0 disables it).
+"""
+import json
+import os
+import resource
+import sys
+
+
+def count_user_tasks(uid):
+    """
+    Count the tasks (processes and threads) owned by uid, as RLIMIT_NPROC does.
+
+    Args:
+        uid: User id to count for
+
+    Returns:
+        The number of tasks, or None if /proc is not available
+    """
+    try:
+        pids = [name for name in os.listdir('/proc') if name.isdigit()]
+    except OSError:
+        return None
+    count = 0
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/status', encoding='utf-8') as status:
+                fields = dict(line.split(':', 1) for line in status if ':' in line)
+        except OSError:
+            continue  # exited while counting
+        if int(fields.get('Uid', '-1').split()[0]) == uid:
+            count += int(fields.get('Threads', '1'))
+    return count
+
+
+def set_limits(cpu_seconds, address_space, file_size, max_processes):
+    """
+    Apply the run's rlimits to the current process.
+
+    RLIMIT_NPROC counts every task of the user, not of the run, so it is set
+    to max_processes above the user's current count. This is best-effort:
+    the headroom is shared with whatever else the user starts meanwhile, and
+    the limit is skipped where /proc can't be read (or max_processes is 0).
+    """
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (file_size, file_size))
+    if max_processes:
+        current = count_user_tasks(os.getuid())
+        if current is not None:
+            nproc = current + max_processes
+            _, hard = resource.getrlimit(resource.RLIMIT_NPROC)
+            if hard != resource.RLIM_INFINITY:
+                nproc = min(nproc, hard)
+            resource.setrlimit(resource.RLIMIT_NPROC, (nproc, nproc))
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+    if address_space:
+        resource.setrlimit(resource.RLIMIT_AS, (address_space, address_space))
+
+
+def main(argv):
+    report_path = argv[0]
+    cpu_seconds, address_space, file_size, max_processes = (int(value) for value in argv[1:5])
+    command = argv[6:]
+
+    # Close-on-exec pipe: stays empty unless exec fails
+    error_read, error_write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(error_read)
+        try:
+            set_limits(cpu_seconds, address_space, file_size, max_processes)
+            os.execvp(command[0], command)
+        except OSError as e:
+            os.write(error_write, json.dumps([e.errno, e.strerror, command[0]]).encode('utf-8'))
+        os._exit(127)
+
+    os.close(error_write)
+    with os.fdopen(error_read, 'rb') as error_pipe:
+        exec_error = error_pipe.read()
+    _, status, rusage = os.wait4(pid, 0)
+
+    report = {
+        'exit_code': os.WEXITSTATUS(status) if os.WIFEXITED(status) else None,
+        'signal': os.WTERMSIG(status) if os.WIFSIGNALED(status) else None,
+        'cpu_time': rusage.ru_utime + rusage.ru_stime,
+        'max_rss_kb': rusage.ru_maxrss,
+    }
+    if exec_error:
+        report['exec_error'] = json.loads(exec_error.decode('utf-8'))
+    with open(report_path, 'w', encoding='utf-8') as report_file:
+        json.dump(report, report_file)
+
+    return report['exit_code'] if report['exit_code'] is not None else 128 + report['signal']
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,167 @@
+"""
+Pre-forked Python interpreter ("zygote") for the local executor.
+
+Usage: python -I local_zygote.py SOCKET_PATH
+
+Imports the modules submissions commonly use once, then serves run requests
+on a Unix socket. For each request it forks a supervisor, which forks the
+program's process (rlimits applied, stdio redirected to the files of the run
+directory), waits for it and reports its exit status and rusage. Programs
+therefore start from an initialized interpreter instead of paying for
+interpreter startup and imports on every run.
+
+Protocol, one request per connection:
+    -> {"run_dir", "cpu_seconds", "address_space", "file_size", "max_processes"}
+    <- {"pid"}                                              once the program started
+    <- {"exit_code", "signal", "cpu_time", "max_rss_kb", "baseline_rss_kb"}
+                                                            once it finished
+
+baseline_rss_kb is the zygote's RSS the program started from, which its
+max_rss_kb includes.
+
+The zygote exits when its stdin is closed (i.e. when the app goes away).
+Runs on the standard library only (no Django).
+"""
+import io
+import json
+import os
+import resource
+import runpy
+import select
+import signal
+import socket
+import sys
+import traceback
+
+# Preloaded for submissions
+import bisect  # noqa: F401
+import collections  # noqa: F401
+import functools  # noqa: F401
+import heapq  # noqa: F401
+import itertools  # noqa: F401
+import math  # noqa: F401
+
+# -I keeps this directory off sys.path; borrow the launcher's limits without leaving it there
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from local_launcher import set_limits  # noqa: E402
+del sys.path[0]
+
+
+def redirect_stdio(run_dir):
+    """Point fds 0-2 and sys.stdin/stdout/stderr at the run's files."""
+    streams = (
+        (0, '.stdin', os.O_RDONLY),
+        (1, '.stdout', os.O_WRONLY | os.O_CREAT | os.O_TRUNC),
+        (2, '.stderr', os.O_WRONLY | os.O_CREAT | os.O_TRUNC),
+    )
+    for fd, name, flags in streams:
+        target = os.open(os.path.join(run_dir, name), flags, 0o600)
+        os.dup2(target, fd)
+        os.close(target)
+    sys.stdin = io.TextIOWrapper(io.FileIO(0, 'r', closefd=False), encoding='utf-8')
+    sys.stdout = io.TextIOWrapper(io.FileIO(1, 'w', closefd=False), encoding='utf-8')
+    sys.stderr = io.TextIOWrapper(
+        io.FileIO(2, 'w', closefd=False), encoding='utf-8', errors='backslashreplace', line_buffering=True
+    )
+
+
+def run_program(request):
+    """Body of the program's process: run main.py like `python -I main.py` would."""
+    os.setsid()
+    signal.signal(signal.SIGPIPE, signal.SIG_DFL)
+    run_dir = request['run_dir']
+    os.chdir(run_dir)
+    os.environ['HOME'] = run_dir
+    os.environ['TMPDIR'] = run_dir
+    redirect_stdio(run_dir)
+    set_limits(request['cpu_seconds'], request['address_space'], request['file_size'], request['max_processes'])
+    sys.argv = ['main.py']
+
+    exit_code = 0
+    try:
+        runpy.run_path('main.py', run_name='__main__')
+    except SystemExit as e:
+        if e.code is None:
+            exit_code = 0
+        elif isinstance(e.code, int):
+            exit_code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            exit_code = 1
+    except BaseException:
+        # Hide the zygote's own frames, as if main.py had been run directly
+        error_type, error, tb = sys.exc_info()
+        while tb is not None and tb.tb_frame.f_code.co_filename != 'main.py':
+            tb = tb.tb_next
+        traceback.print_exception(error_type, error, tb)
+        exit_code = 1
+
+    try:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    except (OSError, ValueError):
+        exit_code = exit_code or 120
+    os._exit(exit_code & 0xff)
+
+
+def supervise(connection, request):
+    """Body of the supervisor: start the program, wait for it, report."""
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    pid = os.fork()
+    if pid == 0:
+        connection.close()
+        try:
+            run_program(request)
+        finally:
+            os._exit(1)
+
+    # The program's peak RSS starts at the zygote's, which this fork of it shares
+    baseline_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    connection.sendall(json.dumps({'pid': pid}).encode('utf-8') + b'\n')
+    _, status, rusage = os.wait4(pid, 0)
+    report = {
+        'exit_code': os.WEXITSTATUS(status) if os.WIFEXITED(status) else None,
+        'signal': os.WTERMSIG(status) if os.WIFSIGNALED(status) else None,
+        'cpu_time': rusage.ru_utime + rusage.ru_stime,
+        'max_rss_kb': rusage.ru_maxrss,
+        'baseline_rss_kb': baseline_rss_kb,
+    }
+    connection.sendall(json.dumps(report).encode('utf-8') + b'\n')
+
+
+def main(socket_path):
+    # Supervisors are reaped automatically
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    server.listen(64)
+    sys.stdout.write('READY\n')
+    sys.stdout.flush()
+
+    while True:
+        readable, _, _ = select.select([server, sys.stdin], [], [])
+        if sys.stdin in readable and not os.read(sys.stdin.fileno(), 1024):
+            return
+        if server not in readable:
+            continue
+
+        connection, _ = server.accept()
+        try:
+            request = json.loads(connection.makefile('rb').readline())
+        except (OSError, ValueError):
+            connection.close()
+            continue
+
+        if os.fork() == 0:
+            server.close()
+            try:
+                supervise(connection, request)
+            finally:
+                os._exit(0)
+        connection.close()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1])
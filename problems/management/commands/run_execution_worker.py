@@ -0,0 +1,52 @@
+"""
+Process queued execution jobs (asynchronous job mode).
+
+Usage: python manage.py run_execution_worker [--concurrency N] [--burst]
+
+Start as many of these as needed, on one host or several; they share the
+job table without stepping on each other (see problems/jobs.py).
+"""
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from problems.jobs import EXECUTION_WORKER_CONCURRENCY, EXECUTION_WORKER_POLL_INTERVAL, run_worker
+
+
+class Command(BaseCommand):
+    help = 'Run queued code executions from the ExecutionJob table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=EXECUTION_WORKER_CONCURRENCY,
+            help='Jobs processed at once by this worker process'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=EXECUTION_WORKER_POLL_INTERVAL,
+            help='Seconds to wait before polling an empty queue again'
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Exit once the queue is empty'
+        )
+
+    def handle(self, *args, **options):
+        stop_event = threading.Event()
+
+        def stop(signum, frame):
+            # Let running jobs finish; queued ones stay for the next worker
+            self.stdout.write('Stopping after the current jobs...')
+            stop_event.set()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        self.stdout.write(f"Execution worker started with {options['concurrency']} threads")
+        run_worker(
+            concurrency=options['concurrency'],
+            poll_interval=options['poll_interval'],
+            stop_event=stop_event,
+            burst=options['burst']
+        )
+        self.stdout.write('Execution worker stopped')
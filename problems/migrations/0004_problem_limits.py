@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-18 10:12
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('problems', '0003_problem_test_cases'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='problem',
+            name='memory_limit',
+            field=models.PositiveIntegerField(blank=True, help_text='Memory limit per test case in MB', null=True, validators=[django.core.validators.MinValueValidator(32), django.core.validators.MaxValueValidator(512)]),
+        ),
+        migrations.AddField(
+            model_name='problem',
+            name='time_limit',
+            field=models.FloatField(blank=True, help_text='CPU time limit per test case in seconds', null=True, validators=[django.core.validators.MinValueValidator(0.5), django.core.validators.MaxValueValidator(10)]),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-18 06:18
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('problems', '0005_execution_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='executionjob',
+            name='stop_on_first_failure',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='TestCaseHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('failed_cases', models.JSONField(blank=True, default=list, help_text='Digests of the failing test cases')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('problem', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='test_case_history', to='problems.problem')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='test_case_history', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Test Case History',
+                'verbose_name_plural': 'Test Case History',
+                'unique_together': {('user', 'problem')},
+            },
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.validators import MaxValueValidator, MinValueValidator
 from datetime import datetime, timedelta
+import uuid
 from django.utils import timezone
 
 
@@ -42,6 +44,20 @@ class Problem(models.Model):
         help_text="Array of test cases with input and expected output. Format: [{\"input\": \"...\", \"output\": \"...\", \"explanation\": \"...\"}]"
     )
     
+    # Execution limits per test case (empty means the executor's defaults)
+    time_limit = models.FloatField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(0.5), MaxValueValidator(10)],
+        help_text="CPU time limit per test case in seconds"
+    )
+    memory_limit = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(32), MaxValueValidator(512)],
+        help_text="Memory limit per test case in MB"
+    )
+    
     # Tracking Info
     status = models.CharField(max_length=15, choices=STATUS_CHOICES, default='ATTEMPTED')
     solved_count = models.PositiveIntegerField(default=0)
@@ -60,6 +76,19 @@ class Problem(models.Model):
     def __str__(self):
         return f"{self.problem_name} ({self.platform})"
     
+    def get_execution_limits(self):
+        """
+        Resource limits for running this problem's test cases.
+        
+        Returns:
+            dict: {'time_limit': float, 'memory_limit': int} in seconds and MB,
+            None for a limit the problem leaves to the executor
+        """
+        return {
+            'time_limit': self.time_limit,
+            'memory_limit': self.memory_limit,
+        }
+    
     def mark_revised(self):
         """
         Mark problem as revised using spaced repetition algorithm.
@@ -174,3 +203,95 @@ class Collection(models.Model):
     def problem_count(self):
         """Return the number of problems in this collection."""
         return self.problems.count()
+
+
+class ExecutionJob(models.Model):
+    """
+    Code execution queued for the background workers (asynchronous job mode).
+    
+    Jobs are claimed with SELECT ... FOR UPDATE SKIP LOCKED (see
+    problems/jobs.py), so any number of worker processes on any number of
+    hosts can drain the table. A claimed job holds a lease; a job whose worker
+    died is picked up again once its lease expires.
+    """
+    
+    KIND_CHOICES = [
+        ('EXECUTE', 'Execute'),
+        ('RUN_TESTS', 'Run Tests'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('QUEUED', 'Queued'),
+        ('RUNNING', 'Running'),
+        ('COMPLETED', 'Completed'),
+        ('FAILED', 'Failed'),
+    ]
+    
+    # Unguessable, as job ids are handed out to clients
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='execution_jobs')
+    problem = models.ForeignKey(
+        Problem, on_delete=models.CASCADE, related_name='execution_jobs', null=True, blank=True
+    )
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    
+    # What to run (test cases and limits are snapshotted at submission time)
+    language = models.CharField(max_length=20)
+    code = models.TextField()
+    input_data = models.TextField(blank=True, default='')
+    test_cases = models.JSONField(default=list, blank=True)
+    limits = models.JSONField(null=True, blank=True)
+    stop_on_first_failure = models.BooleanField(default=False)
+    
+    # Progress and outcome
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='QUEUED')
+    completed_count = models.PositiveIntegerField(default=0)
+    total_count = models.PositiveIntegerField(default=0)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    
+    # Worker bookkeeping
+    worker = models.CharField(max_length=255, blank=True, default='')
+    attempts = models.PositiveIntegerField(default=0)
+    lease_expires_at = models.DateTimeField(null=True, blank=True)
+    
+    # Timestamps
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Execution Job'
+        verbose_name_plural = 'Execution Jobs'
+        indexes = [
+            # Claim query: oldest claimable job first
+            models.Index(fields=['status', 'created_at'], name='problems_job_claim_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.id} ({self.status})"
+
+
+class TestCaseHistory(models.Model):
+    """
+    Which of a problem's test cases failed on the user's last runs.
+    
+    Those cases are run first next time (see problems/failure_history.py), so a
+    submission that still has the same bug is judged after one case instead of
+    after all of them. Cases are identified by a digest of their input and
+    expected output, which survives test cases being reordered or added.
+    """
+    
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='test_case_history')
+    problem = models.ForeignKey(Problem, on_delete=models.CASCADE, related_name='test_case_history')
+    failed_cases = models.JSONField(default=list, blank=True, help_text="Digests of the failing test cases")
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Test Case History'
+        verbose_name_plural = 'Test Case History'
+        unique_together = [['user', 'problem']]
+    
+    def __str__(self):
+        return f"{self.problem.problem_name} ({self.user.username}): {len(self.failed_cases)} failing"
@@ -0,0 +1,288 @@
+"""
+Client for the pre-forked Python zygote of the local executor.
+
+With LOCAL_PYTHON_ZYGOTE enabled, PYTHON runs are forked from a long-lived
+interpreter (problems/local_zygote.py) that has already started up and
+imported the common stdlib modules, instead of starting `python main.py`
+through the launcher. The interpreter startup that is saved is measured
+against a cold start and reported with every result; the cold start's
+memory is also what the zygote's own footprint is replaced with in the
+program's reported peak RSS.
+"""
+import json
+import os
+import select
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+from .execution_tokens import get_current_execution
+from .local_executor import (
+    LOCAL_EXECUTOR_CPU_LIMIT, LOCAL_EXECUTOR_FILE_SIZE_LIMIT_MB, LOCAL_EXECUTOR_MAX_PROCESSES,
+    LOCAL_EXECUTOR_MEMORY_LIMIT_MB, LOCAL_EXECUTOR_TEMP_DIR, LOCAL_EXECUTOR_TIMEOUT,
+    build_launcher_command, get_sandbox_env, kill_process_group, read_output
+)
+
+
+LOCAL_PYTHON_ZYGOTE = getattr(settings, 'LOCAL_PYTHON_ZYGOTE', False)
+
+ZYGOTE_SERVER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'local_zygote.py')
+
+# Seconds to wait for the zygote to start listening
+ZYGOTE_START_TIMEOUT = 10
+
+# Seconds to wait for the program's final report after it was killed
+ZYGOTE_REPORT_GRACE = 2
+
+# What a cold `python -I main.py` imports before running a typical submission
+COLD_START_PROGRAM = 'import bisect, collections, functools, heapq, itertools, math'
+
+
+class ZygoteError(Exception):
+    """The zygote could not be started or did not answer."""
+
+
+def measure_cold_start(samples=3):
+    """
+    Time a cold interpreter start with the zygote's preloaded imports.
+
+    Started through the launcher like a normal run, so its peak RSS is the
+    interpreter's own and not that of this process.
+
+    Returns:
+        tuple: (fastest of several runs in milliseconds, peak RSS of a run in KB)
+    """
+    timings = []
+    max_rss_kb = 0
+    report_fd, report_path = tempfile.mkstemp(prefix='codevault-cold-start-', dir=LOCAL_EXECUTOR_TEMP_DIR)
+    os.close(report_fd)
+    try:
+        command = build_launcher_command(
+            [sys.executable, '-I', '-c', COLD_START_PROGRAM], report_path, LOCAL_EXECUTOR_CPU_LIMIT,
+            LOCAL_EXECUTOR_MEMORY_LIMIT_MB, limit_address_space=False
+        )
+        for _ in range(samples):
+            started = time.monotonic()
+            subprocess.run(command, check=False)
+            timings.append((time.monotonic() - started) * 1000)
+            try:
+                with open(report_path, encoding='utf-8') as report_file:
+                    max_rss_kb = max(max_rss_kb, json.load(report_file)['max_rss_kb'])
+            except (OSError, ValueError, KeyError):
+                pass
+    finally:
+        os.unlink(report_path)
+    return min(timings), max_rss_kb
+
+
+class ReplyReader:
+    """
+    Line reader over a socket that survives timeouts.
+
+    socket.makefile() cannot be read again after a timeout, which is exactly
+    what happens when a program runs past its time limit.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.buffer = b''
+
+    def readline(self):
+        """Return the next line (b'' if the zygote closed the connection)."""
+        while b'\n' not in self.buffer:
+            chunk = self.connection.recv(4096)
+            if not chunk:
+                return b''
+            self.buffer += chunk
+        line, self.buffer = self.buffer.split(b'\n', 1)
+        return line
+
+
+class PythonZygote:
+    """A running zygote process and the Unix socket it listens on."""
+
+    def __init__(self):
+        """
+        Start the zygote and measure the cold start it saves.
+
+        Raises:
+            ZygoteError: If the zygote does not start
+        """
+        self.socket_dir = tempfile.mkdtemp(prefix='codevault-zygote-', dir=LOCAL_EXECUTOR_TEMP_DIR)
+        self.socket_path = os.path.join(self.socket_dir, 'zygote.sock')
+        self.process = subprocess.Popen(
+            [sys.executable, '-I', ZYGOTE_SERVER_PATH, self.socket_path],
+            cwd=self.socket_dir,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env=get_sandbox_env(self.socket_dir),
+            start_new_session=True,
+        )
+        readable, _, _ = select.select([self.process.stdout], [], [], ZYGOTE_START_TIMEOUT)
+        if not readable or self.process.stdout.readline().strip() != b'READY':
+            self.close()
+            raise ZygoteError('Python zygote did not start')
+
+        self.cold_start_ms, self.cold_rss_kb = measure_cold_start()
+        self._lock = threading.Lock()
+        self._runs = 0
+        self._startup_ms_total = 0.0
+
+    def is_alive(self):
+        """Whether the zygote process is still running."""
+        return self.process.poll() is None
+
+    def close(self):
+        """Stop the zygote (running programs are not affected)."""
+        kill_process_group(self.process.pid)
+        self.process.wait()
+        for stream in (self.process.stdin, self.process.stdout):
+            try:
+                stream.close()
+            except OSError:
+                pass
+        shutil.rmtree(self.socket_dir, ignore_errors=True)
+
+    def run(self, run_dir, input_data='', timeout=LOCAL_EXECUTOR_TIMEOUT, cpu_seconds=LOCAL_EXECUTOR_CPU_LIMIT,
+            memory_limit_mb=LOCAL_EXECUTOR_MEMORY_LIMIT_MB):
+        """
+        Run run_dir/main.py in a child of the zygote.
+
+        Args:
+            run_dir (str): Run directory holding main.py
+            input_data (str): Standard input
+            timeout (float): Wall-clock limit in seconds
+            cpu_seconds (int): CPU time limit in seconds
+            memory_limit_mb (int): Address space limit in MB
+
+        Returns:
+            dict: run_process result format plus
+            'startup': {'mode': 'zygote', 'time_ms': float, 'saved_ms': float}
+
+        Raises:
+            ZygoteError: If the zygote does not answer
+        """
+        with open(os.path.join(run_dir, '.stdin'), 'w', encoding='utf-8') as stdin_file:
+            stdin_file.write(input_data or '')
+        request = {
+            'run_dir': run_dir,
+            'cpu_seconds': max(1, int(cpu_seconds)),
+            'address_space': int(memory_limit_mb * 1024 * 1024),
+            'file_size': int(LOCAL_EXECUTOR_FILE_SIZE_LIMIT_MB * 1024 * 1024),
+            'max_processes': LOCAL_EXECUTOR_MAX_PROCESSES,
+        }
+
+        started = time.monotonic()
+        timed_out = False
+        execution = get_current_execution()
+        pid = None
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+                connection.settimeout(ZYGOTE_START_TIMEOUT)
+                connection.connect(self.socket_path)
+                connection.sendall(json.dumps(request).encode('utf-8') + b'\n')
+                replies = ReplyReader(connection)
+                pid = json.loads(replies.readline())['pid']
+                startup_ms = (time.monotonic() - started) * 1000
+                if execution is not None:
+                    execution.add_process(pid)
+
+                connection.settimeout(max(0.001, started + timeout - time.monotonic()))
+                try:
+                    report = json.loads(replies.readline())
+                except socket.timeout:
+                    timed_out = True
+                    kill_process_group(pid)
+                    connection.settimeout(ZYGOTE_REPORT_GRACE)
+                    report = json.loads(replies.readline())
+                # Clean up anything the program forked
+                kill_process_group(pid)
+        except (OSError, ValueError, KeyError) as e:
+            raise ZygoteError(f'Python zygote error: {e}')
+        finally:
+            if execution is not None and pid is not None:
+                execution.remove_process(pid)
+        wall_time = time.monotonic() - started
+
+        saved_ms = max(0.0, self.cold_start_ms - startup_ms)
+        # Report memory as a cold `python main.py` would: the program's growth over the zygote,
+        # on top of a cold interpreter's own footprint
+        max_rss_kb = report['max_rss_kb']
+        if report.get('baseline_rss_kb'):
+            max_rss_kb = max(0, max_rss_kb - report['baseline_rss_kb']) + self.cold_rss_kb
+        with self._lock:
+            self._runs += 1
+            self._startup_ms_total += startup_ms
+
+        return {
+            'stdout': read_output(os.path.join(run_dir, '.stdout')),
+            'stderr': read_output(os.path.join(run_dir, '.stderr')),
+            'exit_code': report['exit_code'],
+            'signal': report['signal'],
+            'timed_out': timed_out,
+            'wall_time': wall_time,
+            'cpu_time': report['cpu_time'],
+            'max_rss_kb': max_rss_kb,
+            'startup': {
+                'mode': 'zygote',
+                'time_ms': round(startup_ms, 2),
+                'saved_ms': round(saved_ms, 2),
+            },
+        }
+
+    def stats(self):
+        """
+        Startup counters.
+
+        Returns:
+            dict: {'runs': int, 'cold_start_ms': float, 'avg_startup_ms': float, 'saved_ms_total': float}
+        """
+        with self._lock:
+            average = self._startup_ms_total / self._runs if self._runs else 0.0
+            return {
+                'runs': self._runs,
+                'cold_start_ms': round(self.cold_start_ms, 2),
+                'avg_startup_ms': round(average, 2),
+                'saved_ms_total': round(max(0.0, self.cold_start_ms * self._runs - self._startup_ms_total), 2),
+            }
+
+
+_zygote = None
+_zygote_pid = None
+_zygote_lock = threading.Lock()
+
+
+def get_python_zygote(start=True):
+    """
+    Return the process-wide zygote, (re)starting it if needed.
+
+    Args:
+        start (bool): Start the zygote if it is not running yet
+
+    Returns:
+        PythonZygote: Running zygote, or None when LOCAL_PYTHON_ZYGOTE is off
+        (or it is not running and start is False)
+
+    Raises:
+        ZygoteError: If the zygote cannot be started
+    """
+    global _zygote, _zygote_pid
+    if not LOCAL_PYTHON_ZYGOTE:
+        return None
+    with _zygote_lock:
+        if _zygote is not None and _zygote_pid == os.getpid() and _zygote.is_alive():
+            return _zygote
+        if not start:
+            return None
+        if _zygote is not None and _zygote_pid == os.getpid():
+            _zygote.close()
+        _zygote = PythonZygote()
+        _zygote_pid = os.getpid()
+        return _zygote
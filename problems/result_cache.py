@@ -0,0 +1,312 @@
+"""
+Content-addressed cache for code execution results.
+
+Results are keyed on a hash of everything that determines the outcome of a run
+(backend, language, runtime version, the final wrapped source and stdin), so
+pressing "Run" again on unchanged code is answered without calling the executor.
+Only deterministic outcomes are stored; timeouts and infrastructure errors are
+always re-executed.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+# Cache configuration
+EXECUTION_CACHE_BACKEND = getattr(settings, 'EXECUTION_CACHE_BACKEND', 'memory')  # memory, file, django or none
+EXECUTION_CACHE_MAX_ENTRIES = getattr(settings, 'EXECUTION_CACHE_MAX_ENTRIES', 1024)
+EXECUTION_CACHE_TTL = getattr(settings, 'EXECUTION_CACHE_TTL', 3600)  # seconds
+EXECUTION_CACHE_DIR = getattr(
+    settings, 'EXECUTION_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'codevault-execution-cache')
+)
+EXECUTION_CACHE_ALIAS = getattr(settings, 'EXECUTION_CACHE_ALIAS', 'default')
+
+# Outcomes that depend only on the code and its input
+CACHEABLE_STATUSES = {
+    'Accepted',
+    'Wrong Answer',
+    'Compilation Error',
+    'Runtime Error (Non-zero exit)',
+    'Runtime Error (NZEC)',
+}
+
+
+def make_execution_key(backend, language, runtime_version, source, stdin, limits=None):
+    """
+    Build the cache key for an execution.
+
+    Args:
+        backend (str): Execution backend (piston, judge0, ...)
+        language (str): Programming language
+        runtime_version (str): Compiler/interpreter version requested
+        source (str): Final source sent to the executor (after wrapping)
+        stdin (str): Standard input
+        limits (dict): Per-problem time/memory limits, None for the defaults
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    payload = json.dumps([backend, language, runtime_version, source, stdin, limits], sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def is_cacheable_result(result):
+    """Whether an execution result is deterministic enough to be cached."""
+    return result.get('status') in CACHEABLE_STATUSES
+
+
+class BaseResultCache:
+    """Common hit/miss accounting for result cache backends."""
+
+    backend_name = 'base'
+
+    def __init__(self):
+        self._stats_lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._stores = 0
+
+    def get(self, key):
+        """
+        Look up a cached result.
+
+        Args:
+            key (str): Key from make_execution_key
+
+        Returns:
+            dict: Cached execution result, or None on a miss
+        """
+        result = self._get(key)
+        with self._stats_lock:
+            if result is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+        return result
+
+    def set(self, key, result):
+        """
+        Store an execution result.
+
+        Args:
+            key (str): Key from make_execution_key
+            result (dict): Execution result
+        """
+        self._set(key, result)
+        with self._stats_lock:
+            self._stores += 1
+
+    def stats(self):
+        """
+        Hit/miss counters.
+
+        Returns:
+            dict: {'backend': str, 'hits': int, 'misses': int, 'stores': int, 'hit_ratio': float}
+        """
+        with self._stats_lock:
+            lookups = self._hits + self._misses
+            return {
+                'backend': self.backend_name,
+                'hits': self._hits,
+                'misses': self._misses,
+                'stores': self._stores,
+                'hit_ratio': round(self._hits / lookups, 3) if lookups else 0.0
+            }
+
+    def _get(self, key):
+        raise NotImplementedError
+
+    def _set(self, key, result):
+        raise NotImplementedError
+
+
+class NullResultCache(BaseResultCache):
+    """Cache that never stores anything (caching disabled)."""
+
+    backend_name = 'none'
+
+    def _get(self, key):
+        return None
+
+    def _set(self, key, result):
+        pass
+
+
+class MemoryResultCache(BaseResultCache):
+    """Per-process LRU cache with a TTL."""
+
+    backend_name = 'memory'
+
+    def __init__(self, max_entries=EXECUTION_CACHE_MAX_ENTRIES, ttl=EXECUTION_CACHE_TTL):
+        super().__init__()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, result = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return dict(result)
+
+    def _set(self, key, result):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, dict(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class FileResultCache(BaseResultCache):
+    """
+    Cache stored as JSON files in a directory.
+
+    Survives restarts and is shared by every worker process on the host. Files
+    are touched on read, so pruning by modification time evicts the least
+    recently used entries.
+    """
+
+    backend_name = 'file'
+
+    # Prune at most once per this many writes
+    PRUNE_EVERY = 64
+
+    def __init__(self, directory=EXECUTION_CACHE_DIR, max_entries=EXECUTION_CACHE_MAX_ENTRIES,
+                 ttl=EXECUTION_CACHE_TTL):
+        super().__init__()
+        self.directory = directory
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._writes = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.json')
+
+    def _get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as cache_file:
+                entry = json.load(cache_file)
+        except (OSError, ValueError):
+            return None
+        if entry.get('expires_at', 0) < time.time():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry.get('result')
+
+    def _set(self, key, result):
+        path = self._path(key)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as cache_file:
+                json.dump({'expires_at': time.time() + self.ttl, 'result': result}, cache_file)
+            os.replace(temp_path, path)
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return
+
+        with self._lock:
+            self._writes += 1
+            should_prune = self._writes % self.PRUNE_EVERY == 0
+        if should_prune:
+            self.prune()
+
+    def prune(self):
+        """Delete the least recently used files beyond max_entries."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except OSError:
+                continue
+        entries.sort()
+        for _, path in entries[:max(0, len(entries) - self.max_entries)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class DjangoResultCache(BaseResultCache):
+    """
+    Cache backed by a configured Django cache (e.g. Redis or Memcached).
+
+    Shared by every process and host using the same cache; the size bound is
+    the cache backend's own eviction policy.
+    """
+
+    backend_name = 'django'
+
+    def __init__(self, alias=EXECUTION_CACHE_ALIAS, ttl=EXECUTION_CACHE_TTL):
+        super().__init__()
+        self.alias = alias
+        self.ttl = ttl
+
+    def _get(self, key):
+        return caches[self.alias].get(f'execution-result:{key}')
+
+    def _set(self, key, result):
+        caches[self.alias].set(f'execution-result:{key}', result, self.ttl)
+
+
+RESULT_CACHE_BACKENDS = {
+    'none': NullResultCache,
+    'memory': MemoryResultCache,
+    'file': FileResultCache,
+    'django': DjangoResultCache,
+}
+
+_result_cache = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """
+    Return the process-wide result cache for the configured backend.
+
+    Returns:
+        BaseResultCache: Shared cache instance
+
+    Raises:
+        ValueError: If EXECUTION_CACHE_BACKEND is not a known backend
+    """
+    global _result_cache
+    with _result_cache_lock:
+        if _result_cache is None:
+            backend = RESULT_CACHE_BACKENDS.get(EXECUTION_CACHE_BACKEND.lower())
+            if backend is None:
+                raise ValueError(
+                    f"Unknown EXECUTION_CACHE_BACKEND: {EXECUTION_CACHE_BACKEND}. "
+                    f"Supported: {', '.join(RESULT_CACHE_BACKENDS.keys())}"
+                )
+            _result_cache = backend()
+        return _result_cache
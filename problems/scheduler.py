@@ -0,0 +1,340 @@
+"""
+Fair scheduling of executions between users.
+
+Every execution that reaches a backend (execute_code on a result cache miss,
+a Judge0 batch, a local compile check) first takes one of
+EXECUTION_SCHEDULER_SLOTS slots. When all slots are busy, waiting executions
+are queued in one of two lanes:
+
+    run     single custom-input runs (POST /api/execute/), latency sensitive
+    submit  test case runs (run_tests), bulk
+
+Lanes share the slots by weight (EXECUTION_SCHEDULER_LANE_WEIGHTS), so quick
+runs get ahead of test suites without starving them. Within a lane users are
+served by weighted fair queuing (self-clocked: each execution is tagged with
+a virtual finish time per user), so a user with hundreds of test cases queued
+takes turns with everyone else instead of going first.
+
+The lane and user of the executions started in a context are set with
+`scheduling(user_id, lane)`. Contexts are copied to the test case pool, so
+test cases keep the lane of their run. Scheduling is per process.
+"""
+import asyncio
+import contextvars
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+
+from django.conf import settings
+
+from .execution_tokens import get_current_execution
+
+
+RUN_LANE = 'run'
+SUBMIT_LANE = 'submit'
+
+EXECUTION_SCHEDULER_SLOTS = getattr(settings, 'EXECUTION_SCHEDULER_SLOTS', 8)  # 0 disables scheduling
+DEFAULT_LANE_WEIGHTS = {RUN_LANE: 4, SUBMIT_LANE: 1}
+EXECUTION_SCHEDULER_LANE_WEIGHTS = getattr(settings, 'EXECUTION_SCHEDULER_LANE_WEIGHTS', DEFAULT_LANE_WEIGHTS)
+
+# How often a queued execution checks whether its run was superseded
+ABANDON_CHECK_INTERVAL = 0.25  # seconds
+
+# Recent waits kept per lane for the percentiles in stats()
+WAIT_SAMPLE_SIZE = 1024
+
+_schedule = contextvars.ContextVar('codevault_schedule', default=None)
+
+
+class _Ticket:
+    """A queued execution."""
+
+    __slots__ = ('lane', 'enqueued_at', 'granted', 'abandoned', 'on_granted')
+
+    def __init__(self, lane, on_granted=None):
+        self.lane = lane
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+        self.abandoned = False
+        self.on_granted = on_granted  # called with the lock held once the slot is granted
+
+
+class ExecutionScheduler:
+    """Bounded execution slots shared fairly between lanes and users."""
+
+    def __init__(self, slots=EXECUTION_SCHEDULER_SLOTS, lane_weights=None):
+        self.slots = slots
+        self.lane_weights = {
+            **DEFAULT_LANE_WEIGHTS,
+            **(lane_weights if lane_weights is not None else EXECUTION_SCHEDULER_LANE_WEIGHTS)
+        }
+        self._condition = threading.Condition()
+        self._running = 0
+        self._sequence = itertools.count()
+        self._queues = {lane: [] for lane in self.lane_weights}
+        self._queued = {lane: 0 for lane in self.lane_weights}
+        self._virtual_time = {lane: 0.0 for lane in self.lane_weights}
+        self._user_finish = {lane: {} for lane in self.lane_weights}
+        self._lane_service = {lane: 0.0 for lane in self.lane_weights}
+        self._granted = {lane: 0 for lane in self.lane_weights}
+        self._abandoned = {lane: 0 for lane in self.lane_weights}
+        self._waits = {lane: deque(maxlen=WAIT_SAMPLE_SIZE) for lane in self.lane_weights}
+
+    def acquire(self, user_id, lane=RUN_LANE, weight=1.0, abandon=None, block=True):
+        """
+        Wait for a slot.
+
+        Args:
+            user_id: Owner of the execution (None for anonymous work)
+            lane (str): RUN_LANE or SUBMIT_LANE
+            weight (float): The user's share relative to other users in the lane
+            abandon (callable): Checked while queued; the wait is given up
+                once it returns True
+            block (bool): Queue for a slot when none is free; otherwise
+                return False right away without queueing
+
+        Returns:
+            bool: True once a slot is held (release it with release()), False
+            if the wait was abandoned (or no slot was free and block is False)
+        """
+        if lane not in self._queues:
+            lane = RUN_LANE
+        with self._condition:
+            if self._take_free_slot(lane):
+                return True
+            if not block:
+                return False
+
+            ticket = self._enqueue(user_id, lane, weight)
+            while not ticket.granted:
+                self._condition.wait(ABANDON_CHECK_INTERVAL if abandon else None)
+                if not ticket.granted and abandon is not None and abandon():
+                    self._abandon(ticket)
+                    return False
+            return True
+
+    async def acquire_async(self, user_id, lane=RUN_LANE, weight=1.0, abandon=None):
+        """
+        Like acquire(), for coroutines: a queued execution waits on a future
+        that release() resolves, so it holds no thread while it waits.
+
+        The wait is also given up when the coroutine is cancelled (e.g. the
+        client went away); CancelledError is then raised as usual.
+        """
+        if lane not in self._queues:
+            lane = RUN_LANE
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def on_granted():
+            try:
+                loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(True))
+            except RuntimeError:
+                # The loop is closed and nothing waits for the slot: _dispatch passes it on
+                self._running -= 1
+
+        with self._condition:
+            if self._take_free_slot(lane):
+                return True
+            ticket = self._enqueue(user_id, lane, weight, on_granted)
+
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(asyncio.shield(granted), ABANDON_CHECK_INTERVAL if abandon else None)
+                    return True
+                except asyncio.TimeoutError:
+                    with self._condition:
+                        if ticket.granted:
+                            return True
+                        if abandon():
+                            self._abandon(ticket)
+                            return False
+        except asyncio.CancelledError:
+            with self._condition:
+                if ticket.granted:
+                    # Granted just before the cancellation: hand the slot on
+                    self._release_locked()
+                else:
+                    self._abandon(ticket)
+            raise
+
+    def _take_free_slot(self, lane):
+        """Take a slot without queueing if one is free (called with the lock held)."""
+        if self._running >= self.slots:
+            return False
+        self._running += 1
+        self._granted[lane] += 1
+        self._waits[lane].append(0.0)
+        return True
+
+    def _enqueue(self, user_id, lane, weight, on_granted=None):
+        """Queue an execution for the next free slot (called with the lock held)."""
+        if not self._queued[lane]:
+            # A lane coming back from idle does not get to catch up on the service it missed
+            active = [self._lane_service[other] for other in self._queues if self._queued[other]]
+            if active:
+                self._lane_service[lane] = max(self._lane_service[lane], min(active))
+
+        ticket = _Ticket(lane, on_granted)
+        start = max(self._virtual_time[lane], self._user_finish[lane].get(user_id, 0.0))
+        finish = start + 1.0 / max(weight, 0.001)
+        self._user_finish[lane][user_id] = finish
+        heapq.heappush(self._queues[lane], (finish, next(self._sequence), ticket))
+        self._queued[lane] += 1
+        return ticket
+
+    def _abandon(self, ticket):
+        """Give up a queued execution's wait (called with the lock held)."""
+        ticket.abandoned = True
+        self._queued[ticket.lane] -= 1
+        self._abandoned[ticket.lane] += 1
+
+    def release(self):
+        """Return a slot taken with acquire() and hand it to the next queued execution."""
+        with self._condition:
+            self._release_locked()
+
+    def _release_locked(self):
+        """release() with the lock already held."""
+        self._running -= 1
+        self._dispatch()
+
+    def _pick_lane(self):
+        """Lane with the least weighted service among those with queued executions."""
+        lanes = [lane for lane in self._queues if self._queued[lane]]
+        if not lanes:
+            return None
+        return min(lanes, key=lambda lane: self._lane_service[lane])
+
+    def _dispatch(self):
+        """Grant free slots to queued executions (called with the lock held)."""
+        granted = False
+        while self._running < self.slots:
+            lane = self._pick_lane()
+            if lane is None:
+                break
+            queue = self._queues[lane]
+            finish, _, ticket = heapq.heappop(queue)
+            if ticket.abandoned:
+                continue
+
+            self._queued[lane] -= 1
+            self._virtual_time[lane] = finish
+            if not self._queued[lane]:
+                # Lane drained: finish tags before the current virtual time no longer matter
+                self._user_finish[lane].clear()
+            self._lane_service[lane] += 1.0 / self.lane_weights[lane]
+
+            ticket.granted = True
+            self._running += 1
+            self._granted[lane] += 1
+            self._waits[lane].append(time.monotonic() - ticket.enqueued_at)
+            granted = True
+            if ticket.on_granted is not None:
+                ticket.on_granted()
+
+        # Abandoned tickets still queued once their lane drained
+        for lane, queue in self._queues.items():
+            if not self._queued[lane]:
+                queue.clear()
+        if granted:
+            self._condition.notify_all()
+
+    def stats(self):
+        """
+        Queue depth, wait times and throughput per lane.
+
+        Returns:
+            dict: {'slots': int, 'running': int, 'lanes': {lane: {'weight', 'queued',
+            'users_queued', 'granted', 'abandoned', 'wait_ms': {'p50', 'p95', 'max'}}}}
+        """
+        with self._condition:
+            lanes = {}
+            for lane in self._queues:
+                waits = sorted(self._waits[lane])
+                users = {
+                    user_id for user_id, finish in self._user_finish[lane].items()
+                    if finish > self._virtual_time[lane]
+                }
+                lanes[lane] = {
+                    'weight': self.lane_weights[lane],
+                    'queued': self._queued[lane],
+                    'users_queued': len(users) if self._queued[lane] else 0,
+                    'granted': self._granted[lane],
+                    'abandoned': self._abandoned[lane],
+                    'wait_ms': {
+                        'p50': round(waits[(len(waits) - 1) // 2] * 1000, 2) if waits else 0.0,
+                        'p95': round(waits[int((len(waits) - 1) * 0.95)] * 1000, 2) if waits else 0.0,
+                        'max': round(waits[-1] * 1000, 2) if waits else 0.0,
+                    },
+                }
+            return {
+                'slots': self.slots,
+                'running': self._running,
+                'lanes': lanes,
+            }
+
+
+@contextmanager
+def scheduling(user_id, lane, weight=1.0):
+    """Queue the executions started in this context as user_id's, in lane."""
+    reset_token = _schedule.set((user_id, lane, weight))
+    try:
+        yield
+    finally:
+        _schedule.reset(reset_token)
+
+
+@contextmanager
+def execution_slot():
+    """
+    Hold a scheduler slot for the duration of the block.
+
+    The wait is given up if the current execution is superseded (see
+    execution_tokens); the block then runs with False instead of True.
+    """
+    if EXECUTION_SCHEDULER_SLOTS <= 0:
+        yield True
+        return
+
+    user_id, lane, weight = _schedule.get() or (None, RUN_LANE, 1.0)
+    execution = get_current_execution()
+    acquired = execution_scheduler.acquire(
+        user_id, lane, weight, abandon=execution.is_set if execution is not None else None
+    )
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            execution_scheduler.release()
+
+
+@asynccontextmanager
+async def async_execution_slot():
+    """
+    Async version of execution_slot for coroutines (see problems/async_services.py).
+
+    Queued executions wait on the event loop (see acquire_async), not on a thread.
+    """
+    if EXECUTION_SCHEDULER_SLOTS <= 0:
+        yield True
+        return
+
+    user_id, lane, weight = _schedule.get() or (None, RUN_LANE, 1.0)
+    execution = get_current_execution()
+    acquired = await execution_scheduler.acquire_async(
+        user_id, lane, weight, abandon=execution.is_set if execution is not None else None
+    )
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            execution_scheduler.release()
+
+
+# Shared by every execution in this process
+execution_scheduler = ExecutionScheduler()
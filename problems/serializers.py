@@ -1,6 +1,6 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import Problem, Solution, Collection
+from .models import Problem, Solution, Collection, ExecutionJob
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -55,6 +55,8 @@ class ProblemSerializer(serializers.ModelSerializer):
             'difficulty',
             'tags',
             'test_cases',
+            'time_limit',
+            'memory_limit',
             'status',
             'solved_count',
             'last_solved',
@@ -149,3 +151,26 @@ class CollectionListSerializer(serializers.ModelSerializer):
     def get_problem_count(self, obj):
         """Return the count of problems in this collection."""
         return obj.problems.count()
+
+
+class ExecutionJobSerializer(serializers.ModelSerializer):
+    """Serializer for asynchronous execution jobs (status, progress and result)."""
+    
+    class Meta:
+        model = ExecutionJob
+        fields = [
+            'id',
+            'kind',
+            'problem',
+            'language',
+            'stop_on_first_failure',
+            'status',
+            'completed_count',
+            'total_count',
+            'result',
+            'error',
+            'created_at',
+            'started_at',
+            'finished_at',
+        ]
+        read_only_fields = fields
@@ -1,23 +1,58 @@
 """
-Code execution service supporting multiple APIs (Piston, Judge0).
+Code execution service supporting multiple APIs (Piston, Judge0) and a local executor.
 """
 import base64
+import contextvars
+import hashlib
+import json
+import math
+import re
+import signal
+import threading
 import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from urllib.parse import urlencode
+
 import requests
 from django.conf import settings
+from django.core.cache import cache
 
+from .executor_client import get_executor_client
+from .executor_router import get_executor_router
+from .jvm_pool import LOCAL_JVM_POOL_SIZE
+from .local_executor import check_compilation_local, execute_code_local, get_local_runtime_version
+from .result_cache import get_result_cache, is_cacheable_result, make_execution_key
+from .scheduler import execution_slot
 
-# API Selection - Choose 'piston' or 'judge0'
+
+# API Selection - Choose 'piston', 'judge0' or 'local'
 CODE_EXECUTION_API = getattr(settings, 'CODE_EXECUTION_API', 'piston')
 
 # Piston API Configuration (FREE - No API key needed!)
 PISTON_API_URL = getattr(settings, 'PISTON_API_URL', 'https://emkc.org/api/v2/piston')
+# One or more Piston hosts (a list or a comma-separated string); requests are balanced between them
+PISTON_API_URLS = [
+    url.strip() for url in (PISTON_API_URL.split(',') if isinstance(PISTON_API_URL, str) else PISTON_API_URL)
+    if url.strip()
+]
 
 # Judge0 API Configuration (Requires RapidAPI subscription)
 JUDGE0_API_URL = getattr(settings, 'JUDGE0_API_URL', 'https://judge0-ce.p.rapidapi.com')
 JUDGE0_API_KEY = getattr(settings, 'JUDGE0_API_KEY', '')
 JUDGE0_API_HOST = getattr(settings, 'JUDGE0_API_HOST', 'judge0-ce.p.rapidapi.com')
 
+# Errors reported when the execution service itself failed (see is_backend_failure)
+PISTON_API_ERROR_PREFIX = 'Piston API Error: '
+JUDGE0_API_ERROR_PREFIX = 'API Error: '
+EXECUTION_TIMEOUT_MESSAGE = 'Code execution timed out. Please try again.'
+
+# Pinned Piston runtime versions, e.g. {'PYTHON': '3.10.0'} (unpinned languages use the latest)
+PISTON_LANGUAGE_VERSIONS = getattr(settings, 'PISTON_LANGUAGE_VERSIONS', {})
+
+# Highest run_timeout/run_cpu_time the Piston hosts accept (larger values are rejected with HTTP 400)
+PISTON_MAX_RUN_TIMEOUT_MS = getattr(settings, 'PISTON_MAX_RUN_TIMEOUT_MS', 3000)
+
 # Language mapping for Piston
 PISTON_LANGUAGE_MAP = {
     'JAVA': 'java',
@@ -35,121 +70,165 @@ JUDGE0_LANGUAGE_IDS = {
     'JAVASCRIPT': 63 # JavaScript (Node.js 12.14.0)
 }
 
-# Maximum number of polling attempts
-MAX_POLL_ATTEMPTS = 10
-POLL_INTERVAL = 1  # seconds
+# Judge0 polling: exponential backoff from the initial to the max interval
+JUDGE0_POLL_INITIAL_INTERVAL = getattr(settings, 'JUDGE0_POLL_INITIAL_INTERVAL', 0.05)  # seconds
+JUDGE0_POLL_MAX_INTERVAL = getattr(settings, 'JUDGE0_POLL_MAX_INTERVAL', 1.0)  # seconds
+JUDGE0_POLL_BACKOFF = getattr(settings, 'JUDGE0_POLL_BACKOFF', 1.5)
+JUDGE0_POLL_TIMEOUT = getattr(settings, 'JUDGE0_POLL_TIMEOUT', 30)  # seconds
 
+# Judge0 callback mode: Judge0 PUTs finished submissions to this URL
+JUDGE0_CALLBACK_URL = getattr(settings, 'JUDGE0_CALLBACK_URL', '')
+JUDGE0_CALLBACK_SECRET = getattr(settings, 'JUDGE0_CALLBACK_SECRET', '')
+JUDGE0_CALLBACK_CACHE_TTL = 300  # seconds
 
-# ==================== HELPER FUNCTIONS ====================
+# Judge0 accepts at most this many submissions per batch request
+JUDGE0_BATCH_SIZE = 20
 
+# Test case concurrency: shared pool size and per-submission fan-out
+TEST_CASE_MAX_WORKERS = getattr(settings, 'TEST_CASE_MAX_WORKERS', 8)
+TEST_CASE_CONCURRENCY = getattr(settings, 'TEST_CASE_CONCURRENCY', 4)
+TEST_CASE_CONCURRENCY_BY_LANGUAGE = getattr(settings, 'TEST_CASE_CONCURRENCY_BY_LANGUAGE', {})
+CANCEL_CHECK_INTERVAL = 0.25  # seconds
 
+# Batch mode: run all test cases of a submission in a single execution
+TEST_CASE_BATCH_MODE = getattr(settings, 'TEST_CASE_BATCH_MODE', True)
 
-def wrap_java_code(code):
-    """
-    Wrap Java code with imports and main method (LeetCode-style).
-    Automatically adds common Java imports and helper classes so users don't need to.
-    Used for regular code execution.
-    
-    Args:
-        code (str): Java source code
-        
-    Returns:
-        str: Wrapped Java code ready to execute with imports and helper classes
-    """
-    code = code.strip()
-    
-    # Common Java imports (LeetCode-style)
-    common_imports = """import java.util.*;
-import java.io.*;
-import java.lang.*;
-import java.math.*;
-"""
-    
-    # Check if code already has imports
-    has_imports = code.startswith('import ')
-    
-    # Check if code already has a main method
-    if 'static void main' in code or 'public static void main' in code:
-        # Code already has main, return as-is (user wrote complete code)
-        return code
-    
-    # Remove 'public' from any class declaration (can't have multiple public classes)
-    # Java requires public class name to match filename
-    import re
-    code = re.sub(r'\bpublic\s+class\s+', 'class ', code)
-    
-    # Pattern 1: User has a class (LeetCode style - just Solution class)
-    # Put Solution class INSIDE Main class so it can access inner helper classes
-    if 'class ' in code:
-        return f"""{common_imports}
+# Per-problem time limits bound CPU time; wall-clock time gets this much slack for I/O and start-up
+TIME_LIMIT_WALL_FACTOR = 2
+TIME_LIMIT_WALL_GRACE = 1.0  # seconds
 
-public class Main {{
+# What runtimes print when an allocation fails under a memory limit
+OUT_OF_MEMORY_PATTERN = re.compile(
+    r'MemoryError|std::bad_alloc|java\.lang\.OutOfMemoryError|heap out of memory|Cannot allocate memory'
+)
+
+# Batch harnesses stop a case with SIGXCPU (CPU limit) or SIGALRM (wall-clock limit)
+TIME_LIMIT_EXIT_CODES = (128 + signal.SIGXCPU, 128 + signal.SIGALRM)
+
+# Languages whose submissions are compile-checked once before their test cases run
+COMPILED_LANGUAGES = ('CPP', 'JAVA')
+COMPILE_ERROR_PREFIX = 'Compilation Error: '
+
+
+# ==================== HELPER FUNCTIONS ====================
+
+
+
+# Helper classes nested in every wrapped Main class
+JAVA_HELPER_CLASSES = """
     // Helper class for linked list problems
-    public static class ListNode {{
+    public static class ListNode {
         int val;
         ListNode next;
-        ListNode() {{}}
-        ListNode(int val) {{ this.val = val; }}
-        ListNode(int val, ListNode next) {{ this.val = val; this.next = next; }}
+        ListNode() {}
+        ListNode(int val) { this.val = val; }
+        ListNode(int val, ListNode next) { this.val = val; this.next = next; }
         
         // Convert array to ListNode
-        public static ListNode fromArray(int[] arr) {{
+        public static ListNode fromArray(int[] arr) {
             if (arr == null || arr.length == 0) return null;
             ListNode head = new ListNode(arr[0]);
             ListNode current = head;
-            for (int i = 1; i < arr.length; i++) {{
+            for (int i = 1; i < arr.length; i++) {
                 current.next = new ListNode(arr[i]);
                 current = current.next;
-            }}
+            }
             return head;
-        }}
+        }
         
         // Convert ListNode to array
-        public static int[] toArray(ListNode head) {{
+        public static int[] toArray(ListNode head) {
             if (head == null) return new int[0];
             List<Integer> result = new ArrayList<>();
             ListNode current = head;
-            while (current != null) {{
+            while (current != null) {
                 result.add(current.val);
                 current = current.next;
-            }}
+            }
             int[] arr = new int[result.size()];
-            for (int i = 0; i < result.size(); i++) {{
+            for (int i = 0; i < result.size(); i++) {
                 arr[i] = result.get(i);
-            }}
+            }
             return arr;
-        }}
-    }}
+        }
+    }
 
     // Helper class for tree problems
-    public static class TreeNode {{
+    public static class TreeNode {
         int val;
         TreeNode left;
         TreeNode right;
-        TreeNode() {{}}
-        TreeNode(int val) {{ this.val = val; }}
-        TreeNode(int val, TreeNode left, TreeNode right) {{
+        TreeNode() {}
+        TreeNode(int val) { this.val = val; }
+        TreeNode(int val, TreeNode left, TreeNode right) {
             this.val = val;
             this.left = left;
             this.right = right;
-        }}
-    }}
+        }
+    }
 
     // Helper class for graph problems
-    public static class Node {{
+    public static class Node {
         int val;
         List<Node> neighbors;
-        Node() {{ this.neighbors = new ArrayList<>(); }}
-        Node(int _val) {{
+        Node() { this.neighbors = new ArrayList<>(); }
+        Node(int _val) {
             val = _val;
             neighbors = new ArrayList<>();
-        }}
-        Node(int _val, ArrayList<Node> _neighbors) {{
+        }
+        Node(int _val, ArrayList<Node> _neighbors) {
             val = _val;
             neighbors = _neighbors;
-        }}
-    }}
+        }
+    }
+"""
+
+
+def wrap_java_code(code, helper_classes=True):
+    """
+    Wrap Java code with imports and main method (LeetCode-style).
+    Automatically adds common Java imports and helper classes so users don't need to.
+    Used for regular code execution.
+    
+    Args:
+        code (str): Java source code
+        helper_classes (bool): Nest ListNode/TreeNode/Node in Main. Disabled when
+            the code runs in the warm JVM pool, which loads them from its
+            precompiled helper library instead.
+        
+    Returns:
+        str: Wrapped Java code ready to execute with imports and helper classes
+    """
+    code = code.strip()
+    
+    # Common Java imports (LeetCode-style)
+    common_imports = """import java.util.*;
+import java.io.*;
+import java.lang.*;
+import java.math.*;
+"""
+    
+    # Check if code already has imports
+    has_imports = code.startswith('import ')
+    
+    # Check if code already has a main method
+    if 'static void main' in code or 'public static void main' in code:
+        # Code already has main, return as-is (user wrote complete code)
+        return code
+    
+    # Remove 'public' from any class declaration (can't have multiple public classes)
+    # Java requires public class name to match filename
+    import re
+    code = re.sub(r'\bpublic\s+class\s+', 'class ', code)
+    
+    helpers = JAVA_HELPER_CLASSES if helper_classes else ''
+    
+    # Pattern 1: User has a class (LeetCode style - just Solution class)
+    # Put Solution class INSIDE Main class so it can access inner helper classes
+    if 'class ' in code:
+        return f"""{common_imports}
 
+public class Main {{{helpers}
     // User's solution class
     {code}
 
@@ -163,71 +242,7 @@ public class Main {{
     # Wrap in Main class with imports and helper classes
     return f"""{common_imports}
 
-public class Main {{
-    // Helper class for linked list problems
-    public static class ListNode {{
-        int val;
-        ListNode next;
-        ListNode() {{}}
-        ListNode(int val) {{ this.val = val; }}
-        ListNode(int val, ListNode next) {{ this.val = val; this.next = next; }}
-        
-        public static ListNode fromArray(int[] arr) {{
-            if (arr == null || arr.length == 0) return null;
-            ListNode head = new ListNode(arr[0]);
-            ListNode current = head;
-            for (int i = 1; i < arr.length; i++) {{
-                current.next = new ListNode(arr[i]);
-                current = current.next;
-            }}
-            return head;
-        }}
-        
-        public static int[] toArray(ListNode head) {{
-            if (head == null) return new int[0];
-            List<Integer> result = new ArrayList<>();
-            ListNode current = head;
-            while (current != null) {{
-                result.add(current.val);
-                current = current.next;
-            }}
-            int[] arr = new int[result.size()];
-            for (int i = 0; i < result.size(); i++) {{
-                arr[i] = result.get(i);
-            }}
-            return arr;
-        }}
-    }}
-
-    // Helper class for tree problems
-    public static class TreeNode {{
-        int val;
-        TreeNode left;
-        TreeNode right;
-        TreeNode() {{}}
-        TreeNode(int val) {{ this.val = val; }}
-        TreeNode(int val, TreeNode left, TreeNode right) {{
-            this.val = val;
-            this.left = left;
-            this.right = right;
-        }}
-    }}
-
-    // Helper class for graph problems
-    public static class Node {{
-        int val;
-        List<Node> neighbors;
-        Node() {{ this.neighbors = new ArrayList<>(); }}
-        Node(int _val) {{
-            val = _val;
-            neighbors = new ArrayList<>();
-        }}
-        Node(int _val, ArrayList<Node> _neighbors) {{
-            val = _val;
-            neighbors = _neighbors;
-        }}
-    }}
-
+public class Main {{{helpers}
     public static void main(String[] args) {{
 {code}
     }}
@@ -612,426 +627,2422 @@ public class Main {{
 """
 
 
-# ==================== PISTON API FUNCTIONS ====================
+# ==================== BATCH HARNESSES ====================
+# A batch harness packs every test case of a submission into one execution.
+# For stdin languages it runs the user's program once per case, each run in a
+# fresh child process so global state never leaks between cases; for Java the
+# harness class is compiled once and loops over the cases in a single JVM.
+# Every case's output is framed:
+#
+#     @@CODEVAULT:<nonce>:BEGIN:<case>@@
+#     ...program output...
+#     @@CODEVAULT:<nonce>:END:<case>:<exit code>:<wall ms>:<cpu ms>:<peak rss kb>@@
+#
+# Metrics the harness cannot measure are written as '-'. The same frames are
+# written to stderr so errors can be attributed per case.
 
-def execute_code_piston(language, code, input_data=""):
+
+def get_batch_nonce(code, cases):
     """
-    Execute code using Piston API (FREE - No API key required!)
+    Derive the framing nonce for a batch harness.
+    
+    The nonce is deterministic so identical submissions produce identical
+    harness source.
     
     Args:
-        language (str): Programming language (JAVA, PYTHON, CPP, JAVASCRIPT)
-        code (str): Source code to execute
-        input_data (str): Input data for stdin
+        code (str): User's source code
+        cases (list): (idx, test_case) pairs included in the batch
         
     Returns:
-        dict: Execution result compatible with Judge0 format
+        str: 16 character hex nonce
     """
-    try:
-        # Get Piston language identifier
-        language_upper = language.upper()
-        if language_upper not in PISTON_LANGUAGE_MAP:
-            raise ValueError(f"Unsupported language: {language}. Supported: {', '.join(PISTON_LANGUAGE_MAP.keys())}")
-        
-        piston_language = PISTON_LANGUAGE_MAP[language_upper]
-        
-        # Wrap Java code with main method if needed
-        if language_upper == 'JAVA':
-            code = wrap_java_code(code)
-        
-        # Prepare execution request
-        # For Java, specify filename as Main.java
-        file_payload = {
-            "content": code
-        }
-        if language_upper == 'JAVA':
-            file_payload["name"] = "Main.java"
-        
-        payload = {
-            "language": piston_language,
-            "version": "*",  # Use latest version
-            "files": [file_payload],
-            "stdin": input_data
-        }
-        
-        # Execute code
-        url = f"{PISTON_API_URL}/execute"
-        response = requests.post(url, json=payload, timeout=10)
-        response.raise_for_status()
-        
-        result = response.json()
-        
-        # Extract results
-        run_result = result.get('run', {})
-        compile_result = result.get('compile', {})
-        
-        # Determine status
-        # Check compile errors first
-        if compile_result and compile_result.get('code') != 0:
-            status = 'Compilation Error'
-            status_id = 6
-        # Check for successful execution (exit code 0)
-        elif run_result.get('code') == 0:
-            status = 'Accepted'
-            status_id = 3
-        # Check for signals (crashes)
-        elif run_result.get('signal'):
-            status = 'Runtime Error (Signal)'
-            status_id = 11
-        # Non-zero exit code
-        elif run_result.get('code'):
-            # If there's stdout output, consider it accepted despite error in stderr
-            if run_result.get('stdout', '').strip():
-                status = 'Accepted'
-                status_id = 3
-            else:
-                status = 'Runtime Error (Non-zero exit)'
-                status_id = 11
-        else:
-            status = 'Unknown'
-            status_id = 0
-        
-        # Return in Judge0-compatible format
-        return {
-            'output': run_result.get('stdout', ''),
-            'error': run_result.get('stderr', ''),
-            'status': status,
-            'status_id': status_id,
-            'time': '0',  # Piston doesn't provide execution time
-            'memory': 0,  # Piston doesn't provide memory usage
-            'compile_output': compile_result.get('output', '') if compile_result else ''
-        }
-        
-    except ValueError as e:
-        return {
-            'output': '',
-            'error': str(e),
-            'status': 'Error',
-            'status_id': 0,
-            'time': '0',
-            'memory': 0,
-            'compile_output': ''
-        }
-    except requests.RequestException as e:
-        return {
-            'output': '',
-            'error': f'Piston API Error: {str(e)}',
-            'status': 'Error',
-            'status_id': 0,
-            'time': '0',
-            'memory': 0,
-            'compile_output': ''
-        }
-    except Exception as e:
-        return {
-            'output': '',
-            'error': f'Unexpected error: {str(e)}',
-            'status': 'Error',
-            'status_id': 0,
-            'time': '0',
-            'memory': 0,
-            'compile_output': ''
-        }
-
-
-# ==================== JUDGE0 API FUNCTIONS ====================
+    digest = hashlib.sha256(code.encode('utf-8'))
+    for idx, test_case in cases:
+        digest.update(f"\0{idx}\0{test_case.get('input', '')}".encode('utf-8'))
+    return digest.hexdigest()[:16]
 
 
-def get_language_id(language):
+def to_cpp_string_literal(text):
     """
-    Convert language string to Judge0 language ID.
+    Encode text as a C++ string literal.
+    
+    Non-printable and non-ASCII bytes are written as 3-digit octal escapes,
+    which (unlike \\x escapes) can never swallow the character that follows.
+    
+    Args:
+        text (str): Text to encode
+        
+    Returns:
+        str: Quoted C++ string literal
+    """
+    escaped = []
+    for byte in text.encode('utf-8'):
+        char = chr(byte)
+        if char in '\\"?':
+            escaped.append('\\' + char)
+        elif char == '\n':
+            escaped.append('\\n')
+        elif 32 <= byte < 127:
+            escaped.append(char)
+        else:
+            escaped.append('\\%03o' % byte)
+    return '"' + ''.join(escaped) + '"'
+
+
+def get_harness_limits(limits):
+    """
+    Per-case limits for the batch harnesses.
+    
+    Rlimits and alarms only take whole seconds; the exact time limit is
+    checked against the measured CPU time afterwards (see get_limit_verdict).
+    
+    Args:
+        limits (dict): Resolved limits (see resolve_execution_limits) or None
+        
+    Returns:
+        tuple: (CPU seconds, wall-clock seconds, memory bytes), 0 meaning no limit
+    """
+    if not limits:
+        return 0, 0, 0
+    cpu_seconds = math.ceil(limits['time_limit']) if limits['time_limit'] else 0
+    wall_seconds = math.ceil(limits['wall_time_limit']) if limits['time_limit'] else 0
+    memory_bytes = limits['memory_limit'] * 1024 * 1024 if limits['memory_limit'] else 0
+    return cpu_seconds, wall_seconds, memory_bytes
+
+
+def wrap_python_batch_code(code, cases, nonce, limits=None):
+    """
+    Wrap Python code in a harness that runs it once per test case.
+    
+    The harness forks a child per case, feeds the case input on stdin and
+    runs the program as __main__ in the child, under the per-case limits.
+    
+    Args:
+        code (str): User's Python source code
+        cases (list): (idx, test_case) pairs to run, in order
+        nonce (str): Framing nonce (see get_batch_nonce)
+        limits (dict): Resolved per-case limits, or None
+        
+    Returns:
+        str: Python harness source
+    """
+    inputs = [(idx, test_case.get('input', '')) for idx, test_case in cases]
+    cpu_seconds, wall_seconds, memory_bytes = get_harness_limits(limits)
+    return f"""import os
+import resource
+import runpy
+import signal
+import sys
+import tempfile
+import time
+import traceback
+
+SOURCE = {code!r}
+CASES = {inputs!r}
+MARK = {'@@CODEVAULT:' + nonce + ':'!r}
+CPU_LIMIT = {cpu_seconds}
+WALL_LIMIT = {wall_seconds}
+MEMORY_LIMIT = {memory_bytes}
+
+
+def set_soft_limit(kind, value):
+    _, hard = resource.getrlimit(kind)
+    if hard != resource.RLIM_INFINITY:
+        value = min(value, hard)
+    resource.setrlimit(kind, (value, hard))
+
+
+def apply_limits():
+    if CPU_LIMIT:
+        set_soft_limit(resource.RLIMIT_CPU, CPU_LIMIT)
+    if MEMORY_LIMIT:
+        set_soft_limit(resource.RLIMIT_AS, MEMORY_LIMIT)
+    if WALL_LIMIT:
+        signal.alarm(WALL_LIMIT)
+
+
+def run_program(path):
+    sys.argv = [path]
+    try:
+        runpy.run_path(path, run_name='__main__')
+        return 0
+    except SystemExit as exc:
+        if exc.code is None:
+            return 0
+        if isinstance(exc.code, int):
+            return exc.code
+        print(exc.code, file=sys.stderr)
+        return 1
+    except BaseException as exc:
+        # Hide the harness frames so the traceback matches a plain run
+        tb = exc.__traceback__
+        while tb is not None and tb.tb_frame.f_code.co_filename != path:
+            tb = tb.tb_next
+        traceback.print_exception(type(exc), exc, tb)
+        return 1
+
+
+def main():
+    path = os.path.join(tempfile.mkdtemp(), 'main.py')
+    with open(path, 'w') as source_file:
+        source_file.write(SOURCE)
+    for idx, data in CASES:
+        read_fd, write_fd = os.pipe()
+        for stream in (sys.stdout, sys.stderr):
+            stream.write(MARK + 'BEGIN:%d@@\\n' % idx)
+            stream.flush()
+        started = time.monotonic()
+        pid = os.fork()
+        if pid == 0:
+            os.close(write_fd)
+            os.dup2(read_fd, 0)
+            os.close(read_fd)
+            apply_limits()
+            exit_code = run_program(path)
+            for stream in (sys.stdout, sys.stderr):
+                try:
+                    stream.flush()
+                except Exception:
+                    pass
+            os._exit(exit_code & 0xFF)
+        os.close(read_fd)
+        try:
+            with os.fdopen(write_fd, 'wb') as pipe:
+                pipe.write(data.encode('utf-8'))
+        except BrokenPipeError:
+            pass
+        _, status, usage = os.wait4(pid, 0)
+        wall_ms = (time.monotonic() - started) * 1000
+        cpu_ms = (usage.ru_utime + usage.ru_stime) * 1000
+        # os.waitstatus_to_exitcode needs Python 3.9 (Judge0 runs 3.8)
+        if os.WIFSIGNALED(status):
+            exit_code = 128 + os.WTERMSIG(status)
+        else:
+            exit_code = os.WEXITSTATUS(status)
+        for stream in (sys.stdout, sys.stderr):
+            stream.write('\\n' + MARK + 'END:%d:%d:%.3f:%.3f:%d@@\\n' % (
+                idx, exit_code, wall_ms, cpu_ms, usage.ru_maxrss))
+            stream.flush()
+
+
+main()
+"""
+
+
+def wrap_cpp_batch_code(code, cases, nonce, limits=None):
+    """
+    Wrap C++ code in a harness that runs it once per test case.
+    
+    A static initializer runs before the user's main(): it forks a child per
+    case with the case input piped to stdin, and the child simply returns into
+    the user's unchanged main() under the per-case limits. The parent only
+    waits and writes the frames, and exits without ever running main() itself.
+    
+    Args:
+        code (str): User's C++ source code (with its own main)
+        cases (list): (idx, test_case) pairs to run, in order
+        nonce (str): Framing nonce (see get_batch_nonce)
+        limits (dict): Resolved per-case limits, or None
+        
+    Returns:
+        str: C++ harness source
+    """
+    cpu_seconds, wall_seconds, memory_bytes = get_harness_limits(limits)
+    case_ids = ', '.join(str(idx) for idx, _ in cases)
+    inputs = ',\n    '.join(to_cpp_string_literal(test_case.get('input', '')) for _, test_case in cases)
+    lengths = ', '.join(str(len(test_case.get('input', '').encode('utf-8'))) for _, test_case in cases)
+    return f"""#include <csignal>
+#include <cstdio>
+#include <ctime>
+#include <unistd.h>
+#include <sys/resource.h>
+#include <sys/wait.h>
+
+namespace codevault_batch {{
+static const char* const MARK = "@@CODEVAULT:{nonce}:";
+static const int CASE_IDS[] = {{ {case_ids} }};
+static const char* const INPUTS[] = {{
+    {inputs}
+}};
+static const size_t INPUT_LENGTHS[] = {{ {lengths} }};
+static const rlim_t CPU_LIMIT = {cpu_seconds};
+static const unsigned WALL_LIMIT = {wall_seconds};
+static const rlim_t MEMORY_LIMIT = {memory_bytes}ULL;
+
+template <typename Kind>
+static void set_soft_limit(Kind kind, rlim_t value) {{
+    struct rlimit limit;
+    if (getrlimit(kind, &limit) != 0) return;
+    limit.rlim_cur = limit.rlim_max == RLIM_INFINITY || value < limit.rlim_max ? value : limit.rlim_max;
+    setrlimit(kind, &limit);
+}}
+
+struct Runner {{
+    Runner() {{
+        signal(SIGPIPE, SIG_IGN);
+        for (size_t i = 0; i < sizeof(CASE_IDS) / sizeof(CASE_IDS[0]); ++i) {{
+            int fds[2];
+            if (pipe(fds) != 0) break;
+            printf("%sBEGIN:%d@@\\n", MARK, CASE_IDS[i]);
+            fprintf(stderr, "%sBEGIN:%d@@\\n", MARK, CASE_IDS[i]);
+            fflush(stdout);
+            fflush(stderr);
+            timespec started;
+            clock_gettime(CLOCK_MONOTONIC, &started);
+            pid_t pid = fork();
+            if (pid == 0) {{
+                // Child: take this case on stdin and continue into the user's main()
+                signal(SIGPIPE, SIG_DFL);
+                if (CPU_LIMIT) set_soft_limit(RLIMIT_CPU, CPU_LIMIT);
+                if (MEMORY_LIMIT) set_soft_limit(RLIMIT_AS, MEMORY_LIMIT);
+                if (WALL_LIMIT) alarm(WALL_LIMIT);
+                dup2(fds[0], 0);
+                close(fds[0]);
+                close(fds[1]);
+                return;
+            }}
+            close(fds[0]);
+            if (pid < 0) {{
+                close(fds[1]);
+                continue;
+            }}
+            size_t written = 0;
+            while (written < INPUT_LENGTHS[i]) {{
+                ssize_t n = write(fds[1], INPUTS[i] + written, INPUT_LENGTHS[i] - written);
+                if (n <= 0) break;
+                written += (size_t) n;
+            }}
+            close(fds[1]);
+            int status = 0;
+            struct rusage usage = {{}};
+            wait4(pid, &status, 0, &usage);
+            timespec finished;
+            clock_gettime(CLOCK_MONOTONIC, &finished);
+            double wall_ms = (finished.tv_sec - started.tv_sec) * 1e3 + (finished.tv_nsec - started.tv_nsec) / 1e6;
+            double cpu_ms = (usage.ru_utime.tv_sec + usage.ru_stime.tv_sec) * 1e3
+                + (usage.ru_utime.tv_usec + usage.ru_stime.tv_usec) / 1e3;
+            int exit_code = WIFEXITED(status) ? WEXITSTATUS(status) : 128 + WTERMSIG(status);
+            printf("\\n%sEND:%d:%d:%.3f:%.3f:%ld@@\\n", MARK, CASE_IDS[i], exit_code, wall_ms, cpu_ms, usage.ru_maxrss);
+            fprintf(stderr, "\\n%sEND:%d:%d:%.3f:%.3f:%ld@@\\n", MARK, CASE_IDS[i], exit_code, wall_ms, cpu_ms,
+                    usage.ru_maxrss);
+            fflush(stdout);
+            fflush(stderr);
+        }}
+        _exit(0);
+    }}
+}};
+
+static Runner runner;
+}}
+
+#line 1
+{code}
+"""
+
+
+def wrap_javascript_batch_code(code, cases, nonce, limits=None):
+    """
+    Wrap JavaScript code in a harness that runs it once per test case.
+    
+    Each case runs the program in a fresh node process with the case input
+    on stdin. A case that overruns the wall-clock limit is killed with
+    SIGALRM, as in the Python and C++ harnesses.
+    
+    Args:
+        code (str): User's JavaScript source code
+        cases (list): (idx, test_case) pairs to run, in order
+        nonce (str): Framing nonce (see get_batch_nonce)
+        limits (dict): Resolved per-case limits, or None
+        
+    Returns:
+        str: JavaScript harness source
+    """
+    inputs = json.dumps([[idx, test_case.get('input', '')] for idx, test_case in cases])
+    _, wall_seconds, memory_bytes = get_harness_limits(limits)
+    return f"""const fs = require('fs');
+const os = require('os');
+const path = require('path');
+const childProcess = require('child_process');
+
+const SOURCE = {json.dumps(code)};
+const CASES = {inputs};
+const MARK = {json.dumps('@@CODEVAULT:' + nonce + ':')};
+const WALL_LIMIT_MS = {wall_seconds * 1000};
+const MEMORY_LIMIT_MB = {memory_bytes // (1024 * 1024)};
+
+const file = path.join(fs.mkdtempSync(path.join(os.tmpdir(), 'codevault-')), 'main.js');
+fs.writeFileSync(file, SOURCE);
+const args = MEMORY_LIMIT_MB ? [`--max-old-space-size=${{MEMORY_LIMIT_MB}}`, file] : [file];
+
+for (const [idx, input] of CASES) {{
+    const started = process.hrtime.bigint();
+    const run = childProcess.spawnSync(process.execPath, args, {{
+        input,
+        maxBuffer: 64 * 1024 * 1024,
+        timeout: WALL_LIMIT_MS || undefined,
+        killSignal: 'SIGALRM'
+    }});
+    if (run.error && run.error.code !== 'ETIMEDOUT') continue;
+    // spawnSync reports no rusage, so only wall time is known
+    const wallMs = (Number(process.hrtime.bigint() - started) / 1e6).toFixed(3);
+    const exitCode = run.status !== null ? run.status : 128 + (os.constants.signals[run.signal] || 0);
+    process.stdout.write(`${{MARK}}BEGIN:${{idx}}@@\\n`);
+    process.stdout.write(run.stdout);
+    process.stdout.write(`\\n${{MARK}}END:${{idx}}:${{exitCode}}:${{wallMs}}:-:-@@\\n`);
+    process.stderr.write(`${{MARK}}BEGIN:${{idx}}@@\\n`);
+    process.stderr.write(run.stderr);
+    process.stderr.write(`\\n${{MARK}}END:${{idx}}:${{exitCode}}:${{wallMs}}:-:-@@\\n`);
+}}
+"""
+
+
+def wrap_java_batch_test_code(code, cases, nonce, limits=None):
+    """
+    Wrap Java Solution code in one harness that runs every test case.
+    
+    Same input handling as wrap_java_test_code, but the class is compiled
+    once and main() loops over all cases, so javac and JVM start-up are paid
+    once per submission instead of once per case. Each case runs on its own
+    thread with Main and the user's classes loaded afresh by a class loader
+    of its own, so static fields set by one case do not carry over into the
+    next (where the class files cannot be read back, the cases share the
+    classes as loaded at start-up); a case that overruns the
+    wall-clock limit is reported like a SIGALRM and ends the batch (the
+    cases after it are then run on their own).
+    
+    Args:
+        code (str): Java Solution class code
+        cases (list): (idx, test_case) pairs to run, in order
+        nonce (str): Framing nonce (see get_batch_nonce)
+        limits (dict): Resolved per-case limits, or None
+        
+    Returns:
+        str: Complete Java code with batch test harness
+    """
+    code = code.strip()
+    _, wall_seconds, _ = get_harness_limits(limits)
+    
+    # Common Java imports
+    common_imports = """import java.util.*;
+import java.io.*;
+import java.lang.*;
+import java.math.*;
+"""
+    
+    # Each case becomes a String[] of its input lines (json string syntax is valid Java)
+    case_ids = ', '.join(str(idx) for idx, _ in cases)
+    case_inputs = ',\n        '.join(
+        '{ ' + ', '.join(json.dumps(line) for line in test_case.get('input', '').strip().split('\n')) + ' }'
+        for _, test_case in cases
+    )
+    
+    # Remove 'public' from class declarations and make it static
+    code = re.sub(r'\bpublic\s+class\s+', 'static class ', code)
+    # Also handle case where user just has 'class' without public
+    if not code.startswith('static'):
+        code = code.replace('class Solution', 'static class Solution')
+    
+    return f"""{common_imports}
+
+public class Main {{
+    // Helper class for linked list problems
+    public static class ListNode {{
+        int val;
+        ListNode next;
+        ListNode() {{}}
+        ListNode(int val) {{ this.val = val; }}
+        ListNode(int val, ListNode next) {{ this.val = val; this.next = next; }}
+        
+        public static ListNode fromArray(int[] arr) {{
+            if (arr == null || arr.length == 0) return null;
+            ListNode head = new ListNode(arr[0]);
+            ListNode current = head;
+            for (int i = 1; i < arr.length; i++) {{
+                current.next = new ListNode(arr[i]);
+                current = current.next;
+            }}
+            return head;
+        }}
+    }}
+
+    // Helper class for tree problems
+    public static class TreeNode {{
+        int val;
+        TreeNode left;
+        TreeNode right;
+        TreeNode() {{}}
+        TreeNode(int val) {{ this.val = val; }}
+        TreeNode(int val, TreeNode left, TreeNode right) {{
+            this.val = val;
+            this.left = left;
+            this.right = right;
+        }}
+    }}
+
+    // Helper class for graph problems
+    public static class Node {{
+        int val;
+        List<Node> neighbors;
+        Node() {{ this.neighbors = new ArrayList<>(); }}
+        Node(int _val) {{
+            val = _val;
+            neighbors = new ArrayList<>();
+        }}
+    }}
+
+    // User's solution class
+    {code}
+
+    static final String MARK = "@@CODEVAULT:{nonce}:";
+    static final long WALL_LIMIT_MS = {wall_seconds * 1000}L;
+    static final int TIME_LIMIT_EXIT_CODE = 128 + 14;  // SIGALRM
+    static final int[] CASE_IDS = {{ {case_ids} }};
+    static final String[][] CASE_INPUTS = {{
+        {case_inputs}
+    }};
+
+    // Helper method to parse array input
+    static int[] parseArray(String input) {{
+        if (input == null || input.trim().isEmpty()) return new int[0];
+        input = input.trim().replaceAll("[\\\\[\\\\]\\\\s]", "");
+        if (input.isEmpty()) return new int[0];
+        String[] parts = input.split(",");
+        int[] result = new int[parts.length];
+        for (int i = 0; i < parts.length; i++) {{
+            result[i] = Integer.parseInt(parts[i].trim());
+        }}
+        return result;
+    }}
+    
+    // Helper to convert ListNode to array for output
+    static int[] linkedListToArray(ListNode head) {{
+        if (head == null) return new int[0];
+        List<Integer> result = new ArrayList<>();
+        ListNode current = head;
+        while (current != null) {{
+            result.add(current.val);
+            current = current.next;
+        }}
+        int[] arr = new int[result.size()];
+        for (int i = 0; i < result.size(); i++) {{
+            arr[i] = result.get(i);
+        }}
+        return arr;
+    }}
+    
+    // Helper to format array output
+    static String formatArray(int[] arr) {{
+        if (arr == null || arr.length == 0) return "[]";
+        StringBuilder sb = new StringBuilder("[");
+        for (int i = 0; i < arr.length; i++) {{
+            if (i > 0) sb.append(",");
+            sb.append(arr[i]);
+        }}
+        sb.append("]");
+        return sb.toString();
+    }}
+
+    // Loads Main and the classes nested in it (the user's code) afresh, so each case starts with clean statics
+    static class CaseLoader extends ClassLoader {{
+        CaseLoader(ClassLoader parent) {{
+            super(parent);
+        }}
+
+        static byte[] readClass(ClassLoader loader, String name) {{
+            try (InputStream in = loader.getResourceAsStream(name.replace('.', '/') + ".class")) {{
+                return in == null ? null : in.readAllBytes();
+            }} catch (IOException e) {{
+                return null;
+            }}
+        }}
+
+        @Override
+        protected Class<?> loadClass(String name, boolean resolve) throws ClassNotFoundException {{
+            if (!name.equals("Main") && !name.startsWith("Main$")) return super.loadClass(name, resolve);
+            synchronized (getClassLoadingLock(name)) {{
+                Class<?> loaded = findLoadedClass(name);
+                if (loaded == null) {{
+                    byte[] bytes = readClass(getParent(), name);
+                    if (bytes == null) throw new ClassNotFoundException(name);
+                    loaded = defineClass(name, bytes, 0, bytes.length);
+                }}
+                if (resolve) resolveClass(loaded);
+                return loaded;
+            }}
+        }}
+    }}
+
+    // runCase of a freshly loaded Main (of this one when the class files cannot be read)
+    static java.lang.reflect.Method loadCaseRunner() throws Exception {{
+        ClassLoader parent = Main.class.getClassLoader();
+        Class<?> main = CaseLoader.readClass(parent, "Main") == null ? Main.class : new CaseLoader(parent).loadClass("Main");
+        java.lang.reflect.Method runner = main.getDeclaredMethod("runCase", String[].class);
+        runner.setAccessible(true);
+        return runner;
+    }}
+
+    // Run one test case and return its output line (null when nothing to print)
+    static String runCase(String[] lines) throws Exception {{
+        Solution solution = new Solution();
+        if (lines.length >= 2) {{
+            ListNode list1 = ListNode.fromArray(parseArray(lines[0]));
+            ListNode list2 = ListNode.fromArray(parseArray(lines[1]));
+            
+            // Call mergeTwoLists (looked up reflectively so other cases still compile)
+            java.lang.reflect.Method merge = Solution.class.getDeclaredMethod("mergeTwoLists", ListNode.class, ListNode.class);
+            merge.setAccessible(true);
+            ListNode result = (ListNode) merge.invoke(solution, list1, list2);
+            return formatArray(linkedListToArray(result));
+        }}
+        
+        ListNode head = ListNode.fromArray(parseArray(lines[0]));
+        
+        // Generic approach: call the first declared method with the parsed list
+        java.lang.reflect.Method[] methods = Solution.class.getDeclaredMethods();
+        if (methods.length == 0) return null;
+        java.lang.reflect.Method method = methods[0];
+        try {{
+            Object result = method.invoke(solution, head);
+            if (result instanceof ListNode) {{
+                return formatArray(linkedListToArray((ListNode) result));
+            }}
+            return String.valueOf(result);
+        }} catch (Exception e) {{
+            return "Error calling method: " + e.getMessage();
+        }}
+    }}
+
+    public static void main(String[] args) throws Exception {{
+        final java.lang.management.ThreadMXBean threads = java.lang.management.ManagementFactory.getThreadMXBean();
+        for (int i = 0; i < CASE_IDS.length; i++) {{
+            System.out.println(MARK + "BEGIN:" + CASE_IDS[i] + "@@");
+            System.err.println(MARK + "BEGIN:" + CASE_IDS[i] + "@@");
+            final String[] lines = CASE_INPUTS[i];
+            final int[] exitCode = {{ 0 }};
+            final long[] cpuNanos = {{ 0 }};
+            final java.lang.reflect.Method caseRunner = loadCaseRunner();
+            long started = System.nanoTime();
+            Thread runner = new Thread(null, () -> {{
+                try {{
+                    String output = (String) caseRunner.invoke(null, (Object) lines);
+                    if (output != null) System.out.println(output);
+                }} catch (Throwable e) {{
+                    Throwable cause = e;
+                    while (cause instanceof java.lang.reflect.InvocationTargetException && cause.getCause() != null) {{
+                        cause = cause.getCause();
+                    }}
+                    System.out.println("Error: " + cause.getMessage());
+                    cause.printStackTrace();
+                    // Exceptions are reported as output, like the single-case harness; JVM errors fail the case
+                    if (!(cause instanceof Exception)) exitCode[0] = 1;
+                }} finally {{
+                    cpuNanos[0] = threads.getCurrentThreadCpuTime();
+                }}
+            }}, "main", 64L * 1024 * 1024);
+            runner.setDaemon(true);
+            runner.start();
+            runner.join(WALL_LIMIT_MS);
+            boolean timedOut = runner.isAlive();
+            long cpu = timedOut ? threads.getThreadCpuTime(runner.getId()) : cpuNanos[0];
+            // Cases share one JVM, so there is no per-case peak memory
+            String metrics = String.format(
+                Locale.ROOT, "%.3f:%.3f:-", (System.nanoTime() - started) / 1e6, Math.max(cpu, 0) / 1e6
+            );
+            int code = timedOut ? TIME_LIMIT_EXIT_CODE : exitCode[0];
+            System.out.println();
+            System.out.println(MARK + "END:" + CASE_IDS[i] + ":" + code + ":" + metrics + "@@");
+            System.err.println();
+            System.err.println(MARK + "END:" + CASE_IDS[i] + ":" + code + ":" + metrics + "@@");
+            if (timedOut) {{
+                // The case's thread cannot be stopped safely; leave the remaining cases unframed
+                System.out.flush();
+                System.err.flush();
+                Runtime.getRuntime().halt(0);
+            }}
+        }}
+        System.out.flush();
+        System.err.flush();
+    }}
+}}
+"""
+
+
+BATCH_HARNESS_WRAPPERS = {
+    'JAVA': wrap_java_batch_test_code,
+    'PYTHON': wrap_python_batch_code,
+    'CPP': wrap_cpp_batch_code,
+    'JAVASCRIPT': wrap_javascript_batch_code,
+}
+
+
+def build_batch_harness(language, code, cases, limits=None):
+    """
+    Build the single-submission harness for a set of test cases.
+    
+    Args:
+        language (str): Programming language (JAVA, PYTHON, CPP, JAVASCRIPT)
+        code (str): User's source code
+        cases (list): (idx, test_case) pairs to run, in order
+        limits (dict): Resolved per-case limits, or None
+        
+    Returns:
+        tuple: (harness source, nonce)
+        
+    Raises:
+        ValueError: If the language has no batch harness
+    """
+    wrapper = BATCH_HARNESS_WRAPPERS.get(language.upper())
+    if wrapper is None:
+        raise ValueError(f"No batch harness for language: {language}")
+    nonce = get_batch_nonce(code, cases)
+    return wrapper(code, cases, nonce, limits), nonce
+
+
+def parse_batch_frames(nonce, text):
+    """
+    Split harness output into per-case sections.
+    
+    Cases whose frame is incomplete (e.g. the sandbox was killed or output
+    was truncated) are simply missing from the result.
+    
+    Args:
+        nonce (str): Framing nonce used by the harness
+        text (str): Captured stdout or stderr of the harness
+        
+    Returns:
+        dict: Mapping of case idx to (body, exit_code, metrics), metrics being
+        {'wall_time': float, 'cpu_time': float, 'memory': int} in seconds and
+        KB, with None for whatever the harness could not measure
+    """
+    mark = re.escape(f'@@CODEVAULT:{nonce}:')
+    pattern = re.compile(
+        mark + r'BEGIN:(\d+)@@\n(.*?)\n' + mark
+        + r'END:\1:(-?\d+)(?::([\d.]+|-):([\d.]+|-):(\d+|-))?@@',
+        re.DOTALL
+    )
+    
+    def milliseconds_to_seconds(value):
+        return round(float(value) / 1000, 3) if value and value != '-' else None
+    
+    frames = {}
+    for match in pattern.finditer(text or ''):
+        memory = match.group(6)
+        metrics = {
+            'wall_time': milliseconds_to_seconds(match.group(4)),
+            'cpu_time': milliseconds_to_seconds(match.group(5)),
+            'memory': int(memory) if memory and memory != '-' else None,
+        }
+        frames[int(match.group(1))] = (match.group(2), int(match.group(3)), metrics)
+    return frames
+
+
+def build_batch_case_result(stdout, stderr, exit_code, metrics=None):
+    """
+    Turn one framed case into an execution result (same shape as execute_code).
+    
+    Status mapping mirrors execute_code_piston, plus cases the harness
+    stopped at their time limit.
+    
+    Args:
+        stdout (str): Case stdout
+        stderr (str): Case stderr
+        exit_code (int): Exit code (128 + signal number for signals)
+        metrics (dict): Case metrics from parse_batch_frames
+        
+    Returns:
+        dict: Execution result for the case
+    """
+    metrics = metrics or {}
+    if exit_code in TIME_LIMIT_EXIT_CODES:
+        status, status_id = 'Time Limit Exceeded', 5
+    elif exit_code == 0 or stdout.strip():
+        status, status_id = 'Accepted', 3
+    elif exit_code > 128:
+        status, status_id = 'Runtime Error (Signal)', 11
+    else:
+        status, status_id = 'Runtime Error (Non-zero exit)', 11
+    cpu_time = metrics.get('cpu_time')
+    return {
+        'output': stdout,
+        'error': stderr,
+        'status': status,
+        'status_id': status_id,
+        'time': f'{cpu_time:.3f}' if cpu_time is not None else '0',
+        'memory': metrics.get('memory') or 0,
+        'wall_time': metrics.get('wall_time'),
+        'cpu_time': cpu_time,
+        'compile_output': ''
+    }
+
+
+# ==================== PISTON API FUNCTIONS ====================
+
+def execute_code_piston(language, code, input_data="", limits=None):
+    """
+    Execute code using Piston API (FREE - No API key required!)
+    
+    Args:
+        language (str): Programming language (JAVA, PYTHON, CPP, JAVASCRIPT)
+        code (str): Source code to execute
+        input_data (str): Input data for stdin
+        limits (dict): Resolved per-problem limits (see resolve_execution_limits), or None
+        
+    Returns:
+        dict: Execution result compatible with Judge0 format
+    """
+    try:
+        payload = build_piston_payload(language, code, input_data, limits)
+        
+        # Execute code on the least loaded Piston host (hedged to a second host when enabled)
+        client = get_executor_client()
+        
+        def send(base_url):
+            response = client.post(f"{base_url}/execute", json=payload)
+            response.raise_for_status()
+            return response.json()
+        
+        result = client.get_endpoint_pool('piston', PISTON_API_URLS).call(send)
+        return format_piston_result(result)
+        
+    except ValueError as e:
+        return {
+            'output': '',
+            'error': str(e),
+            'status': 'Error',
+            'status_id': 0,
+            'time': '0',
+            'memory': 0,
+            'compile_output': ''
+        }
+    except requests.RequestException as e:
+        return {
+            'output': '',
+            'error': f'{PISTON_API_ERROR_PREFIX}{str(e)}',
+            'status': 'Error',
+            'status_id': 0,
+            'time': '0',
+            'memory': 0,
+            'compile_output': ''
+        }
+    except Exception as e:
+        return {
+            'output': '',
+            'error': f'Unexpected error: {str(e)}',
+            'status': 'Error',
+            'status_id': 0,
+            'time': '0',
+            'memory': 0,
+            'compile_output': ''
+        }
+
+
+def build_piston_payload(language, code, input_data="", limits=None):
+    """
+    Build the body of a Piston /execute request.
+    
+    Args:
+        language (str): Programming language (JAVA, PYTHON, CPP, JAVASCRIPT)
+        code (str): Source code to execute
+        input_data (str): Input data for stdin
+        limits (dict): Resolved per-problem limits, or None
+        
+    Returns:
+        dict: Request payload
+        
+    Raises:
+        ValueError: If language is not supported
+    """
+    # Get Piston language identifier
+    language_upper = language.upper()
+    if language_upper not in PISTON_LANGUAGE_MAP:
+        raise ValueError(f"Unsupported language: {language}. Supported: {', '.join(PISTON_LANGUAGE_MAP.keys())}")
+    
+    piston_language = PISTON_LANGUAGE_MAP[language_upper]
+    
+    # Wrap Java code with main method if needed
+    if language_upper == 'JAVA':
+        code = wrap_java_code(code)
+    
+    # Prepare execution request
+    # For Java, specify filename as Main.java
+    file_payload = {
+        "content": code
+    }
+    if language_upper == 'JAVA':
+        file_payload["name"] = "Main.java"
+    
+    payload = {
+        "language": piston_language,
+        "version": PISTON_LANGUAGE_VERSIONS.get(language_upper, "*"),  # Latest unless pinned
+        "files": [file_payload],
+        "stdin": input_data
+    }
+    if limits and limits['time_limit']:
+        # Capped at what Piston accepts; the exact limit is judged on the measured
+        # cpu_time afterwards (see get_limit_verdict)
+        payload["run_timeout"] = min(int(limits['wall_time_limit'] * 1000), PISTON_MAX_RUN_TIMEOUT_MS)
+        payload["run_cpu_time"] = min(int(limits['time_limit'] * 1000), PISTON_MAX_RUN_TIMEOUT_MS)
+    if limits and limits['memory_limit']:
+        payload["run_memory_limit"] = limits['memory_limit'] * 1024 * 1024
+    return payload
+
+
+def format_piston_result(result):
+    """
+    Convert a Piston /execute response into an execution result.
+    
+    Args:
+        result (dict): Response body from Piston
+        
+    Returns:
+        dict: Execution result in the execute_code format
+    """
+    # Extract results
+    run_result = result.get('run', {})
+    compile_result = result.get('compile', {})
+    
+    # Determine status
+    # Check compile errors first
+    if compile_result and compile_result.get('code') != 0:
+        status = 'Compilation Error'
+        status_id = 6
+    # Killed at the wall-clock or CPU time limit
+    elif run_result.get('status') == 'TO':
+        status = 'Time Limit Exceeded'
+        status_id = 5
+    # Check for successful execution (exit code 0)
+    elif run_result.get('code') == 0:
+        status = 'Accepted'
+        status_id = 3
+    # Check for signals (crashes)
+    elif run_result.get('signal'):
+        status = 'Runtime Error (Signal)'
+        status_id = 11
+    # Non-zero exit code
+    elif run_result.get('code'):
+        # If there's stdout output, consider it accepted despite error in stderr
+        if run_result.get('stdout', '').strip():
+            status = 'Accepted'
+            status_id = 3
+        else:
+            status = 'Runtime Error (Non-zero exit)'
+            status_id = 11
+    else:
+        status = 'Unknown'
+        status_id = 0
+    
+    # Piston 3.1+ reports cpu_time/wall_time in ms and memory in bytes; older versions report nothing
+    cpu_time = run_result.get('cpu_time')
+    wall_time = run_result.get('wall_time')
+    memory = run_result.get('memory')
+    
+    # Return in Judge0-compatible format
+    return {
+        'output': run_result.get('stdout', ''),
+        'error': run_result.get('stderr', ''),
+        'status': status,
+        'status_id': status_id,
+        'time': f'{cpu_time / 1000:.3f}' if cpu_time is not None else '0',
+        'memory': memory // 1024 if memory else 0,
+        'wall_time': round(wall_time / 1000, 3) if wall_time is not None else None,
+        'cpu_time': round(cpu_time / 1000, 3) if cpu_time is not None else None,
+        'compile_output': compile_result.get('output', '') if compile_result else ''
+    }
+
+
+# ==================== JUDGE0 API FUNCTIONS ====================
+
+
+def get_language_id(language):
+    """
+    Convert language string to Judge0 language ID.
     
     Args:
         language (str): Language name (JAVA, PYTHON, CPP, JAVASCRIPT)
         
     Returns:
-        int: Judge0 language ID
-        
-    Raises:
-        ValueError: If language is not supported
+        int: Judge0 language ID
+        
+    Raises:
+        ValueError: If language is not supported
+    """
+    language_upper = language.upper()
+    if language_upper not in JUDGE0_LANGUAGE_IDS:
+        raise ValueError(f"Unsupported language: {language}. Supported: {', '.join(JUDGE0_LANGUAGE_IDS.keys())}")
+    return JUDGE0_LANGUAGE_IDS[language_upper]
+
+
+def encode_base64(text):
+    """
+    Encode text to base64 string.
+    
+    Args:
+        text (str): Text to encode
+        
+    Returns:
+        str: Base64 encoded string
+    """
+    if not text:
+        return ""
+    return base64.b64encode(text.encode('utf-8')).decode('utf-8')
+
+
+def decode_base64(encoded_text):
+    """
+    Decode base64 string to text.
+    
+    Args:
+        encoded_text (str): Base64 encoded string
+        
+    Returns:
+        str: Decoded text
+    """
+    if not encoded_text:
+        return ""
+    try:
+        return base64.b64decode(encoded_text.encode('utf-8')).decode('utf-8')
+    except Exception:
+        return encoded_text
+
+
+def create_submission(language, source_code, stdin="", limits=None):
+    """
+    Create a code submission on Judge0.
+    
+    Args:
+        language (str): Programming language
+        source_code (str): Source code to execute
+        stdin (str): Standard input for the program
+        limits (dict): Resolved per-problem limits, or None
+        
+    Returns:
+        str: Submission token
+        
+    Raises:
+        requests.RequestException: If API request fails
+        ValueError: If response is invalid
+    """
+    submission_data = build_judge0_submission(language, source_code, stdin, limits)
+    
+    # API headers
+    headers = {
+        "content-type": "application/json",
+        "Content-Type": "application/json",
+        "X-RapidAPI-Key": JUDGE0_API_KEY,
+        "X-RapidAPI-Host": JUDGE0_API_HOST
+    }
+    
+    # Create submission
+    url = f"{JUDGE0_API_URL}/submissions?base64_encoded=true&fields=*"
+    response = get_executor_client().post(url, json=submission_data, headers=headers)
+    response.raise_for_status()
+    
+    result = response.json()
+    token = result.get('token')
+    
+    if not token:
+        raise ValueError("No token returned from Judge0 API")
+    
+    return token
+
+
+def build_judge0_submission(language, source_code, stdin="", limits=None):
+    """
+    Build the body of a Judge0 submission request.
+    
+    Args:
+        language (str): Programming language
+        source_code (str): Source code to execute
+        stdin (str): Standard input for the program
+        limits (dict): Resolved per-problem limits, or None
+        
+    Returns:
+        dict: Submission data (base64-encoded source and stdin)
+        
+    Raises:
+        ValueError: If language is not supported
+    """
+    language_id = get_language_id(language)
+    
+    # Prepare submission data
+    submission_data = {
+        "language_id": language_id,
+        "source_code": encode_base64(source_code),
+        "stdin": encode_base64(stdin),
+        "wait": False,
+        **get_judge0_limit_fields(limits)
+    }
+    if JUDGE0_CALLBACK_URL:
+        submission_data["callback_url"] = get_judge0_callback_url()
+    return submission_data
+
+
+def get_judge0_limit_fields(limits):
+    """
+    Submission fields carrying per-problem limits to Judge0.
+    
+    Only the CPU time and memory limits are sent; the wall-clock limit stays
+    at the Judge0 instance's default so it cannot exceed its configured maximum.
+    
+    Args:
+        limits (dict): Resolved per-problem limits, or None
+        
+    Returns:
+        dict: cpu_time_limit (seconds) and memory_limit (KB), where set
+    """
+    fields = {}
+    if limits and limits['time_limit']:
+        fields['cpu_time_limit'] = limits['time_limit']
+    if limits and limits['memory_limit']:
+        fields['memory_limit'] = limits['memory_limit'] * 1024
+    return fields
+
+
+def get_submission_result(token):
+    """
+    Retrieve submission result from Judge0.
+    
+    Args:
+        token (str): Submission token
+        
+    Returns:
+        dict: Submission result
+        
+    Raises:
+        requests.RequestException: If API request fails
+    """
+    headers = {
+        "X-RapidAPI-Key": JUDGE0_API_KEY,
+        "X-RapidAPI-Host": JUDGE0_API_HOST
+    }
+    
+    url = f"{JUDGE0_API_URL}/submissions/{token}?base64_encoded=true&fields=*"
+    response = get_executor_client().get(url, headers=headers)
+    response.raise_for_status()
+    
+    return response.json()
+
+
+def get_poll_delays(timeout=JUDGE0_POLL_TIMEOUT):
+    """
+    Yield how long to wait before each Judge0 poll.
+    
+    Delays start at JUDGE0_POLL_INITIAL_INTERVAL and grow by JUDGE0_POLL_BACKOFF
+    up to JUDGE0_POLL_MAX_INTERVAL, so fast programs are picked up within tens
+    of milliseconds while slow ones are not hammered. When callbacks are
+    enabled polling is only a safety net and runs at the max interval.
+    
+    Args:
+        timeout (float): Total seconds to keep polling
+        
+    Yields:
+        float: Seconds to wait before the next poll
+    """
+    deadline = time.monotonic() + timeout
+    delay = JUDGE0_POLL_MAX_INTERVAL if JUDGE0_CALLBACK_URL else JUDGE0_POLL_INITIAL_INTERVAL
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        yield min(delay, remaining)
+        delay = min(delay * JUDGE0_POLL_BACKOFF, JUDGE0_POLL_MAX_INTERVAL)
+
+
+def get_judge0_callback_url():
+    """Callback URL passed to Judge0, carrying the shared secret."""
+    return f"{JUDGE0_CALLBACK_URL}?{urlencode({'secret': JUDGE0_CALLBACK_SECRET})}"
+
+
+class Judge0CompletionRegistry:
+    """
+    Hands Judge0 callback results to the requests waiting for them.
+    
+    Waiters in this process are woken immediately. Every result is also put in
+    the Django cache so that, with a shared cache backend, a waiter in another
+    worker process picks it up at its next wake-up.
+    """
+    
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._waiting = set()
+        self._results = {}
+    
+    def register(self, tokens):
+        """Start accepting results for these tokens."""
+        with self._condition:
+            self._waiting.update(tokens)
+    
+    def unregister(self, tokens):
+        """Stop accepting results for these tokens and drop any left over."""
+        with self._condition:
+            for token in tokens:
+                self._waiting.discard(token)
+                self._results.pop(token, None)
+    
+    def complete(self, token, result):
+        """
+        Record a finished submission reported by a Judge0 callback.
+        
+        Args:
+            token (str): Submission token
+            result (dict): Submission as sent by Judge0
+        """
+        cache.set(f'judge0-callback:{token}', result, JUDGE0_CALLBACK_CACHE_TTL)
+        with self._condition:
+            if token in self._waiting:
+                self._results[token] = result
+                self._condition.notify_all()
+    
+    def wait(self, tokens, timeout):
+        """
+        Block until a result for any of the tokens arrives, or the timeout passes.
+        
+        Args:
+            tokens (list): Submission tokens still pending
+            timeout (float): Maximum seconds to wait
+            
+        Returns:
+            dict: Mapping of token to result for the tokens that completed
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: any(token in self._results for token in tokens), timeout)
+            completed = {token: self._results.pop(token) for token in tokens if token in self._results}
+        
+        # Results delivered to another worker process
+        missing = [token for token in tokens if token not in completed]
+        if missing:
+            shared = cache.get_many([f'judge0-callback:{token}' for token in missing])
+            for token in missing:
+                result = shared.get(f'judge0-callback:{token}')
+                if result is not None:
+                    completed[token] = result
+        return completed
+
+
+judge0_completions = Judge0CompletionRegistry()
+
+
+def wait_for_judge0(tokens, delay):
+    """
+    Wait before the next poll, waking early if a callback completes a token.
+    
+    Args:
+        tokens (list): Submission tokens still pending
+        delay (float): Seconds until the next poll
+        
+    Returns:
+        dict: Mapping of token to result for tokens completed by callbacks
+    """
+    if not JUDGE0_CALLBACK_URL:
+        time.sleep(delay)
+        return {}
+    return judge0_completions.wait(tokens, delay)
+
+
+def is_judge0_finished(result):
+    """Whether a Judge0 submission has left the queue (1=In Queue, 2=Processing)."""
+    status_id = ((result or {}).get('status') or {}).get('id')
+    return result is not None and status_id not in [1, 2]
+
+
+def poll_submission_result(token, timeout=JUDGE0_POLL_TIMEOUT):
+    """
+    Wait for a submission to finish, polling with backoff.
+    
+    In callback mode the wait ends as soon as Judge0 reports the result.
+    
+    Args:
+        token (str): Submission token
+        timeout (float): Maximum seconds to wait
+        
+    Returns:
+        dict: Final submission result
+        
+    Raises:
+        TimeoutError: If result not ready before the timeout
+        requests.RequestException: If API request fails
+    """
+    judge0_completions.register([token])
+    try:
+        for delay in get_poll_delays(timeout):
+            completed = wait_for_judge0([token], delay)
+            if token in completed:
+                return completed[token]
+            
+            result = get_submission_result(token)
+            if is_judge0_finished(result):
+                return result
+    finally:
+        judge0_completions.unregister([token])
+    
+    raise TimeoutError(EXECUTION_TIMEOUT_MESSAGE)
+
+
+def execute_code(language, code, input_data="", limits=None, batch=False):
+    """
+    Execute code using configured API (Piston, Judge0 or the local executor).
+    
+    Args:
+        language (str): Programming language (JAVA, PYTHON, CPP, JAVASCRIPT)
+        code (str): Source code to execute
+        input_data (str): Input data for stdin
+        limits (dict): Optional per-problem limits {'time_limit': seconds,
+            'memory_limit': MB}; the backend stops the run once they are exceeded
+        batch (bool): The code is a batch harness running many test cases
+            (see build_batch_harness)
+        
+    Returns:
+        dict: Execution result with keys:
+            - output (str): Standard output
+            - error (str): Error message if any
+            - status (str): Execution status description
+            - status_id (int): Status ID
+            - time (str): Execution time
+            - memory (int): Memory used in KB
+            - wall_time (float): Wall-clock seconds (measured around the call
+              when the backend does not report it)
+            - cpu_time (float): CPU seconds, None if the backend does not report it
+            - compile_output (str): Compilation output/errors
+    
+    Executions that miss the result cache wait for a scheduler slot first
+    (see problems/scheduler.py). While the configured backend is unhealthy,
+    runs go to EXECUTOR_FAILOVER_API instead, and a run that fails at the
+    backend is retried there once (see problems/executor_router.py).
+    """
+    # Validate inputs
+    if not code or not code.strip():
+        return {
+            'output': '',
+            'error': 'No code provided',
+            'status': 'Error',
+            'status_id': 0,
+            'time': '0',
+            'memory': 0,
+            'compile_output': ''
+        }
+    
+    limits = resolve_execution_limits(limits)
+    
+    # Piston and Judge0 are skipped while their circuit is open (see problems/executor_router.py)
+    router = get_executor_router()
+    backend = router.choose_backend()
+    if backend is None:
+        return build_executor_unavailable_result()
+    
+    result = execute_code_on_backend(backend, language, code, input_data, limits, batch)
+    if is_backend_failure(result):
+        failover = router.get_failover(backend)
+        if failover:
+            result = execute_code_on_backend(failover, language, code, input_data, limits, batch)
+    return result
+
+
+def execute_code_on_backend(backend, language, code, input_data, limits, batch=False):
+    """
+    Execute code on one backend, through the result cache and the scheduler.
+    
+    Args:
+        backend (str): 'piston', 'judge0' or 'local'
+        language (str): Programming language
+        code (str): Source code to execute
+        input_data (str): Input data for stdin
+        limits (dict): Resolved per-problem limits, or None
+        batch (bool): The code is a batch harness (see execute_code)
+        
+    Returns:
+        dict: Execution result in the execute_code format
+    """
+    code, cache_key = prepare_backend_execution(backend, language, code, input_data, limits)
+    
+    # Identical runs are answered from the result cache
+    result_cache = get_result_cache()
+    cached_result = result_cache.get(cache_key)
+    if cached_result is not None:
+        return cached_result
+    
+    with execution_slot() as scheduled:
+        if not scheduled:
+            return build_not_started_result()
+        
+        # Route to appropriate API
+        started = time.monotonic()
+        if backend == 'piston':
+            result = execute_code_piston(language, code, input_data, limits)
+        elif backend == 'local':
+            result = execute_code_local(language, code, input_data, limits)
+        else:
+            result = execute_code_judge0(language, code, input_data, limits)
+    
+    result = complete_backend_result(backend, result, time.monotonic() - started, batch)
+    if is_cacheable_result(result):
+        result_cache.set(cache_key, result)
+    return result
+
+
+def prepare_backend_execution(backend, language, code, input_data, limits):
+    """
+    Source a backend actually runs, and the result cache key of the run.
+    
+    Args:
+        backend (str): 'piston', 'judge0' or 'local'
+        language (str): Programming language
+        code (str): Source code to execute
+        input_data (str): Input data for stdin
+        limits (dict): Resolved per-problem limits, or None
+        
+    Returns:
+        tuple: (source code, cache key)
+    """
+    # Piston and the local executor run Java through wrap_java_code; key the cache on what is actually executed
+    if backend in ('piston', 'local') and language.upper() == 'JAVA':
+        # The warm JVM pool provides the helper classes from its own library
+        code = wrap_java_code(code, helper_classes=not (backend == 'local' and LOCAL_JVM_POOL_SIZE))
+    
+    cache_key = make_execution_key(
+        backend, language.upper(), get_runtime_version(backend, language), code, input_data, limits
+    )
+    return code, cache_key
+
+
+def complete_backend_result(backend, result, elapsed, batch=False):
+    """
+    Record a backend call with the executor router and fill in its timings.
+    
+    The service's overhead is only recorded when the backend reports the
+    program's own run time; otherwise (and for batch harnesses, which run
+    every test case in one call) a long call may just be a long program, and
+    only the call's outcome is recorded.
+    
+    Args:
+        backend (str): Backend that ran the code
+        result (dict): Execution result returned by the backend
+        elapsed (float): Seconds the backend call took
+        batch (bool): The code was a batch harness
+        
+    Returns:
+        dict: The result, with wall_time (measured around the call when the
+        backend does not report it) and cpu_time always present
+    """
+    overhead = None
+    if not batch and result.get('wall_time') is not None:
+        overhead = max(elapsed - result['wall_time'], 0)
+    get_executor_router().record(backend, overhead, is_backend_failure(result))
+    if result.get('wall_time') is None:
+        result['wall_time'] = round(elapsed, 3)
+    result.setdefault('cpu_time', None)
+    return result
+
+
+def build_not_started_result():
+    """Execution result for a run whose wait for a scheduler slot was given up."""
+    return {
+        'output': '',
+        'error': 'Execution was cancelled before it started',
+        'status': 'Error',
+        'status_id': 0,
+        'time': '0',
+        'memory': 0,
+        'compile_output': ''
+    }
+
+
+def is_backend_failure(result):
+    """
+    Whether an execution failed at the execution service rather than in the program.
+    
+    Request errors (including 429 and 5xx responses) and Judge0 submissions
+    that never finished count; compile errors, runtime errors and time limits
+    of the program itself do not.
+    
+    Args:
+        result (dict): Execution result in the execute_code format
+        
+    Returns:
+        bool: True if the result reports a backend failure
+    """
+    error = result.get('error') or ''
+    return (
+        error.startswith((PISTON_API_ERROR_PREFIX, JUDGE0_API_ERROR_PREFIX))
+        or error == EXECUTION_TIMEOUT_MESSAGE
+    )
+
+
+def build_executor_unavailable_result():
+    """
+    Execution result for a run that no healthy backend can take.
+    
+    Returned at once while the configured backend's circuit is open and no
+    failover backend is healthy, instead of waiting out the backend's timeout.
+    
+    Returns:
+        dict: Execution result in the execute_code format
+    """
+    return {
+        'output': '',
+        'error': 'Code execution service is temporarily unavailable. Please try again shortly.',
+        'status': 'Error',
+        'status_id': 0,
+        'time': '0',
+        'memory': 0,
+        'compile_output': ''
+    }
+
+
+def probe_backend(backend):
+    """
+    Run a trivial program on a backend to see whether it has recovered.
+    
+    Used by the executor router while the backend's circuit is open; the
+    probe bypasses the result cache and the scheduler.
+    
+    Args:
+        backend (str): 'piston' or 'judge0'
+        
+    Returns:
+        bool: True if the backend answered without a backend failure
+    """
+    if backend == 'piston':
+        result = execute_code_piston('PYTHON', 'print(1)')
+    else:
+        result = execute_code_judge0('PYTHON', 'print(1)')
+    return not is_backend_failure(result)
+
+
+def resolve_execution_limits(limits):
+    """
+    Complete per-problem limits with the wall-clock budget derived from them.
+    
+    Args:
+        limits (dict): {'time_limit': seconds, 'memory_limit': MB}, either may be None
+        
+    Returns:
+        dict: {'time_limit': float, 'wall_time_limit': float, 'memory_limit': int}
+        with None for unset limits, or None when no limit is set at all
+    """
+    if not limits or not (limits.get('time_limit') or limits.get('memory_limit')):
+        return None
+    time_limit = float(limits['time_limit']) if limits.get('time_limit') else None
+    return {
+        'time_limit': time_limit,
+        'wall_time_limit': time_limit * TIME_LIMIT_WALL_FACTOR + TIME_LIMIT_WALL_GRACE if time_limit else None,
+        'memory_limit': int(limits['memory_limit']) if limits.get('memory_limit') else None,
+    }
+
+
+def get_runtime_version(backend, language):
+    """
+    Identify the compiler/interpreter a backend will use for a language.
+    
+    Args:
+        backend (str): Execution backend (piston, judge0 or local)
+        language (str): Programming language
+        
+    Returns:
+        str: Version identifier ('*' means the backend's latest)
+    """
+    if backend == 'piston':
+        return PISTON_LANGUAGE_VERSIONS.get(language.upper(), '*')
+    if backend == 'local':
+        return get_local_runtime_version(language)
+    return str(JUDGE0_LANGUAGE_IDS.get(language.upper(), ''))
+
+
+def execute_code_judge0(language, code, input_data="", limits=None):
+    """
+    Execute code using Judge0 API.
+    
+    Args:
+        language (str): Programming language (JAVA, PYTHON, CPP, JAVASCRIPT)
+        code (str): Source code to execute
+        input_data (str): Input data for stdin
+        limits (dict): Resolved per-problem limits, or None
+        
+    Returns:
+        dict: Execution result with keys:
+            - output (str): Standard output
+            - error (str): Error message if any
+            - status (str): Execution status description
+            - status_id (int): Status ID
+            - time (str): Execution time
+            - memory (int): Memory used in KB
+            - compile_output (str): Compilation output/errors
+            
+    Raises:
+        ValueError: If language is not supported
+        Exception: For other errors during execution
+    """
+    try:
+        # Create submission
+        token = create_submission(language, code, input_data, limits)
+        
+        # Poll for result
+        result = poll_submission_result(token)
+        
+        return format_judge0_result(result)
+        
+    except Exception as e:
+        return build_judge0_error_result(e)
+
+
+def format_judge0_result(result):
+    """
+    Extract and decode the fields of a finished Judge0 submission.
+    
+    Args:
+        result (dict): Submission as returned by the Judge0 API
+        
+    Returns:
+        dict: Execution result in the execute_code format
+    """
+    status = result.get('status') or {}
+    return {
+        'output': decode_base64(result.get('stdout', '')),
+        'error': decode_base64(result.get('stderr', '')),
+        'status': status.get('description', 'Unknown'),
+        'status_id': status.get('id', 0),
+        'time': result.get('time', '0'),
+        'memory': result.get('memory', 0),
+        'wall_time': parse_seconds(result.get('wall_time')),
+        'cpu_time': parse_seconds(result.get('time')),
+        'compile_output': decode_base64(result.get('compile_output', ''))
+    }
+
+
+def parse_seconds(value):
+    """
+    Parse a duration in seconds as reported by Judge0 (a string such as "0.012").
+    
+    Returns:
+        float: Seconds, or None if the value is missing or malformed
+    """
+    try:
+        return round(float(value), 3) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def build_judge0_error_result(error):
+    """
+    Turn an exception raised while talking to Judge0 into an execution result.
+    
+    Args:
+        error (Exception): The exception
+        
+    Returns:
+        dict: Execution result in the execute_code format
+    """
+    if isinstance(error, ValueError):
+        # Language validation error
+        message, status, status_id = str(error), 'Error', 0
+    elif isinstance(error, TimeoutError):
+        # Execution timeout
+        message, status, status_id = str(error), 'Time Limit Exceeded', 5
+    elif isinstance(error, requests.RequestException):
+        # API request error
+        message, status, status_id = f'{JUDGE0_API_ERROR_PREFIX}{str(error)}', 'Error', 0
+    else:
+        # Unexpected error
+        message, status, status_id = f'Unexpected error: {str(error)}', 'Error', 0
+    
+    return {
+        'output': '',
+        'error': message,
+        'status': status,
+        'status_id': status_id,
+        'time': '0',
+        'memory': 0,
+        'compile_output': ''
+    }
+
+
+def create_submissions_batch(language, submissions, limits=None):
+    """
+    Create several submissions on Judge0 with a single request.
+    
+    Args:
+        language (str): Programming language
+        submissions (list): (source_code, stdin) pairs, at most JUDGE0_BATCH_SIZE
+        limits (dict): Resolved per-problem limits applied to every submission, or None
+        
+    Returns:
+        list: Submission tokens, in the same order as `submissions`
+        
+    Raises:
+        requests.RequestException: If API request fails
+        ValueError: If any submission was rejected
+    """
+    batch_data = build_judge0_batch(language, submissions, limits)
+    
+    headers = {
+        "Content-Type": "application/json",
+        "X-RapidAPI-Key": JUDGE0_API_KEY,
+        "X-RapidAPI-Host": JUDGE0_API_HOST
+    }
+    
+    url = f"{JUDGE0_API_URL}/submissions/batch?base64_encoded=true"
+    response = get_executor_client().post(url, json=batch_data, headers=headers)
+    response.raise_for_status()
+    
+    return parse_judge0_batch_tokens(response.json(), len(submissions))
+
+
+def build_judge0_batch(language, submissions, limits=None):
+    """
+    Build the body of a Judge0 batch submission request.
+    
+    Args:
+        language (str): Programming language
+        submissions (list): (source_code, stdin) pairs
+        limits (dict): Resolved per-problem limits applied to every submission, or None
+        
+    Returns:
+        dict: {"submissions": [...]} (base64-encoded sources and stdins)
+        
+    Raises:
+        ValueError: If language is not supported
+    """
+    language_id = get_language_id(language)
+    
+    batch_data = {
+        "submissions": [
+            {
+                "language_id": language_id,
+                "source_code": encode_base64(source_code),
+                "stdin": encode_base64(stdin),
+                **get_judge0_limit_fields(limits)
+            }
+            for source_code, stdin in submissions
+        ]
+    }
+    if JUDGE0_CALLBACK_URL:
+        for submission in batch_data["submissions"]:
+            submission["callback_url"] = get_judge0_callback_url()
+    return batch_data
+
+
+def parse_judge0_batch_tokens(items, count):
+    """
+    Extract the tokens from a Judge0 batch submission response.
+    
+    Args:
+        items (list): Response body, one entry per submission
+        count (int): Number of submissions sent
+        
+    Returns:
+        list: Submission tokens, in submission order
+        
+    Raises:
+        ValueError: If any submission was rejected or entries are missing
+    """
+    tokens = []
+    for item in items:
+        token = item.get('token') if isinstance(item, dict) else None
+        if not token:
+            raise ValueError(f"Judge0 rejected a batch submission: {item}")
+        tokens.append(token)
+    
+    if len(tokens) != count:
+        raise ValueError("Judge0 returned an unexpected number of tokens")
+    
+    return tokens
+
+
+def get_submissions_batch(tokens):
+    """
+    Retrieve several submission results from Judge0 with a single request.
+    
+    Args:
+        tokens (list): Submission tokens
+        
+    Returns:
+        list: Submission results in token order (None for unknown tokens)
+        
+    Raises:
+        requests.RequestException: If API request fails
+    """
+    headers = {
+        "X-RapidAPI-Key": JUDGE0_API_KEY,
+        "X-RapidAPI-Host": JUDGE0_API_HOST
+    }
+    
+    url = f"{JUDGE0_API_URL}/submissions/batch"
+    params = {
+        'tokens': ','.join(tokens),
+        'base64_encoded': 'true',
+        'fields': '*'
+    }
+    response = get_executor_client().get(url, headers=headers, params=params)
+    response.raise_for_status()
+    
+    return response.json().get('submissions', [])
+
+
+def poll_submissions_batch(tokens, timeout=JUDGE0_POLL_TIMEOUT, cancel_event=None, on_finished=None):
+    """
+    Wait for several submissions to finish, polling with backoff.
+    
+    Each round fetches only the tokens that are still queued or processing,
+    all in one batched request. In callback mode tokens reported by Judge0
+    are taken as soon as they arrive.
+    
+    Args:
+        tokens (list): Submission tokens
+        timeout (float): Maximum seconds to wait
+        cancel_event (threading.Event): Stops polling early once set
+        on_finished (callable): Called with (token, result) for each
+            submission as soon as it is known to have finished
+        
+    Returns:
+        dict: Mapping of token to its finished submission result. Tokens that
+        did not finish before cancellation are missing.
+        
+    Raises:
+        TimeoutError: If some results are not ready before the timeout
+        requests.RequestException: If API request fails
+    """
+    finished = {}
+    pending = list(tokens)
+    
+    def collect(new_results):
+        for token in pending:
+            if token in new_results and token not in finished:
+                finished[token] = new_results[token]
+                if on_finished:
+                    on_finished(token, finished[token])
+    
+    judge0_completions.register(tokens)
+    try:
+        for delay in get_poll_delays(timeout):
+            if cancel_event and cancel_event.is_set():
+                return finished
+            
+            collect(wait_for_judge0(pending, delay))
+            pending = [token for token in pending if token not in finished]
+            if cancel_event and cancel_event.is_set():
+                return finished
+            
+            # Judge0 caps the number of tokens per batched GET as well
+            results = []
+            for start in range(0, len(pending), JUDGE0_BATCH_SIZE):
+                results.extend(get_submissions_batch(pending[start:start + JUDGE0_BATCH_SIZE]))
+            
+            collect({
+                token: result
+                for token, result in zip(pending, results)
+                if is_judge0_finished(result)
+            })
+            
+            pending = [token for token in pending if token not in finished]
+            if not pending:
+                return finished
+    finally:
+        judge0_completions.unregister(tokens)
+    
+    raise TimeoutError(EXECUTION_TIMEOUT_MESSAGE)
+
+
+# ==================== TEST CASE EXECUTION ====================
+
+_test_case_pool = None
+_test_case_pool_lock = threading.Lock()
+
+
+def get_test_case_concurrency(language, backend=None):
+    """
+    Number of test cases a single submission may have in flight at once.
+    
+    Uses the per-language override when one is configured, otherwise the
+    deployment-wide default, and never exceeds the shared pool size. With
+    several Piston hosts the concurrency applies per host, so a submission's
+    cases are spread across all of them (each host still takes at most
+    EXECUTOR_ENDPOINT_MAX_CONCURRENCY requests, see EndpointPool).
+    
+    Args:
+        language (str): Programming language (JAVA, PYTHON, CPP, JAVASCRIPT)
+        backend (str): Backend the cases run on, if known
+        
+    Returns:
+        int: Concurrency level (1 means run sequentially)
+    """
+    concurrency = int(TEST_CASE_CONCURRENCY_BY_LANGUAGE.get(language.upper(), TEST_CASE_CONCURRENCY))
+    if backend == 'piston' and len(PISTON_API_URLS) > 1:
+        concurrency *= len(PISTON_API_URLS)
+        capacity = get_executor_client().get_endpoint_pool('piston', PISTON_API_URLS).capacity
+        if capacity:
+            concurrency = min(concurrency, capacity)
+    return max(1, min(concurrency, TEST_CASE_MAX_WORKERS))
+
+
+def get_test_case_pool():
+    """
+    Return the process-wide thread pool used to run test cases concurrently.
+    
+    The pool is created lazily so that forked gunicorn workers each get their own.
+    
+    Returns:
+        ThreadPoolExecutor: Shared, bounded pool of TEST_CASE_MAX_WORKERS threads
+    """
+    global _test_case_pool
+    with _test_case_pool_lock:
+        if _test_case_pool is None:
+            _test_case_pool = ThreadPoolExecutor(
+                max_workers=TEST_CASE_MAX_WORKERS,
+                thread_name_prefix='codevault-test-case'
+            )
+        return _test_case_pool
+
+
+def normalize_output(text):
+    """Trim trailing whitespace and unify newlines for fair comparison."""
+    if text is None:
+        return ""
+    # Strip outer whitespace, trim each line's right side, and rejoin
+    lines = [line.rstrip() for line in str(text).strip().splitlines()]
+    return "\n".join(lines)
+
+
+def build_test_case_result(idx, test_case, execution_result, limits=None):
+    """
+    Compare an execution result against a test case's expected output.
+    
+    Args:
+        idx (int): 1-based position of the test case
+        test_case (dict): Test case with input, output and explanation
+        execution_result (dict): Result in the execute_code format
+        limits (dict): Resolved per-problem limits the case is judged against, or None
+        
+    Returns:
+        dict: Result entry as described in run_test_cases
+    """
+    test_input = test_case.get('input', '')
+    expected_output = normalize_output(test_case.get('output', ''))
+    explanation = test_case.get('explanation', '')
+    metrics = get_execution_metrics(execution_result)
+    
+    # Check for compilation or runtime errors
+    if execution_result.get('compile_output'):
+        return {
+            'test_case': idx,
+            'input': test_input,
+            'expected': expected_output,
+            'actual': '',
+            'passed': False,
+            'verdict': 'Compilation Error',
+            'error': COMPILE_ERROR_PREFIX + execution_result['compile_output'],
+            'time': execution_result.get('time', '0'),
+            **metrics,
+            'explanation': explanation
+        }
+    
+    # A run over its limits fails whatever it printed
+    limit_verdict = get_limit_verdict(execution_result, limits)
+    if limit_verdict:
+        return {
+            'test_case': idx,
+            'input': test_input,
+            'expected': expected_output,
+            'actual': normalize_output(execution_result.get('output', '')),
+            'passed': False,
+            'verdict': limit_verdict,
+            'error': describe_limit_verdict(limit_verdict, limits),
+            'time': execution_result.get('time', '0'),
+            **metrics,
+            'explanation': explanation
+        }
+    
+    if execution_result.get('error') and execution_result.get('status') != 'Accepted':
+        return {
+            'test_case': idx,
+            'input': test_input,
+            'expected': expected_output,
+            'actual': '',
+            'passed': False,
+            # Status 0 is a failure of the executor rather than of the program
+            'verdict': 'Runtime Error' if execution_result.get('status_id') else 'Error',
+            'error': execution_result['error'],
+            'time': execution_result.get('time', '0'),
+            **metrics,
+            'explanation': explanation
+        }
+    
+    # Get actual output
+    actual_output = normalize_output(execution_result.get('output', ''))
+    # Compare outputs (normalize whitespace)
+    passed = actual_output == expected_output
+    
+    return {
+        'test_case': idx,
+        'input': test_input,
+        'expected': expected_output,
+        'actual': actual_output,
+        'passed': passed,
+        'verdict': 'Accepted' if passed else 'Wrong Answer',
+        'error': '',
+        'time': execution_result.get('time', '0'),
+        **metrics,
+        'explanation': explanation
+    }
+
+
+def get_limit_verdict(execution_result, limits=None):
+    """
+    Decide whether a run exceeded its time or memory limit.
+    
+    Backends that stop a run at its limit report 'Time Limit Exceeded'
+    themselves. On top of that the measured CPU time and peak memory are
+    checked against the per-problem limits (rlimits only work in whole
+    seconds, and not every backend enforces memory the same way), and a run
+    that died of a failed allocation counts as exceeding its memory.
+    
+    Args:
+        execution_result (dict): Result in the execute_code format
+        limits (dict): Resolved per-problem limits, or None
+        
+    Returns:
+        str: 'Time Limit Exceeded', 'Memory Limit Exceeded' or None
+    """
+    cpu_time = execution_result.get('cpu_time')
+    memory = execution_result.get('memory') or 0
+    time_limit = limits['time_limit'] if limits else None
+    memory_limit = limits['memory_limit'] if limits else None
+    
+    if execution_result.get('status_id') == 5 or (time_limit and cpu_time is not None and cpu_time > time_limit):
+        return 'Time Limit Exceeded'
+    if memory_limit and memory > memory_limit * 1024:
+        return 'Memory Limit Exceeded'
+    if OUT_OF_MEMORY_PATTERN.search(execution_result.get('error') or ''):
+        return 'Memory Limit Exceeded'
+    return None
+
+
+def describe_limit_verdict(verdict, limits=None):
+    """Error message for a test case that exceeded a limit."""
+    if verdict == 'Time Limit Exceeded' and limits and limits['time_limit']:
+        return f"{verdict} ({limits['time_limit']:g}s)"
+    if verdict == 'Memory Limit Exceeded' and limits and limits['memory_limit']:
+        return f"{verdict} ({limits['memory_limit']} MB)"
+    return verdict
+
+
+def get_execution_metrics(execution_result):
+    """
+    Resource usage of one execution, for test case results.
+    
+    Args:
+        execution_result (dict): Result in the execute_code format
+        
+    Returns:
+        dict: {'wall_time': float, 'cpu_time': float, 'memory': int}
+        (seconds, seconds, peak KB); None where the backend reports nothing
+    """
+    return {
+        'wall_time': execution_result.get('wall_time'),
+        'cpu_time': execution_result.get('cpu_time'),
+        # 0 means "not reported" for Piston and batch harness results
+        'memory': execution_result.get('memory') or None,
+    }
+
+
+def summarize_metrics(results):
+    """
+    Aggregate per-case resource usage across test case results.
+    
+    Cases without a value for a metric (not run, or not reported by the
+    backend) are left out of that metric's aggregates.
+    
+    Args:
+        results (list): Test case result entries
+        
+    Returns:
+        dict: {
+            'wall_time': {'max': float, 'p50': float, 'total': float},
+            'cpu_time': {'max': float, 'p50': float, 'total': float},
+            'memory': {'max': int, 'p50': int}
+        }
+        with None in place of a metric no case reported
+    """
+    def aggregate(name, include_total=True):
+        values = sorted(result[name] for result in results if result.get(name) is not None)
+        if not values:
+            return None
+        summary = {'max': values[-1], 'p50': values[(len(values) - 1) // 2]}
+        if include_total:
+            summary['total'] = round(sum(values), 3)
+        return summary
+    
+    return {
+        'wall_time': aggregate('wall_time'),
+        'cpu_time': aggregate('cpu_time'),
+        # Peak memory of separate runs does not add up
+        'memory': aggregate('memory', include_total=False),
+    }
+
+
+def prepare_test_case_source(language, code, test_case):
+    """
+    Build the source and stdin that run a single test case.
+    
+    Args:
+        language (str): Programming language (JAVA, PYTHON, CPP, JAVASCRIPT)
+        code (str): Source code to execute
+        test_case (dict): Test case with input, output and explanation
+        
+    Returns:
+        tuple: (source code, stdin)
     """
-    language_upper = language.upper()
-    if language_upper not in JUDGE0_LANGUAGE_IDS:
-        raise ValueError(f"Unsupported language: {language}. Supported: {', '.join(JUDGE0_LANGUAGE_IDS.keys())}")
-    return JUDGE0_LANGUAGE_IDS[language_upper]
+    test_input = test_case.get('input', '')
+    
+    # For Java, use special test harness that parses input and calls methods
+    if language.upper() == 'JAVA':
+        return wrap_java_test_code(code, test_input, normalize_output(test_case.get('output', ''))), ''
+    
+    # For other languages, pass input as stdin
+    return code, test_input
 
 
-def encode_base64(text):
+def run_test_case(language, code, idx, test_case, limits=None):
     """
-    Encode text to base64 string.
+    Run code against a single test case.
     
     Args:
-        text (str): Text to encode
+        language (str): Programming language (JAVA, PYTHON, CPP, JAVASCRIPT)
+        code (str): Source code to execute
+        idx (int): 1-based position of the test case
+        test_case (dict): Test case with input, output and explanation
+        limits (dict): Resolved per-problem limits, or None
         
     Returns:
-        str: Base64 encoded string
+        dict: Result entry as described in run_test_cases
     """
-    if not text:
-        return ""
-    return base64.b64encode(text.encode('utf-8')).decode('utf-8')
+    test_code, stdin = prepare_test_case_source(language, code, test_case)
+    execution_result = execute_code(language, test_code, stdin, limits)
+    return build_test_case_result(idx, test_case, execution_result, limits)
 
 
-def decode_base64(encoded_text):
+def build_not_run_result(idx, test_case, reason, verdict='Not Run'):
     """
-    Decode base64 string to text.
+    Build the result entry for a test case that was never executed.
     
     Args:
-        encoded_text (str): Base64 encoded string
+        idx (int): 1-based position of the test case
+        test_case (dict): Test case with input, output and explanation
+        reason (str): Why the case was not run
+        verdict (str): Verdict to report for the case
         
     Returns:
-        str: Decoded text
+        dict: Failed result entry carrying the reason as its error
     """
-    if not encoded_text:
-        return ""
+    return {
+        'test_case': idx,
+        'input': test_case.get('input', ''),
+        'expected': normalize_output(test_case.get('output', '')),
+        'actual': '',
+        'passed': False,
+        'verdict': verdict,
+        'error': reason,
+        'time': '0',
+        'wall_time': None,
+        'cpu_time': None,
+        'memory': None,
+        'explanation': test_case.get('explanation', '')
+    }
+
+
+def run_test_case_safely(language, code, idx, test_case, limits=None):
+    """Run a single test case, turning unexpected exceptions into a failed result."""
     try:
-        return base64.b64decode(encoded_text.encode('utf-8')).decode('utf-8')
-    except Exception:
-        return encoded_text
+        return run_test_case(language, code, idx, test_case, limits)
+    except Exception as e:
+        return build_not_run_result(idx, test_case, f'Unexpected error: {str(e)}', verdict='Error')
 
 
-def create_submission(language, source_code, stdin=""):
+def run_test_cases_concurrently(language, code, cases, concurrency, cancel_event=None, limits=None, on_result=None):
     """
-    Create a code submission on Judge0.
+    Run test cases on the shared pool, keeping at most `concurrency` in flight.
+    
+    Cases are only handed to the pool as earlier ones finish, so a cancelled
+    submission never has more than `concurrency` executions left running.
+    Cases run in a copy of the caller's context (see execution_tokens), and
+    results that arrive once cancel_event is set are discarded.
     
     Args:
         language (str): Programming language
-        source_code (str): Source code to execute
-        stdin (str): Standard input for the program
+        code (str): Source code to execute
+        cases (list): (idx, test_case) pairs in scheduling order
+        concurrency (int): Maximum number of cases in flight
+        cancel_event (threading.Event): Stops scheduling new cases once set
+        limits (dict): Resolved per-problem limits, or None
+        on_result (callable): Called with each result entry as its case finishes
         
     Returns:
-        str: Submission token
-        
-    Raises:
-        requests.RequestException: If API request fails
-        ValueError: If response is invalid
+        dict: Mapping of test case idx to its result entry (missing when not run)
     """
-    language_id = get_language_id(language)
-    
-    # Prepare submission data
-    submission_data = {
-        "language_id": language_id,
-        "source_code": encode_base64(source_code),
-        "stdin": encode_base64(stdin),
-        "wait": False
-    }
-    
-    # API headers
-    headers = {
-        "content-type": "application/json",
-        "Content-Type": "application/json",
-        "X-RapidAPI-Key": JUDGE0_API_KEY,
-        "X-RapidAPI-Host": JUDGE0_API_HOST
-    }
+    pool = get_test_case_pool()
+    remaining = iter(cases)
+    pending = {}
+    results = {}
     
-    # Create submission
-    url = f"{JUDGE0_API_URL}/submissions?base64_encoded=true&fields=*"
-    response = requests.post(url, json=submission_data, headers=headers, timeout=10)
-    response.raise_for_status()
+    try:
+        while True:
+            # Top up the window unless the request has been aborted
+            while len(pending) < concurrency and not (cancel_event and cancel_event.is_set()):
+                try:
+                    idx, test_case = next(remaining)
+                except StopIteration:
+                    break
+                future = pool.submit(
+                    contextvars.copy_context().run, run_test_case_safely, language, code, idx, test_case, limits
+                )
+                pending[future] = idx
+            
+            if not pending or (cancel_event and cancel_event.is_set()):
+                break
+            
+            # Wake up periodically so cancellation is noticed while cases run
+            done, _ = wait(pending, timeout=CANCEL_CHECK_INTERVAL, return_when=FIRST_COMPLETED)
+            if cancel_event and cancel_event.is_set():
+                # e.g. killed because the submission was superseded
+                break
+            for future in done:
+                result = results[pending.pop(future)] = future.result()
+                if on_result:
+                    on_result(result)
+    finally:
+        # Anything still queued is dropped; running cases finish in the background
+        for future in pending:
+            future.cancel()
     
-    result = response.json()
-    token = result.get('token')
+    return results
+
+
+def run_test_cases_batched(language, code, cases, limits=None):
+    """
+    Run a set of test cases in a single execution using a batch harness.
     
-    if not token:
-        raise ValueError("No token returned from Judge0 API")
+    Per-problem limits are enforced per case by the harness; the execution
+    as a whole runs under the backend's default limits.
     
-    return token
+    Args:
+        language (str): Programming language with a batch harness
+        code (str): Source code to execute
+        cases (list): (idx, test_case) pairs to run, in order
+        limits (dict): Resolved per-problem limits, or None
+        
+    Returns:
+        dict: Mapping of test case idx to its result entry. Cases whose output
+        could not be recovered from the harness are left out so the caller can
+        run them individually.
+    """
+    harness, nonce = build_batch_harness(language, code, cases, limits)
+    execution_result = execute_code(language, harness, '', batch=True)
+    return parse_batch_results(cases, nonce, execution_result, limits)
 
 
-def get_submission_result(token):
+def parse_batch_results(cases, nonce, execution_result, limits=None):
     """
-    Retrieve submission result from Judge0.
+    Split the output of a batch harness execution into per-case results.
     
     Args:
-        token (str): Submission token
+        cases (list): (idx, test_case) pairs the harness ran
+        nonce (str): Frame marker of the harness (see build_batch_harness)
+        execution_result (dict): Result of executing the harness
+        limits (dict): Resolved per-problem limits, or None
         
     Returns:
-        dict: Submission result
-        
-    Raises:
-        requests.RequestException: If API request fails
+        dict: Mapping of test case idx to its result entry (see run_test_cases_batched)
     """
-    headers = {
-        "X-RapidAPI-Key": JUDGE0_API_KEY,
-        "X-RapidAPI-Host": JUDGE0_API_HOST
-    }
+    stdout_frames = parse_batch_frames(nonce, execution_result.get('output', ''))
+    stderr_frames = parse_batch_frames(nonce, execution_result.get('error', ''))
     
-    url = f"{JUDGE0_API_URL}/submissions/{token}?base64_encoded=true&fields=*"
-    response = requests.get(url, headers=headers, timeout=10)
-    response.raise_for_status()
+    # A compile failure means no case ran; it applies to every case alike
+    if not stdout_frames and execution_result.get('compile_output'):
+        return {
+            idx: build_test_case_result(idx, test_case, execution_result)
+            for idx, test_case in cases
+        }
     
-    return response.json()
+    results = {}
+    for idx, test_case in cases:
+        if idx not in stdout_frames:
+            continue
+        stdout, exit_code, metrics = stdout_frames[idx]
+        stderr, _, _ = stderr_frames.get(idx, ('', exit_code, metrics))
+        case_result = build_batch_case_result(stdout, stderr, exit_code, metrics)
+        results[idx] = build_test_case_result(idx, test_case, case_result, limits)
+    return results
 
 
-def poll_submission_result(token, max_attempts=MAX_POLL_ATTEMPTS, interval=POLL_INTERVAL):
+def run_test_cases_judge0_batch(language, code, cases, cancel_event=None, limits=None, on_result=None):
     """
-    Poll for submission result until completion.
+    Run test cases on Judge0 using its batch endpoints.
+    
+    All cases are created with batched POSTs and then polled together with
+    batched GETs, instead of one create and one polling loop per case.
     
     Args:
-        token (str): Submission token
-        max_attempts (int): Maximum number of polling attempts
-        interval (float): Seconds to wait between attempts
+        language (str): Programming language
+        code (str): Source code to execute
+        cases (list): (idx, test_case) pairs to run
+        cancel_event (threading.Event): Stops polling early once set
+        limits (dict): Resolved per-problem limits, or None
+        on_result (callable): Called with each result entry as its case finishes
         
     Returns:
-        dict: Final submission result
-        
-    Raises:
-        TimeoutError: If result not ready after max attempts
-        requests.RequestException: If API request fails
+        dict: Mapping of test case idx to its result entry (missing when the
+        run was cancelled before the case finished)
     """
-    for attempt in range(max_attempts):
-        result = get_submission_result(token)
-        status_id = result.get('status', {}).get('id')
-        
-        # Status IDs: 1=In Queue, 2=Processing, 3=Accepted, 4+=Error/Failed
-        # Wait if still processing (status 1 or 2)
-        if status_id in [1, 2]:
-            time.sleep(interval)
-            continue
-        
-        # Result ready
-        return result
+    submissions = [prepare_test_case_source(language, code, test_case) for _, test_case in cases]
+    cases_by_token = {}
+    results = {}
+    
+    def on_finished(token, result):
+        idx, test_case = cases_by_token[token]
+        results[idx] = build_test_case_result(idx, test_case, format_judge0_result(result), limits)
+        if on_result:
+            on_result(results[idx])
+    
+    error_result = None
+    try:
+        # The whole batch counts as one execution for the scheduler
+        with execution_slot() as scheduled:
+            if scheduled:
+                tokens = []
+                for start in range(0, len(submissions), JUDGE0_BATCH_SIZE):
+                    tokens.extend(
+                        create_submissions_batch(language, submissions[start:start + JUDGE0_BATCH_SIZE], limits)
+                    )
+                cases_by_token = dict(zip(tokens, cases))
+                poll_submissions_batch(tokens, cancel_event=cancel_event, on_finished=on_finished)
+    except Exception as e:
+        error_result = build_judge0_error_result(e)
+        for idx, test_case in cases:
+            if idx not in results:
+                results[idx] = build_test_case_result(idx, test_case, error_result)
+                if on_result:
+                    on_result(results[idx])
+    
+    # A batch runs many programs at once, so only its outcome is recorded, not its latency
+    get_executor_router().record('judge0', None, error_result is not None and is_backend_failure(error_result))
     
-    raise TimeoutError("Code execution timed out. Please try again.")
+    return results
 
 
-def execute_code(language, code, input_data=""):
+def get_compile_error(results):
     """
-    Execute code using configured API (Piston or Judge0).
+    Compiler output from a set of test case results, if compilation failed.
     
     Args:
-        language (str): Programming language (JAVA, PYTHON, CPP, JAVASCRIPT)
-        code (str): Source code to execute
-        input_data (str): Input data for stdin
+        results (dict): Mapping of test case idx to result entry
         
     Returns:
-        dict: Execution result with keys:
-            - output (str): Standard output
-            - error (str): Error message if any
-            - status (str): Execution status description
-            - status_id (int): Status ID
-            - time (str): Execution time
-            - memory (int): Memory used in KB
-            - compile_output (str): Compilation output/errors
+        str: Compiler output of the first case that did not compile, or ''
     """
-    # Validate inputs
-    if not code or not code.strip():
-        return {
-            'output': '',
-            'error': 'No code provided',
-            'status': 'Error',
-            'status_id': 0,
-            'time': '0',
-            'memory': 0,
-            'compile_output': ''
-        }
-    
-    # Route to appropriate API
-    if CODE_EXECUTION_API.lower() == 'piston':
-        return execute_code_piston(language, code, input_data)
-    else:
-        return execute_code_judge0(language, code, input_data)
+    for idx in sorted(results):
+        if results[idx]['verdict'] == 'Compilation Error':
+            return results[idx]['error'][len(COMPILE_ERROR_PREFIX):]
+    return ''
 
 
-def execute_code_judge0(language, code, input_data=""):
+def build_compile_error_summary(cases, compile_output):
     """
-    Execute code using Judge0 API.
+    Build the run_test_cases result for a submission that does not compile.
     
     Args:
-        language (str): Programming language (JAVA, PYTHON, CPP, JAVASCRIPT)
-        code (str): Source code to execute
-        input_data (str): Input data for stdin
+        cases (list): (idx, test_case) pairs of the run
+        compile_output (str): Compiler output
         
     Returns:
-        dict: Execution result with keys:
-            - output (str): Standard output
-            - error (str): Error message if any
-            - status (str): Execution status description
-            - status_id (int): Status ID
-            - time (str): Execution time
-            - memory (int): Memory used in KB
-            - compile_output (str): Compilation output/errors
-            
-    Raises:
-        ValueError: If language is not supported
-        Exception: For other errors during execution
+        dict: One 'Compilation Error' verdict for the submission, with every
+        case reported as not run
     """
-    try:
-        # Create submission
-        token = create_submission(language, code, input_data)
-        
-        # Poll for result
-        result = poll_submission_result(token)
-        
-        # Extract and decode result fields
-        return {
-            'output': decode_base64(result.get('stdout', '')),
-            'error': decode_base64(result.get('stderr', '')),
-            'status': result.get('status', {}).get('description', 'Unknown'),
-            'status_id': result.get('status', {}).get('id', 0),
-            'time': result.get('time', '0'),
-            'memory': result.get('memory', 0),
-            'compile_output': decode_base64(result.get('compile_output', ''))
-        }
-        
-    except ValueError as e:
-        # Language validation error
-        return {
-            'output': '',
-            'error': str(e),
-            'status': 'Error',
-            'status_id': 0,
-            'time': '0',
-            'memory': 0,
-            'compile_output': ''
-        }
-        
-    except TimeoutError as e:
-        # Execution timeout
-        return {
-            'output': '',
-            'error': str(e),
-            'status': 'Time Limit Exceeded',
-            'status_id': 5,
-            'time': '0',
-            'memory': 0,
-            'compile_output': ''
-        }
-        
-    except requests.RequestException as e:
-        # API request error
-        return {
-            'output': '',
-            'error': f'API Error: {str(e)}',
-            'status': 'Error',
-            'status_id': 0,
-            'time': '0',
-            'memory': 0,
-            'compile_output': ''
-        }
-        
-    except Exception as e:
-        # Unexpected error
-        return {
-            'output': '',
-            'error': f'Unexpected error: {str(e)}',
-            'status': 'Error',
-            'status_id': 0,
-            'time': '0',
-            'memory': 0,
-            'compile_output': ''
-        }
+    results = [
+        build_not_run_result(idx, test_case, 'Not run: compilation failed')
+        for idx, test_case in cases
+    ]
+    return {
+        'all_passed': False,
+        'passed_count': 0,
+        'total_count': len(cases),
+        'cancelled': False,
+        'stopped_early': False,
+        'verdict': 'Compilation Error',
+        'compile_output': compile_output,
+        'metrics': summarize_metrics(results),
+        'results': results
+    }
 
 
-# ==================== TEST CASE EXECUTION ====================
+class AnyEvent:
+    """
+    Read-only view of several events that counts as set once any of them is.
+    
+    Lets run_test_cases stop its sub-runners both when the caller cancels and
+    when fail-fast mode sees a failing case, through the one cancel_event
+    they already honour.
+    """
+    
+    def __init__(self, *events):
+        self.events = [event for event in events if event is not None]
+    
+    def is_set(self):
+        return any(event.is_set() for event in self.events)
+    
+    @property
+    def cancel_reason(self):
+        """cancel_reason of the first event that is set, if it has one."""
+        for event in self.events:
+            if event.is_set():
+                return getattr(event, 'cancel_reason', None)
+        return None
 
-def run_test_cases(language, code, test_cases):
+
+def run_test_cases(language, code, test_cases, cancel_event=None, limits=None, on_result=None,
+                   stop_on_first_failure=False, priority=None):
     """
     Run code against multiple test cases (LeetCode-style).
     
+    All cases are first packed into a single execution with a batch harness
+    (see build_batch_harness), unless stop_on_first_failure is set. Any case the
+    batch could not cover runs on its own: on Judge0 through one batched
+    submission, otherwise concurrently on a bounded thread pool (see
+    get_test_case_concurrency). Results are always returned in the
+    original test case order.
+    
+    Cases listed in `priority` (typically the ones that failed on the user's
+    previous run, see problems/failure_history.py) are scheduled first. With
+    stop_on_first_failure no further cases are started once one fails, so a
+    broken submission is judged after the failing case instead of after all
+    of them; cases that already ran are still reported. A batch execution
+    runs every case it covers in one go, so fail-fast runs skip it and run
+    their cases one per execution.
+    
+    Compiled languages are compile-checked once before any case runs: locally
+    by compiling without running (the build is then reused through the
+    compile cache), remotely by the batch execution or, failing that, by
+    running the first case alone before the rest. A submission that does not
+    compile gets a single 'Compilation Error' verdict instead of the same
+    compiler output from every case. Remote backends keep no builds, so
+    outside a batch the remote check only saves starting the other cases of
+    code that does not compile; each case that runs is still compiled again.
+    
     Args:
         language (str): Programming language (JAVA, PYTHON, CPP, JAVASCRIPT)
         code (str): Source code to execute
         test_cases (list): Array of test cases with format:
             [{"input": "...", "output": "...", "explanation": "..."}]
+        cancel_event (threading.Event): Optional event; once set, no further
+            test cases are started and the remaining ones are reported as not run
+            (with the event's `cancel_reason`, if it has one, as their error).
+            Every caller passes one: run_tests and execution jobs their
+            execution token (see execution_tokens), streamed runs also an
+            event set when the client disconnects (see streaming).
+        limits (dict): Optional per-problem limits {'time_limit': seconds,
+            'memory_limit': MB} (see Problem.get_execution_limits). Each case
+            is stopped once it exceeds them and judged against them.
+        on_result (callable): Optional; called in the calling thread with each
+            case's result entry as soon as it is known (in completion order)
+        stop_on_first_failure (bool): Start no further cases once one fails
+        priority (list): Optional 1-based test case positions to run first
     
     Returns:
         dict: Test results with pass/fail status for each test case
@@ -1039,6 +3050,11 @@ def run_test_cases(language, code, test_cases):
             'all_passed': bool,
             'passed_count': int,
             'total_count': int,
+            'cancelled': bool,
+            'stopped_early': bool,  # stop_on_first_failure skipped cases
+            'verdict': 'Compilation Error',  # only when the code does not compile,
+            'compile_output': '...',         # every case is then 'Not Run'
+            'metrics': {...},  # max/p50/total across cases, see summarize_metrics
             'results': [
                 {
                     'test_case': 1,
@@ -1046,21 +3062,19 @@ def run_test_cases(language, code, test_cases):
                     'expected': '...',
                     'actual': '...',
                     'passed': bool,
+                    'verdict': '...',    # Accepted, Wrong Answer, Time Limit Exceeded,
+                                         # Memory Limit Exceeded, Runtime Error,
+                                         # Compilation Error, Error or Not Run
                     'error': '...',
                     'time': '...',
+                    'wall_time': float,  # seconds
+                    'cpu_time': float,   # seconds, None if unknown
+                    'memory': int,       # peak KB, None if unknown
                     'explanation': '...'
                 }
             ]
         }
     """
-    def normalize_output(text: str) -> str:
-        """Trim trailing whitespace and unify newlines for fair comparison."""
-        if text is None:
-            return ""
-        # Strip outer whitespace, trim each line's right side, and rejoin
-        lines = [line.rstrip() for line in str(text).strip().splitlines()]
-        return "\n".join(lines)
-
     if not test_cases:
         return {
             'all_passed': False,
@@ -1070,72 +3084,126 @@ def run_test_cases(language, code, test_cases):
             'error': 'No test cases provided'
         }
     
-    results = []
-    passed_count = 0
+    cases = list(enumerate(test_cases, 1))
+    results_by_idx = {}
+    limits = resolve_execution_limits(limits)
     
-    for idx, test_case in enumerate(test_cases, 1):
-        test_input = test_case.get('input', '')
-        expected_output = normalize_output(test_case.get('output', ''))
-        explanation = test_case.get('explanation', '')
-        
-        # For Java, use special test harness that parses input and calls methods
-        if language.upper() == 'JAVA':
-            test_code = wrap_java_test_code(code, test_input, expected_output)
-            execution_result = execute_code(language, test_code, '')
-        else:
-            # For other languages, pass input as stdin
-            execution_result = execute_code(language, code, test_input)
-        
-        # Check for compilation or runtime errors
-        if execution_result.get('compile_output'):
-            results.append({
-                'test_case': idx,
-                'input': test_input,
-                'expected': expected_output,
-                'actual': '',
-                'passed': False,
-                'error': f"Compilation Error: {execution_result['compile_output']}",
-                'time': execution_result.get('time', '0'),
-                'explanation': explanation
-            })
-            continue
-        
-        if execution_result.get('error') and execution_result.get('status') != 'Accepted':
-            results.append({
-                'test_case': idx,
-                'input': test_input,
-                'expected': expected_output,
-                'actual': '',
-                'passed': False,
-                'error': execution_result['error'],
-                'time': execution_result.get('time', '0'),
-                'explanation': explanation
-            })
-            continue
-        
-        # Get actual output
-        actual_output = normalize_output(execution_result.get('output', ''))
-        
-        # Compare outputs (normalize whitespace)
-        passed = actual_output == expected_output
-        
-        if passed:
-            passed_count += 1
+    # Stable sort: prioritized cases first, each group in its original order
+    prioritized = set(priority or [])
+    scheduled = sorted(cases, key=lambda case: case[0] not in prioritized)
+    position = {idx: order for order, (idx, _) in enumerate(scheduled)}
+    
+    failed = threading.Event()
+    halt = AnyEvent(cancel_event, failed)
+    
+    def report(result):
+        if stop_on_first_failure and not result['passed']:
+            failed.set()
+        if on_result:
+            on_result(result)
+    
+    def record(new_results):
+        results_by_idx.update(new_results)
+        for idx in sorted(new_results, key=position.get):
+            report(new_results[idx])
+    
+    # Backend the run is routed to (None while no backend is healthy: every case then fails fast)
+    backend = get_executor_router().current_backend()
+    
+    # Cases of an interpreted language cannot fail to compile
+    compile_checked = language.upper() not in COMPILED_LANGUAGES
+    if not compile_checked and backend == 'local':
+        source, _ = prepare_test_case_source(language, code, scheduled[0][1])
+        with execution_slot() as slot_held:
+            compile_output = check_compilation_local(language, source) if slot_held else None
+        if compile_output:
+            return build_compile_error_summary(cases, compile_output)
+        compile_checked = compile_output == ''
+    
+    # Pack every case into one remote execution where a batch harness exists
+    # (the local executor has no round trip to save and limits each run separately;
+    # fail-fast runs skip it too, as the harness would run every case regardless)
+    if (TEST_CASE_BATCH_MODE and backend not in ('local', None) and not stop_on_first_failure
+            and language.upper() in BATCH_HARNESS_WRAPPERS and len(cases) > 1):
+        batch_results = run_test_cases_batched(language, code, scheduled, limits)
+        compile_output = get_compile_error(batch_results)
+        if compile_output:
+            return build_compile_error_summary(cases, compile_output)
+        record(batch_results)
+        compile_checked = compile_checked or bool(batch_results)
+    
+    # Otherwise the first case doubles as the compile check before the rest are started
+    unchecked = [(idx, test_case) for idx, test_case in scheduled if idx not in results_by_idx]
+    if not compile_checked and len(unchecked) > 1 and not halt.is_set():
+        idx, test_case = unchecked[0]
+        first_result = {idx: run_test_case_safely(language, code, idx, test_case, limits)}
+        compile_output = get_compile_error(first_result)
+        if compile_output:
+            return build_compile_error_summary(cases, compile_output)
+        record(first_result)
+    
+    # Run whatever the batch did not cover one case per execution
+    remaining = [] if halt.is_set() else [
+        (idx, test_case) for idx, test_case in scheduled if idx not in results_by_idx
+    ]
+    concurrency = get_test_case_concurrency(language, backend)
+    
+    if backend == 'judge0' and len(remaining) > 1:
+        results_by_idx.update(run_test_cases_judge0_batch(language, code, remaining, halt, limits, report))
+    elif concurrency == 1:
+        for idx, test_case in remaining:
+            if halt.is_set():
+                break
+            result = run_test_case_safely(language, code, idx, test_case, limits)
+            if cancel_event and cancel_event.is_set():
+                # The case may have been killed by the cancellation
+                break
+            record({idx: result})
+    elif remaining:
+        results_by_idx.update(
+            run_test_cases_concurrently(language, code, remaining, concurrency, halt, limits, report)
+        )
+    
+    return build_test_run_summary(cases, results_by_idx, failed.is_set(), cancel_event)
+
+
+def build_test_run_summary(cases, results_by_idx, failed, cancel_event=None):
+    """
+    Build the run_test_cases result from the results of the cases that ran.
+    
+    Args:
+        cases (list): (idx, test_case) pairs of the run
+        results_by_idx (dict): Mapping of test case idx to result entry
+        failed (bool): Whether fail-fast mode saw a failing case
+        cancel_event (threading.Event): The run's cancel_event, if any
         
-        results.append({
-            'test_case': idx,
-            'input': test_input,
-            'expected': expected_output,
-            'actual': actual_output,
-            'passed': passed,
-            'error': '',
-            'time': execution_result.get('time', '0'),
-            'explanation': explanation
-        })
+    Returns:
+        dict: Summary as described in run_test_cases; cases that did not run
+        are reported as not run
+    """
+    # Runs that were not compile-checked up front (a single case, no compile cache)
+    compile_output = get_compile_error(results_by_idx)
+    if compile_output:
+        return build_compile_error_summary(cases, compile_output)
+    
+    stopped_early = failed and len(results_by_idx) < len(cases)
+    if stopped_early:
+        not_run_reason = 'Not run: stopped after the first failing test case'
+    else:
+        not_run_reason = getattr(cancel_event, 'cancel_reason', None) or 'Not run: execution was cancelled'
+    
+    results = [
+        results_by_idx.get(idx) or build_not_run_result(idx, test_case, not_run_reason)
+        for idx, test_case in cases
+    ]
+    passed_count = sum(1 for result in results if result['passed'])
     
     return {
-        'all_passed': passed_count == len(test_cases),
+        'all_passed': passed_count == len(cases),
         'passed_count': passed_count,
-        'total_count': len(test_cases),
+        'total_count': len(cases),
+        'cancelled': len(results_by_idx) < len(cases) and not stopped_early,
+        'stopped_early': stopped_early,
+        'metrics': summarize_metrics(results),
         'results': results
     }
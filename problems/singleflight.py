@@ -0,0 +1,104 @@
+"""
+Coalescing of identical in-flight executions (single-flight).
+
+When the same user fires the same execution twice at once (double click,
+frontend retry), the second caller waits for the first one's result instead of
+starting another execution. Coalescing is per process.
+"""
+import hashlib
+import json
+import threading
+
+
+def make_flight_key(*parts):
+    """
+    Build a single-flight key from JSON-serialisable parts.
+
+    Returns:
+        str: Hex SHA-256 digest of the parts
+    """
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class _Call:
+    """An execution in flight and the callers waiting on it."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time and shares its outcome."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._executed = 0
+        self._coalesced = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Call fn, or join an identical call that is already running.
+
+        Args:
+            key (str): Identity of the call (see make_flight_key)
+            fn (callable): Function to run
+            *args, **kwargs: Passed to fn
+
+        Returns:
+            The result of fn, shared by every caller that joined
+
+        Raises:
+            Exception: Whatever fn raised, re-raised in every caller
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self._executed += 1
+            else:
+                self._coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        except BaseException:
+            # The leader itself was aborted; followers get a plain error instead
+            call.error = RuntimeError('Coalesced execution was aborted')
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        """
+        Coalescing counters.
+
+        Returns:
+            dict: {'executed': int, 'coalesced': int, 'in_flight': int}
+        """
+        with self._lock:
+            return {
+                'executed': self._executed,
+                'coalesced': self._coalesced,
+                'in_flight': len(self._calls)
+            }
+
+
+# Shared by the execution endpoints
+execution_flight = SingleFlight()
@@ -0,0 +1,137 @@
+"""
+Streaming test runs: each test case's result is sent the moment it finishes.
+
+POST /api/problems/{id}/run_tests/?stream=ndjson (or stream=sse) answers with
+a chunked response instead of waiting for the whole run:
+
+    {"type": "result", "completed": 1, "total": 5, "result": {...}}   one per case, as it finishes
+    ...
+    {"type": "summary", "all_passed": false, ...}                      the regular run_tests response
+    or {"type": "error", "error": "..."}                               if the run itself failed
+
+'ndjson' writes one JSON object per line (application/x-ndjson); 'sse' writes
+the same records as server-sent events, the record type being the event name.
+Idle periods are bridged with keep-alive lines (a blank line / an SSE comment)
+so proxies do not time out the connection. If the client disconnects, no
+further test cases are started.
+"""
+import json
+import queue
+import threading
+
+from .execution_tokens import execution_scope, finish_execution
+from .scheduler import SUBMIT_LANE, scheduling
+from .services import AnyEvent, run_test_cases
+
+
+# Supported stream formats and their content types
+STREAM_CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'sse': 'text/event-stream',
+}
+
+STREAM_KEEPALIVE_INTERVAL = 15  # seconds
+
+
+def stream_test_cases(language, code, test_cases, limits=None, stop_on_first_failure=False, priority=None,
+                      execution=None, user_id=None, on_complete=None):
+    """
+    Run test cases in the background and yield records as results arrive.
+
+    Args:
+        language (str): Programming language (JAVA, PYTHON, CPP, JAVASCRIPT)
+        code (str): Source code to execute
+        test_cases (list): Test cases as for run_test_cases
+        limits (dict): Per-problem limits as for run_test_cases
+        stop_on_first_failure (bool): As for run_test_cases
+        priority (list): As for run_test_cases
+        execution (Execution): Token from execution_tokens.begin_execution, if
+            any; released when the run ends. A superseded run's summary
+            carries "superseded": true.
+        user_id (int): User the executions are scheduled for (see scheduler)
+        on_complete (callable): Called with the summary before it is sent
+            (not for superseded runs)
+
+    Yields:
+        dict: 'result' records, then one 'summary' (or 'error') record; None
+        whenever STREAM_KEEPALIVE_INTERVAL passes without a record
+    """
+    records = queue.Queue()
+    cancel_event = threading.Event()
+
+    def run():
+        try:
+            with execution_scope(execution), scheduling(user_id, SUBMIT_LANE):
+                summary = run_test_cases(
+                    language, code, test_cases,
+                    cancel_event=AnyEvent(cancel_event, execution),
+                    limits=limits,
+                    on_result=lambda result: records.put(('result', result)),
+                    stop_on_first_failure=stop_on_first_failure,
+                    priority=priority
+                )
+            if execution is not None and execution.superseded:
+                summary['superseded'] = True
+            records.put(('summary', summary))
+        except Exception as e:
+            records.put(('error', {'error': f'Failed to run tests: {str(e)}'}))
+        finally:
+            if execution is not None:
+                finish_execution(execution)
+
+    # Not on the test case pool: run_test_cases schedules its cases there
+    threading.Thread(target=run, name='codevault-test-stream', daemon=True).start()
+
+    completed = 0
+    try:
+        while True:
+            try:
+                kind, payload = records.get(timeout=STREAM_KEEPALIVE_INTERVAL)
+            except queue.Empty:
+                yield None
+                continue
+
+            if kind == 'result':
+                completed += 1
+                yield {'type': 'result', 'completed': completed, 'total': len(test_cases), 'result': payload}
+            else:
+                if kind == 'summary' and on_complete and not payload.get('superseded'):
+                    on_complete(payload)
+                yield {'type': kind, **payload}
+                return
+    finally:
+        # Also reached when the client disconnects: start no further cases
+        cancel_event.set()
+
+
+def format_stream_record(record, stream_format):
+    """
+    Encode one record for the wire.
+
+    Args:
+        record (dict): Record from stream_test_cases (None for a keep-alive)
+        stream_format (str): 'ndjson' or 'sse'
+
+    Returns:
+        str: Encoded record
+    """
+    if stream_format == 'sse':
+        if record is None:
+            return ': keep-alive\n\n'
+        return f"event: {record['type']}\ndata: {json.dumps(record)}\n\n"
+    if record is None:
+        return '\n'
+    return json.dumps(record) + '\n'
+
+
+def render_test_case_stream(language, code, test_cases, stream_format, limits=None, **options):
+    """
+    Encoded body of a streaming run_tests response.
+
+    Keyword options are passed on to stream_test_cases.
+
+    Yields:
+        str: Encoded records (see format_stream_record)
+    """
+    for record in stream_test_cases(language, code, test_cases, limits, **options):
+        yield format_stream_record(record, stream_format)
@@ -1,3 +1,1696 @@
-from django.test import TestCase
+import asyncio
+import itertools
+import json
+import os
+import resource
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import httpx
+import requests
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .async_executor_client import get_async_executor_client
+from .async_services import (
+    execute_code_judge0_async, poll_submissions_batch_async, run_test_cases_judge0_batch_async
+)
+from .async_views import run_tests_async
+from .bulkhead import Bulkhead, bulkheaded
+from .compile_cache import CompileCache, make_compile_key
+from .execution_tokens import begin_execution, finish_execution, publish_execution
+from .executor_client import EndpointPool
+from .executor_router import ExecutorRouter
+from .jobs import EXECUTION_JOB_MAX_ATTEMPTS, claim_next_job
+from .jvm_pool import JvmWorker, JvmWorkerPool
+from .local_executor import build_local_result, execute_code_local
+from .local_launcher import count_user_tasks
+from .models import ExecutionJob, Problem
+from .python_zygote import get_python_zygote
+from .result_cache import MemoryResultCache, NullResultCache, make_execution_key
+from .scheduler import RUN_LANE, SUBMIT_LANE, ExecutionScheduler
+from .services import (
+    JUDGE0_BATCH_SIZE, PISTON_API_ERROR_PREFIX, TIME_LIMIT_EXIT_CODES, build_batch_case_result, build_batch_harness,
+    build_test_case_result, create_submissions_batch, decode_base64, encode_base64, execute_code,
+    execute_code_on_backend, get_batch_nonce, get_poll_delays, judge0_completions, parse_batch_frames,
+    parse_batch_results, poll_submissions_batch, resolve_execution_limits, run_test_cases,
+    run_test_cases_judge0_batch, summarize_metrics
+)
+from .singleflight import SingleFlight
+from .streaming import format_stream_record, stream_test_cases
+
+
+def wait_until(predicate, timeout=5.0):
+    """Poll predicate until it holds; fail the test if it does not within timeout."""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError('Condition not reached in time')
+        time.sleep(0.005)
+
+
+def build_result(output='ok', error=''):
+    """Execution result in the execute_code format."""
+    return {
+        'output': output,
+        'error': error,
+        'status': 'Accepted' if not error else 'Error',
+        'status_id': 3 if not error else 0,
+        'time': '0.01',
+        'memory': 0,
+        'wall_time': 0.01,
+        'compile_output': ''
+    }
+
+
+def run_harness(language, source):
+    """Compile and run a batch harness on this host; returns (stdout, stderr)."""
+    directory = tempfile.mkdtemp()
+    try:
+        if language == 'JAVA':
+            path = os.path.join(directory, 'Main.java')
+            commands = [['javac', '-encoding', 'UTF-8', path], ['java', '-cp', directory, 'Main']]
+        elif language == 'CPP':
+            path = os.path.join(directory, 'main.cpp')
+            commands = [['g++', '-o', os.path.join(directory, 'main'), path], [os.path.join(directory, 'main')]]
+        elif language == 'JAVASCRIPT':
+            path = os.path.join(directory, 'main.js')
+            commands = [['node', path]]
+        else:
+            path = os.path.join(directory, 'main.py')
+            commands = [[sys.executable, path]]
+        with open(path, 'w', encoding='utf-8') as source_file:
+            source_file.write(source)
+        for command in commands:
+            run = subprocess.run(command, cwd=directory, input='', capture_output=True, text=True, timeout=60)
+        return run.stdout, run.stderr
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def frame(nonce, idx, body, exit_code=0, metrics=''):
+    """One case's output as a batch harness frames it."""
+    mark = f'@@CODEVAULT:{nonce}:'
+    return f'{mark}BEGIN:{idx}@@\n{body}\n{mark}END:{idx}:{exit_code}{metrics}@@\n'
+
+
+class BatchHarnessTests(TestCase):
+    """Single-execution harnesses for the stdin languages and their framing."""
+
+    program = (
+        'import os, signal, sys\n'
+        'data = sys.stdin.read().strip()\n'
+        'if data == "exit":\n'
+        '    sys.exit(3)\n'
+        'if data == "kill":\n'
+        '    os.kill(os.getpid(), signal.SIGKILL)\n'
+        'if data == "raise":\n'
+        '    raise ValueError("boom")\n'
+        'print(data * 2)\n'
+    )
+    cases = [
+        (1, {'input': 'ab', 'output': 'abab'}),
+        (2, {'input': 'exit', 'output': ''}),
+        (3, {'input': 'kill', 'output': ''}),
+        (4, {'input': 'raise', 'output': ''}),
+    ]
+
+    def test_nonce_depends_on_code_and_cases(self):
+        nonce = get_batch_nonce(self.program, self.cases)
+        self.assertEqual(nonce, get_batch_nonce(self.program, self.cases))
+        self.assertNotEqual(nonce, get_batch_nonce(self.program + '\n', self.cases))
+        self.assertNotEqual(nonce, get_batch_nonce(self.program, self.cases[:1]))
+
+    def test_frames_of_another_nonce_are_ignored(self):
+        text = frame('0' * 16, 1, 'forged') + frame('1' * 16, 1, 'real')
+        self.assertEqual(parse_batch_frames('1' * 16, text), {
+            1: ('real', 0, {'wall_time': None, 'cpu_time': None, 'memory': None})
+        })
+
+    def test_frame_metrics_are_parsed(self):
+        frames = parse_batch_frames('n', frame('n', 1, 'out', 137, ':12.000:3.000:2048') + frame('n', 2, '', 0, ':8.000:-:-'))
+        self.assertEqual(frames[1], ('out', 137, {'wall_time': 0.012, 'cpu_time': 0.003, 'memory': 2048}))
+        self.assertEqual(frames[2], ('', 0, {'wall_time': 0.008, 'cpu_time': None, 'memory': None}))
+
+    def test_case_cut_off_mid_frame_is_left_out(self):
+        mark = '@@CODEVAULT:n:'
+        text = frame('n', 1, 'done') + f'{mark}BEGIN:2@@\npartial output'
+        self.assertEqual(list(parse_batch_frames('n', text)), [1])
+
+        results = parse_batch_results(
+            [(1, {'input': '', 'output': 'done'}), (2, {'input': '', 'output': 'x'})], 'n', build_result(text)
+        )
+        self.assertEqual(list(results), [1])
+        self.assertTrue(results[1]['passed'])
+
+    def test_python_harness_reports_each_case(self):
+        harness, nonce = build_batch_harness('PYTHON', self.program, self.cases)
+        stdout, stderr = run_harness('PYTHON', harness)
+        stdout_frames = parse_batch_frames(nonce, stdout)
+        stderr_frames = parse_batch_frames(nonce, stderr)
+
+        self.assertEqual(stdout_frames[1][0].strip(), 'abab')
+        self.assertEqual(
+            {idx: exit_code for idx, (_, exit_code, _) in stdout_frames.items()},
+            {1: 0, 2: 3, 3: 128 + signal.SIGKILL, 4: 1}
+        )
+        self.assertIn('ValueError: boom', stderr_frames[4][0])
+        self.assertNotIn('runpy', stderr_frames[4][0])
+        for _, _, metrics in stdout_frames.values():
+            self.assertGreater(metrics['wall_time'], 0)
+            self.assertIsNotNone(metrics['cpu_time'])
+            self.assertGreater(metrics['memory'], 0)
+
+        results = parse_batch_results(self.cases, nonce, build_result(stdout, stderr))
+        self.assertTrue(results[1]['passed'])
+        killed_stdout, killed_exit_code, _ = stdout_frames[3]
+        self.assertEqual(
+            build_batch_case_result(killed_stdout, '', killed_exit_code)['status'], 'Runtime Error (Signal)'
+        )
+
+    def test_python_harness_applies_the_time_limit(self):
+        cases = [(1, {'input': '', 'output': ''})]
+        limits = resolve_execution_limits({'time_limit': 1})
+        harness, nonce = build_batch_harness('PYTHON', 'while True:\n    pass\n', cases, limits)
+        stdout, stderr = run_harness('PYTHON', harness)
+
+        self.assertIn(parse_batch_frames(nonce, stdout)[1][1], TIME_LIMIT_EXIT_CODES)
+        result = parse_batch_results(cases, nonce, build_result(stdout, stderr), limits)
+        self.assertEqual(result[1]['verdict'], 'Time Limit Exceeded')
+
+    def test_cpp_and_javascript_harnesses_run_each_case(self):
+        programs = {
+            'CPP': '#include <iostream>\n#include <string>\nint main() { std::string s; std::cin >> s; '
+                   'std::cout << s << s << std::endl; return s == "exit" ? 3 : 0; }\n',
+            'JAVASCRIPT': 'const s = require("fs").readFileSync(0, "utf8").trim();\n'
+                          'console.log(s + s);\nprocess.exit(s === "exit" ? 3 : 0);\n',
+        }
+        cases = self.cases[:2]
+        for language, program in programs.items():
+            with self.subTest(language=language):
+                if not shutil.which({'CPP': 'g++', 'JAVASCRIPT': 'node'}[language]):
+                    self.skipTest(f'No {language} toolchain on this host')
+                harness, nonce = build_batch_harness(language, program, cases)
+                frames = parse_batch_frames(nonce, run_harness(language, harness)[0])
+                self.assertEqual((frames[1][0].strip(), frames[1][1]), ('abab', 0))
+                self.assertEqual((frames[2][0].strip(), frames[2][1]), ('exitexit', 3))
+
+    @mock.patch('problems.services.execute_code')
+    def test_cases_missing_from_the_batch_run_on_their_own(self, execute):
+        cases = [{'input': str(idx), 'output': str(idx)} for idx in (1, 2, 3)]
+        _, nonce = build_batch_harness('PYTHON', 'print(input())', list(enumerate(cases, 1)))
+        mark = f'@@CODEVAULT:{nonce}:'
+
+        def run(language, code, input_data='', limits=None, batch=False):
+            if batch:
+                # The sandbox was killed during the second case
+                return build_result(frame(nonce, 1, '1', 0, ':1.000:1.000:1024') + f'{mark}BEGIN:2@@\n2')
+            return build_result(input_data)
+
+        execute.side_effect = run
+        summary = run_test_cases('PYTHON', 'print(input())', cases)
+
+        self.assertTrue(summary['all_passed'])
+        self.assertEqual(sorted(call.args[2] for call in execute.call_args_list[1:]), ['2', '3'])
+
+
+class JavaBatchHarnessTests(TestCase):
+    """The Java harness compiled once for every test case."""
+
+    solution = (
+        'class Solution {\n'
+        '    static int calls = 0;\n'
+        '    public int countCalls(ListNode head) { return ++calls; }\n'
+        '}\n'
+    )
+    cases = [(idx, {'input': '[1,2,"3"]', 'output': '1'}) for idx in (1, 2, 3)]
+
+    def test_harness_embeds_the_cases_and_nonce(self):
+        harness, nonce = build_batch_harness('JAVA', self.solution, self.cases)
+        self.assertIn(f'"@@CODEVAULT:{nonce}:"', harness)
+        self.assertIn('CASE_IDS = { 1, 2, 3 }', harness)
+        self.assertIn('{ "[1,2,\\"3\\"]" }', harness)
+        self.assertIn('static class Solution', harness)
+
+    def test_timed_out_case_ends_the_batch(self):
+        _, nonce = build_batch_harness('JAVA', self.solution, self.cases)
+        stdout = (
+            frame(nonce, 1, '1', 0, ':5.000:4.000:-')
+            + frame(nonce, 2, '', 128 + signal.SIGALRM, ':2000.000:1990.000:-')
+        )
+        results = parse_batch_results(self.cases, nonce, build_result(stdout))
+
+        # Case 3 was never framed: it is left for a run of its own
+        self.assertEqual(sorted(results), [1, 2])
+        self.assertTrue(results[1]['passed'])
+        self.assertIsNone(results[1]['memory'])
+        self.assertEqual(results[2]['verdict'], 'Time Limit Exceeded')
+
+    def test_compile_error_fails_every_case(self):
+        _, nonce = build_batch_harness('JAVA', self.solution, self.cases)
+        execution_result = {**build_result(''), 'compile_output': "Main.java:5: error: ';' expected"}
+        results = parse_batch_results(self.cases, nonce, execution_result)
+
+        self.assertEqual([result['verdict'] for result in results.values()], ['Compilation Error'] * 3)
+
+    @skipUnless(shutil.which('javac'), 'No JDK on this host')
+    def test_static_state_does_not_carry_over_between_cases(self):
+        harness, nonce = build_batch_harness('JAVA', self.solution, self.cases)
+        stdout, stderr = run_harness('JAVA', harness)
+        results = parse_batch_results(self.cases, nonce, build_result(stdout, stderr))
+
+        self.assertEqual([result['actual'] for result in results.values()], ['1', '1', '1'])
+        self.assertTrue(all(result['passed'] for result in results.values()))
+
+
+def judge0_submission(done, stdout='ok\n'):
+    """Judge0 submission as returned by its API (base64 encoded fields)."""
+    if not done:
+        return {'status': {'id': 2, 'description': 'Processing'}, 'stdout': None}
+    return {'status': {'id': 3, 'description': 'Accepted'}, 'stdout': encode_base64(stdout)}
+
+
+class FakeJudge0Session:
+    """Executor client answering Judge0 batch requests; each token finishes on its polls_needed-th poll."""
+
+    def __init__(self, polls_needed=1):
+        self.polls_needed = polls_needed
+        self.created = []
+        self.polled = []
+        self.polls = {}
+
+    def response(self, payload):
+        response = mock.Mock()
+        response.json.return_value = payload
+        return response
+
+    def post(self, url, json=None, **kwargs):
+        start = sum(len(batch) for batch in self.created)
+        self.created.append(json['submissions'])
+        return self.response([{'token': f'token-{start + n}'} for n in range(len(json['submissions']))])
+
+    def get(self, url, params=None, **kwargs):
+        tokens = params['tokens'].split(',')
+        self.polled.append(tokens)
+        for token in tokens:
+            self.polls[token] = self.polls.get(token, 0) + 1
+        return self.response({
+            'submissions': [judge0_submission(self.polls[token] >= self.polls_needed) for token in tokens]
+        })
+
+
+class Judge0BatchTests(TestCase):
+    """Judge0 test cases created and polled through the batch endpoints."""
+
+    def setUp(self):
+        self.session = FakeJudge0Session()
+        router = mock.Mock()
+        router.current_backend.return_value = 'judge0'
+        for target, value in (
+            ('problems.services.get_executor_client', mock.Mock(return_value=self.session)),
+            ('problems.services.get_executor_router', mock.Mock(return_value=router)),
+            ('problems.services.get_poll_delays', mock.Mock(side_effect=lambda timeout=None: [0] * 5)),
+        ):
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def make_cases(self, count):
+        return [(idx, {'input': str(idx), 'output': 'ok'}) for idx in range(1, count + 1)]
+
+    def test_submissions_are_sent_in_one_request(self):
+        limits = resolve_execution_limits({'time_limit': 2, 'memory_limit': 64})
+        tokens = create_submissions_batch('PYTHON', [('print(1)', 'a'), ('print(2)', 'b')], limits)
+
+        self.assertEqual(tokens, ['token-0', 'token-1'])
+        (submissions,) = self.session.created
+        self.assertEqual([decode_base64(item['stdin']) for item in submissions], ['a', 'b'])
+        self.assertEqual({item['cpu_time_limit'] for item in submissions}, {2})
+        self.assertEqual({item['memory_limit'] for item in submissions}, {64 * 1024})
+
+    def test_rejected_submission_is_an_error(self):
+        self.session.post = lambda url, **kwargs: self.session.response(
+            [{'token': 'token-0'}, {'language_id': ['is invalid']}]
+        )
+        with self.assertRaises(ValueError):
+            create_submissions_batch('PYTHON', [('print(1)', ''), ('print(2)', '')])
+
+    def test_cases_are_split_into_batches_of_the_api_maximum(self):
+        results = run_test_cases_judge0_batch('PYTHON', 'print("ok")', self.make_cases(JUDGE0_BATCH_SIZE + 5))
+
+        self.assertEqual(len(results), JUDGE0_BATCH_SIZE + 5)
+        self.assertTrue(all(result['passed'] for result in results.values()))
+        self.assertEqual([len(batch) for batch in self.session.created], [JUDGE0_BATCH_SIZE, 5])
+        self.assertEqual([len(tokens) for tokens in self.session.polled], [JUDGE0_BATCH_SIZE, 5])
+
+    def test_api_failure_marks_every_case(self):
+        self.session.post = mock.Mock(side_effect=requests.ConnectionError('refused'))
+        results = run_test_cases_judge0_batch('PYTHON', 'print("ok")', self.make_cases(3))
+
+        self.assertEqual(sorted(results), [1, 2, 3])
+        self.assertFalse(any(result['passed'] for result in results.values()))
+
+    @mock.patch('problems.services.TEST_CASE_BATCH_MODE', False)
+    def test_judge0_runs_use_the_batch_endpoints(self):
+        summary = run_test_cases('PYTHON', 'print("ok")', [{'input': '', 'output': 'ok'}] * 3)
+
+        self.assertTrue(summary['all_passed'])
+        self.assertEqual([len(batch) for batch in self.session.created], [3])
+
+
+class Judge0PollingTests(TestCase):
+    """Polling backoff and callback completion of Judge0 submissions."""
+
+    def setUp(self):
+        self.session = FakeJudge0Session(polls_needed=2)
+        patcher = mock.patch('problems.services.get_executor_client', return_value=self.session)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @mock.patch('problems.services.JUDGE0_POLL_INITIAL_INTERVAL', 0.05)
+    @mock.patch('problems.services.JUDGE0_POLL_BACKOFF', 2)
+    @mock.patch('problems.services.JUDGE0_POLL_MAX_INTERVAL', 0.5)
+    def test_poll_delays_back_off_up_to_the_max(self):
+        delays = list(itertools.islice(get_poll_delays(timeout=60), 7))
+        self.assertEqual(delays, [0.05, 0.1, 0.2, 0.4, 0.5, 0.5, 0.5])
+
+    def test_poll_delays_stop_at_the_timeout(self):
+        waited = 0
+        for delay in get_poll_delays(timeout=0.2):
+            time.sleep(delay)
+            waited += delay
+        self.assertLessEqual(waited, 0.2)
+
+    @mock.patch('problems.services.JUDGE0_CALLBACK_URL', 'https://codevault.test/api/judge0/callback/')
+    @mock.patch('problems.services.JUDGE0_POLL_MAX_INTERVAL', 0.5)
+    def test_callback_mode_polls_at_the_max_interval(self):
+        self.assertEqual(next(get_poll_delays(timeout=60)), 0.5)
+
+    def test_finished_tokens_are_not_polled_again(self):
+        self.session.polls['token-1'] = -1  # finishes one poll after token-0
+        with mock.patch('problems.services.get_poll_delays', return_value=[0] * 5):
+            results = poll_submissions_batch(['token-0', 'token-1'])
+
+        self.assertEqual(sorted(results), ['token-0', 'token-1'])
+        self.assertEqual(self.session.polled, [['token-0', 'token-1'], ['token-0', 'token-1'], ['token-1']])
+
+    @mock.patch('problems.services.JUDGE0_CALLBACK_URL', 'https://codevault.test/api/judge0/callback/')
+    def test_callback_result_is_not_polled(self):
+        judge0_completions.complete('callback-token', judge0_submission(True))
+        with mock.patch('problems.services.get_poll_delays', return_value=[0] * 5):
+            results = poll_submissions_batch(['callback-token', 'token-0'])
+
+        self.assertEqual(decode_base64(results['callback-token']['stdout']), 'ok\n')
+        self.assertTrue(all('callback-token' not in tokens for tokens in self.session.polled))
+
+    @mock.patch('problems.views.JUDGE0_CALLBACK_SECRET', 'secret')
+    def test_callback_endpoint_checks_the_secret(self):
+        client = APIClient()
+        url = '/api/judge0/callback/'
+        body = {'token': 'endpoint-token', **judge0_submission(True)}
+
+        self.assertEqual(client.put(f'{url}?secret=wrong', body, format='json').status_code, 403)
+        self.assertEqual(client.put(url, body, format='json').status_code, 403)
+        self.assertEqual(client.put(f'{url}?secret=secret', {}, format='json').status_code, 400)
+        self.assertEqual(client.put(f'{url}?secret=secret', body, format='json').status_code, 204)
+
+        judge0_completions.register(['endpoint-token'])
+        self.addCleanup(judge0_completions.unregister, ['endpoint-token'])
+        self.assertIn('endpoint-token', judge0_completions.wait(['endpoint-token'], 0))
+
+    @mock.patch('problems.views.JUDGE0_CALLBACK_SECRET', '')
+    def test_callback_endpoint_is_closed_without_a_secret(self):
+        response = APIClient().put('/api/judge0/callback/', {'token': 'endpoint-token'}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+class ResultCacheTests(TestCase):
+    """Execution result cache: keys, hits, expiry and what is cached."""
+
+    def setUp(self):
+        router = mock.Mock()
+        router.current_backend.return_value = 'piston'
+        patcher = mock.patch('problems.services.get_executor_router', return_value=router)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def execute(self, cache, result, code='print(1)', input_data=''):
+        with mock.patch('problems.services.get_result_cache', return_value=cache), \
+                mock.patch('problems.services.execute_code_piston', return_value=dict(result)) as backend:
+            execute_code_on_backend('piston', 'PYTHON', code, input_data, resolve_execution_limits(None))
+        return backend.call_count
+
+    def test_key_covers_every_input_of_the_run(self):
+        key = make_execution_key('piston', 'PYTHON', '3.10', 'print(1)', '', None)
+        self.assertEqual(key, make_execution_key('piston', 'PYTHON', '3.10', 'print(1)', '', None))
+        for changed in (
+            ('judge0', 'PYTHON', '3.10', 'print(1)', '', None),
+            ('piston', 'PYTHON', '3.11', 'print(1)', '', None),
+            ('piston', 'PYTHON', '3.10', 'print(2)', '', None),
+            ('piston', 'PYTHON', '3.10', 'print(1)', '1', None),
+            ('piston', 'PYTHON', '3.10', 'print(1)', '', {'time_limit': 1, 'memory_limit': None}),
+        ):
+            self.assertNotEqual(make_execution_key(*changed), key)
+
+    def test_repeated_run_is_a_hit(self):
+        cache = MemoryResultCache()
+        self.assertEqual(self.execute(cache, build_result()), 1)
+        self.assertEqual(self.execute(cache, build_result()), 0)
+        self.assertEqual(self.execute(cache, build_result(), input_data='other'), 1)
+
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['stores']), (1, 2, 2))
+
+    def test_entries_expire_after_the_ttl(self):
+        cache = MemoryResultCache(ttl=60)
+        now = time.monotonic()
+        with mock.patch('problems.result_cache.time.monotonic', return_value=now):
+            cache.set('key', build_result())
+        with mock.patch('problems.result_cache.time.monotonic', return_value=now + 59):
+            self.assertIsNotNone(cache.get('key'))
+        with mock.patch('problems.result_cache.time.monotonic', return_value=now + 61):
+            self.assertIsNone(cache.get('key'))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = MemoryResultCache(max_entries=2)
+        cache.set('a', build_result('a'))
+        cache.set('b', build_result('b'))
+        cache.get('a')
+        cache.set('c', build_result('c'))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a')['output'], 'a')
+
+    def test_timeouts_and_service_errors_are_not_cached(self):
+        cache = MemoryResultCache()
+        timeout = {**build_result(), 'status': 'Time Limit Exceeded', 'status_id': 5}
+        service_error = build_result(error=f'{PISTON_API_ERROR_PREFIX}503 Service Unavailable')
+        for result in (timeout, service_error):
+            self.assertEqual(self.execute(cache, result), 1)
+            self.assertEqual(self.execute(cache, result), 1)
+        self.assertEqual(cache.stats()['stores'], 0)
+
+
+class SingleFlightTests(TestCase):
+    """Coalescing of identical in-flight calls."""
+
+    def start_leader(self, flight, key, fn):
+        """Run flight.do(key, fn) on a thread; returns the thread and its outcome."""
+        outcome = {}
+
+        def run():
+            try:
+                outcome['result'] = flight.do(key, fn)
+            except Exception as e:
+                outcome['error'] = e
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        wait_until(lambda: flight.stats()['in_flight'] == 1)
+        return thread, outcome
+
+    def test_identical_calls_share_one_execution(self):
+        flight = SingleFlight()
+        proceed = threading.Event()
+        calls = []
+
+        def run():
+            calls.append(1)
+            proceed.wait(5)
+            return {'output': '42'}
+
+        leader, outcome = self.start_leader(flight, 'key', run)
+        follower_outcome = {}
+        follower = threading.Thread(
+            target=lambda: follower_outcome.update(result=flight.do('key', run)), daemon=True
+        )
+        follower.start()
+        wait_until(lambda: flight.stats()['coalesced'] == 1)
+
+        proceed.set()
+        leader.join(5)
+        follower.join(5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(outcome['result'], {'output': '42'})
+        self.assertIs(follower_outcome['result'], outcome['result'])
+        self.assertEqual(flight.stats(), {'executed': 1, 'coalesced': 1, 'in_flight': 0})
+
+    def test_error_is_raised_in_every_caller(self):
+        flight = SingleFlight()
+        proceed = threading.Event()
+
+        def fail():
+            proceed.wait(5)
+            raise ValueError('backend down')
+
+        leader, outcome = self.start_leader(flight, 'key', fail)
+        follower_outcome = {}
+
+        def follow():
+            try:
+                flight.do('key', fail)
+            except ValueError as e:
+                follower_outcome['error'] = e
+
+        follower = threading.Thread(target=follow, daemon=True)
+        follower.start()
+        wait_until(lambda: flight.stats()['coalesced'] == 1)
+
+        proceed.set()
+        leader.join(5)
+        follower.join(5)
+        self.assertIsInstance(outcome['error'], ValueError)
+        self.assertIs(follower_outcome['error'], outcome['error'])
+
+    def test_different_keys_run_separately(self):
+        flight = SingleFlight()
+        self.assertEqual(flight.do('a', lambda: 1), 1)
+        self.assertEqual(flight.do('b', lambda: 2), 2)
+        self.assertEqual(flight.do('a', lambda: 3), 3)
+        self.assertEqual(flight.stats()['executed'], 3)
+        self.assertEqual(flight.stats()['coalesced'], 0)
+
+
+class LocalLauncherLimitTests(TestCase):
+    """Process limit of programs run by the local executor."""
+
+    def test_process_limit_is_headroom_over_the_users_tasks(self):
+        current = count_user_tasks(os.getuid())
+        if current is None:
+            self.skipTest('/proc is not available')
+        probe = (
+            'import resource, sys; '
+            'from problems.local_launcher import set_limits; '
+            'set_limits(5, 0, 1 << 20, 16); '
+            'print(resource.getrlimit(resource.RLIMIT_NPROC)[0])'
+        )
+        run = subprocess.run([sys.executable, '-c', probe], capture_output=True, text=True, timeout=30)
+        _, hard = resource.getrlimit(resource.RLIMIT_NPROC)
+        limit = int(run.stdout)
+        if hard == resource.RLIM_INFINITY or hard > current + 64:
+            self.assertGreater(limit, current)
+            self.assertLess(limit, current + 64)
+
+    def test_zero_leaves_the_process_limit_alone(self):
+        probe = (
+            'import resource; '
+            'from problems.local_launcher import set_limits; '
+            'before = resource.getrlimit(resource.RLIMIT_NPROC); '
+            'set_limits(5, 0, 1 << 20, 0); '
+            'print(before == resource.getrlimit(resource.RLIMIT_NPROC))'
+        )
+        run = subprocess.run([sys.executable, '-c', probe], capture_output=True, text=True, timeout=30)
+        self.assertEqual(run.stdout.strip(), 'True')
+
+
+class CompileCacheTests(TestCase):
+    """Compiled artifacts cached by source and compiler flags."""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.cache = CompileCache(directory, max_mb=1)
+        self.compiles = []
+
+    def compile_fn(self, size=16, output='', cacheable=True):
+        def compile_into(build_dir):
+            self.compiles.append(build_dir)
+            with open(os.path.join(build_dir, 'main'), 'wb') as artifact:
+                artifact.write(b'\0' * size)
+            return output, cacheable
+        return compile_into
+
+    def test_key_covers_language_flags_compiler_and_source(self):
+        key = make_compile_key('CPP', ['g++', '-O2'], '11.4', 'int main() {}')
+        self.assertEqual(key, make_compile_key('CPP', ['g++', '-O2'], '11.4', 'int main() {}'))
+        for changed in (
+            ('JAVA', ['g++', '-O2'], '11.4', 'int main() {}'),
+            ('CPP', ['g++', '-O0'], '11.4', 'int main() {}'),
+            ('CPP', ['g++', '-O2'], '12.1', 'int main() {}'),
+            ('CPP', ['g++', '-O2'], '11.4', 'int main() { return 0; }'),
+        ):
+            self.assertNotEqual(make_compile_key(*changed), key)
+
+    def test_second_lookup_reuses_the_artifacts(self):
+        artifact_dir, output = self.cache.get_or_compile('key', self.compile_fn())
+        again_dir, again_output = self.cache.get_or_compile('key', self.compile_fn())
+
+        self.assertEqual(len(self.compiles), 1)
+        self.assertEqual((again_dir, again_output), (artifact_dir, ''))
+        self.assertTrue(os.path.exists(os.path.join(artifact_dir, 'main')))
+        self.assertEqual(self.cache.stats(), {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
+
+    def test_compile_errors_are_cached_with_their_output(self):
+        self.cache.get_or_compile('key', self.compile_fn(output='error: expected ;'))
+        _, output = self.cache.get_or_compile('key', self.compile_fn())
+        self.assertEqual(output, 'error: expected ;')
+        self.assertEqual(len(self.compiles), 1)
+
+    def test_uncacheable_results_are_not_stored(self):
+        artifact_dir, output = self.cache.get_or_compile('key', self.compile_fn(output='timed out', cacheable=False))
+        self.assertIsNone(artifact_dir)
+        self.assertEqual(output, 'timed out')
+        self.cache.get_or_compile('key', self.compile_fn())
+        self.assertEqual(len(self.compiles), 2)
+
+    def test_prune_evicts_least_recently_used_entries(self):
+        for age, key in enumerate(('newest', 'middle', 'oldest')):
+            entry, _ = self.cache.get_or_compile(key, self.compile_fn(size=1000))
+            os.utime(entry, (time.time() - 100 * (age + 1),) * 2)
+        # A hit makes an entry the most recently used
+        self.cache.get_or_compile('oldest', self.compile_fn())
+
+        self.cache.max_bytes = 2500
+        self.cache.prune()
+        remaining = sorted(name for name in os.listdir(self.cache.directory) if not name.startswith('.'))
+        self.assertEqual(remaining, ['newest', 'oldest'])
+
+
+class JvmWorkerPoolTests(TestCase):
+    """Reuse and recycling of warm JVM workers."""
+
+    def setUp(self):
+        self.run_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.run_dir, ignore_errors=True)
+
+    def make_worker(self, reply, runs=0):
+        """Worker whose JVM answers the run with reply."""
+        worker = JvmWorker.__new__(JvmWorker)
+        worker.runs = runs
+        worker._send = lambda *fields: None
+        worker._read_reply = lambda expected, timeout: reply
+        return worker
+
+    def done(self, rss_kb=100000, clean='1'):
+        return ['DONE', '0', '1000000', '2048', str(rss_kb), clean]
+
+    def test_clean_run_keeps_the_worker(self):
+        _, reusable = self.make_worker(self.done()).run(self.run_dir, '')
+        self.assertTrue(reusable)
+
+    @mock.patch('problems.jvm_pool.LOCAL_JVM_POOL_MAX_RUNS', 3)
+    def test_worker_is_recycled_after_max_runs(self):
+        worker = self.make_worker(self.done())
+        self.assertEqual([worker.run(self.run_dir, '')[1] for _ in range(3)], [True, True, False])
+
+    @mock.patch('problems.jvm_pool.LOCAL_JVM_POOL_MAX_RSS_MB', 256)
+    def test_worker_is_recycled_past_max_rss(self):
+        _, reusable = self.make_worker(self.done(rss_kb=300 * 1024)).run(self.run_dir, '')
+        self.assertFalse(reusable)
+
+    def test_worker_is_recycled_after_an_unclean_run_or_a_timeout(self):
+        # Unclean: the program left threads running or changed global state
+        for reply in (self.done(clean='0'), ['TIMEOUT']):
+            _, reusable = self.make_worker(reply).run(self.run_dir, '')
+            self.assertFalse(reusable)
+
+    def test_pool_reuses_idle_workers_and_replaces_recycled_ones(self):
+        pool = JvmWorkerPool(size=1)
+        with mock.patch('problems.jvm_pool.JvmWorker') as worker_class, \
+                mock.patch.object(pool, '_get_class_dir', return_value=self.run_dir):
+            worker_class.return_value.is_alive.return_value = True
+            first = pool._acquire()
+            pool._release(first, reusable=True)
+            self.assertIs(pool._acquire(), first)
+            pool._release(first, reusable=False)
+            pool._acquire()
+
+        first.close.assert_called_once()
+        stats = pool.stats()
+        self.assertEqual((stats['started'], stats['recycled'], stats['idle']), (2, 1, 0))
+
+
+class PythonZygoteMemoryTests(TestCase):
+    """Memory reported for programs forked from the Python zygote."""
+
+    def tearDown(self):
+        zygote = get_python_zygote(start=False)
+        if zygote is not None:
+            zygote.close()
+
+    def run_program(self, code, zygote):
+        with mock.patch('problems.python_zygote.LOCAL_PYTHON_ZYGOTE', zygote):
+            result = execute_code_local('PYTHON', code, '')
+        self.assertEqual(result.get('startup', {}).get('mode') == 'zygote', zygote)
+        return result['memory']
+
+    def test_memory_matches_a_run_without_the_zygote(self):
+        for code in ('print(1)', 'data = bytearray(48 * 1024 * 1024)\nprint(len(data))'):
+            cold = self.run_program(code, zygote=False)
+            forked = self.run_program(code, zygote=True)
+            self.assertLess(abs(forked - cold), 8 * 1024, code)
+
+
+class ExecutionMetricsTests(TestCase):
+    """Per-case wall time, CPU time and peak memory, and their aggregates."""
+
+    def metered_result(self, wall_time, cpu_time, memory):
+        return {**build_result(), 'wall_time': wall_time, 'cpu_time': cpu_time, 'memory': memory}
+
+    def test_each_case_reports_its_usage(self):
+        router = mock.Mock()
+        router.current_backend.return_value = 'piston'
+        usage = {'1': (0.2, 0.1, 9000), '2': (0.4, 0.3, 12000), '3': (0.3, 0.2, 0)}
+
+        def execute(language, code, stdin, limits=None):
+            return self.metered_result(*usage[stdin.strip()])
+
+        with mock.patch('problems.services.get_executor_router', return_value=router), \
+                mock.patch('problems.services.TEST_CASE_BATCH_MODE', False), \
+                mock.patch('problems.services.execute_code', side_effect=execute):
+            summary = run_test_cases('PYTHON', 'print("ok")', [
+                {'input': idx, 'output': 'ok'} for idx in ('1', '2', '3')
+            ])
+
+        self.assertEqual(
+            [(result['wall_time'], result['cpu_time'], result['memory']) for result in summary['results']],
+            [(0.2, 0.1, 9000), (0.4, 0.3, 12000), (0.3, 0.2, None)]
+        )
+        self.assertEqual(summary['metrics'], {
+            'wall_time': {'max': 0.4, 'p50': 0.3, 'total': 0.9},
+            'cpu_time': {'max': 0.3, 'p50': 0.2, 'total': 0.6},
+            'memory': {'max': 12000, 'p50': 9000},
+        })
+
+    def test_cases_without_a_value_are_left_out(self):
+        metrics = summarize_metrics([
+            {'wall_time': 0.5, 'cpu_time': None, 'memory': None},
+            {'wall_time': None, 'cpu_time': None, 'memory': None},
+        ])
+        self.assertEqual(metrics, {
+            'wall_time': {'max': 0.5, 'p50': 0.5, 'total': 0.5},
+            'cpu_time': None,
+            'memory': None,
+        })
+
+    def test_executor_stats_reports_every_component(self):
+        admin = User.objects.create_user(username='stats-admin', password='pass', is_staff=True)
+        client = APIClient()
+        client.force_authenticate(admin)
+        with mock.patch('problems.views.get_jvm_pool', return_value=JvmWorkerPool(size=2)):
+            stats = client.get('/api/executor/stats/').json()
+
+        self.assertEqual(set(stats), {
+            'http', 'async_http', 'result_cache', 'single_flight', 'compile_cache', 'jvm_pool', 'python_zygote',
+            'scheduler', 'router', 'bulkhead', 'async_bulkhead',
+        })
+        self.assertEqual(set(stats['result_cache']), {'backend', 'hits', 'misses', 'stores', 'hit_ratio'})
+        self.assertEqual(stats['jvm_pool'], {'size': 2, 'idle': 0, 'started': 0, 'recycled': 0, 'runs': 0})
+        self.assertIn('lanes', stats['scheduler'])
+
+    def test_executor_stats_is_for_admins_only(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='stats-user', password='pass'))
+        self.assertEqual(client.get('/api/executor/stats/').status_code, 403)
+
+
+class JvmWorkerLimitTests(TestCase):
+    """Per-problem limits of Java runs on the warm JVM pool."""
+
+    def setUp(self):
+        self.run_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.run_dir, ignore_errors=True)
+
+    def make_worker(self, reply):
+        """Worker whose JVM answers every command with reply."""
+        worker = JvmWorker.__new__(JvmWorker)
+        worker.runs = 0
+        worker.sent = []
+        worker._send = lambda *fields: worker.sent.append(fields)
+        worker._read_reply = lambda expected, timeout: reply
+        return worker
+
+    def test_limits_are_sent_with_the_run(self):
+        worker = self.make_worker(['DONE', '0', '1000000', '2048', '40000', '1'])
+        run, reusable = worker.run(self.run_dir, '', timeout=3, cpu_seconds=2, memory_limit_mb=64)
+
+        self.assertEqual(worker.sent, [('RUN', self.run_dir, '3000', '2000', str(64 * 1024 * 1024))])
+        self.assertEqual(run['exit_code'], 0)
+        self.assertEqual(run['max_rss_kb'], 2)
+        self.assertTrue(reusable)
+
+    def test_cpu_limit_is_a_time_limit_verdict(self):
+        worker = self.make_worker(['LIMIT', 'cpu', '2100000000', '4096'])
+        run, reusable = worker.run(self.run_dir, '', timeout=6, cpu_seconds=2, memory_limit_mb=256)
+
+        self.assertFalse(reusable)
+        self.assertEqual(run['signal'], signal.SIGXCPU)
+        self.assertEqual(build_local_result(run)['status'], 'Time Limit Exceeded')
+
+    def test_memory_limit_is_a_memory_limit_verdict(self):
+        worker = self.make_worker(['LIMIT', 'memory', '500000000', str(80 * 1024 * 1024)])
+        run, reusable = worker.run(self.run_dir, '', timeout=6, cpu_seconds=5, memory_limit_mb=64)
+
+        self.assertFalse(reusable)
+        limits = resolve_execution_limits({'memory_limit': 64})
+        result = build_test_case_result(1, {'input': '', 'output': ''}, build_local_result(run), limits)
+        self.assertEqual(result['verdict'], 'Memory Limit Exceeded')
+
+    def test_pool_passes_the_problem_limits(self):
+        pool = JvmWorkerPool(size=1)
+        worker = mock.Mock()
+        worker.run.return_value = ({'stdout': '', 'stderr': '', 'exit_code': 0, 'signal': None, 'timed_out': False,
+                                    'wall_time': 0.1, 'cpu_time': 0.1, 'max_rss_kb': 0}, True)
+        with mock.patch.object(pool, '_acquire', return_value=worker), \
+                mock.patch.object(pool, '_prepare', return_value=''), \
+                mock.patch.object(pool, '_release'), \
+                mock.patch('problems.jvm_pool.get_jvm_pool', return_value=pool), \
+                mock.patch('problems.local_executor.LOCAL_EXECUTOR_TIMEOUT', 10), \
+                mock.patch('problems.local_executor.LOCAL_EXECUTOR_MEMORY_LIMIT_MB', 256):
+            execute_code_local('JAVA', 'public class Main {}', '', resolve_execution_limits(
+                {'time_limit': 1.5, 'memory_limit': 64}
+            ))
+
+        _, _, timeout, cpu_seconds, memory_limit_mb = worker.run.call_args.args
+        self.assertEqual((cpu_seconds, memory_limit_mb), (2, 64))
+        self.assertLess(timeout, 10)
+
+
+class ClaimNextJobTests(TestCase):
+    """Claiming queued and abandoned execution jobs."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='worker-test', password='pass')
+
+    def create_job(self, age, **fields):
+        """Queue a job created age seconds ago."""
+        job = ExecutionJob.objects.create(user=self.user, kind='EXECUTE', language='PYTHON', code='print(1)', **fields)
+        ExecutionJob.objects.filter(pk=job.pk).update(created_at=timezone.now() - timedelta(seconds=age))
+        return job
+
+    def test_oldest_queued_job_is_claimed_first(self):
+        newer = self.create_job(10)
+        older = self.create_job(20)
+
+        job = claim_next_job('worker-1')
+        self.assertEqual(job.pk, older.pk)
+        self.assertEqual(job.status, 'RUNNING')
+        self.assertEqual(job.worker, 'worker-1')
+        self.assertEqual(job.attempts, 1)
+        self.assertIsNotNone(job.lease_expires_at)
+
+        self.assertEqual(claim_next_job('worker-2').pk, newer.pk)
+        self.assertIsNone(claim_next_job('worker-3'))
+
+    def test_running_job_with_live_lease_is_not_claimed(self):
+        self.create_job(
+            10, status='RUNNING', worker='worker-1', attempts=1,
+            lease_expires_at=timezone.now() + timedelta(minutes=1)
+        )
+        self.assertIsNone(claim_next_job('worker-2'))
+
+    def test_job_with_expired_lease_is_reclaimed(self):
+        job = self.create_job(
+            10, status='RUNNING', worker='worker-1', attempts=1,
+            lease_expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        claimed = claim_next_job('worker-2')
+        self.assertEqual(claimed.pk, job.pk)
+        self.assertEqual(claimed.worker, 'worker-2')
+        self.assertEqual(claimed.attempts, 2)
+
+    def test_job_out_of_attempts_is_failed(self):
+        job = self.create_job(
+            10, status='RUNNING', worker='worker-1', attempts=EXECUTION_JOB_MAX_ATTEMPTS,
+            lease_expires_at=timezone.now() - timedelta(seconds=1)
+        )
+
+        self.assertIsNone(claim_next_job('worker-2'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'FAILED')
+        self.assertEqual(job.error, 'Execution worker stopped responding')
+
+
+class ClaimNextJobLockingTests(TransactionTestCase):
+    """Claims skip rows locked by another worker instead of waiting for them."""
+
+    @skipUnlessDBFeature('has_select_for_update_skip_locked')
+    def test_locked_job_is_skipped(self):
+        from django.db import connection, transaction
+
+        user = User.objects.create_user(username='worker-lock-test', password='pass')
+        older = ExecutionJob.objects.create(user=user, kind='EXECUTE', language='PYTHON', code='print(1)')
+        ExecutionJob.objects.filter(pk=older.pk).update(created_at=timezone.now() - timedelta(seconds=20))
+        newer = ExecutionJob.objects.create(user=user, kind='EXECUTE', language='PYTHON', code='print(2)')
+
+        locked = threading.Event()
+        done = threading.Event()
+
+        def hold_lock():
+            try:
+                with transaction.atomic():
+                    ExecutionJob.objects.select_for_update().get(pk=older.pk)
+                    locked.set()
+                    done.wait(5)
+            finally:
+                connection.close()
+
+        holder = threading.Thread(target=hold_lock, daemon=True)
+        holder.start()
+        self.assertTrue(locked.wait(5))
+        try:
+            self.assertEqual(claim_next_job('worker-2').pk, newer.pk)
+        finally:
+            done.set()
+            holder.join(5)
+
+
+class StreamingTests(TestCase):
+    """NDJSON / server-sent event streams of test case results."""
+
+    def fake_run(self, language, code, test_cases, cancel_event=None, on_result=None, **kwargs):
+        results = []
+        for idx, _ in enumerate(test_cases, 1):
+            results.append({'test_case': idx, 'passed': True})
+            on_result(results[-1])
+        return {'all_passed': True, 'passed_count': len(results), 'total_count': len(results), 'results': results}
+
+    def test_records_are_framed_per_format(self):
+        record = {'type': 'result', 'completed': 1, 'total': 2, 'result': {'passed': True}}
+        self.assertEqual(format_stream_record(record, 'ndjson'), json.dumps(record) + '\n')
+        self.assertEqual(format_stream_record(None, 'ndjson'), '\n')
+        self.assertEqual(format_stream_record(record, 'sse'), f'event: result\ndata: {json.dumps(record)}\n\n')
+        self.assertEqual(format_stream_record(None, 'sse'), ': keep-alive\n\n')
+
+    def test_results_then_summary(self):
+        with mock.patch('problems.streaming.run_test_cases', side_effect=self.fake_run):
+            records = list(stream_test_cases('PYTHON', 'print(1)', [{}, {}]))
+
+        self.assertEqual(
+            [(record['type'], record.get('completed')) for record in records],
+            [('result', 1), ('result', 2), ('summary', None)]
+        )
+        self.assertEqual(records[0]['total'], 2)
+        self.assertTrue(records[-1]['all_passed'])
+
+    @mock.patch('problems.streaming.STREAM_KEEPALIVE_INTERVAL', 0.01)
+    def test_idle_stream_sends_keepalives(self):
+        def slow_run(*args, **kwargs):
+            time.sleep(0.1)
+            return self.fake_run(*args, **kwargs)
+
+        with mock.patch('problems.streaming.run_test_cases', side_effect=slow_run):
+            records = list(stream_test_cases('PYTHON', 'print(1)', [{}]))
+
+        self.assertIsNone(records[0])
+        self.assertEqual([record['type'] for record in records if record], ['result', 'summary'])
+
+    def test_failed_run_ends_with_an_error_record(self):
+        with mock.patch('problems.streaming.run_test_cases', side_effect=RuntimeError('boom')):
+            records = list(stream_test_cases('PYTHON', 'print(1)', [{}]))
+        self.assertEqual(records, [{'type': 'error', 'error': 'Failed to run tests: boom'}])
+
+    def test_closing_the_stream_cancels_the_run(self):
+        cancelled = threading.Event()
+
+        def run(language, code, test_cases, cancel_event=None, on_result=None, **kwargs):
+            on_result({'test_case': 1, 'passed': True})
+            wait_until(cancel_event.is_set)
+            cancelled.set()
+            return {'results': []}
+
+        with mock.patch('problems.streaming.run_test_cases', side_effect=run):
+            stream = stream_test_cases('PYTHON', 'print(1)', [{}, {}])
+            self.assertEqual(next(stream)['type'], 'result')
+            stream.close()
+            self.assertTrue(cancelled.wait(5))
+
+    def test_run_tests_streams_ndjson_and_sse(self):
+        user = User.objects.create_user(username='stream-test', password='pass')
+        problem = Problem.objects.create(
+            user=user, problem_name='Two Sum', test_cases=[{'input': '1', 'output': '1'}] * 2
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+        url = f'/api/problems/{problem.pk}/run_tests/'
+        body = {'language': 'PYTHON', 'code': 'print(1)'}
+
+        with mock.patch('problems.streaming.run_test_cases', side_effect=self.fake_run):
+            ndjson = client.post(f'{url}?stream=ndjson', body, format='json')
+            sse = client.post(f'{url}?stream=sse', body, format='json')
+            unsupported = client.post(f'{url}?stream=xml', body, format='json')
+
+        self.assertEqual(ndjson['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(ndjson.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual([json.loads(line)['type'] for line in lines], ['result', 'result', 'summary'])
+
+        self.assertEqual(sse['Content-Type'], 'text/event-stream')
+        events = b''.join(sse.streaming_content).decode('utf-8').split('\n\n')
+        self.assertEqual([event.split('\n')[0] for event in events if event],
+                         ['event: result', 'event: result', 'event: summary'])
+        self.assertEqual(unsupported.status_code, 400)
+
+
+class FailFastTests(TestCase):
+    """Fail-fast runs stop at the first failing test case."""
+
+    test_cases = [
+        {'input': '1', 'output': '1'},
+        {'input': '2', 'output': '2'},
+        {'input': '3', 'output': '3'},
+    ]
+
+    @mock.patch('problems.services.get_test_case_concurrency', return_value=1)
+    @mock.patch('problems.services.execute_code', return_value=build_result('wrong'))
+    def test_failing_first_case_stops_the_run(self, execute, concurrency):
+        summary = run_test_cases('PYTHON', 'print(0)', self.test_cases, stop_on_first_failure=True)
+
+        # Not packed into a batch harness, which would run every case
+        execute.assert_called_once()
+        self.assertEqual(execute.call_args.args[1], 'print(0)')
+        self.assertTrue(summary['stopped_early'])
+        self.assertEqual(
+            [result['verdict'] for result in summary['results']],
+            ['Wrong Answer', 'Not Run', 'Not Run']
+        )
+
+    @mock.patch('problems.services.get_test_case_concurrency', return_value=1)
+    @mock.patch('problems.services.execute_code', return_value=build_result('wrong'))
+    def test_without_fail_fast_every_case_runs(self, execute, concurrency):
+        with mock.patch('problems.services.TEST_CASE_BATCH_MODE', False):
+            summary = run_test_cases('PYTHON', 'print(0)', self.test_cases)
+
+        self.assertEqual(execute.call_count, 3)
+        self.assertFalse(summary['stopped_early'])
+        self.assertEqual(summary['passed_count'], 0)
+
+
+class CompileErrorShortCircuitTests(TestCase):
+    """A submission that does not compile is reported once, with no case run."""
+
+    cases = [{'input': str(idx), 'output': str(idx)} for idx in range(1, 4)]
+
+    def use_backend(self, backend):
+        router = mock.Mock()
+        router.current_backend.return_value = backend
+        patcher = mock.patch('problems.services.get_executor_router', return_value=router)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def compile_error(self):
+        return {**build_result(error='Compilation failed'), 'compile_output': "main.cpp:1: error: expected ';'"}
+
+    def assert_compile_error_summary(self, summary):
+        self.assertEqual(summary['verdict'], 'Compilation Error')
+        self.assertEqual(summary['compile_output'], "main.cpp:1: error: expected ';'")
+        self.assertEqual(summary['passed_count'], 0)
+        self.assertEqual([result['verdict'] for result in summary['results']], ['Not Run'] * 3)
+        self.assertTrue(all(result['error'] == 'Not run: compilation failed' for result in summary['results']))
+
+    @mock.patch('problems.services.TEST_CASE_BATCH_MODE', False)
+    def test_first_case_doubles_as_the_compile_check(self):
+        self.use_backend('piston')
+        with mock.patch('problems.services.execute_code', return_value=self.compile_error()) as execute:
+            summary = run_test_cases('CPP', 'int main() { return 0 }', self.cases)
+
+        self.assert_compile_error_summary(summary)
+        self.assertEqual(execute.call_count, 1)
+
+    def test_batch_harness_compile_error_runs_nothing_else(self):
+        self.use_backend('piston')
+        with mock.patch('problems.services.execute_code', return_value=self.compile_error()) as execute:
+            summary = run_test_cases('CPP', 'int main() { return 0 }', self.cases)
+
+        self.assert_compile_error_summary(summary)
+        self.assertEqual(execute.call_count, 1)
+        self.assertTrue(execute.call_args.kwargs.get('batch'))
+
+    @skipUnless(shutil.which('g++'), 'g++ is not installed')
+    def test_local_compile_check_runs_no_case(self):
+        self.use_backend('local')
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        with mock.patch('problems.local_executor.get_compile_cache', return_value=CompileCache(cache_dir)), \
+                mock.patch('problems.services.execute_code') as execute:
+            summary = run_test_cases('CPP', 'int main() { return 0 }', self.cases)
+
+        self.assertEqual(summary['verdict'], 'Compilation Error')
+        self.assertIn('error', summary['compile_output'])
+        self.assertEqual([result['verdict'] for result in summary['results']], ['Not Run'] * 3)
+        execute.assert_not_called()
+
+
+class RecordingFlight(SingleFlight):
+    """SingleFlight that fails a call joining one already in flight instead of waiting on it."""
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            if key in self._calls:
+                raise AssertionError('Joined a run already in flight')
+        return super().do(key, fn, *args, **kwargs)
+
+
+class ExecutionTokenTests(TestCase):
+    """A user's newest run of a problem supersedes the older ones."""
+
+    def tearDown(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    def test_identical_submission_shares_the_token(self):
+        first = begin_execution(1, 1, 'fingerprint-a')
+        second = begin_execution(1, 1, 'fingerprint-a')
+        self.assertIs(first, second)
+        self.assertFalse(first.is_set())
+        finish_execution(first)
+        finish_execution(second)
+
+    def test_different_code_supersedes_the_run_in_progress(self):
+        first = begin_execution(1, 1, 'fingerprint-a')
+        second = begin_execution(1, 1, 'fingerprint-b')
+        self.assertNotEqual(first.token, second.token)
+        self.assertTrue(first.superseded)
+        self.assertTrue(first.is_set())
+        self.assertFalse(second.is_set())
+
+        # Other users and problems are not affected
+        other = begin_execution(2, 1, 'fingerprint-c')
+        self.assertFalse(second.is_set())
+        for execution in (first, second, other):
+            finish_execution(execution)
+
+    def test_resubmission_after_supersession_gets_a_new_token(self):
+        first = begin_execution(1, 1, 'fingerprint-a')
+        finish_execution(begin_execution(1, 1, 'fingerprint-b'))
+        third = begin_execution(1, 1, 'fingerprint-a')
+        self.assertNotEqual(third.token, first.token)
+        self.assertFalse(third.is_set())
+        finish_execution(first)
+        finish_execution(third)
+
+    def test_published_job_supersedes_the_run_in_progress(self):
+        execution = begin_execution(1, 1, 'fingerprint-a')
+        publish_execution(1, 1, 'job-token')
+        self.assertTrue(execution.superseded)
+        finish_execution(execution)
+
+    def test_superseded_run_is_not_joined_by_its_resubmission(self):
+        user = User.objects.create_user(username='token-test', password='pass')
+        problem = Problem.objects.create(
+            user=user, problem_name='Two Sum', test_cases=[{'input': '1', 'expected_output': '1'}]
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+        url = f'/api/problems/{problem.pk}/run_tests/'
+        responses = {}
+
+        def run_test_cases(language, code, test_cases, cancel_event=None, **kwargs):
+            # While the first run of A is in progress: submit B, then A again
+            if code == 'A' and 'B' not in responses:
+                responses['B'] = client.post(url, {'language': 'PYTHON', 'code': 'B'}, format='json')
+                responses['A again'] = client.post(url, {'language': 'PYTHON', 'code': 'A'}, format='json')
+            return {'code': code, 'superseded_when_done': cancel_event.is_set(), 'results': []}
+
+        with mock.patch('problems.views.run_test_cases', side_effect=run_test_cases), \
+                mock.patch('problems.views.execution_flight', RecordingFlight()):
+            first = client.post(url, {'language': 'PYTHON', 'code': 'A'}, format='json')
+
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(first.json()['superseded'])
+        self.assertEqual(responses['B'].status_code, 200)
+        self.assertEqual(responses['B'].json()['code'], 'B')
+        self.assertEqual(responses['A again'].status_code, 200)
+        self.assertEqual(responses['A again'].json()['code'], 'A')
+        self.assertFalse(responses['A again'].json()['superseded_when_done'])
+        self.assertNotIn('superseded', responses['A again'].json())
+
+
+class ExecutionSchedulerTests(TestCase):
+    """Slots, lanes and per-user fairness of the execution scheduler."""
+
+    def queue(self, scheduler, order, user_id, lane):
+        """Start a thread that queues for a slot, records its turn and releases the slot."""
+        lane_stats = scheduler.stats()['lanes'][lane]
+        queued = lane_stats['queued']
+
+        def run():
+            scheduler.acquire(user_id, lane)
+            order.append((lane, user_id))
+            scheduler.release()
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        wait_until(lambda: scheduler.stats()['lanes'][lane]['queued'] == queued + 1)
+        return thread
+
+    def drain(self, scheduler, threads):
+        """Hand the held slot on and wait for every queued thread to run."""
+        scheduler.release()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(scheduler.stats()['running'], 0)
+
+    def test_free_slot_is_granted_without_queueing(self):
+        scheduler = ExecutionScheduler(slots=2)
+        self.assertTrue(scheduler.acquire(1))
+        self.assertTrue(scheduler.acquire(2))
+        self.assertFalse(scheduler.acquire(3, block=False))
+
+        scheduler.release()
+        self.assertTrue(scheduler.acquire(3, block=False))
+
+    def test_users_take_turns_within_a_lane(self):
+        scheduler = ExecutionScheduler(slots=1)
+        scheduler.acquire(None)
+        order = []
+        threads = [self.queue(scheduler, order, 'alice', SUBMIT_LANE) for _ in range(4)]
+        threads += [self.queue(scheduler, order, 'bob', SUBMIT_LANE) for _ in range(2)]
+
+        self.drain(scheduler, threads)
+        self.assertEqual(
+            [user_id for _, user_id in order],
+            ['alice', 'bob', 'alice', 'bob', 'alice', 'alice']
+        )
+
+    def test_lanes_share_slots_by_weight(self):
+        scheduler = ExecutionScheduler(slots=1, lane_weights={RUN_LANE: 4, SUBMIT_LANE: 1})
+        scheduler.acquire(None)
+        order = []
+        threads = [self.queue(scheduler, order, 'alice', SUBMIT_LANE) for _ in range(4)]
+        threads += [self.queue(scheduler, order, 'bob', RUN_LANE) for _ in range(4)]
+
+        self.drain(scheduler, threads)
+        lanes = [lane for lane, _ in order]
+        self.assertEqual(len(lanes), 8)
+        self.assertEqual(lanes[:5].count(RUN_LANE), 4)
+
+    def test_abandoned_wait_gives_up_its_place(self):
+        scheduler = ExecutionScheduler(slots=1)
+        scheduler.acquire(None)
+
+        self.assertFalse(scheduler.acquire(1, abandon=lambda: True))
+        stats = scheduler.stats()['lanes'][RUN_LANE]
+        self.assertEqual(stats['abandoned'], 1)
+        self.assertEqual(stats['queued'], 0)
+
+        scheduler.release()
+        self.assertEqual(scheduler.stats()['running'], 0)
+
+    def test_async_wait_is_woken_by_release_from_another_thread(self):
+        scheduler = ExecutionScheduler(slots=1)
+        scheduler.acquire(None)
+
+        async def acquire():
+            releaser = threading.Timer(0.05, scheduler.release)
+            releaser.start()
+            return await asyncio.wait_for(scheduler.acquire_async(1), 5)
+
+        self.assertTrue(asyncio.run(acquire()))
+        self.assertEqual(scheduler.stats()['running'], 1)
+        scheduler.release()
+
+    def test_cancelled_async_wait_leaves_the_queue(self):
+        scheduler = ExecutionScheduler(slots=1)
+        scheduler.acquire(None)
+
+        async def acquire():
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(scheduler.acquire_async(1), 0.05)
+
+        asyncio.run(acquire())
+        self.assertEqual(scheduler.stats()['lanes'][RUN_LANE]['abandoned'], 1)
+        scheduler.release()
+        self.assertEqual(scheduler.stats()['running'], 0)
+
+
+class ExecutorRouterTests(TestCase):
+    """Circuit breaker and failover between the remote backends."""
+
+    def fail(self, router, backend, calls):
+        for _ in range(calls):
+            router.record(backend, 0.1, True)
+
+    @mock.patch('problems.executor_router.EXECUTOR_PROBE_INTERVAL', 60)
+    def test_failing_backend_trips_to_failover(self):
+        router = ExecutorRouter('piston', failover='judge0', breaker=True)
+        self.fail(router, 'piston', 4)
+        self.assertEqual(router.current_backend(), 'piston')
+
+        self.fail(router, 'piston', 1)
+        self.assertEqual(router.stats()['backends']['piston']['state'], 'open')
+        self.assertEqual(router.stats()['backends']['piston']['trips'], 1)
+        self.assertEqual(router.choose_backend(), 'judge0')
+        self.assertEqual(router.stats()['failovers'], 1)
+
+    @mock.patch('problems.executor_router.EXECUTOR_PROBE_INTERVAL', 60)
+    def test_open_circuit_without_failover_fails_fast(self):
+        router = ExecutorRouter('piston', failover='', breaker=True)
+        self.fail(router, 'piston', 5)
+        self.assertIsNone(router.choose_backend())
+        self.assertEqual(router.stats()['rejected'], 1)
+
+    def test_disabled_breaker_only_reports_health(self):
+        router = ExecutorRouter('piston', failover='', breaker=False)
+        self.fail(router, 'piston', 10)
+        self.assertEqual(router.current_backend(), 'piston')
+        self.assertEqual(router.stats()['backends']['piston']['failures'], 10)
+        self.assertEqual(router.stats()['backends']['piston']['trips'], 0)
+
+    @mock.patch('problems.executor_router.EXECUTOR_PROBE_INTERVAL', 60)
+    def test_slow_calls_count_as_failures_only_when_measured(self):
+        router = ExecutorRouter('piston', failover='judge0', breaker=True)
+        for _ in range(5):
+            router.record('piston', None, False)
+        self.assertEqual(router.current_backend(), 'piston')
+
+        for _ in range(5):
+            router.record('piston', 60.0, False)
+        self.assertEqual(router.current_backend(), 'judge0')
+
+    @mock.patch('problems.executor_router.EXECUTOR_PROBE_INTERVAL', 0.01)
+    def test_successful_probe_closes_the_circuit(self):
+        router = ExecutorRouter('piston', failover='judge0', breaker=True)
+        with mock.patch('problems.services.probe_backend', return_value=True) as probe:
+            self.fail(router, 'piston', 5)
+            wait_until(lambda: router.is_available('piston'))
+        probe.assert_called_with('piston')
+        self.assertEqual(router.current_backend(), 'piston')
+
+    @mock.patch('problems.services.get_result_cache', return_value=NullResultCache())
+    @mock.patch('problems.services.execute_code_judge0', return_value=build_result('from judge0'))
+    @mock.patch('problems.services.execute_code_piston',
+                return_value=build_result('', PISTON_API_ERROR_PREFIX + '503 Service Unavailable'))
+    def test_backend_failure_is_retried_on_failover(self, piston, judge0, result_cache):
+        router = ExecutorRouter('piston', failover='judge0', breaker=False)
+        with mock.patch('problems.services.get_executor_router', return_value=router):
+            result = execute_code('PYTHON', 'print(1)')
+
+        self.assertEqual(result['output'], 'from judge0')
+        piston.assert_called_once()
+        judge0.assert_called_once()
+        self.assertEqual(router.stats()['backends']['piston']['failures'], 1)
+
+    @mock.patch('problems.services.execute_code_piston')
+    def test_no_backend_call_while_every_circuit_is_open(self, piston):
+        router = ExecutorRouter('piston', failover='', breaker=True)
+        with mock.patch('problems.executor_router.EXECUTOR_PROBE_INTERVAL', 60):
+            self.fail(router, 'piston', 5)
+        with mock.patch('problems.services.get_executor_router', return_value=router):
+            result = execute_code('PYTHON', 'print(1)')
+
+        self.assertIn('temporarily unavailable', result['error'])
+        piston.assert_not_called()
+
+
+class EndpointPoolTests(TestCase):
+    """Endpoint selection and caps across the hosts of a service."""
+
+    def test_least_outstanding_spreads_requests(self):
+        pool = EndpointPool(['http://a', 'http://b'], policy='least_outstanding')
+        first = pool.acquire()
+        second = pool.acquire()
+        self.assertNotEqual(first.url, second.url)
+
+        pool.release(first, 0.1)
+        self.assertEqual(pool.acquire().url, first.url)
+
+    def test_latency_policy_prefers_the_faster_endpoint(self):
+        pool = EndpointPool(['http://slow', 'http://fast'], policy='latency')
+        slow, fast = pool.endpoints
+        for endpoint, latency in ((slow, 2.0), (fast, 0.1)):
+            endpoint.outstanding += 1
+            pool.release(endpoint, latency)
+
+        self.assertIs(pool.acquire(), fast)
+        self.assertIs(pool.acquire(), fast)
+
+    def test_failed_request_counts_as_slow(self):
+        pool = EndpointPool(['http://a'], policy='latency')
+        endpoint = pool.acquire()
+        pool.release(endpoint, 0.01, failed=True)
+        self.assertGreaterEqual(endpoint.latency, 1.0)
+        self.assertEqual(endpoint.errors, 1)
+
+    def test_endpoints_at_their_cap_are_not_picked(self):
+        pool = EndpointPool(['http://a', 'http://b'], max_concurrency=1)
+        self.assertEqual(pool.capacity, 2)
+        first = pool.acquire()
+        pool.acquire()
+        self.assertIsNone(pool.acquire(block=False))
+
+        pool.release(first, 0.1)
+        self.assertIs(pool.acquire(block=False), first)
+
+    def test_failed_block_is_recorded_as_an_error(self):
+        pool = EndpointPool(['http://a'])
+        with self.assertRaises(ConnectionError):
+            with pool.endpoint() as url:
+                self.assertEqual(url, 'http://a')
+                raise ConnectionError('refused')
+        self.assertEqual(pool.endpoints[0].errors, 1)
+        self.assertEqual(pool.endpoints[0].outstanding, 0)
+
+
+class HedgedRequestTests(TestCase):
+    """Duplicating slow requests to a second endpoint."""
+
+    def setUp(self):
+        self.unblock = threading.Event()
+
+    def tearDown(self):
+        self.unblock.set()
+
+    def seed(self, pool, latency, samples=20):
+        """Record successful requests of the given latency on the pool's endpoints."""
+        for _ in range(samples):
+            pool.release(pool.acquire(), latency)
+
+    def test_no_hedging_without_enough_samples(self):
+        pool = EndpointPool(['http://a', 'http://b'], hedging=True)
+        self.assertIsNone(pool.get_hedge_delay())
+        self.assertEqual(pool.call(lambda url: url), 'http://a')
+        self.assertEqual(pool.stats()['hedges'], 0)
+
+    @mock.patch('problems.executor_client.EXECUTOR_HEDGE_MAX_RATE', 1.0)
+    def test_slow_request_is_hedged_to_another_endpoint(self):
+        pool = EndpointPool(['http://a', 'http://b'], hedging=True)
+        self.seed(pool, 0.01)
+        self.assertAlmostEqual(pool.get_hedge_delay(), 0.01)
+
+        attempts = []
+        lock = threading.Lock()
+
+        def send(url):
+            with lock:
+                attempts.append(url)
+                first = len(attempts) == 1
+            if first:
+                self.unblock.wait(5)
+                return 'slow'
+            return 'fast'
+
+        self.assertEqual(pool.call(send), 'fast')
+        self.assertEqual(len(set(attempts)), 2)
+        stats = pool.stats()
+        self.assertEqual(stats['hedges'], 1)
+        self.assertEqual(stats['hedge_wins'], 1)
+
+    @mock.patch('problems.executor_client.EXECUTOR_HEDGE_MAX_RATE', 0.1)
+    def test_hedge_rate_is_bounded(self):
+        pool = EndpointPool(['http://a', 'http://b'], hedging=True)
+        self.seed(pool, 0.01)
+
+        def send(url):
+            self.unblock.wait(0.05)
+            return url
+
+        # Hedging the first request of the window would put the hedge rate at 100%
+        pool.call(send)
+        self.assertEqual(pool.stats()['hedges'], 0)
+
+    def test_hedging_needs_two_endpoints(self):
+        pool = EndpointPool(['http://a'], hedging=True)
+        self.seed(pool, 0.01)
+        self.assertFalse(pool.hedging)
+        self.assertIsNone(pool.get_hedge_delay())
+
+
+class FakeJudge0Client:
+    """Async executor client answering Judge0 batch requests; every token finishes on its second poll."""
+
+    def __init__(self):
+        self.created = []
+        self.polled = []
+        self.polls = {}
+
+    async def post(self, url, json=None, **kwargs):
+        start = sum(len(batch) for batch in self.created)
+        self.created.append(json['submissions'])
+        tokens = [{'token': f'token-{start + n}'} for n in range(len(json['submissions']))]
+        return httpx.Response(200, json=tokens, request=httpx.Request('POST', url))
+
+    async def get(self, url, params=None, **kwargs):
+        tokens = params['tokens'].split(',')
+        self.polled.append(len(tokens))
+        submissions = []
+        for token in tokens:
+            self.polls[token] = self.polls.get(token, 0) + 1
+            # token-0 stays queued one round longer than the rest
+            done = self.polls[token] >= (3 if token == 'token-0' else 2)
+            status = {'id': 3, 'description': 'Accepted'} if done else {'id': 2, 'description': 'Processing'}
+            submissions.append({'status': status, 'stdout': encode_base64('ok\n') if done else None})
+        return httpx.Response(200, json={'submissions': submissions}, request=httpx.Request('GET', url))
+
+
+class AsyncExecutionTests(TestCase):
+    """Async executor client and ASGI views."""
+
+    def test_client_is_closed_with_its_event_loop(self):
+        async def get_client():
+            client = get_async_executor_client()
+            self.assertIs(get_async_executor_client(), client)
+            return client
+
+        client = asyncio.run(get_client())
+        self.assertTrue(client.client.is_closed)
+        self.assertIsNot(asyncio.run(get_client()), client)
+
+    def test_run_tests_status_codes_match_the_sync_view(self):
+        owner = User.objects.create_user(username='async-owner', password='pass')
+        other = User.objects.create_user(username='async-other', password='pass')
+        problem = Problem.objects.create(
+            user=owner, problem_name='Two Sum', test_cases=[{'input': '1', 'expected_output': '1'}]
+        )
+        empty = Problem.objects.create(user=other, problem_name='Empty', test_cases=[])
+        client = APIClient()
+        client.force_authenticate(other)
+        token = str(RefreshToken.for_user(other).access_token)
+        body = {'language': 'PYTHON', 'code': 'print(1)'}
+
+        for pk, expected in ((problem.pk, 403), (problem.pk + empty.pk + 100, 404), (empty.pk, 400)):
+            sync_response = client.post(f'/api/problems/{pk}/run_tests/', body, format='json')
+            request = RequestFactory().post(
+                f'/api/asgi/problems/{pk}/run_tests/', json.dumps(body), content_type='application/json',
+                HTTP_AUTHORIZATION=f'Bearer {token}'
+            )
+            async_response = async_to_sync(run_tests_async)(request, pk=pk)
+            self.assertEqual((sync_response.status_code, async_response.status_code), (expected, expected))
+
+    def test_judge0_cases_use_the_batch_endpoints(self):
+        client = FakeJudge0Client()
+        cases = [(idx, {'input': str(idx), 'output': 'ok'}) for idx in range(1, 26)]
+        with mock.patch('problems.async_services.get_async_executor_client', return_value=client), \
+                mock.patch('problems.async_services.get_poll_delays', return_value=[0] * 5):
+            results = asyncio.run(run_test_cases_judge0_batch_async('PYTHON', 'print("ok")', cases))
+
+        self.assertEqual(sorted(results), list(range(1, 26)))
+        self.assertTrue(all(result['passed'] for result in results.values()))
+        self.assertEqual([len(batch) for batch in client.created], [20, 5])
+        # Unfinished tokens are fetched together on the next round
+        self.assertEqual(client.polled, [20, 5, 20, 5, 1])
+
+    def test_judge0_execution_is_a_batch_of_one(self):
+        client = FakeJudge0Client()
+        with mock.patch('problems.async_services.get_async_executor_client', return_value=client), \
+                mock.patch('problems.async_services.get_poll_delays', return_value=[0] * 5):
+            result = asyncio.run(execute_code_judge0_async('PYTHON', 'print("ok")', 'x'))
+
+        self.assertEqual(result['output'].strip(), 'ok')
+        self.assertEqual([len(batch) for batch in client.created], [1])
+        self.assertEqual(client.polled, [1, 1, 1])
+
+    @mock.patch('problems.async_services.JUDGE0_CALLBACK_URL', 'https://codevault.test/api/judge0/callback/')
+    def test_judge0_callback_ends_the_wait(self):
+        async def poll():
+            task = asyncio.ensure_future(poll_submissions_batch_async(['token-1']))
+            await asyncio.sleep(0.05)
+            judge0_completions.complete('token-1', {'status': {'id': 3}, 'stdout': encode_base64('ok')})
+            return await task
+
+        client = FakeJudge0Client()
+        with mock.patch('problems.async_services.get_async_executor_client', return_value=client), \
+                mock.patch('problems.async_services.get_poll_delays', return_value=[5]):
+            started = time.monotonic()
+            results = asyncio.run(poll())
+
+        self.assertIn('token-1', results)
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(client.polled, [])
+
+
+class BulkheadTests(TestCase):
+    """Concurrency ceiling, waiting line and 429 responses of the execution bulkhead."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_requests_beyond_the_line_are_rejected(self):
+        bulkhead = Bulkhead(max_concurrent=1, max_queue=1, queue_timeout=5)
+        self.assertTrue(bulkhead.enter())
+
+        admitted = []
+        waiter = threading.Thread(target=lambda: admitted.append(bulkhead.enter()), daemon=True)
+        waiter.start()
+        wait_until(lambda: bulkhead.stats()['waiting'] == 1)
+        self.assertFalse(bulkhead.enter())
+
+        bulkhead.leave(0.1)
+        waiter.join(5)
+        self.assertEqual(admitted, [True])
+        stats = bulkhead.stats()
+        self.assertEqual((stats['admitted'], stats['queued'], stats['rejected']), (2, 1, 1))
+
+    def test_wait_in_line_times_out(self):
+        bulkhead = Bulkhead(max_concurrent=1, max_queue=1, queue_timeout=0.05)
+        bulkhead.enter()
+        self.assertFalse(bulkhead.enter())
+        self.assertEqual(bulkhead.stats()['waiting'], 0)
+
+    def test_retry_after_covers_the_backlog(self):
+        bulkhead = Bulkhead(max_concurrent=2, max_queue=2)
+        bulkhead.enter()
+        bulkhead.leave(4.0)
+        bulkhead.enter()
+        bulkhead.enter()
+        self.assertEqual(bulkhead.get_retry_after(), 4)
+
+    def test_turned_away_request_gets_429_with_retry_after(self):
+        view = bulkheaded(lambda request: HttpResponse('ran'))
+        with mock.patch('problems.bulkhead.execution_bulkhead', Bulkhead(max_concurrent=0, max_queue=0)):
+            response = view(self.factory.post('/api/execute/'))
+
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+
+    def test_streaming_response_keeps_its_turn_until_sent(self):
+        bulkhead = Bulkhead(max_concurrent=1, max_queue=0)
+        view = bulkheaded(lambda request: StreamingHttpResponse(iter([b'a', b'b'])))
+        with mock.patch('problems.bulkhead.execution_bulkhead', bulkhead):
+            response = view(self.factory.post('/api/execute/'))
+            self.assertEqual(bulkhead.stats()['running'], 1)
+            self.assertEqual(b''.join(response.streaming_content), b'ab')
+        self.assertEqual(bulkhead.stats()['running'], 0)
+
+    def test_async_views_use_their_own_bulkhead(self):
+        async def view(request):
+            return HttpResponse('ran')
+
+        sync_bulkhead = Bulkhead(max_concurrent=0, max_queue=0)
+        with mock.patch('problems.bulkhead.execution_bulkhead', sync_bulkhead), \
+                mock.patch('problems.bulkhead.async_execution_bulkhead', Bulkhead(max_concurrent=1, max_queue=0)):
+            response = asyncio.run(bulkheaded(view)(self.factory.post('/api/asgi/execute/')))
+        self.assertEqual(response.status_code, 200)
+
+    def test_execution_endpoint_is_limited_but_crud_is_not(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='bulkhead-test', password='pass'))
+
+        with mock.patch('problems.bulkhead.execution_bulkhead', Bulkhead(max_concurrent=0, max_queue=0)):
+            response = client.post('/api/execute/', {'language': 'PYTHON', 'code': 'print(1)'}, format='json')
+            self.assertEqual(response.status_code, 429)
+            self.assertIn('Retry-After', response)
+            self.assertEqual(response.json()['retry_after'], int(response['Retry-After']))
+
+            self.assertEqual(client.get('/api/problems/').status_code, 200)
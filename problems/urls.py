@@ -4,7 +4,8 @@ from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
-from .views import ProblemViewSet, SolutionViewSet, CollectionViewSet, RegisterView, run_code
+from .views import ProblemViewSet, SolutionViewSet, CollectionViewSet, RegisterView, run_code, executor_stats, judge0_callback, job_detail
+from .async_views import run_code_async, run_tests_async
 
 # Create router and register viewsets
 router = DefaultRouter()
@@ -20,6 +21,13 @@ urlpatterns = [
     
     # Code execution endpoint
     path('execute/', run_code, name='execute_code'),
+    path('jobs/<uuid:job_id>/', job_detail, name='job_detail'),
+    path('executor/stats/', executor_stats, name='executor_stats'),
+    path('judge0/callback/', judge0_callback, name='judge0_callback'),
+    
+    # Async code execution endpoints (served without a thread per request under ASGI)
+    path('asgi/execute/', run_code_async, name='execute_code_async'),
+    path('asgi/problems/<int:pk>/run_tests/', run_tests_async, name='run_tests_async'),
     
     # ViewSet routes
     path('', include(router.urls)),
@@ -1,15 +1,51 @@
 from rest_framework import viewsets, status, filters
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import action, api_view, permission_classes, authentication_classes
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly, AllowAny
+from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly, AllowAny, IsAdminUser
 from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
 from django.contrib.auth.models import User
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from django.utils import timezone
+from django.utils.crypto import constant_time_compare
 
-from .models import Problem, Solution, Collection
-from .serializers import ProblemSerializer, ProblemListSerializer, SolutionSerializer, UserSerializer, CollectionSerializer, CollectionListSerializer
-from .services import execute_code, run_test_cases
+from .models import Problem, Solution, Collection, ExecutionJob
+from .serializers import ProblemSerializer, ProblemListSerializer, SolutionSerializer, UserSerializer, CollectionSerializer, CollectionListSerializer, ExecutionJobSerializer
+from .services import execute_code, run_test_cases, judge0_completions, JUDGE0_CALLBACK_SECRET
+from .async_executor_client import get_async_executor_stats
+from .bulkhead import async_execution_bulkhead, bulkheaded, execution_bulkhead
+from .executor_client import get_executor_client
+from .executor_router import get_executor_router
+from .compile_cache import get_compile_cache
+from .execution_tokens import begin_execution, execution_scope, finish_execution
+from .jobs import enqueue_execute_job, enqueue_run_tests_job
+from .jvm_pool import get_jvm_pool
+from .python_zygote import get_python_zygote
+from .result_cache import get_result_cache
+from .scheduler import RUN_LANE, SUBMIT_LANE, execution_scheduler, scheduling
+from .singleflight import execution_flight, make_flight_key
+from .streaming import STREAM_CONTENT_TYPES, render_test_case_stream
+from .failure_history import get_failed_first_priority, remember_test_results
+
+
+def is_flag_set(request, name):
+    """Whether a boolean option is on ("name": true in the body or ?name=true)."""
+    value = request.data.get(name, request.query_params.get(name, False))
+    return str(value).lower() in ('1', 'true', 'yes')
+
+
+def wants_async(request):
+    """Whether the client asked for an asynchronous job ("async": true in the body or ?async=true)."""
+    return is_flag_set(request, 'async')
+
+
+def build_job_response(request, job):
+    """202 Accepted response for a newly queued job, pointing at its status URL."""
+    data = ExecutionJobSerializer(job).data
+    data['status_url'] = request.build_absolute_uri(reverse('job_detail', args=[job.id]))
+    return Response(data, status=status.HTTP_202_ACCEPTED)
 
 
 class RegisterView(APIView):
@@ -292,6 +328,7 @@ class ProblemViewSet(viewsets.ModelViewSet):
         }, status=status.HTTP_200_OK)
     
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
+    @bulkheaded
     def run_tests(self, request, pk=None):
         """
         Run code against problem's test cases (LeetCode-style).
@@ -301,15 +338,43 @@ class ProblemViewSet(viewsets.ModelViewSet):
         Expected POST data:
         {
             "language": "PYTHON",
-            "code": "def solution():\\n    return 42"
+            "code": "def solution():\\n    return 42",
+            "async": false,  // optional: queue a job and return right away
+            "stream": "ndjson",  // optional: "ndjson" or "sse" (also ?stream=...)
+            "stop_on_first_failure": false  // optional: start no further cases once one fails
         }
         
+        Cases run under the problem's time_limit/memory_limit when set and
+        report a verdict such as 'Time Limit Exceeded' per case. Cases that
+        failed on the user's previous runs are run first (see
+        problems/failure_history.py).
+        
+        With "stream", each case's result is sent as soon as it finishes,
+        followed by a summary record (see problems/streaming.py).
+        
+        Submitting different code while an earlier run of this problem is in
+        progress supersedes that run: it starts no further cases, its local
+        processes are killed and it answers with "superseded": true (see
+        problems/execution_tokens.py).
+        
         Returns:
-            200 OK: Test results with pass/fail status
+            200 OK: Test results with pass/fail status and per-case verdicts
+                (streamed as NDJSON or server-sent events in stream mode)
+            202 Accepted: Job queued (async mode); poll GET /api/jobs/{id}/
             400 Bad Request: Missing required fields or no test cases
             403 Forbidden: User doesn't own the problem
+            404 Not Found: No such problem
+            429 Too Many Requests: Execution capacity exhausted; retry after
+                the Retry-After header's seconds (see problems/bulkhead.py)
         """
-        problem = self.get_object()
+        problem = get_object_or_404(Problem, pk=pk)
+        
+        # Ensure user can only run their own problems' tests
+        if problem.user_id != request.user.id:
+            return Response(
+                {'error': "You can only run your own problems' test cases"},
+                status=status.HTTP_403_FORBIDDEN
+            )
         
         # Check if problem has test cases
         if not problem.test_cases:
@@ -328,15 +393,68 @@ class ProblemViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Run test cases
+        stop_on_first_failure = is_flag_set(request, 'stop_on_first_failure')
+        if wants_async(request):
+            return build_job_response(
+                request, enqueue_run_tests_job(request.user, problem, language, code, stop_on_first_failure)
+            )
+        
+        test_cases = problem.test_cases
+        limits = problem.get_execution_limits()
+        priority = get_failed_first_priority(request.user, problem, test_cases)
+        fingerprint = make_flight_key(
+            request.user.id, 'run_tests', problem.pk, language, code, test_cases, limits,
+            stop_on_first_failure, priority
+        )
+        
+        stream_format = request.query_params.get('stream') or request.data.get('stream')
+        if stream_format:
+            if stream_format not in STREAM_CONTENT_TYPES:
+                return Response(
+                    {
+                        'error': f'Unsupported stream format: {stream_format}',
+                        'supported': list(STREAM_CONTENT_TYPES)
+                    },
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            response = StreamingHttpResponse(
+                render_test_case_stream(
+                    language, code, test_cases, stream_format, limits,
+                    stop_on_first_failure=stop_on_first_failure,
+                    priority=priority,
+                    execution=begin_execution(request.user.id, problem.pk, fingerprint),
+                    user_id=request.user.id,
+                    on_complete=lambda summary: remember_test_results(request.user, problem, test_cases, summary)
+                ),
+                content_type=STREAM_CONTENT_TYPES[stream_format]
+            )
+            # Keep proxies from buffering the stream
+            response['Cache-Control'] = 'no-cache'
+            response['X-Accel-Buffering'] = 'no'
+            return response
+        
+        # Run test cases (identical concurrent submissions share one run;
+        # different code supersedes the user's run of this problem in progress)
+        execution = begin_execution(request.user.id, problem.pk, fingerprint)
+        # Keyed by token too: a superseded run still finishing must not be joined
+        flight_key = make_flight_key(fingerprint, execution.token)
         try:
-            results = run_test_cases(language, code, problem.test_cases)
+            with execution_scope(execution), scheduling(request.user.id, SUBMIT_LANE):
+                results = execution_flight.do(
+                    flight_key, run_test_cases, language, code, test_cases, cancel_event=execution,
+                    limits=limits, stop_on_first_failure=stop_on_first_failure, priority=priority
+                )
+            if execution.superseded:
+                return Response({**results, 'superseded': True}, status=status.HTTP_200_OK)
+            remember_test_results(request.user, problem, test_cases, results)
             return Response(results, status=status.HTTP_200_OK)
         except Exception as e:
             return Response(
                 {'error': f'Failed to run tests: {str(e)}'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+        finally:
+            finish_execution(execution)
 
 
 class SolutionViewSet(viewsets.ModelViewSet):
@@ -479,6 +597,7 @@ class SolutionViewSet(viewsets.ModelViewSet):
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@bulkheaded
 def run_code(request):
     """
     Execute code using Judge0 API.
@@ -489,7 +608,8 @@ def run_code(request):
     {
         "language": "PYTHON",  // JAVA, PYTHON, CPP, JAVASCRIPT
         "code": "print('Hello World')",
-        "input": ""  // optional stdin input
+        "input": "",  // optional stdin input
+        "async": false  // optional: queue a job and return 202 with its id right away
     }
     
     Response:
@@ -502,6 +622,9 @@ def run_code(request):
         "memory": 4096,
         "compile_output": ""
     }
+    
+    When too many executions are already running or waiting, answers
+    429 Too Many Requests with a Retry-After header (see problems/bulkhead.py).
     """
     # Extract request data
     language = request.data.get('language', '').upper()
@@ -532,9 +655,14 @@ def run_code(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
+    if wants_async(request):
+        return build_job_response(request, enqueue_execute_job(request.user, language, code, input_data))
+    
     try:
-        # Execute code
-        result = execute_code(language, code, input_data)
+        # Execute code (identical concurrent requests share one execution)
+        flight_key = make_flight_key(request.user.id, 'execute', language, code, input_data)
+        with scheduling(request.user.id, RUN_LANE):
+            result = execution_flight.do(flight_key, execute_code, language, code, input_data)
         return Response(result, status=status.HTTP_200_OK)
         
     except Exception as e:
@@ -548,6 +676,206 @@ def run_code(request):
         )
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def job_detail(request, job_id):
+    """
+    Progress and result of an asynchronous execution job.
+    
+    GET /api/jobs/{id}/
+    
+    Response:
+    {
+        "id": "...",
+        "kind": "RUN_TESTS",          // or EXECUTE
+        "status": "RUNNING",          // QUEUED, RUNNING, COMPLETED or FAILED
+        "completed_count": 2,
+        "total_count": 5,
+        "result": null,               // run_tests / execute response once COMPLETED
+        "error": "",
+        ...
+    }
+    
+    Returns:
+        200 OK: Job status
+        404 Not Found: No such job for this user
+    """
+    job = get_object_or_404(ExecutionJob, pk=job_id, user=request.user)
+    return Response(ExecutionJobSerializer(job).data, status=status.HTTP_200_OK)
+
+
+@api_view(['PUT', 'POST'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def judge0_callback(request):
+    """
+    Receive a finished submission from Judge0 (callback mode).
+    
+    PUT /api/judge0/callback/?secret=<JUDGE0_CALLBACK_SECRET>
+    
+    Judge0 sends the full submission (base64 encoded fields) once it finishes;
+    the request waiting on that token is woken up instead of polling.
+    
+    Returns:
+        204 No Content: Result accepted
+        400 Bad Request: Missing token
+        403 Forbidden: Callbacks disabled or wrong secret
+    """
+    secret = request.query_params.get('secret', '')
+    if not JUDGE0_CALLBACK_SECRET or not constant_time_compare(secret, JUDGE0_CALLBACK_SECRET):
+        return Response(
+            {'error': 'Invalid callback secret'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    token = request.data.get('token')
+    if not token:
+        return Response(
+            {'error': 'token field is required'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    judge0_completions.complete(token, dict(request.data))
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def executor_stats(request):
+    """
+    Report code execution infrastructure counters for monitoring.
+    
+    GET /api/executor/stats/
+    
+    Response:
+    {
+        "http": {
+            "requests": 120,
+            "errors": 0,
+            "connections_opened": 4,
+            "connections_reused": 116,
+            "reuse_ratio": 0.967,
+            "pool_size": 20,
+            "endpoints": {
+                "piston": {
+                    "policy": "least_outstanding",
+                    "max_concurrency": 4,
+                    "hedging": true,
+                    "calls": 120,
+                    "hedges": 6,
+                    "hedge_wins": 4,
+                    "hedge_rate": 0.05,
+                    "hedge_delay_ms": 410.0,
+                    "endpoints": [
+                        {"url": "http://piston-1:2000/api/v2", "outstanding": 3, "requests": 61,
+                         "errors": 0, "latency_ms": 212.4},
+                        {"url": "http://piston-2:2000/api/v2", "outstanding": 2, "requests": 59,
+                         "errors": 0, "latency_ms": 230.9}
+                    ]
+                }
+            }
+        },
+        "async_http": {
+            "loops": 1,
+            "requests": 860,
+            "errors": 2
+        },
+        "result_cache": {
+            "backend": "memory",
+            "hits": 42,
+            "misses": 80,
+            "stores": 75,
+            "hit_ratio": 0.344
+        },
+        "single_flight": {
+            "executed": 120,
+            "coalesced": 7,
+            "in_flight": 1
+        },
+        "compile_cache": {
+            "hits": 30,
+            "misses": 4,
+            "hit_ratio": 0.882
+        },
+        "jvm_pool": {
+            "size": 2,
+            "idle": 2,
+            "started": 3,
+            "recycled": 1,
+            "runs": 57
+        },
+        "python_zygote": {
+            "runs": 210,
+            "cold_start_ms": 24.1,
+            "avg_startup_ms": 1.3,
+            "saved_ms_total": 4788.0
+        },
+        "scheduler": {
+            "slots": 8,
+            "running": 8,
+            "lanes": {
+                "run": {"weight": 4, "queued": 1, "users_queued": 1, "granted": 310, "abandoned": 0,
+                        "wait_ms": {"p50": 0.0, "p95": 120.5, "max": 480.2}},
+                "submit": {"weight": 1, "queued": 25, "users_queued": 2, "granted": 2200, "abandoned": 14,
+                           "wait_ms": {"p50": 35.2, "p95": 950.0, "max": 2100.7}}
+            }
+        },
+        "router": {
+            "primary": "piston",
+            "failover": "judge0",
+            "breaker": true,
+            "failovers": 12,
+            "rejected": 0,
+            "backends": {
+                "piston": {"state": "open", "calls": 480, "failures": 15, "failure_rate": 0.6,
+                           "latency_p50": 0.41, "latency_p95": 9.8, "trips": 1, "open_for": 12.5},
+                "judge0": {"state": "closed", "calls": 12, "failures": 0, "failure_rate": 0.0,
+                           "latency_p50": 0.9, "latency_p95": 1.4, "trips": 0, "open_for": null}
+            }
+        },
+        "bulkhead": {
+            "max_concurrent": 4,
+            "max_queue": 4,
+            "running": 4,
+            "waiting": 2,
+            "admitted": 930,
+            "queued": 41,
+            "rejected": 6,
+            "avg_service_ms": 820.4
+        },
+        "async_bulkhead": {
+            "max_concurrent": 200,
+            "max_queue": 200,
+            "running": 35,
+            "waiting": 0,
+            "admitted": 5120,
+            "queued": 0,
+            "rejected": 0,
+            "avg_service_ms": 610.2
+        }
+    }
+    
+    compile_cache, jvm_pool and python_zygote are null when disabled
+    (python_zygote also until its first run).
+    """
+    compile_cache = get_compile_cache()
+    jvm_pool = get_jvm_pool()
+    python_zygote = get_python_zygote(start=False)
+    return Response({
+        'http': get_executor_client().stats(),
+        'async_http': get_async_executor_stats(),
+        'result_cache': get_result_cache().stats(),
+        'single_flight': execution_flight.stats(),
+        'compile_cache': compile_cache.stats() if compile_cache else None,
+        'jvm_pool': jvm_pool.stats() if jvm_pool else None,
+        'python_zygote': python_zygote.stats() if python_zygote else None,
+        'scheduler': execution_scheduler.stats(),
+        'router': get_executor_router().stats(),
+        'bulkhead': execution_bulkhead.stats(),
+        'async_bulkhead': async_execution_bulkhead.stats(),
+    }, status=status.HTTP_200_OK)
+
+
 class CollectionViewSet(viewsets.ModelViewSet):
     """
     ViewSet for Collection model.